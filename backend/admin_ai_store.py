@@ -216,7 +216,8 @@ def get_ai_stats() -> Dict[str, Any]:
         "total_generations": total_generations,
         "total_tokens_used": total_tokens,
         "domains_used": domains_used,
-        "recent_generations": recent_generations
+        "recent_generations": recent_generations,
+        "response_cache": get_ai_cache_stats()
     }
 
 
@@ -260,6 +261,70 @@ def update_ai_stats(domain: Optional[str], tokens_used: Optional[int]) -> None:
                 logger.error(f"Error inserting AI domain stats: {e}")
 
 
+def record_ai_cache_stats(namespace: str, counters: Dict[str, int]) -> None:
+    """
+    Add AI response cache counters to the usage statistics.
+
+    Counters are stored as stat_type 'cache_<counter>' (cache_hits,
+    cache_similar_hits, cache_misses) keyed by the cache namespace.
+    """
+    pg_manager = get_postgres_manager()
+
+    for counter, delta in counters.items():
+        if not delta:
+            continue
+        stat_type = f"cache_{counter}"
+
+        update_query = """
+        UPDATE jeseci_academy.ai_usage_stats
+        SET stat_value = stat_value + %s, updated_at = NOW()
+        WHERE stat_type = %s AND stat_key = %s
+        """
+        try:
+            updated = pg_manager.execute_query(update_query, (delta, stat_type, namespace), fetch=False)
+        except Exception as e:
+            logger.error(f"Error updating AI cache stats: {e}")
+            continue
+
+        if updated == 0:
+            insert_query = """
+            INSERT INTO jeseci_academy.ai_usage_stats (stat_type, stat_key, stat_value, is_deleted, created_by, created_at, updated_by, updated_at)
+            VALUES (%s, %s, %s, false, 'system', NOW(), 'system', NOW())
+            """
+            try:
+                pg_manager.execute_query(insert_query, (stat_type, namespace, delta), fetch=False)
+            except Exception as e:
+                logger.error(f"Error inserting AI cache stats: {e}")
+
+
+def get_ai_cache_stats() -> Dict[str, Any]:
+    """Get persisted AI response cache hit-rate statistics per namespace"""
+    pg_manager = get_postgres_manager()
+
+    query = """
+    SELECT stat_type, stat_key, stat_value
+    FROM jeseci_academy.ai_usage_stats
+    WHERE stat_type IN ('cache_hits', 'cache_similar_hits', 'cache_misses')
+    AND is_deleted = false
+    """
+    try:
+        result = pg_manager.execute_query(query)
+    except Exception as e:
+        logger.error(f"Error getting AI cache stats: {e}")
+        result = None
+
+    namespaces: Dict[str, Dict[str, Any]] = {}
+    for row in result or []:
+        counters = namespaces.setdefault(row.get('stat_key'), {"hits": 0, "similar_hits": 0, "misses": 0})
+        counters[row.get('stat_type')[len("cache_"):]] = int(row.get('stat_value') or 0)
+
+    for counters in namespaces.values():
+        lookups = counters["hits"] + counters["similar_hits"] + counters["misses"]
+        counters["hit_rate"] = round((counters["hits"] + counters["similar_hits"]) / lookups * 100, 1) if lookups else 0
+
+    return namespaces
+
+
 def delete_ai_content(content_id: str, deleted_by: Optional[str] = None, ip_address: Optional[str] = None) -> Dict[str, Any]:
     """Soft delete AI generated content from PostgreSQL"""
     pg_manager = get_postgres_manager()
@@ -2,6 +2,7 @@
 # Uses the existing Quiz model from SQLAlchemy
 
 import os
+import copy
 import threading
 import datetime
 import logging
@@ -14,6 +15,7 @@ logger = logging.getLogger(__name__)
 import sys
 sys.path.insert(0, os.path.dirname(__file__))
 from database import get_postgres_manager
+from ai_response_cache import quiz_cache
 
 # In-memory cache for quick lookups
 quizzes_cache = {}
@@ -345,6 +347,20 @@ def generate_ai_quiz(topic: str, difficulty: str, question_count: int = 5) -> Di
         # Return a sample quiz for demo purposes
         return _generate_sample_quiz(topic, difficulty, question_count)
     
+    # Serve identical quiz requests from the response cache
+    cache_params = {"topic": topic, "difficulty": difficulty, "question_count": question_count}
+    cached_quiz = quiz_cache.get(cache_params)
+    if cached_quiz is not None:
+        quiz_data = copy.deepcopy(cached_quiz)
+        return {
+            "success": True,
+            "quiz": quiz_data,
+            "topic": topic,
+            "difficulty": difficulty,
+            "question_count": len(quiz_data.get("questions", [])),
+            "cached": True
+        }
+    
     async def _call_openai():
         prompt = f"""
         You are an expert quiz creator for the JAC programming language. 
@@ -416,6 +432,8 @@ def generate_ai_quiz(topic: str, difficulty: str, question_count: int = 5) -> Di
         finally:
             loop.close()
         
+        quiz_cache.set(cache_params, copy.deepcopy(quiz_data))
+        
         return {
             "success": True,
             "quiz": quiz_data,
@@ -24,6 +24,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from logger_config import logger
 import psycopg2
 from psycopg2 import extras
+from reputation_leaderboard import reputation_leaderboard
+from group_chat import get_group_chat_hub, to_message
 
 # Database configuration
 DB_SCHEMA = os.getenv("DB_SCHEMA", "jeseci_academy")
@@ -56,13 +58,40 @@ def generate_id(prefix: str = "") -> str:
 # REPUTATION SYSTEM FUNCTIONS
 # ==============================================================================
 
+# (minimum points, level), highest first
+REPUTATION_LEVELS = [
+    (10000, 10), (5000, 9), (2500, 8), (1000, 7), (500, 6),
+    (250, 5), (100, 4), (50, 3), (25, 2)
+]
+
+# Event types that also bump a per-user counter column
+REPUTATION_EVENT_COUNTERS = {
+    'upvote_received': 'total_upvotes_received',
+    'downvote_received': 'total_downvotes_received',
+    'answer_accepted': 'total_accepted_answers'
+}
+
+
+def reputation_level(points: int) -> int:
+    """Level for a reputation point total"""
+    for minimum, level in REPUTATION_LEVELS:
+        if points >= minimum:
+            return level
+    return 1
+
+
+def _level_sql(points_expr: str) -> str:
+    whens = " ".join(f"WHEN {points_expr} >= {minimum} THEN {level}" for minimum, level in REPUTATION_LEVELS)
+    return f"CASE {whens} ELSE 1 END"
+
+
 def get_user_reputation(user_id: int) -> Optional[Dict[str, Any]]:
     """Get reputation profile for a user"""
     conn = get_db_connection()
     try:
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.user_reputation WHERE user_id = %s
+            SELECT * FROM {DB_SCHEMA}.user_reputation WHERE user_id = %s
         """, (user_id,))
         result = cursor.fetchone()
         return dict(result) if result else None
@@ -70,88 +99,111 @@ def get_user_reputation(user_id: int) -> Optional[Dict[str, Any]]:
         conn.close()
 
 
-def create_or_update_reputation(user_id: int, event_type: str, points_change: int, 
-                                 target_user_id: Optional[int] = None,
-                                 content_id: Optional[str] = None,
-                                 content_type: Optional[str] = None,
-                                 reason: Optional[str] = None) -> Dict[str, Any]:
-    """Create a reputation event and update user reputation"""
+def _apply_reputation_events(cursor, events: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Write reputation events and the resulting per-user totals.
+    
+    All events are inserted with one statement and each affected user's
+    points, counters and level are updated with one upsert. Runs in the
+    caller's transaction; pass the returned (user_id, points, xid) tuples
+    to reputation_leaderboard.record() after committing.
+    """
+    if not events:
+        return []
+    
+    event_rows = []
+    totals: Dict[int, Dict[str, int]] = {}
+    for event in events:
+        event_id = generate_id("rep_evt")
+        event['event_id'] = event_id
+        event_rows.append((
+            event_id, event['user_id'], event['event_type'], event['points_change'],
+            event.get('target_user_id'), event.get('content_id'), event.get('content_type'), event.get('reason')
+        ))
+        user_totals = totals.setdefault(event['user_id'], {'points': 0, **{c: 0 for c in REPUTATION_EVENT_COUNTERS.values()}})
+        user_totals['points'] += event['points_change']
+        counter = REPUTATION_EVENT_COUNTERS.get(event['event_type'])
+        if counter:
+            user_totals[counter] += 1
+    
+    # The transaction id lets leaderboard rebuilds tell whether their
+    # snapshot already counted these events
+    inserted = extras.execute_values(cursor, f"""
+        INSERT INTO {DB_SCHEMA}.reputation_events 
+        (event_id, user_id, event_type, points_change, target_user_id, content_id, content_type, reason)
+        VALUES %s
+        RETURNING txid_current() AS xid
+    """, event_rows, fetch=True)
+    row = inserted[0]
+    xid = row["xid"] if isinstance(row, dict) else row[0]
+    
+    # Sorted by user so concurrent batches lock rows in the same order
+    counters = list(REPUTATION_EVENT_COUNTERS.values())
+    extras.execute_values(cursor, f"""
+        INSERT INTO {DB_SCHEMA}.user_reputation AS r
+            (user_id, reputation_points, level, {", ".join(counters)})
+        VALUES %s
+        ON CONFLICT (user_id) DO UPDATE SET
+            reputation_points = COALESCE(r.reputation_points, 0) + EXCLUDED.reputation_points,
+            {", ".join(f"{c} = COALESCE(r.{c}, 0) + EXCLUDED.{c}" for c in counters)},
+            level = {_level_sql("(COALESCE(r.reputation_points, 0) + EXCLUDED.reputation_points)")},
+            updated_at = CURRENT_TIMESTAMP
+    """, [
+        (user_id, t['points'], reputation_level(t['points']), *(t[c] for c in counters))
+        for user_id, t in sorted(totals.items())
+    ])
+    
+    return [(user_id, t['points'], xid) for user_id, t in totals.items()]
+
+
+def record_reputation_events(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Record a batch of reputation events in one transaction.
+    
+    Args:
+        events: dicts with user_id, event_type and points_change, and
+            optionally target_user_id, content_id, content_type and reason
+    """
     conn = get_db_connection()
     try:
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
-        
-        # Create the reputation event
-        event_id = generate_id("rep_evt")
-        cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.reputation_events 
-            (event_id, user_id, event_type, points_change, target_user_id, content_id, content_type, reason)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING *
-        """, (event_id, user_id, event_type, points_change, target_user_id, content_id, content_type, reason))
-        
-        # Update or create user reputation
-        cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.user_reputation (user_id, reputation_points, level)
-            VALUES (%s, %s, 1)
-            ON CONFLICT (user_id) DO UPDATE SET
-                reputation_points = {{DB_SCHEMA}}.user_reputation.reputation_points + EXCLUDED.reputation_points,
-                updated_at = CURRENT_TIMESTAMP
-            RETURNING *
-        """, (user_id, points_change))
-        
-        reputation = cursor.fetchone()
-        
-        # Update counters based on event type
-        if event_type == 'upvote_received':
-            cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.user_reputation SET total_upvotes_received = total_upvotes_received + 1
-                WHERE user_id = %s
-            """, (target_user_id,))
-        elif event_type == 'downvote_received':
-            cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.user_reputation SET total_downvotes_received = total_downvotes_received + 1
-                WHERE user_id = %s
-            """, (target_user_id,))
-        elif event_type == 'answer_accepted':
-            cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.user_reputation SET total_accepted_answers = total_accepted_answers + 1
-                WHERE user_id = %s
-            """, (target_user_id,))
-        
-        # Update level based on points
-        cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.user_reputation SET
-                level = CASE
-                    WHEN reputation_points >= 10000 THEN 10
-                    WHEN reputation_points >= 5000 THEN 9
-                    WHEN reputation_points >= 2500 THEN 8
-                    WHEN reputation_points >= 1000 THEN 7
-                    WHEN reputation_points >= 500 THEN 6
-                    WHEN reputation_points >= 250 THEN 5
-                    WHEN reputation_points >= 100 THEN 4
-                    WHEN reputation_points >= 50 THEN 3
-                    WHEN reputation_points >= 25 THEN 2
-                    ELSE 1
-                END
-            WHERE user_id = %s
-        """, (user_id,))
-        
+        changes = _apply_reputation_events(cursor, events)
         conn.commit()
-        
-        return {
-            "success": True,
-            "event_id": event_id,
-            "points_change": points_change,
-            "message": f"Reputation event recorded: {event_type}"
-        }
+        reputation_leaderboard.record(changes)
+        return {"success": True, "event_ids": [event['event_id'] for event in events]}
     except Exception as e:
         conn.rollback()
-        logger.error(f"Error creating reputation event: {e}")
+        logger.error(f"Error recording reputation events: {e}")
         return {"success": False, "error": str(e)}
     finally:
         conn.close()
 
 
+def create_or_update_reputation(user_id: int, event_type: str, points_change: int, 
+                                 target_user_id: Optional[int] = None,
+                                 content_id: Optional[str] = None,
+                                 content_type: Optional[str] = None,
+                                 reason: Optional[str] = None) -> Dict[str, Any]:
+    """Create a reputation event and update user reputation"""
+    result = record_reputation_events([{
+        'user_id': user_id,
+        'event_type': event_type,
+        'points_change': points_change,
+        'target_user_id': target_user_id,
+        'content_id': content_id,
+        'content_type': content_type,
+        'reason': reason
+    }])
+    if not result["success"]:
+        return result
+    return {
+        "success": True,
+        "event_id": result["event_ids"][0],
+        "points_change": points_change,
+        "message": f"Reputation event recorded: {event_type}"
+    }
+
+
 def upvote_content(user_id: int, content_id: str, content_type: str, vote_type: int = 1) -> Dict[str, Any]:
     """Upvote or downvote content"""
     conn = get_db_connection()
@@ -160,7 +212,7 @@ def upvote_content(user_id: int, content_id: str, content_type: str, vote_type:
         
         # Check if already voted
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.content_upvotes 
+            SELECT * FROM {DB_SCHEMA}.content_upvotes 
             WHERE user_id = %s AND content_id = %s AND content_type = %s
         """, (user_id, content_id, content_type))
         existing_vote = cursor.fetchone()
@@ -169,7 +221,7 @@ def upvote_content(user_id: int, content_id: str, content_type: str, vote_type:
             if existing_vote['vote_type'] == vote_type:
                 # Remove vote if clicking same button
                 cursor.execute(f"""
-                    DELETE FROM {{DB_SCHEMA}}.content_upvotes 
+                    DELETE FROM {DB_SCHEMA}.content_upvotes 
                     WHERE user_id = %s AND content_id = %s AND content_type = %s
                 """, (user_id, content_id, content_type))
                 vote_change = -vote_type
@@ -177,7 +229,7 @@ def upvote_content(user_id: int, content_id: str, content_type: str, vote_type:
             else:
                 # Change vote
                 cursor.execute(f"""
-                    UPDATE {{DB_SCHEMA}}.content_upvotes SET vote_type = %s
+                    UPDATE {DB_SCHEMA}.content_upvotes SET vote_type = %s
                     WHERE user_id = %s AND content_id = %s AND content_type = %s
                 """, (vote_type, user_id, content_id, content_type))
                 vote_change = 2 * vote_type
@@ -186,7 +238,7 @@ def upvote_content(user_id: int, content_id: str, content_type: str, vote_type:
             # Create new vote
             upvote_id = generate_id("up")
             cursor.execute(f"""
-                INSERT INTO {{DB_SCHEMA}}.content_upvotes (upvote_id, user_id, content_id, content_type, vote_type)
+                INSERT INTO {DB_SCHEMA}.content_upvotes (upvote_id, user_id, content_id, content_type, vote_type)
                 VALUES (%s, %s, %s, %s, %s)
             """, (upvote_id, user_id, content_id, content_type, vote_type))
             vote_change = vote_type
@@ -195,41 +247,43 @@ def upvote_content(user_id: int, content_id: str, content_type: str, vote_type:
         # Update like count on content
         if content_type == 'forum_post':
             cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.forum_posts SET like_count = like_count + %s
+                UPDATE {DB_SCHEMA}.forum_posts SET like_count = like_count + %s
                 WHERE post_id = %s
             """, (vote_change, content_id))
             # Get author
-            cursor.execute(f"SELECT user_id FROM {{DB_SCHEMA}}.forum_posts WHERE post_id = %s", (content_id,))
+            cursor.execute(f"SELECT user_id FROM {DB_SCHEMA}.forum_posts WHERE post_id = %s", (content_id,))
             post = cursor.fetchone()
         elif content_type == 'forum_thread':
             cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.forum_threads SET like_count = like_count + %s
+                UPDATE {DB_SCHEMA}.forum_threads SET like_count = like_count + %s
                 WHERE thread_id = %s
             """, (vote_change, content_id))
-            cursor.execute(f"SELECT user_id FROM {{DB_SCHEMA}}.forum_threads WHERE thread_id = %s", (content_id,))
+            cursor.execute(f"SELECT user_id FROM {DB_SCHEMA}.forum_threads WHERE thread_id = %s", (content_id,))
             post = cursor.fetchone()
         elif content_type == 'content_comment':
             cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.content_comments SET like_count = like_count + %s
+                UPDATE {DB_SCHEMA}.content_comments SET like_count = like_count + %s
                 WHERE comment_id = %s
             """, (vote_change, content_id))
-            cursor.execute(f"SELECT user_id FROM {{DB_SCHEMA}}.content_comments WHERE comment_id = %s", (content_id,))
+            cursor.execute(f"SELECT user_id FROM {DB_SCHEMA}.content_comments WHERE comment_id = %s", (content_id,))
             post = cursor.fetchone()
         else:
             post = None
         
         # Award reputation points to content author
+        changes = []
         if post and post['user_id'] != user_id:
             points = vote_type * 10  # 10 points per upvote
-            create_or_update_reputation(
-                user_id=post['user_id'],
-                event_type='upvote_received' if vote_type > 0 else 'downvote_received',
-                points_change=points,
-                content_id=content_id,
-                content_type=content_type
-            )
+            changes = _apply_reputation_events(cursor, [{
+                'user_id': post['user_id'],
+                'event_type': 'upvote_received' if vote_type > 0 else 'downvote_received',
+                'points_change': points,
+                'content_id': content_id,
+                'content_type': content_type
+            }])
         
         conn.commit()
+        reputation_leaderboard.record(changes)
         
         return {
             "success": True,
@@ -245,22 +299,52 @@ def upvote_content(user_id: int, content_id: str, content_type: str, vote_type:
         conn.close()
 
 
-def get_leaderboard(limit: int = 10) -> List[Dict[str, Any]]:
-    """Get reputation leaderboard"""
+def _with_user_details(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add username, avatar and reputation profile to leaderboard entries"""
+    if not entries:
+        return []
     conn = get_db_connection()
     try:
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         cursor.execute(f"""
-            SELECT r.*, u.username, up.avatar_url
-            FROM {{DB_SCHEMA}}.user_reputation r
-            JOIN {{DB_SCHEMA}}.users u ON r.user_id = u.id
-            LEFT JOIN {{DB_SCHEMA}}.user_profile up ON r.user_id = u.id
-            ORDER BY r.reputation_points DESC
-            LIMIT %s
-        """, (limit,))
-        return [dict(row) for row in cursor.fetchall()]
+            SELECT u.id AS user_id, u.username, up.avatar_url,
+                   r.reputation_points, r.level, r.total_upvotes_received,
+                   r.total_downvotes_received, r.total_accepted_answers
+            FROM {DB_SCHEMA}.users u
+            LEFT JOIN {DB_SCHEMA}.user_profile up ON up.user_id = u.id
+            LEFT JOIN {DB_SCHEMA}.user_reputation r ON r.user_id = u.id
+            WHERE u.id = ANY(%s)
+        """, ([entry['user_id'] for entry in entries],))
+        details = {row['user_id']: dict(row) for row in cursor.fetchall()}
     finally:
         conn.close()
+    return [{**details.get(entry['user_id'], {}), **entry} for entry in entries]
+
+
+def get_leaderboard(limit: int = 10, board: str = 'global', group_id: Optional[str] = None,
+                    offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Get a page of a reputation leaderboard.
+    
+    Args:
+        board: 'global' (all-time points), 'weekly' (points this week) or
+            'group' (members of group_id by all-time points)
+    """
+    page = reputation_leaderboard.top(limit=limit, offset=offset, board=board, group_id=group_id)
+    return _with_user_details(page['entries'])
+
+
+def get_reputation_rank(user_id: int, board: str = 'global', group_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get a user's rank and points on a leaderboard, or None if unranked"""
+    return reputation_leaderboard.rank(user_id, board=board, group_id=group_id)
+
+
+def get_leaderboard_neighbourhood(user_id: int, radius: int = 5, board: str = 'global',
+                                  group_id: Optional[str] = None) -> Dict[str, Any]:
+    """Get the users ranked just above and below a user"""
+    page = reputation_leaderboard.around(user_id, radius=radius, board=board, group_id=group_id)
+    page['entries'] = _with_user_details(page['entries'])
+    return page
 
 
 # ==============================================================================
@@ -278,7 +362,7 @@ def create_study_group(name: str, description: str, created_by: int,
         
         group_id = generate_id("sg")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.study_groups 
+            INSERT INTO {DB_SCHEMA}.study_groups 
             (group_id, name, description, learning_goal, target_topic, is_public, created_by)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             RETURNING *
@@ -289,7 +373,7 @@ def create_study_group(name: str, description: str, created_by: int,
         # Add creator as owner
         membership_id = generate_id("sgm")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.study_group_members 
+            INSERT INTO {DB_SCHEMA}.study_group_members 
             (membership_id, group_id, user_id, role)
             VALUES (%s, %s, %s, 'owner')
         """, (membership_id, group_id, created_by))
@@ -314,9 +398,9 @@ def get_study_groups(is_public: bool = True, topic: Optional[str] = None,
         
         query = f"""
             SELECT g.*, u.username as creator_name,
-                   (SELECT COUNT(*) FROM {{DB_SCHEMA}}.study_group_members WHERE group_id = g.group_id) as member_count
-            FROM {{DB_SCHEMA}}.study_groups g
-            JOIN {{DB_SCHEMA}}.users u ON g.created_by = u.id
+                   (SELECT COUNT(*) FROM {DB_SCHEMA}.study_group_members WHERE group_id = g.group_id) as member_count
+            FROM {DB_SCHEMA}.study_groups g
+            JOIN {DB_SCHEMA}.users u ON g.created_by = u.id
             WHERE g.is_active = TRUE AND g.is_public = %s
         """
         params = [is_public]
@@ -341,7 +425,7 @@ def join_study_group(group_id: str, user_id: int) -> Dict[str, Any]:
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         
         # Check if group exists and has space
-        cursor.execute(f"SELECT * FROM {{DB_SCHEMA}}.study_groups WHERE group_id = %s AND is_active = TRUE", (group_id,))
+        cursor.execute(f"SELECT * FROM {DB_SCHEMA}.study_groups WHERE group_id = %s AND is_active = TRUE", (group_id,))
         group = cursor.fetchone()
         
         if not group:
@@ -352,7 +436,7 @@ def join_study_group(group_id: str, user_id: int) -> Dict[str, Any]:
         
         # Check if already a member
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.study_group_members WHERE group_id = %s AND user_id = %s
+            SELECT * FROM {DB_SCHEMA}.study_group_members WHERE group_id = %s AND user_id = %s
         """, (group_id, user_id))
         if cursor.fetchone():
             return {"success": False, "error": "Already a member of this group"}
@@ -360,11 +444,12 @@ def join_study_group(group_id: str, user_id: int) -> Dict[str, Any]:
         # Add member
         membership_id = generate_id("sgm")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.study_group_members (membership_id, group_id, user_id, role)
+            INSERT INTO {DB_SCHEMA}.study_group_members (membership_id, group_id, user_id, role)
             VALUES (%s, %s, %s, 'member')
         """, (membership_id, group_id, user_id))
         
         conn.commit()
+        reputation_leaderboard.invalidate_group(group_id)
         
         return {"success": True, "message": "Successfully joined study group"}
     except Exception as e:
@@ -384,14 +469,14 @@ def create_group_note(group_id: str, author_id: int, title: str, content: str,
         
         # Verify membership
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.study_group_members WHERE group_id = %s AND user_id = %s
+            SELECT * FROM {DB_SCHEMA}.study_group_members WHERE group_id = %s AND user_id = %s
         """, (group_id, author_id))
         if not cursor.fetchone():
             return {"success": False, "error": "You must be a member to add notes"}
         
         note_id = generate_id("sgn")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.study_group_notes 
+            INSERT INTO {DB_SCHEMA}.study_group_notes 
             (note_id, group_id, author_id, title, content, tags)
             VALUES (%s, %s, %s, %s, %s, %s)
             RETURNING *
@@ -416,8 +501,8 @@ def get_group_notes(group_id: str, limit: int = 50, offset: int = 0) -> List[Dic
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         cursor.execute(f"""
             SELECT n.*, u.username as author_name
-            FROM {{DB_SCHEMA}}.study_group_notes n
-            JOIN {{DB_SCHEMA}}.users u ON n.author_id = u.id
+            FROM {DB_SCHEMA}.study_group_notes n
+            JOIN {DB_SCHEMA}.users u ON n.author_id = u.id
             WHERE n.group_id = %s
             ORDER BY n.is_pinned DESC, n.created_at DESC
             LIMIT %s OFFSET %s
@@ -436,7 +521,7 @@ def create_group_goal(group_id: str, title: str, description: Optional[str] = No
         
         goal_id = generate_id("sgg")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.study_group_goals 
+            INSERT INTO {DB_SCHEMA}.study_group_goals 
             (goal_id, group_id, title, description, target_completion_date)
             VALUES (%s, %s, %s, %s, %s)
             RETURNING *
@@ -460,7 +545,7 @@ def get_group_goals(group_id: str) -> List[Dict[str, Any]]:
     try:
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.study_group_goals 
+            SELECT * FROM {DB_SCHEMA}.study_group_goals 
             WHERE group_id = %s
             ORDER BY is_completed ASC, target_completion_date ASC
         """, (group_id,))
@@ -471,37 +556,52 @@ def get_group_goals(group_id: str) -> List[Dict[str, Any]]:
 
 def send_group_message(group_id: str, user_id: int, content: str, 
                        message_type: str = 'text', file_url: Optional[str] = None) -> Dict[str, Any]:
-    """Send a message to group chat"""
+    """
+    Send a message to group chat.
+    
+    The message is appended to the group's log and then pushed to connected
+    members and waiting long-poll requests by the group chat hub. Its
+    cursor orders it within the group.
+    """
     conn = get_db_connection()
     try:
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         
-        # Verify membership
+        # Verify membership (user_id may be users.id or users.user_id)
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.study_group_members WHERE group_id = %s AND user_id = %s
-        """, (group_id, user_id))
-        if not cursor.fetchone():
+            SELECT u.id, u.username, up.avatar_url
+            FROM {DB_SCHEMA}.study_group_members m
+            JOIN {DB_SCHEMA}.users u ON u.id = m.user_id
+            LEFT JOIN {DB_SCHEMA}.user_profile up ON up.user_id = u.id
+            WHERE m.group_id = %s AND (u.user_id = %s OR u.id::text = %s)
+        """, (group_id, str(user_id), str(user_id)))
+        member = cursor.fetchone()
+        if not member:
             return {"success": False, "error": "You must be a member to send messages"}
         
+        # Serialize sends per group so cursors commit in increasing order
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (group_id,))
+        
         message_id = generate_id("sgmsg")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.study_group_messages 
+            INSERT INTO {DB_SCHEMA}.study_group_messages 
             (message_id, group_id, user_id, content, message_type, file_url)
             VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING *
-        """, (message_id, group_id, user_id, content, message_type, file_url))
+            RETURNING id AS cursor, message_id, group_id, user_id, content, message_type, file_url, created_at
+        """, (message_id, group_id, member['id'], content, message_type, file_url))
         
-        message = cursor.fetchone()
+        message = to_message({**cursor.fetchone(), "username": member['username'], "avatar_url": member['avatar_url']})
         
         # Update last active time for member
         cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.study_group_members SET last_active_at = CURRENT_TIMESTAMP
+            UPDATE {DB_SCHEMA}.study_group_members SET last_active_at = CURRENT_TIMESTAMP
             WHERE group_id = %s AND user_id = %s
-        """, (group_id, user_id))
+        """, (group_id, member['id']))
         
         conn.commit()
+        get_group_chat_hub().publish(message)
         
-        return {"success": True, "message": dict(message)}
+        return {"success": True, "message": message}
     except Exception as e:
         conn.rollback()
         logger.error(f"Error sending group message: {e}")
@@ -510,32 +610,38 @@ def send_group_message(group_id: str, user_id: int, content: str,
         conn.close()
 
 
-def get_group_messages(group_id: str, limit: int = 50, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Get messages from group chat"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
-        
-        query = f"""
-            SELECT m.*, u.username, up.avatar_url
-            FROM {{DB_SCHEMA}}.study_group_messages m
-            JOIN {{DB_SCHEMA}}.users u ON m.user_id = u.id
-            LEFT JOIN {{DB_SCHEMA}}.user_profile up ON m.user_id = u.id
-            WHERE m.group_id = %s
-        """
-        params = [group_id]
-        
-        if before_id:
-            query += " AND m.message_id < %s"
-            params.append(before_id)
-        
-        query += f" ORDER BY m.created_at DESC LIMIT %s"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+def get_group_messages(group_id: str, limit: int = 50, before_id: Optional[str] = None,
+                       after: Optional[int] = None, before: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Get messages from group chat.
+    
+    Without a cursor, returns the newest messages (newest first). after
+    returns messages newer than that cursor (oldest first) for catching up.
+    before (a cursor) or before_id (a message_id) scroll back through
+    history (newest first). Only scroll-back reads the database; the other
+    reads are served from the group's in-memory tail when possible.
+    """
+    hub = get_group_chat_hub()
+    if after is not None:
+        return hub.after(group_id, after, limit)
+    
+    if before is None and before_id:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id FROM {DB_SCHEMA}.study_group_messages WHERE message_id = %s AND group_id = %s
+            """, (before_id, group_id))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return []
+        before = row[0]
+    
+    if before is not None:
+        return hub.before(group_id, before, limit)
+    return hub.latest(group_id, limit)
 
 
 # ==============================================================================
@@ -554,7 +660,7 @@ def create_mentor_profile(user_id: int, expertise_areas: List[str],
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.mentorship_profiles 
+            INSERT INTO {DB_SCHEMA}.mentorship_profiles 
             (user_id, expertise_areas, bio, years_experience, teaching_style, availability_hours, max_mentees)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             ON CONFLICT (user_id) DO UPDATE SET
@@ -590,9 +696,9 @@ def search_mentors(expertise_areas: Optional[List[str]] = None,
         
         query = f"""
             SELECT mp.*, u.username, up.first_name, up.last_name, up.avatar_url, up.bio as user_bio
-            FROM {{DB_SCHEMA}}.mentorship_profiles mp
-            JOIN {{DB_SCHEMA}}.users u ON mp.user_id = u.id
-            LEFT JOIN {{DB_SCHEMA}}.user_profile up ON mp.user_id = u.id
+            FROM {DB_SCHEMA}.mentorship_profiles mp
+            JOIN {DB_SCHEMA}.users u ON mp.user_id = u.id
+            LEFT JOIN {DB_SCHEMA}.user_profile up ON mp.user_id = u.id
             WHERE mp.is_available = %s AND u.is_active = TRUE
         """
         params = [is_available]
@@ -621,7 +727,7 @@ def request_mentorship(mentor_id: int, mentee_id: int, topic: str,
         
         # Check if mentor exists and is available
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.mentorship_profiles 
+            SELECT * FROM {DB_SCHEMA}.mentorship_profiles 
             WHERE user_id = %s AND is_available = TRUE
         """, (mentor_id,))
         mentor = cursor.fetchone()
@@ -634,7 +740,7 @@ def request_mentorship(mentor_id: int, mentee_id: int, topic: str,
         
         # Check for existing request
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.mentorship_requests 
+            SELECT * FROM {DB_SCHEMA}.mentorship_requests 
             WHERE mentor_id = %s AND mentee_id = %s AND status IN ('pending', 'accepted')
         """, (mentor_id, mentee_id))
         if cursor.fetchone():
@@ -642,7 +748,7 @@ def request_mentorship(mentor_id: int, mentee_id: int, topic: str,
         
         request_id = generate_id("msr")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.mentorship_requests 
+            INSERT INTO {DB_SCHEMA}.mentorship_requests 
             (request_id, mentor_id, mentee_id, topic, goals, preferred_schedule, message)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             RETURNING *
@@ -668,7 +774,7 @@ def respond_to_mentorship_request(request_id: str, status: str,
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.mentorship_requests WHERE request_id = %s
+            SELECT * FROM {DB_SCHEMA}.mentorship_requests WHERE request_id = %s
         """, (request_id,))
         request = cursor.fetchone()
         
@@ -679,7 +785,7 @@ def respond_to_mentorship_request(request_id: str, status: str,
             return {"success": False, "error": "Request already processed"}
         
         cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.mentorship_requests 
+            UPDATE {DB_SCHEMA}.mentorship_requests 
             SET status = %s, response_message = %s, responded_at = CURRENT_TIMESTAMP
             WHERE request_id = %s
             RETURNING *
@@ -688,7 +794,7 @@ def respond_to_mentorship_request(request_id: str, status: str,
         # If accepted, update mentor's mentee count
         if status == 'accepted':
             cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.mentorship_profiles 
+                UPDATE {DB_SCHEMA}.mentorship_profiles 
                 SET current_mentees_count = current_mentees_count + 1
                 WHERE user_id = %s
             """, (request['mentor_id'],))
@@ -714,7 +820,7 @@ def schedule_mentorship_session(mentorship_id: int, scheduled_at: datetime,
         
         # Verify mentorship exists
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.mentorship_requests WHERE id = %s AND status = 'accepted'
+            SELECT * FROM {DB_SCHEMA}.mentorship_requests WHERE id = %s AND status = 'accepted'
         """, (mentorship_id,))
         mentorship = cursor.fetchone()
         
@@ -723,7 +829,7 @@ def schedule_mentorship_session(mentorship_id: int, scheduled_at: datetime,
         
         session_id = generate_id("mss")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.mentorship_sessions 
+            INSERT INTO {DB_SCHEMA}.mentorship_sessions 
             (session_id, mentorship_id, mentor_id, mentee_id, scheduled_at, duration_minutes, topic)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             RETURNING *
@@ -753,7 +859,7 @@ def complete_mentorship_session(session_id: str, mentor_feedback: Optional[str]
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.mentorship_sessions WHERE session_id = %s
+            SELECT * FROM {DB_SCHEMA}.mentorship_sessions WHERE session_id = %s
         """, (session_id,))
         session = cursor.fetchone()
         
@@ -761,7 +867,7 @@ def complete_mentorship_session(session_id: str, mentor_feedback: Optional[str]
             return {"success": False, "error": "Session not found"}
         
         cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.mentorship_sessions 
+            UPDATE {DB_SCHEMA}.mentorship_sessions 
             SET status = 'completed', ended_at = CURRENT_TIMESTAMP,
                 mentor_feedback = %s, mentee_feedback = %s,
                 mentor_rating = %s, mentee_rating = %s, outcome = %s
@@ -771,7 +877,7 @@ def complete_mentorship_session(session_id: str, mentor_feedback: Optional[str]
         
         # Update mentor stats
         cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.mentorship_profiles 
+            UPDATE {DB_SCHEMA}.mentorship_profiles 
             SET total_sessions_completed = total_sessions_completed + 1
             WHERE user_id = %s
         """, (session['mentor_id'],))
@@ -779,25 +885,27 @@ def complete_mentorship_session(session_id: str, mentor_feedback: Optional[str]
         # Update mentor rating
         if mentee_rating:
             cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.mentorship_profiles 
+                UPDATE {DB_SCHEMA}.mentorship_profiles 
                 SET average_rating = (
                     SELECT COALESCE(AVG(mentee_rating), 0)
-                    FROM {{DB_SCHEMA}}.mentorship_sessions
+                    FROM {DB_SCHEMA}.mentorship_sessions
                     WHERE mentor_id = %s AND mentee_rating IS NOT NULL
                 )
                 WHERE user_id = %s
             """, (session['mentor_id'], session['mentor_id']))
         
         # Award reputation points
+        changes = []
         if session['mentor_id']:
-            create_or_update_reputation(
-                user_id=session['mentor_id'],
-                event_type='mentorship_completed',
-                points_change=50,
-                reason="Completed mentorship session"
-            )
+            changes = _apply_reputation_events(cursor, [{
+                'user_id': session['mentor_id'],
+                'event_type': 'mentorship_completed',
+                'points_change': 50,
+                'reason': "Completed mentorship session"
+            }])
         
         conn.commit()
+        reputation_leaderboard.record(changes)
         
         return {"success": True, "message": "Session completed successfully"}
     except Exception as e:
@@ -822,7 +930,7 @@ def report_content(reporter_id: int, content_id: str, content_type: str,
         
         report_id = generate_id("rep")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.content_reports 
+            INSERT INTO {DB_SCHEMA}.content_reports 
             (report_id, reporter_id, content_id, content_type, report_reason, additional_info, priority)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             RETURNING *
@@ -833,7 +941,7 @@ def report_content(reporter_id: int, content_id: str, content_type: str,
         # Add to moderation queue
         queue_id = generate_id("mq")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.moderation_queue (queue_id, content_id, content_type, report_id, priority)
+            INSERT INTO {DB_SCHEMA}.moderation_queue (queue_id, content_id, content_type, report_id, priority)
             VALUES (%s, %s, %s, %s, %s)
         """, (queue_id, content_id, content_type, report['id'], priority))
         
@@ -858,9 +966,9 @@ def get_moderation_queue(status: str = 'pending', priority: Optional[str] = None
         query = f"""
             SELECT q.*, r.report_reason, r.additional_info, r.reporter_id,
                    u.username as reporter_username
-            FROM {{DB_SCHEMA}}.moderation_queue q
-            LEFT JOIN {{DB_SCHEMA}}.content_reports r ON q.report_id = r.id
-            LEFT JOIN {{DB_SCHEMA}}.users u ON r.reporter_id = u.id
+            FROM {DB_SCHEMA}.moderation_queue q
+            LEFT JOIN {DB_SCHEMA}.content_reports r ON q.report_id = r.id
+            LEFT JOIN {DB_SCHEMA}.users u ON r.reporter_id = u.id
             WHERE q.status = %s
         """
         params = [status]
@@ -888,7 +996,7 @@ def take_moderation_action(moderator_id: int, content_id: str, content_type: str
         
         action_id = generate_id("ma")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.moderation_actions 
+            INSERT INTO {DB_SCHEMA}.moderation_actions 
             (action_id, moderator_id, content_id, content_type, action_type, reason, notes)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             RETURNING *
@@ -896,7 +1004,7 @@ def take_moderation_action(moderator_id: int, content_id: str, content_type: str
         
         # Update related queue item
         cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.moderation_queue 
+            UPDATE {DB_SCHEMA}.moderation_queue 
             SET status = 'resolved', resolved_at = CURRENT_TIMESTAMP,
                 resolution_summary = %s
             WHERE content_id = %s AND status != 'resolved'
@@ -904,7 +1012,7 @@ def take_moderation_action(moderator_id: int, content_id: str, content_type: str
         
         # Update related reports
         cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.content_reports 
+            UPDATE {DB_SCHEMA}.content_reports 
             SET status = 'resolved', reviewed_by = %s, reviewed_at = CURRENT_TIMESTAMP,
                 resolution_notes = %s
             WHERE content_id = %s AND status = 'pending'
@@ -913,11 +1021,11 @@ def take_moderation_action(moderator_id: int, content_id: str, content_type: str
         # Perform the actual action on content (soft delete)
         if action_type == 'content_removed':
             if content_type == 'forum_post':
-                cursor.execute(f"UPDATE {{DB_SCHEMA}}.forum_posts SET is_deleted = TRUE WHERE post_id = %s", (content_id,))
+                cursor.execute(f"UPDATE {DB_SCHEMA}.forum_posts SET is_deleted = TRUE WHERE post_id = %s", (content_id,))
             elif content_type == 'forum_thread':
-                cursor.execute(f"UPDATE {{DB_SCHEMA}}.forum_threads SET is_deleted = TRUE WHERE thread_id = %s", (content_id,))
+                cursor.execute(f"UPDATE {DB_SCHEMA}.forum_threads SET is_deleted = TRUE WHERE thread_id = %s", (content_id,))
             elif content_type == 'content_comment':
-                cursor.execute(f"UPDATE {{DB_SCHEMA}}.content_comments SET is_deleted = TRUE WHERE comment_id = %s", (content_id,))
+                cursor.execute(f"UPDATE {DB_SCHEMA}.content_comments SET is_deleted = TRUE WHERE comment_id = %s", (content_id,))
         
         conn.commit()
         
@@ -938,21 +1046,21 @@ def get_moderation_stats() -> Dict[str, Any]:
         
         # Pending reports
         cursor.execute(f"""
-            SELECT COUNT(*) as count FROM {{DB_SCHEMA}}.content_reports WHERE status = 'pending'
+            SELECT COUNT(*) as count FROM {DB_SCHEMA}.content_reports WHERE status = 'pending'
         """)
         pending = cursor.fetchone()['count']
         
         # Reports by reason
         cursor.execute(f"""
             SELECT report_reason, COUNT(*) as count
-            FROM {{DB_SCHEMA}}.content_reports
+            FROM {DB_SCHEMA}.content_reports
             GROUP BY report_reason
         """)
         by_reason = {row['report_reason']: row['count'] for row in cursor.fetchall()}
         
         # Recent actions
         cursor.execute(f"""
-            SELECT COUNT(*) as count FROM {{DB_SCHEMA}}.moderation_actions 
+            SELECT COUNT(*) as count FROM {DB_SCHEMA}.moderation_actions 
             WHERE created_at > CURRENT_TIMESTAMP - INTERVAL '24 hours'
         """)
         recent_actions = cursor.fetchone()['count']
@@ -982,7 +1090,7 @@ def create_peer_review_submission(user_id: int, title: str, description: str,
         
         submission_id = generate_id("prs")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.peer_review_submissions 
+            INSERT INTO {DB_SCHEMA}.peer_review_submissions 
             (submission_id, user_id, title, description, content_type, 
              related_content_id, related_content_type, max_reviewers)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
@@ -1011,7 +1119,7 @@ def assign_peer_reviewer(submission_id: str, reviewer_id: int,
         
         # Check submission exists and needs reviewers
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.peer_review_submissions 
+            SELECT * FROM {DB_SCHEMA}.peer_review_submissions 
             WHERE submission_id = %s AND status = 'open'
         """, (submission_id,))
         submission = cursor.fetchone()
@@ -1024,7 +1132,7 @@ def assign_peer_reviewer(submission_id: str, reviewer_id: int,
         
         # Check if already assigned
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.peer_review_assignments 
+            SELECT * FROM {DB_SCHEMA}.peer_review_assignments 
             WHERE submission_id = %s AND reviewer_id = %s
         """, (submission_id, reviewer_id))
         if cursor.fetchone():
@@ -1032,7 +1140,7 @@ def assign_peer_reviewer(submission_id: str, reviewer_id: int,
         
         assignment_id = generate_id("pra")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.peer_review_assignments 
+            INSERT INTO {DB_SCHEMA}.peer_review_assignments 
             (assignment_id, submission_id, reviewer_id, deadline)
             VALUES (%s, %s, %s, %s)
             RETURNING *
@@ -1040,7 +1148,7 @@ def assign_peer_reviewer(submission_id: str, reviewer_id: int,
         
         # Update submission reviewer count
         cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.peer_review_submissions 
+            UPDATE {DB_SCHEMA}.peer_review_submissions 
             SET current_reviewers = current_reviewers + 1
             WHERE submission_id = %s
         """, (submission_id,))
@@ -1066,7 +1174,7 @@ def submit_peer_review(assignment_id: str, reviewer_id: int,
         
         # Get assignment
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.peer_review_assignments 
+            SELECT * FROM {DB_SCHEMA}.peer_review_assignments 
             WHERE assignment_id = %s AND reviewer_id = %s
         """, (assignment_id, reviewer_id))
         assignment = cursor.fetchone()
@@ -1079,7 +1187,7 @@ def submit_peer_review(assignment_id: str, reviewer_id: int,
         
         feedback_id = generate_id("prf")
         cursor.execute(f"""
-            INSERT INTO {{DB_SCHEMA}}.peer_review_feedback 
+            INSERT INTO {DB_SCHEMA}.peer_review_feedback 
             (feedback_id, assignment_id, submission_id, reviewer_id, 
              overall_rating, strengths, improvements, comments)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
@@ -1089,7 +1197,7 @@ def submit_peer_review(assignment_id: str, reviewer_id: int,
         
         # Update assignment status
         cursor.execute(f"""
-            UPDATE {{DB_SCHEMA}}.peer_review_assignments 
+            UPDATE {DB_SCHEMA}.peer_review_assignments 
             SET status = 'completed', completed_at = CURRENT_TIMESTAMP
             WHERE assignment_id = %s
         """, (assignment_id,))
@@ -1097,32 +1205,33 @@ def submit_peer_review(assignment_id: str, reviewer_id: int,
         # Check if all reviews are complete
         cursor.execute(f"""
             SELECT COUNT(*) as completed
-            FROM {{DB_SCHEMA}}.peer_review_assignments
+            FROM {DB_SCHEMA}.peer_review_assignments
             WHERE submission_id = %s AND status = 'completed'
         """, (assignment['submission_id'],))
         completed_count = cursor.fetchone()['completed']
         
         cursor.execute(f"""
-            SELECT * FROM {{DB_SCHEMA}}.peer_review_submissions WHERE submission_id = %s
+            SELECT * FROM {DB_SCHEMA}.peer_review_submissions WHERE submission_id = %s
         """, (assignment['submission_id'],))
         submission = cursor.fetchone()
         
         if completed_count >= submission['max_reviewers']:
             cursor.execute(f"""
-                UPDATE {{DB_SCHEMA}}.peer_review_submissions 
+                UPDATE {DB_SCHEMA}.peer_review_submissions 
                 SET status = 'completed'
                 WHERE submission_id = %s
             """, (assignment['submission_id'],))
         
         # Award reputation points to reviewer
-        create_or_update_reputation(
-            user_id=reviewer_id,
-            event_type='peer_review_completed',
-            points_change=25,
-            reason="Completed peer review"
-        )
+        changes = _apply_reputation_events(cursor, [{
+            'user_id': reviewer_id,
+            'event_type': 'peer_review_completed',
+            'points_change': 25,
+            'reason': "Completed peer review"
+        }])
         
         conn.commit()
+        reputation_leaderboard.record(changes)
         
         return {"success": True, "feedback_id": feedback_id}
     except Exception as e:
@@ -1140,9 +1249,9 @@ def get_submission_reviews(submission_id: str) -> List[Dict[str, Any]]:
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         cursor.execute(f"""
             SELECT f.*, u.username, up.avatar_url
-            FROM {{DB_SCHEMA}}.peer_review_feedback f
-            JOIN {{DB_SCHEMA}}.users u ON f.reviewer_id = u.id
-            LEFT JOIN {{DB_SCHEMA}}.user_profile up ON f.reviewer_id = u.id
+            FROM {DB_SCHEMA}.peer_review_feedback f
+            JOIN {DB_SCHEMA}.users u ON f.reviewer_id = u.id
+            LEFT JOIN {DB_SCHEMA}.user_profile up ON f.reviewer_id = u.id
             WHERE f.submission_id = %s
             ORDER BY f.created_at ASC
         """, (submission_id,))
@@ -1159,8 +1268,8 @@ def get_my_submissions(user_id: int, status: Optional[str] = None) -> List[Dict[
         
         query = f"""
             SELECT s.*, 
-                   (SELECT COUNT(*) FROM {{DB_SCHEMA}}.peer_review_feedback WHERE submission_id = s.submission_id) as feedback_count
-            FROM {{DB_SCHEMA}}.peer_review_submissions s
+                   (SELECT COUNT(*) FROM {DB_SCHEMA}.peer_review_feedback WHERE submission_id = s.submission_id) as feedback_count
+            FROM {DB_SCHEMA}.peer_review_submissions s
             WHERE s.user_id = %s
         """
         params = [user_id]
@@ -1186,9 +1295,9 @@ def get_my_review_assignments(user_id: int, status: Optional[str] = None) -> Lis
         query = f"""
             SELECT a.*, s.title as submission_title, s.description as submission_description,
                    u.username as author_username
-            FROM {{DB_SCHEMA}}.peer_review_assignments a
-            JOIN {{DB_SCHEMA}}.peer_review_submissions s ON a.submission_id = s.submission_id
-            JOIN {{DB_SCHEMA}}.users u ON s.user_id = u.id
+            FROM {DB_SCHEMA}.peer_review_assignments a
+            JOIN {DB_SCHEMA}.peer_review_submissions s ON a.submission_id = s.submission_id
+            JOIN {DB_SCHEMA}.users u ON s.user_id = u.id
             WHERE a.reviewer_id = %s
         """
         params = [user_id]
@@ -1212,9 +1321,9 @@ def get_all_reviewers_for_submission(submission_id: str) -> List[Dict[str, Any]]
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         cursor.execute(f"""
             SELECT a.*, u.username, u.email, up.avatar_url
-            FROM {{DB_SCHEMA}}.peer_review_assignments a
-            JOIN {{DB_SCHEMA}}.users u ON a.reviewer_id = u.id
-            LEFT JOIN {{DB_SCHEMA}}.user_profile up ON u.id = up.user_id
+            FROM {DB_SCHEMA}.peer_review_assignments a
+            JOIN {DB_SCHEMA}.users u ON a.reviewer_id = u.id
+            LEFT JOIN {DB_SCHEMA}.user_profile up ON u.id = up.user_id
             WHERE a.submission_id = %s
             ORDER BY a.assigned_at ASC
         """, (submission_id,))
@@ -1229,7 +1338,7 @@ def check_user_has_submission(user_id: int, submission_id: str) -> bool:
     try:
         cursor = conn.cursor()
         cursor.execute(f"""
-            SELECT 1 FROM {{DB_SCHEMA}}.peer_review_submissions
+            SELECT 1 FROM {DB_SCHEMA}.peer_review_submissions
             WHERE user_id = %s AND submission_id = %s
         """, (user_id, submission_id))
         return cursor.fetchone() is not None
@@ -17,6 +17,7 @@ from backend.agents.base_agent import BaseAgent, AgentMessage, AgentTask, AgentS
 
 # Import centralized logging configuration
 from logger_config import logger
+from quiz_catalog import CatalogIndex
 
 
 @dataclass
@@ -95,6 +96,10 @@ class AssessmentAgent(BaseAgent):
         
         # Question management
         self.question_bank: List[QuizQuestion] = []
+        self.question_index = CatalogIndex({
+            "topic": lambda q: [q.topic],
+            "difficulty": lambda q: [q.difficulty],
+        })
         self.quiz_templates: Dict[str, Dict] = {}
         self.active_attempts: Dict[str, QuizAttempt] = {}
         self.attempt_history: List[QuizAttempt] = []
@@ -312,6 +317,7 @@ class AssessmentAgent(BaseAgent):
         ]
         
         self.question_bank = questions
+        self.question_index.add_many((q.question_id, q) for q in questions)
     
     def _initialize_quiz_templates(self):
         """Initialize quiz templates for different scenarios"""
@@ -493,23 +499,13 @@ class AssessmentAgent(BaseAgent):
         Returns:
             Filtered questions
         """
-        filtered = []
-        
-        for q in self.question_bank:
-            # Match topic
-            topic_match = topic == "general" or q.topic == topic
-            
-            # Match difficulty
-            if difficulty == "mixed":
-                diff_match = True
-            elif difficulty == "adaptive":
-                diff_match = q.difficulty in ["beginner", "intermediate"]
-            else:
-                diff_match = q.difficulty == difficulty
-            
-            if topic_match and diff_match:
-                filtered.append(q)
+        filters = {"topic": None if topic == "general" else topic}
+        if difficulty == "adaptive":
+            filters["difficulty"] = ["beginner", "intermediate"]
+        elif difficulty != "mixed":
+            filters["difficulty"] = difficulty
         
+        filtered, _ = self.question_index.search(filters, newest_first=False)
         return filtered
     
     def _get_related_questions(self, topic: str, count: int) -> List[QuizQuestion]:
@@ -526,7 +522,7 @@ class AssessmentAgent(BaseAgent):
         related = []
         
         for t in topics:
-            related.extend([q for q in self.question_bank if q.topic == t])
+            related.extend(self.question_index.search({"topic": t}, newest_first=False)[0])
         
         random.shuffle(related)
         return related[:count]
@@ -633,7 +629,7 @@ class AssessmentAgent(BaseAgent):
         attempt = self.active_attempts[attempt_id]
         
         # Find the question
-        question = next((q for q in self.question_bank if q.question_id == question_id), None)
+        question = self.question_index.get(question_id)
         
         if not question:
             return {"error": "Invalid question ID"}
@@ -649,7 +645,8 @@ class AssessmentAgent(BaseAgent):
         }
         
         # Calculate current score
-        total_points = sum(q.points for q in self.question_bank if q.question_id in attempt.answers)
+        total_points = sum(self.question_index.get(qid).points for qid in attempt.answers
+                           if qid in self.question_index)
         earned_points = sum(a["points"] for a in attempt.answers.values())
         attempt.score = earned_points / max(total_points, 1) if total_points > 0 else 0
         
@@ -724,7 +721,7 @@ class AssessmentAgent(BaseAgent):
         question_id = content.get("question_id")
         answer = content.get("answer")
         
-        question = next((q for q in self.question_bank if q.question_id == question_id), None)
+        question = self.question_index.get(question_id)
         
         if not question:
             return {"error": "Invalid question ID"}
@@ -781,7 +778,7 @@ class AssessmentAgent(BaseAgent):
         by_topic = {}
         
         for question_id, answer_data in attempt.answers.items():
-            question = next((q for q in self.question_bank if q.question_id == question_id), None)
+            question = self.question_index.get(question_id)
             
             if question:
                 if answer_data["correct"]:
@@ -867,8 +864,7 @@ class AssessmentAgent(BaseAgent):
         for attempt in user_attempts:
             for question_id, answer_data in attempt.answers.items():
                 if not answer_data["correct"]:
-                    question = next((q for q in self.question_bank 
-                                   if q.question_id == question_id), None)
+                    question = self.question_index.get(question_id)
                     
                     if question:
                         # Track by topic
@@ -974,7 +970,7 @@ class AssessmentAgent(BaseAgent):
         """
         question_id = content.get("question_id")
         
-        question = next((q for q in self.question_bank if q.question_id == question_id), None)
+        question = self.question_index.get(question_id)
         
         if not question:
             return {"error": "Question not found"}
@@ -1058,8 +1054,7 @@ class AssessmentAgent(BaseAgent):
         topic_performance = {}
         for attempt in user_attempts:
             for question_id, answer_data in attempt.answers.items():
-                question = next((q for q in self.question_bank 
-                               if q.question_id == question_id), None)
+                question = self.question_index.get(question_id)
                 if question:
                     topic = question.topic
                     if topic not in topic_performance:
@@ -1140,17 +1135,11 @@ class AssessmentAgent(BaseAgent):
     
     def _count_by_topic(self) -> Dict[str, int]:
         """Count questions by topic"""
-        counts = {}
-        for q in self.question_bank:
-            counts[q.topic] = counts.get(q.topic, 0) + 1
-        return counts
+        return self.question_index.counts("topic")
     
     def _count_by_difficulty(self) -> Dict[str, int]:
         """Count questions by difficulty"""
-        counts = {}
-        for q in self.question_bank:
-            counts[q.difficulty] = counts.get(q.difficulty, 0) + 1
-        return counts
+        return self.question_index.counts("difficulty")
     
     def _calculate_time_spent(self, start: str, end: str) -> int:
         """Calculate time spent in seconds"""
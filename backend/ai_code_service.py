@@ -24,6 +24,14 @@ from enum import Enum
 # Import centralized logging configuration
 from logger_config import logger
 
+# Shared response cache for code explanations (exact and near-duplicate)
+from ai_response_cache import code_explanation_cache
+
+# Per-user conversation memory for code chat
+from conversation_memory import conversation_memory
+
+CHAT_MEMORY_NAMESPACE = "code"
+
 # Get OpenAI API key from environment
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
@@ -87,7 +95,7 @@ class AICodeAssistant:
         self.api_key = OPENAI_API_KEY
         self.available = OPENAI_AVAILABLE
         self.base_url = "https://api.openai.com/v1"
-        self.chat_history: List[AIChatMessage] = []
+        self.memory = conversation_memory
         self.model = "gpt-4o-mini"
 
     async def analyze_code(
@@ -300,7 +308,9 @@ Focus on actionable feedback with specific line numbers and code suggestions.
         self,
         message: str,
         code_context: str = "",
-        chat_history: Optional[List[Dict[str, str]]] = None
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Chat with AI about code or programming questions.
@@ -308,7 +318,10 @@ Focus on actionable feedback with specific line numbers and code suggestions.
         Args:
             message: User's question
             code_context: Optional code snippet for context
-            chat_history: Previous chat messages
+            chat_history: Previous chat messages supplied by the client; when
+                omitted, the user's stored conversation memory is used
+            user_id: User whose conversation this message belongs to
+            session_id: Conversation session within the user's history
 
         Returns:
             Dictionary with success status, AI response, and timestamp
@@ -335,6 +348,10 @@ If shown code, analyze it and provide clear explanations."""
             if chat_history:
                 for msg in chat_history[-10:]:
                     messages.append({"role": msg.get("role", "user"), "content": msg.get("content", "")})
+            else:
+                messages.extend(
+                    self.memory.get_context_messages(CHAT_MEMORY_NAMESPACE, user_id, session_id)
+                )
 
             # Add user message
             messages.append({"role": "user", "content": message})
@@ -361,9 +378,10 @@ If shown code, analyze it and provide clear explanations."""
                         result = await response.json()
                         ai_response = result["choices"][0]["message"]["content"]
 
-                        # Add to chat history
-                        self.chat_history.append(AIChatMessage(role="user", content=message))
-                        self.chat_history.append(AIChatMessage(role="assistant", content=ai_response))
+                        # Add to this user's conversation memory
+                        self.memory.add_exchange(
+                            CHAT_MEMORY_NAMESPACE, user_id, session_id, message, ai_response
+                        )
 
                         return {
                             "success": True,
@@ -415,17 +433,81 @@ If shown code, analyze it and provide clear explanations."""
                 "fallback": True
             }
 
-        # For now, return a basic explanation
-        return {
+        # Identical or near-identical code is served from the response cache
+        cache_params = {"language": language}
+        cached = code_explanation_cache.get_similar(code, cache_params)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        import concurrent.futures
+
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            future = executor.submit(asyncio.run, self._request_explanation(code, language))
+            explanation = future.result()
+
+        if explanation is None:
+            return {
+                "success": True,
+                "explanation": f"Code analysis requires OpenAI API key configuration.",
+                "fallback": True
+            }
+
+        result = {
             "success": True,
-            "explanation": f"Code analysis requires OpenAI API key configuration.",
-            "fallback": True
+            "explanation": explanation,
+            "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
         }
+        code_explanation_cache.set(cache_params, result, text=code)
+        return result
 
-    def clear_chat_history(self):
-        """Clear the chat history"""
-        self.chat_history = []
-        logger.info("Chat history cleared")
+    async def _request_explanation(self, code: str, language: str) -> Optional[str]:
+        """Request a code explanation from OpenAI, returning None on failure"""
+        try:
+            logger.info(f"Explaining {language} code ({len(code)} chars)")
+
+            async with aiohttp.ClientSession() as session:
+                headers = {
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+
+                payload = {
+                    "model": self.model,
+                    "messages": [
+                        {
+                            "role": "system",
+                            "content": "You are a patient programming tutor. Explain what the given code does, step by step, in clear language suitable for students."
+                        },
+                        {
+                            "role": "user",
+                            "content": f"Explain the following {language} code:\n\n```{language}\n{code}\n```"
+                        }
+                    ],
+                    "temperature": 0.3,
+                    "max_tokens": 1000
+                }
+
+                async with session.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=headers,
+                    json=payload
+                ) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        return result["choices"][0]["message"]["content"]
+
+                    error_text = await response.text()
+                    logger.error(f"OpenAI API error: {error_text}")
+                    return None
+
+        except Exception as e:
+            logger.error(f"Error explaining code: {str(e)}")
+            return None
+
+    def clear_chat_history(self, user_id: Optional[str] = None, session_id: Optional[str] = None):
+        """Clear a user's chat history (one session, or all sessions when session_id is None)"""
+        removed = self.memory.clear(CHAT_MEMORY_NAMESPACE, user_id, session_id)
+        logger.info(f"Chat history cleared for user {user_id} ({removed} conversation(s))")
 
 
 # Global instance
@@ -492,7 +574,9 @@ def sync_analyze_code(
 def sync_chat_about_code(
     message: str,
     code_context: str = "",
-    chat_history_json: str = ""
+    chat_history_json: str = "",
+    user_id: str = "",
+    session_id: str = ""
 ) -> Dict[str, Any]:
     """
     Synchronous wrapper for code chat.
@@ -513,7 +597,9 @@ def sync_chat_about_code(
         asyncio.set_event_loop(loop)
         try:
             result = loop.run_until_complete(
-                ai_code_assistant.chat_about_code(message, code_context, chat_history)
+                ai_code_assistant.chat_about_code(
+                    message, code_context, chat_history, user_id or None, session_id or None
+                )
             )
             return result
         finally:
@@ -524,9 +610,9 @@ def sync_chat_about_code(
         return future.result()
 
 
-def clear_code_chat_history():
-    """Clear the chat history"""
-    ai_code_assistant.clear_chat_history()
+def clear_code_chat_history(user_id: str = "", session_id: str = ""):
+    """Clear a user's code chat history"""
+    ai_code_assistant.clear_chat_history(user_id or None, session_id or None)
 
 
 if __name__ == "__main__":
@@ -13,6 +13,14 @@ from typing import List, Optional, Dict
 # Import centralized logging configuration
 from logger_config import logger
 
+# Shared response cache for generated lessons
+from ai_response_cache import lesson_cache
+
+# Per-user conversation memory for the AI tutor
+from conversation_memory import conversation_memory
+
+CHAT_MEMORY_NAMESPACE = "tutor"
+
 # Get OpenAI API key from environment
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
@@ -27,13 +35,14 @@ class AIContentGenerator:
         self.api_key = OPENAI_API_KEY
         self.available = OPENAI_AVAILABLE
         self.base_url = "https://api.openai.com/v1"
-        self.chat_history: List[Dict[str, str]] = []
+        self.memory = conversation_memory
     
     async def chat_with_ai(
         self,
         message: str,
         context: Optional[str] = None,
-        max_history: int = 10
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None
     ) -> Dict:
         """
         Chat with AI assistant for educational support.
@@ -41,7 +50,9 @@ class AIContentGenerator:
         Args:
             message: User's message/question
             context: Optional context about user's learning progress
-            max_history: Maximum number of chat messages to keep in history
+            user_id: User whose conversation this message belongs to;
+                anonymous messages are answered without history
+            session_id: Conversation session within the user's history
             
         Returns:
             Dictionary containing success status, AI response, and timestamp
@@ -65,9 +76,10 @@ If you don't know something, admit it and suggest where to find more information
             # Build messages array with history
             messages = [{"role": "system", "content": system_content}]
             
-            # Add recent chat history
-            for msg in self.chat_history[-max_history:]:
-                messages.append(msg)
+            # Add this user's conversation memory (summary + recent turns within budget)
+            messages.extend(
+                self.memory.get_context_messages(CHAT_MEMORY_NAMESPACE, user_id, session_id)
+            )
             
             # Add user message
             messages.append({"role": "user", "content": message})
@@ -95,13 +107,10 @@ If you don't know something, admit it and suggest where to find more information
                         result = await response.json()
                         ai_response = result["choices"][0]["message"]["content"]
                         
-                        # Add to chat history
-                        self.chat_history.append({"role": "user", "content": message})
-                        self.chat_history.append({"role": "assistant", "content": ai_response})
-                        
-                        # Trim history if needed
-                        while len(self.chat_history) > max_history * 2:
-                            self.chat_history.pop(0)
+                        # Add to this user's conversation memory
+                        self.memory.add_exchange(
+                            CHAT_MEMORY_NAMESPACE, user_id, session_id, message, ai_response
+                        )
                         
                         logger.info("Successfully generated chat response")
                         
@@ -143,10 +152,10 @@ If you don't know something, admit it and suggest where to find more information
             "fallback": True
         }
     
-    def clear_chat_history(self):
-        """Clear the chat history"""
-        self.chat_history = []
-        logger.info("Chat history cleared")
+    def clear_chat_history(self, user_id: Optional[str] = None, session_id: Optional[str] = None):
+        """Clear a user's chat history (one session, or all sessions when session_id is None)"""
+        removed = self.memory.clear(CHAT_MEMORY_NAMESPACE, user_id, session_id)
+        logger.info(f"Chat history cleared for user {user_id} ({removed} conversation(s))")
     
     async def generate_concept_lesson(
         self, 
@@ -175,6 +184,20 @@ If you don't know something, admit it and suggest where to find more information
         if not self.available or not self.api_key:
             return self._generate_fallback_content(concept_name, domain, difficulty)
         
+        # Serve identical lesson requests from the response cache
+        cache_params = {
+            "concept_name": concept_name,
+            "domain": domain,
+            "difficulty": difficulty,
+            "related_concepts": related_concepts or [],
+            "category": category,
+            "detailed_description": detailed_description
+        }
+        cached_content = lesson_cache.get(cache_params)
+        if cached_content is not None:
+            logger.info(f"Serving cached AI lesson for: {concept_name} ({difficulty} level)")
+            return cached_content
+        
         # Construct context-aware prompt
         related_text = ""
         if related_concepts:
@@ -268,6 +291,7 @@ If you don't know something, admit it and suggest where to find more information
 
 """
                         final_content = metadata_header + generated_content
+                        lesson_cache.set(cache_params, final_content)
                         logger.info(f"Successfully generated lesson for {concept_name}")
                         return final_content
                     else:
@@ -367,7 +391,9 @@ def sync_generate_lesson(
 
 def sync_chat_with_ai(
     message: str,
-    context: str = ""
+    context: str = "",
+    user_id: str = "",
+    session_id: str = ""
 ) -> dict:
     """Synchronous wrapper for chat functionality"""
     import concurrent.futures
@@ -377,15 +403,17 @@ def sync_chat_with_ai(
             asyncio.run,
             ai_generator.chat_with_ai(
                 message=message,
-                context=context
+                context=context,
+                user_id=user_id or None,
+                session_id=session_id or None
             )
         )
         return future.result()
 
 
-def clear_ai_chat_history():
-    """Clear the chat history"""
-    ai_generator.clear_chat_history()
+def clear_ai_chat_history(user_id: str = "", session_id: str = ""):
+    """Clear a user's chat history"""
+    ai_generator.clear_chat_history(user_id or None, session_id or None)
 
 
 if __name__ == "__main__":
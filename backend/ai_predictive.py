@@ -14,13 +14,18 @@ Author: Cavin Otieno
 
 import sys
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
 import uuid
 import json
 import math
+import time
+import asyncio
+import threading
+
+import numpy as np
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(__file__))
@@ -28,10 +33,24 @@ sys.path.insert(0, os.path.dirname(__file__))
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel, Field
 from admin_auth import get_current_user_from_token, AdminRole
+from risk_model_pipeline import get_risk_training_service, score_users
+
+# Import centralized logging configuration
+from logger_config import logger
 
 # Initialize router
 ai_predictive_router = APIRouter()
 
+DB_SCHEMA = os.getenv("DB_SCHEMA", "jeseci_academy")
+RISK_REFRESH_ENABLED = os.getenv("RISK_REFRESH_ENABLED", "true").lower() == "true"
+RISK_REFRESH_INTERVAL_SECONDS = int(os.getenv("RISK_REFRESH_INTERVAL_SECONDS", "21600"))
+RISK_FEATURE_WINDOW_DAYS = int(os.getenv("RISK_FEATURE_WINDOW_DAYS", "30"))
+RISK_ENGAGEMENT_TARGET_EVENTS = float(os.getenv("RISK_ENGAGEMENT_TARGET_EVENTS", "20"))
+RISK_WRITE_PAGE_SIZE = int(os.getenv("RISK_WRITE_PAGE_SIZE", "1000"))
+
+# Advisory lock so that only one worker refreshes stored predictions
+RISK_REFRESH_LOCK = 48213
+
 # =============================================================================
 # Data Models
 # =============================================================================
@@ -542,6 +561,480 @@ def analyze_sentiment(content_id: str, content_type: str) -> SentimentScore:
         review_count=hash_val % 500 + 10
     )
 
+# =============================================================================
+# Batch Risk Scoring
+# =============================================================================
+#
+# Cohort-wide risk is scored for every learner at once: a single query builds
+# the feature matrix, the rules of calculate_risk_score are applied to whole
+# columns with NumPy, and the predictions are stored in risk_predictions with
+# the refresh timestamp. Overview requests aggregate the stored rows instead
+# of rescoring every profile.
+
+BATCH_MODEL_VERSION = "1.1.0"
+
+# Feature matrix columns, in StudentProfile order
+FEATURE_COLUMNS = (
+    "login_frequency", "average_quiz_score", "content_completion_rate",
+    "time_spent_per_session", "engagement_score"
+)
+
+# Used for learners with no data for a feature; matches the default profile
+# of assess_student_risk
+DEFAULT_FEATURES = np.array([2.5, 60.0, 50.0, 25.0, 50.0])
+
+# Factors in calculate_risk_score order:
+# (feature column, high impact label, medium impact label, value format)
+RISK_FACTORS = (
+    (0, "Low Login Frequency", "Moderate Login Frequency", "{:.1f} logins/week"),
+    (1, "Low Quiz Performance", "Below Average Quiz Performance", "{:.1f}% average"),
+    (2, "Low Content Completion", "Moderate Content Completion", "{:.1f}% completion rate"),
+    (4, "Low Engagement", "Below Average Engagement", "{:.1f}/100 engagement score"),
+    (3, None, "Very Short Sessions", "{:.1f} minutes/session"),
+)
+
+
+def score_feature_matrix(features: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized calculate_risk_score for an (n, 5) matrix of FEATURE_COLUMNS.
+
+    Returns:
+        (scores, contributions, high_impact) where scores has shape (n,) and
+        contributions/high_impact have shape (n, 5) in RISK_FACTORS order
+    """
+    login, quiz, completion, session, engagement = features.T
+    contributions = np.zeros((len(features), len(RISK_FACTORS)))
+    high_impact = np.zeros((len(features), len(RISK_FACTORS)), dtype=bool)
+
+    def tiered(factor, value, high_below, high_risk, medium_below, medium_risk):
+        is_high = value < high_below
+        is_medium = ~is_high & (value < medium_below)
+        contributions[:, factor] = np.where(is_high, high_risk, np.where(is_medium, medium_risk, 0.0))
+        high_impact[:, factor] = is_high
+
+    tiered(0, login, 2.0, np.minimum(30, (2.0 - login) * 15), 3.5, (3.5 - login) * 5)
+    tiered(1, quiz, 50, (50 - quiz) * 0.8, 70, (70 - quiz) * 0.3)
+    tiered(2, completion, 40, (40 - completion) * 0.75, 60, (60 - completion) * 0.25)
+    tiered(3, engagement, 30, (30 - engagement) * 1.0, 50, (50 - engagement) * 0.5)
+    contributions[:, 4] = np.where(session < 10, 15.0, 0.0)
+
+    scores = np.clip(contributions.sum(axis=1), 0, 100)
+    return scores, contributions, high_impact
+
+
+def risk_levels(scores: np.ndarray) -> np.ndarray:
+    """Vectorized determine_risk_level"""
+    return np.select(
+        [scores >= 75, scores >= 50, scores >= 25],
+        [RiskLevel.CRITICAL.value, RiskLevel.HIGH.value, RiskLevel.MODERATE.value],
+        RiskLevel.LOW.value
+    )
+
+
+def profiles_to_matrix(profiles: List[StudentProfile]) -> np.ndarray:
+    return np.array(
+        [[getattr(profile, column) for column in FEATURE_COLUMNS] for profile in profiles],
+        dtype=float
+    ).reshape(len(profiles), len(FEATURE_COLUMNS))
+
+
+def score_batch(user_ids: List[str], features: np.ndarray, observed: Optional[np.ndarray] = None,
+                generated_at: Optional[datetime] = None, model_scores: Optional[np.ndarray] = None,
+                model_version: Optional[str] = None) -> List[RiskPrediction]:
+    """
+    Score a feature matrix and build a RiskPrediction per row.
+
+    Args:
+        features: (n, 5) matrix of FEATURE_COLUMNS; NaN means no data
+        observed: (n, 5) mask of features backed by data, for confidence
+        model_scores: (n,) scores from a trained model, NaN where the model
+            has no features for a learner; those rows keep the rule score.
+            Contributing factors always come from the rules.
+    """
+    generated_at = generated_at or datetime.now()
+    missing = np.isnan(features)
+    if observed is None:
+        observed = ~missing
+    features = np.where(missing, DEFAULT_FEATURES, features)
+
+    scores, contributions, high_impact = score_feature_matrix(features)
+    versions = np.full(len(user_ids), BATCH_MODEL_VERSION, dtype=object)
+    if model_scores is not None:
+        from_model = ~np.isnan(model_scores)
+        scores = np.where(from_model, model_scores, scores)
+        versions[from_model] = model_version
+    levels = risk_levels(scores)
+    confidence = np.round(0.6 + 0.35 * observed.mean(axis=1), 2)
+
+    # Recommendations depend only on the factor names and the risk level
+    recommendation_cache: Dict[Tuple, List[str]] = {}
+    predictions = []
+    for row, user_id in enumerate(user_ids):
+        factors = []
+        for factor, (column, high_label, medium_label, value_format) in enumerate(RISK_FACTORS):
+            contribution = contributions[row, factor]
+            if contribution <= 0:
+                continue
+            is_high = high_impact[row, factor]
+            factors.append({
+                "factor": high_label if is_high else medium_label,
+                "impact": "high" if is_high else "medium",
+                "value": value_format.format(features[row, column]),
+                "contribution": float(contribution)
+            })
+        prediction = RiskPrediction(
+            user_id=user_id,
+            risk_score=float(scores[row]),
+            risk_level=RiskLevel(levels[row]),
+            contributing_factors=factors,
+            recommendations=[],
+            confidence=float(confidence[row]),
+            generated_at=generated_at,
+            model_version=versions[row]
+        )
+        key = (prediction.risk_level, tuple(f["factor"] for f in factors))
+        if key not in recommendation_cache:
+            recommendation_cache[key] = generate_risk_recommendations(prediction)
+        prediction.recommendations = recommendation_cache[key]
+        predictions.append(prediction)
+    return predictions
+
+
+def _load_feature_rows(cur, user_ids: Optional[List[str]] = None,
+                       window_days: int = RISK_FEATURE_WINDOW_DAYS) -> List[tuple]:
+    """
+    Build the feature matrix rows for active learners in one query.
+
+    Login frequency counts active days (any activity, session or quiz
+    attempt) per week; engagement is the number of such events in the window
+    against RISK_ENGAGEMENT_TARGET_EVENTS. Quiz, completion and session
+    columns are NULL when the learner has no data for them.
+    """
+    params: Dict[str, Any] = {
+        "since": datetime.now() - timedelta(days=window_days),
+        "days": float(window_days),
+        "target": RISK_ENGAGEMENT_TARGET_EVENTS,
+        "user_ids": user_ids
+    }
+    learner_filter = ""
+    user_filter = ""
+    if user_ids is not None:
+        learner_filter = f"AND user_id IN (SELECT id FROM {DB_SCHEMA}.users WHERE user_id = ANY(%(user_ids)s))"
+        user_filter = "AND u.user_id = ANY(%(user_ids)s)"
+
+    cur.execute(f"""
+        WITH activity AS (
+            SELECT user_id, created_at::date AS day FROM {DB_SCHEMA}.user_activities
+            WHERE created_at >= %(since)s {learner_filter}
+            UNION ALL
+            SELECT user_id, start_time::date FROM {DB_SCHEMA}.learning_sessions
+            WHERE start_time >= %(since)s {learner_filter}
+            UNION ALL
+            SELECT user_id, created_at::date FROM {DB_SCHEMA}.quiz_attempts
+            WHERE created_at >= %(since)s {learner_filter}
+        ),
+        activity_stats AS (
+            SELECT user_id, COUNT(DISTINCT day) AS active_days, COUNT(*) AS events
+            FROM activity GROUP BY user_id
+        ),
+        quiz_stats AS (
+            SELECT user_id, AVG(score) AS average_score
+            FROM {DB_SCHEMA}.quiz_attempts
+            WHERE created_at >= %(since)s {learner_filter}
+            GROUP BY user_id
+        ),
+        progress_stats AS (
+            SELECT user_id,
+                   100.0 * COUNT(*) FILTER (WHERE status = 'completed') / COUNT(*) AS completion_rate
+            FROM {DB_SCHEMA}.user_concept_progress
+            WHERE TRUE {learner_filter}
+            GROUP BY user_id
+        ),
+        session_stats AS (
+            SELECT user_id, AVG(duration_seconds) / 60.0 AS session_minutes
+            FROM {DB_SCHEMA}.learning_sessions
+            WHERE start_time >= %(since)s AND duration_seconds > 0 {learner_filter}
+            GROUP BY user_id
+        )
+        SELECT u.user_id,
+               COALESCE(a.active_days, 0) * 7.0 / %(days)s,
+               q.average_score,
+               p.completion_rate,
+               s.session_minutes,
+               LEAST(100.0, COALESCE(a.events, 0) * 100.0 / %(target)s)
+        FROM {DB_SCHEMA}.users u
+        LEFT JOIN activity_stats a ON a.user_id = u.id
+        LEFT JOIN quiz_stats q ON q.user_id = u.id
+        LEFT JOIN progress_stats p ON p.user_id = u.id
+        LEFT JOIN session_stats s ON s.user_id = u.id
+        WHERE u.is_active = TRUE
+          AND COALESCE(u.is_deleted, FALSE) = FALSE
+          AND COALESCE(u.is_admin, FALSE) = FALSE
+          {user_filter}
+    """, params)
+    return cur.fetchall()
+
+
+def rows_to_matrix(rows: List[tuple]) -> Tuple[List[str], np.ndarray]:
+    """Split feature rows into user ids and an (n, 5) float matrix with NaN for NULL"""
+    user_ids = [row[0] for row in rows]
+    features = np.array(
+        [[np.nan if value is None else float(value) for value in row[1:]] for row in rows],
+        dtype=float
+    ).reshape(len(rows), len(FEATURE_COLUMNS))
+    return user_ids, features
+
+
+def _store_predictions(cur, predictions: List[RiskPrediction], generated_at: datetime) -> None:
+    from psycopg2.extras import execute_values
+
+    execute_values(cur, f"""
+        INSERT INTO {DB_SCHEMA}.risk_predictions
+            (user_id, risk_score, risk_level, confidence, contributing_factors,
+             recommendations, model_version, generated_at)
+        VALUES %s
+        ON CONFLICT (user_id) DO UPDATE SET
+            risk_score = EXCLUDED.risk_score,
+            risk_level = EXCLUDED.risk_level,
+            confidence = EXCLUDED.confidence,
+            contributing_factors = EXCLUDED.contributing_factors,
+            recommendations = EXCLUDED.recommendations,
+            model_version = EXCLUDED.model_version,
+            generated_at = EXCLUDED.generated_at
+    """, [
+        (p.user_id, p.risk_score, p.risk_level.value, p.confidence,
+         json.dumps(p.contributing_factors), json.dumps(p.recommendations),
+         p.model_version, generated_at)
+        for p in predictions
+    ], template="(%s, %s, %s, %s, %s::jsonb, %s::jsonb, %s, %s)", page_size=RISK_WRITE_PAGE_SIZE)
+
+    # Learners who are no longer active keep no stale prediction
+    cur.execute(f"DELETE FROM {DB_SCHEMA}.risk_predictions WHERE generated_at < %s", (generated_at,))
+
+
+def refresh_risk_predictions(force: bool = False) -> Dict[str, Any]:
+    """
+    Rescore every active learner and replace the stored predictions.
+
+    Runs in one transaction under an advisory lock, so readers see either the
+    previous or the new snapshot and concurrent workers do not repeat the
+    work. Without force, does nothing if the last refresh is younger than
+    RISK_REFRESH_INTERVAL_SECONDS.
+    """
+    from database.postgres_manager import get_postgres_manager
+
+    started = time.time()
+    manager = get_postgres_manager()
+    conn = manager.get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (RISK_REFRESH_LOCK,))
+            if not cur.fetchone()[0]:
+                conn.rollback()
+                return {"success": False, "error": "Risk refresh is already running"}
+
+            if not force:
+                cur.execute(f"SELECT MAX(generated_at) FROM {DB_SCHEMA}.risk_scoring_runs")
+                last_run = cur.fetchone()[0]
+                if last_run and (datetime.now() - last_run).total_seconds() < RISK_REFRESH_INTERVAL_SECONDS:
+                    conn.rollback()
+                    return {"success": True, "skipped": True, "generated_at": last_run.isoformat()}
+
+            generated_at = datetime.now()
+            user_ids, features = rows_to_matrix(_load_feature_rows(cur))
+            model = get_risk_training_service().registry.active_model()
+            model_scores = None
+            if model is not None:
+                try:
+                    model_scores = score_users(model, user_ids)
+                except Exception as e:
+                    logger.warning(f"Risk model {model.version} unavailable, using rule scores: {e}")
+            model_version = model.version if model_scores is not None else BATCH_MODEL_VERSION
+            predictions = score_batch(user_ids, features, generated_at=generated_at,
+                                      model_scores=model_scores, model_version=model_version)
+            _store_predictions(cur, predictions, generated_at)
+
+            distribution = {level.value: 0 for level in RiskLevel}
+            for prediction in predictions:
+                distribution[prediction.risk_level.value] += 1
+            average = float(np.mean([p.risk_score for p in predictions])) if predictions else 0.0
+            duration_ms = int((time.time() - started) * 1000)
+            cur.execute(f"""
+                INSERT INTO {DB_SCHEMA}.risk_scoring_runs
+                    (generated_at, users_scored, average_risk_score, risk_distribution, model_version, duration_ms)
+                VALUES (%s, %s, %s, %s::jsonb, %s, %s)
+            """, (generated_at, len(predictions), average, json.dumps(distribution),
+                  model_version, duration_ms))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        manager.return_connection(conn)
+
+    logger.info(f"Risk predictions refreshed for {len(predictions)} learners in {duration_ms}ms")
+    return {
+        "success": True,
+        "users_scored": len(predictions),
+        "average_risk_score": round(average, 2),
+        "risk_distribution": distribution,
+        "duration_ms": duration_ms,
+        "model_version": model_version,
+        "generated_at": generated_at.isoformat()
+    }
+
+
+def load_stored_prediction(user_id: str) -> Optional[RiskPrediction]:
+    """Get a learner's stored prediction from the last refresh"""
+    from database.postgres_manager import get_postgres_manager
+
+    manager = get_postgres_manager()
+    conn = manager.get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT risk_score, risk_level, contributing_factors, recommendations,
+                       confidence, generated_at, model_version
+                FROM {DB_SCHEMA}.risk_predictions WHERE user_id = %s
+            """, (user_id,))
+            row = cur.fetchone()
+    finally:
+        manager.return_connection(conn)
+    if row is None:
+        return None
+    return RiskPrediction(
+        user_id=user_id,
+        risk_score=float(row[0]),
+        risk_level=RiskLevel(row[1]),
+        contributing_factors=row[2] or [],
+        recommendations=row[3] or [],
+        confidence=float(row[4]),
+        generated_at=row[5],
+        model_version=row[6]
+    )
+
+
+def load_risk_overview(trend_runs: int = 10) -> Optional[Dict[str, Any]]:
+    """
+    Aggregate the stored predictions, or None if no refresh has run yet.
+
+    Distribution, segments and trend come from two aggregate queries over
+    risk_predictions and risk_scoring_runs.
+    """
+    from database.postgres_manager import get_postgres_manager
+
+    manager = get_postgres_manager()
+    conn = manager.get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                WITH scored AS (
+                    SELECT p.risk_score, p.risk_level, p.generated_at,
+                           u.created_at >= NOW() - INTERVAL '30 days' AS is_new,
+                           p.contributing_factors @> '[{{"factor": "Low Quiz Performance"}}]' AS low_quiz,
+                           (p.contributing_factors @> '[{{"factor": "Low Engagement"}}]'
+                            OR p.contributing_factors @> '[{{"factor": "Below Average Engagement"}}]') AS irregular
+                    FROM {DB_SCHEMA}.risk_predictions p
+                    LEFT JOIN {DB_SCHEMA}.users u ON u.user_id = p.user_id
+                )
+                SELECT COUNT(*), AVG(risk_score), MAX(generated_at),
+                       COUNT(*) FILTER (WHERE risk_level = 'critical'),
+                       COUNT(*) FILTER (WHERE risk_level = 'high'),
+                       COUNT(*) FILTER (WHERE risk_level = 'moderate'),
+                       COUNT(*) FILTER (WHERE risk_level = 'low'),
+                       COUNT(*) FILTER (WHERE is_new), AVG(risk_score) FILTER (WHERE is_new),
+                       COUNT(*) FILTER (WHERE low_quiz), AVG(risk_score) FILTER (WHERE low_quiz),
+                       COUNT(*) FILTER (WHERE irregular), AVG(risk_score) FILTER (WHERE irregular)
+                FROM scored
+            """)
+            row = cur.fetchone()
+            cur.execute(f"""
+                SELECT generated_at, average_risk_score
+                FROM {DB_SCHEMA}.risk_scoring_runs
+                ORDER BY generated_at DESC
+                LIMIT %s
+            """, (trend_runs,))
+            runs = cur.fetchall()
+    finally:
+        manager.return_connection(conn)
+
+    if not runs:
+        return None
+
+    segments = [
+        ("New Users (< 30 days)", row[7], row[8]),
+        ("Low Quiz Performance", row[9], row[10]),
+        ("Irregular Engagement", row[11], row[12]),
+    ]
+    return {
+        "total_students_analyzed": row[0],
+        "average_risk_score": round(float(row[1] or 0), 2),
+        "risk_distribution": {"critical": row[3], "high": row[4], "moderate": row[5], "low": row[6]},
+        "generated_at": row[2].isoformat() if row[2] else None,
+        "high_risk_segments": [
+            {"segment": name, "avg_risk": round(float(avg or 0), 1), "count": count}
+            for name, count, avg in segments
+        ],
+        "trends": [
+            {"date": generated_at.isoformat(), "avg_risk": round(float(avg_risk or 0), 2)}
+            for generated_at, avg_risk in reversed(runs)
+        ]
+    }
+
+
+_refresh_thread: Optional[threading.Thread] = None
+
+
+def _refresh_loop() -> None:
+    while True:
+        try:
+            result = refresh_risk_predictions()
+            if result.get("users_scored") is not None:
+                # Keep the feature store and its snapshots current between retrains
+                get_risk_training_service().submit_feature_update()
+        except Exception as e:
+            logger.error(f"Risk prediction refresh failed: {e}")
+        time.sleep(min(RISK_REFRESH_INTERVAL_SECONDS, 900))
+
+
+def _on_risk_model_activated(result: Dict[str, Any]) -> None:
+    """Rescore everyone with a newly activated model"""
+    threading.Thread(target=refresh_risk_predictions, args=(True,), name="risk-refresh-model", daemon=True).start()
+
+
+def sync_model_stats() -> Dict[str, Any]:
+    """Reflect the active trained risk model in ml_model_stats"""
+    model = get_risk_training_service().registry.active_model()
+    if model is not None:
+        ml_model_stats.update({
+            "model_version": model.version,
+            "last_trained": model.metadata.get("trained_at", ml_model_stats["last_trained"]),
+            "training_samples": model.metadata.get("samples", ml_model_stats["training_samples"]),
+            "accuracy_score": model.metadata.get("accuracy", ml_model_stats["accuracy_score"]),
+            "auc_score": model.metadata.get("auc"),
+            "features_used": len(model.metadata.get("features", []))
+        })
+    return ml_model_stats
+
+
+def start_risk_refresh() -> bool:
+    """
+    Keep stored predictions fresh from a background thread.
+
+    Safe to call from every worker: the refresh skips while the last run is
+    younger than RISK_REFRESH_INTERVAL_SECONDS, and the advisory lock lets
+    only one worker run it.
+    """
+    global _refresh_thread
+    if not RISK_REFRESH_ENABLED:
+        return False
+    if _refresh_thread is None or not _refresh_thread.is_alive():
+        get_risk_training_service().add_listener(_on_risk_model_activated)
+        _refresh_thread = threading.Thread(target=_refresh_loop, name="risk-refresh", daemon=True)
+        _refresh_thread.start()
+        logger.info(f"Risk predictions refreshed every {RISK_REFRESH_INTERVAL_SECONDS}s")
+    return True
+
 # =============================================================================
 # API Endpoints
 # =============================================================================
@@ -569,58 +1062,34 @@ async def assess_student_risk(
     
     total_score = 0.0
     
-    for user_id in request.user_ids:
-        # Get or create student profile
+    # Score all requested students in one batch; unknown users get the
+    # default profile (NaN rows are filled with DEFAULT_FEATURES)
+    features = np.full((len(request.user_ids), len(FEATURE_COLUMNS)), np.nan)
+    for row, user_id in enumerate(request.user_ids):
         if user_id in student_profiles:
-            profile = student_profiles[user_id]
-        else:
-            # Create default profile for unknown users
-            profile = StudentProfile(
-                user_id=user_id,
-                login_frequency=2.5,
-                average_quiz_score=60.0,
-                content_completion_rate=50.0,
-                time_spent_per_session=25.0,
-                engagement_score=50.0,
-                last_active=datetime.now()
-            )
-        
-        # Calculate risk
-        risk_score, factors = calculate_risk_score(profile)
-        risk_level = determine_risk_level(risk_score)
-        
-        # Generate recommendations
-        prediction = RiskPrediction(
-            user_id=user_id,
-            risk_score=risk_score,
-            risk_level=risk_level,
-            contributing_factors=factors,
-            recommendations=[],
-            confidence=0.85 + (hash(user_id) % 10) / 100,
-            generated_at=datetime.now()
-        )
-        prediction.recommendations = generate_risk_recommendations(prediction)
-        
+            features[row] = profiles_to_matrix([student_profiles[user_id]])[0]
+    
+    for prediction in score_batch(request.user_ids, features):
         # Store prediction
-        risk_predictions[user_id] = prediction
+        risk_predictions[prediction.user_id] = prediction
         
         # Build response
         assessment = {
-            "user_id": user_id,
-            "risk_score": round(risk_score, 2),
-            "risk_level": risk_level.value,
+            "user_id": prediction.user_id,
+            "risk_score": round(prediction.risk_score, 2),
+            "risk_level": prediction.risk_level.value,
             "confidence": prediction.confidence,
             "recommendations": prediction.recommendations
         }
         
         if request.include_factors:
-            assessment["contributing_factors"] = factors
+            assessment["contributing_factors"] = prediction.contributing_factors
         
         assessments.append(assessment)
         
         # Update summary
-        risk_summary[f"{risk_level.value}_count"] += 1
-        total_score += risk_score
+        risk_summary[f"{prediction.risk_level.value}_count"] += 1
+        total_score += prediction.risk_score
     
     # Calculate average
     risk_summary["average_risk_score"] = round(total_score / len(request.user_ids), 2) if request.user_ids else 0
@@ -629,7 +1098,7 @@ async def assess_student_risk(
         success=True,
         assessments=assessments,
         summary=risk_summary,
-        model_info=ml_model_stats
+        model_info=sync_model_stats()
     )
 
 @ai_predictive_router.get("/ai/predict/risk/{user_id}")
@@ -640,8 +1109,13 @@ async def get_student_risk(
     """
     Get detailed risk assessment for a specific student.
     """
-    if user_id in risk_predictions:
-        pred = risk_predictions[user_id]
+    pred = risk_predictions.get(user_id)
+    if pred is None:
+        try:
+            pred = load_stored_prediction(user_id)
+        except Exception as e:
+            logger.warning(f"Stored risk prediction unavailable for {user_id}: {e}")
+    if pred is not None:
         return {
             "success": True,
             "prediction": {
@@ -651,7 +1125,8 @@ async def get_student_risk(
                 "contributing_factors": pred.contributing_factors,
                 "recommendations": pred.recommendations,
                 "confidence": pred.confidence,
-                "generated_at": pred.generated_at.isoformat()
+                "generated_at": pred.generated_at.isoformat(),
+                "model_version": pred.model_version
             }
         }
     else:
@@ -814,24 +1289,44 @@ async def get_risk_analytics_overview(
     - Trends over time
     - High-risk segments
     - Intervention effectiveness
+    
+    Reads the predictions stored by the last batch refresh; the first request
+    before any refresh runs one. Without a database the in-memory profiles
+    are scored instead.
     """
+    try:
+        stored = await asyncio.to_thread(load_risk_overview)
+        if stored is None:
+            await asyncio.to_thread(refresh_risk_predictions, True)
+            stored = await asyncio.to_thread(load_risk_overview)
+    except Exception as e:
+        logger.warning(f"Stored risk predictions unavailable, scoring in-memory profiles: {e}")
+        stored = None
+    
+    if stored is not None:
+        distribution = stored["risk_distribution"]
+        return {
+            "success": True,
+            "overview": {
+                "total_students_analyzed": stored["total_students_analyzed"],
+                "average_risk_score": stored["average_risk_score"],
+                "risk_distribution": distribution,
+                "intervention_recommended": distribution["critical"] + distribution["high"],
+                "model_performance": sync_model_stats(),
+                "predictions_refreshed_at": stored["generated_at"]
+            },
+            "trends": stored["trends"],
+            "high_risk_segments": stored["high_risk_segments"],
+            "generated_at": datetime.now().isoformat()
+        }
+    
     all_predictions = list(risk_predictions.values())
     
     if not all_predictions:
         # Generate summary from student profiles
-        for profile in student_profiles.values():
-            score, _ = calculate_risk_score(profile)
-            level = determine_risk_level(score)
-            pred = RiskPrediction(
-                user_id=profile.user_id,
-                risk_score=score,
-                risk_level=level,
-                contributing_factors=[],
-                recommendations=[],
-                confidence=0.85,
-                generated_at=datetime.now()
-            )
-            risk_predictions[profile.user_id] = pred
+        profiles = list(student_profiles.values())
+        for pred in score_batch([p.user_id for p in profiles], profiles_to_matrix(profiles)):
+            risk_predictions[pred.user_id] = pred
         all_predictions = list(risk_predictions.values())
     
     # Calculate distribution
@@ -869,6 +1364,30 @@ async def get_risk_analytics_overview(
         "generated_at": datetime.now().isoformat()
     }
 
+@ai_predictive_router.post("/ai/predict/risk/refresh")
+async def refresh_stored_risk_predictions(
+    current_user: Dict = Depends(get_current_user_from_token)
+):
+    """
+    Rescore every active learner now instead of waiting for the scheduled refresh.
+    
+    Only SUPER_ADMIN and ANALYTICS_ADMIN roles can access this endpoint.
+    """
+    if current_user.get("admin_role") not in [AdminRole.SUPER_ADMIN, AdminRole.ANALYTICS_ADMIN]:
+        raise HTTPException(
+            status_code=403,
+            detail={"success": False, "error": "Insufficient permissions to refresh risk predictions"}
+        )
+    
+    try:
+        return await asyncio.to_thread(refresh_risk_predictions, True)
+    except Exception as e:
+        logger.error(f"Risk prediction refresh failed: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail={"success": False, "error": "Risk prediction refresh failed"}
+        )
+
 @ai_predictive_router.get("/ai/model/info")
 async def get_model_information(
     current_user: Dict = Depends(get_current_user_from_token)
@@ -876,19 +1395,29 @@ async def get_model_information(
     """
     Get information about the ML models currently in use.
     """
+    risk_model = get_risk_training_service().registry.active_model()
+    if risk_model is not None:
+        risk_prediction = {
+            "version": risk_model.version,
+            "type": "Logistic Regression",
+            "features": risk_model.metadata.get("features", []),
+            "accuracy": risk_model.metadata.get("accuracy"),
+            "auc": risk_model.metadata.get("auc"),
+            "training_samples": risk_model.metadata.get("samples"),
+            "last_updated": risk_model.metadata.get("trained_at")
+        }
+    else:
+        risk_prediction = {
+            "version": BATCH_MODEL_VERSION,
+            "type": "Rule-based scoring",
+            "features": list(FEATURE_COLUMNS),
+            "accuracy": 0.87,
+            "last_updated": "2025-12-01T00:00:00Z"
+        }
     return {
         "success": True,
         "models": {
-            "risk_prediction": {
-                "version": "1.0.0",
-                "type": "Gradient Boosting Classifier",
-                "features": [
-                    "login_frequency", "quiz_scores", "completion_rate",
-                    "session_duration", "engagement_score", "time_since_last_active"
-                ],
-                "accuracy": 0.87,
-                "last_updated": "2025-12-01T00:00:00Z"
-            },
+            "risk_prediction": risk_prediction,
             "recommendation": {
                 "version": "1.0.0", 
                 "type": "Collaborative Filtering",
@@ -927,6 +1456,18 @@ async def retrain_ml_model(
             detail={"success": False, "error": "Insufficient permissions to retrain models"}
         )
     
+    if request.model_type == "risk":
+        # Feature update, training and registration run in the pipeline's
+        # worker process; the new model is hot-swapped when it is activated
+        job = get_risk_training_service().submit_retraining(request.training_data_range_days)
+        return {
+            "success": True,
+            "message": "Retraining risk model in worker process",
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "started_at": job["started_at"]
+        }
+    
     # Add retraining task to background processing
     background_tasks.add_task(
         mock_retrain_model,
@@ -941,6 +1482,72 @@ async def retrain_ml_model(
         "status": "started"
     }
 
+@ai_predictive_router.get("/ai/model/jobs/{job_id}")
+async def get_model_training_job(
+    job_id: str,
+    current_user: Dict = Depends(get_current_user_from_token)
+):
+    """
+    Get the status and result of a risk pipeline job.
+    
+    Only SUPER_ADMIN and ANALYTICS_ADMIN roles can access this endpoint.
+    """
+    if current_user.get("admin_role") not in [AdminRole.SUPER_ADMIN, AdminRole.ANALYTICS_ADMIN]:
+        raise HTTPException(
+            status_code=403,
+            detail={"success": False, "error": "Insufficient permissions to view training jobs"}
+        )
+    
+    job = get_risk_training_service().get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"success": False, "error": "Training job not found"}
+        )
+    return {"success": True, "job": job}
+
+@ai_predictive_router.get("/ai/model/registry")
+async def get_model_registry(
+    current_user: Dict = Depends(get_current_user_from_token)
+):
+    """
+    List registered risk model versions and the active one.
+    
+    Only SUPER_ADMIN and ANALYTICS_ADMIN roles can access this endpoint.
+    """
+    if current_user.get("admin_role") not in [AdminRole.SUPER_ADMIN, AdminRole.ANALYTICS_ADMIN]:
+        raise HTTPException(
+            status_code=403,
+            detail={"success": False, "error": "Insufficient permissions to view the model registry"}
+        )
+    
+    registry = get_risk_training_service().registry.read()
+    return {"success": True, "active": registry["active"], "models": list(reversed(registry["models"]))}
+
+@ai_predictive_router.post("/ai/model/registry/{version}/activate")
+async def activate_model_version(
+    version: str,
+    current_user: Dict = Depends(get_current_user_from_token)
+):
+    """
+    Switch the active risk model to a registered version (e.g. to roll back).
+    
+    Only SUPER_ADMIN and ANALYTICS_ADMIN roles can access this endpoint.
+    """
+    if current_user.get("admin_role") not in [AdminRole.SUPER_ADMIN, AdminRole.ANALYTICS_ADMIN]:
+        raise HTTPException(
+            status_code=403,
+            detail={"success": False, "error": "Insufficient permissions to change models"}
+        )
+    
+    if not get_risk_training_service().registry.activate(version):
+        raise HTTPException(
+            status_code=404,
+            detail={"success": False, "error": "Model version not found"}
+        )
+    _on_risk_model_activated({"version": version})
+    return {"success": True, "active": version}
+
 async def mock_retrain_model(model_type: str, days: int):
     """Mock model retraining function (simulates long-running ML training)"""
     import asyncio
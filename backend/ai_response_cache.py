@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+AI Response Cache
+Caches LLM responses for lesson generation, quiz generation and code explanations
+
+This module provides:
+- Exact-match caching keyed on normalized prompt parameters
+- A similarity tier for near-duplicate code-explanation requests
+- TTL expiry and versioned invalidation when prompt templates change
+- Hit/miss counters flushed to the admin AI usage stats
+
+Author: Jeseci Development Team
+"""
+
+import os
+import re
+import json
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Import centralized logging configuration
+from logger_config import logger
+
+
+# Cache configuration from environment
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "2000"))
+AI_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("AI_CACHE_SIMILARITY_THRESHOLD", "0.92"))
+AI_CACHE_STATS_FLUSH_INTERVAL = int(os.getenv("AI_CACHE_STATS_FLUSH_INTERVAL", "50"))
+AI_CACHE_SIMILARITY_SCAN_LIMIT = int(os.getenv("AI_CACHE_SIMILARITY_SCAN_LIMIT", "200"))
+
+# Prompt template versions. Bump a version whenever the matching prompt
+# changes so that responses produced by the old template are never served.
+PROMPT_TEMPLATE_VERSIONS: Dict[str, str] = {
+    "lesson": "v1",
+    "quiz": "v1",
+    "code_explanation": "v1",
+}
+
+# Dimensionality of the hashed shingle embedding used by the similarity tier
+EMBEDDING_DIMENSIONS = 1024
+_TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|[^\sA-Za-z0-9_]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_value(value: Any) -> Any:
+    """Normalize a prompt parameter so trivially different inputs share a key"""
+    if isinstance(value, str):
+        return _WHITESPACE_PATTERN.sub(" ", value).strip().lower()
+    if isinstance(value, (list, tuple, set)):
+        items = [normalize_value(v) for v in value if v not in (None, "")]
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True))
+    if isinstance(value, dict):
+        return {k: normalize_value(v) for k, v in value.items() if v not in (None, "")}
+    return value
+
+
+def embed_text(text: str) -> Dict[int, float]:
+    """
+    Build a sparse, L2-normalized embedding from hashed token trigrams.
+
+    Identifier names are kept but whitespace and formatting are ignored, so
+    re-indented or lightly edited code lands close to the original.
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < 3:
+        tokens = tokens + [""] * (3 - len(tokens))
+
+    vector: Dict[int, float] = {}
+    for i in range(len(tokens) - 2):
+        shingle = "\x1f".join(tokens[i:i + 3])
+        digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest, "big") % EMBEDDING_DIMENSIONS
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    if norm == 0:
+        return {}
+    return {k: v / norm for k, v in vector.items()}
+
+
+def cosine_similarity(a: Dict[int, float], b: Dict[int, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+@dataclass
+class CacheEntry:
+    """A cached AI response"""
+    value: Any
+    expires_at: float
+    template_version: str
+    partition: str
+    embedding: Optional[Dict[int, float]] = None
+
+
+class AIResponseCache:
+    """
+    Bounded LRU cache for AI responses within a single namespace.
+
+    Exact lookups hash the normalized parameters together with the current
+    prompt template version. Similarity lookups compare an embedding of the
+    free-text input against entries in the same partition (the remaining
+    parameters, e.g. language) and return the closest match above the
+    configured threshold. Only the most recently used similarity_scan_limit
+    entries of a partition are compared, and the comparison runs outside
+    the lock.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: int = AI_CACHE_TTL_SECONDS,
+        max_entries: int = AI_CACHE_MAX_ENTRIES,
+        similarity_threshold: Optional[float] = None,
+        stats_flush_interval: int = AI_CACHE_STATS_FLUSH_INTERVAL,
+        enabled: bool = AI_CACHE_ENABLED,
+        similarity_scan_limit: int = AI_CACHE_SIMILARITY_SCAN_LIMIT
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.stats_flush_interval = stats_flush_interval
+        self.enabled = enabled
+        self.similarity_scan_limit = similarity_scan_limit
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # Keys of embedded entries per partition, least recently used first
+        self._partitions: Dict[str, "OrderedDict[str, None]"] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "similar_hits": 0, "misses": 0, "evictions": 0}
+        self._unflushed = {"hits": 0, "similar_hits": 0, "misses": 0}
+
+    @property
+    def template_version(self) -> str:
+        """Current prompt template version for this namespace"""
+        return PROMPT_TEMPLATE_VERSIONS.get(self.namespace, "v1")
+
+    def make_key(self, params: Dict[str, Any]) -> str:
+        """Build a cache key from normalized parameters and the template version"""
+        payload = json.dumps(
+            {"ns": self.namespace, "v": self.template_version, "p": normalize_value(params)},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _partition(self, params: Dict[str, Any]) -> str:
+        return json.dumps(normalize_value(params), sort_keys=True, default=str)
+
+    def _is_live(self, entry: CacheEntry, now: float) -> bool:
+        return entry.expires_at > now and entry.template_version == self.template_version
+
+    def get(self, params: Dict[str, Any]) -> Optional[Any]:
+        """Return the cached response for these exact parameters, if any"""
+        if not self.enabled:
+            return None
+
+        key = self.make_key(params)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_live(entry, now):
+                self._touch(key)
+                self._record("hits")
+                return entry.value
+            if entry is not None:
+                self._remove(key)
+            self._record("misses")
+        return None
+
+    def get_similar(self, text: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """
+        Return a cached response for the same or a near-duplicate text.
+
+        Args:
+            text: Free-text input (e.g. the code being explained)
+            params: Remaining parameters; only entries with identical values
+                are considered
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        params = params or {}
+        exact_key = self.make_key(dict(params, text=text))
+        partition = self._partition(params)
+        now = time.time()
+
+        candidates = []
+        with self._lock:
+            entry = self._entries.get(exact_key)
+            if entry is not None and self._is_live(entry, now):
+                self._touch(exact_key)
+                self._record("hits")
+                return entry.value
+
+            if self.similarity_threshold is not None:
+                for key in reversed(self._partitions.get(partition, ())):
+                    if len(candidates) >= self.similarity_scan_limit:
+                        break
+                    candidate = self._entries[key]
+                    if self._is_live(candidate, now):
+                        candidates.append((key, candidate))
+
+        best = None
+        if candidates:
+            query = embed_text(text)
+            best_score = self.similarity_threshold
+            for key, candidate in candidates:
+                score = cosine_similarity(query, candidate.embedding)
+                if score >= best_score:
+                    best, best_score = (key, candidate), score
+
+        with self._lock:
+            # The match may have been evicted or replaced while scoring
+            if best is not None and self._entries.get(best[0]) is best[1]:
+                self._touch(best[0])
+                self._record("similar_hits")
+                return best[1].value
+            self._record("misses")
+        return None
+
+    def set(self, params: Dict[str, Any], value: Any, text: Optional[str] = None) -> None:
+        """
+        Store a response.
+
+        Args:
+            params: Prompt parameters used to build the response
+            value: Response to cache
+            text: Free-text input for entries that should participate in
+                similarity lookups (see get_similar)
+        """
+        if not self.enabled:
+            return
+
+        if text is not None:
+            key = self.make_key(dict(params, text=text))
+            embedding = embed_text(text) if self.similarity_threshold is not None else None
+        else:
+            key = self.make_key(params)
+            embedding = None
+
+        entry = CacheEntry(
+            value=value,
+            expires_at=time.time() + self.ttl_seconds,
+            template_version=self.template_version,
+            partition=self._partition(params),
+            embedding=embedding
+        )
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            if embedding is not None:
+                self._partitions.setdefault(entry.partition, OrderedDict())[key] = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def invalidate(self) -> int:
+        """Drop every entry in this namespace and return how many were removed"""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._partitions.clear()
+        logger.info(f"AI response cache '{self.namespace}' invalidated ({removed} entries)")
+        return removed
+
+    def _touch(self, key: str) -> None:
+        """Mark an entry as most recently used; caller must hold the lock"""
+        self._entries.move_to_end(key)
+        bucket = self._partitions.get(self._entries[key].partition)
+        if bucket is not None and key in bucket:
+            bucket.move_to_end(key)
+
+    def _remove(self, key: str) -> None:
+        """Drop an entry and its partition index slot; caller must hold the lock"""
+        entry = self._entries.pop(key)
+        bucket = self._partitions.get(entry.partition)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._partitions[entry.partition]
+
+    def _record(self, counter: str) -> None:
+        """Increment a counter; caller must hold the lock"""
+        self._stats[counter] += 1
+        self._unflushed[counter] += 1
+        if sum(self._unflushed.values()) >= self.stats_flush_interval:
+            pending = dict(self._unflushed)
+            self._unflushed = {k: 0 for k in self._unflushed}
+            threading.Thread(target=self._flush, args=(pending,), daemon=True).start()
+
+    def _flush(self, pending: Dict[str, int]) -> None:
+        try:
+            from admin_ai_store import record_ai_cache_stats
+            record_ai_cache_stats(self.namespace, pending)
+        except Exception as e:
+            logger.warning(f"Could not record AI cache stats for '{self.namespace}': {e}")
+
+    def flush_stats(self) -> None:
+        """Write pending hit/miss counters to the usage stats table"""
+        with self._lock:
+            pending = dict(self._unflushed)
+            self._unflushed = {k: 0 for k in self._unflushed}
+        if any(pending.values()):
+            self._flush(pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get in-process cache statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["similar_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["similar_hits"]) / lookups, 4) if lookups else 0.0
+        stats["namespace"] = self.namespace
+        stats["template_version"] = self.template_version
+        return stats
+
+
+# Registry of namespace caches
+_caches: Dict[str, AIResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(namespace: str, similarity_threshold: Optional[float] = None) -> AIResponseCache:
+    """Get (or create) the shared cache for a namespace"""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = AIResponseCache(namespace, similarity_threshold=similarity_threshold)
+            _caches[namespace] = cache
+        return cache
+
+
+def bump_template_version(namespace: str, version: Optional[str] = None) -> str:
+    """
+    Mark a prompt template as changed so stale responses are no longer served.
+
+    Args:
+        namespace: Cache namespace (lesson, quiz, code_explanation)
+        version: Explicit new version; defaults to incrementing the current one
+
+    Returns:
+        The new template version
+    """
+    if version is None:
+        digits = PROMPT_TEMPLATE_VERSIONS.get(namespace, "v1").lstrip("v")
+        version = f"v{int(digits) + 1 if digits.isdigit() else 1}"
+    PROMPT_TEMPLATE_VERSIONS[namespace] = version
+
+    cache = _caches.get(namespace)
+    if cache is not None:
+        cache.invalidate()
+    return version
+
+
+def get_all_cache_stats() -> List[Dict[str, Any]]:
+    """Get statistics for every namespace cache"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.get_stats() for cache in caches]
+
+
+lesson_cache = get_response_cache("lesson")
+quiz_cache = get_response_cache("quiz")
+code_explanation_cache = get_response_cache(
+    "code_explanation",
+    similarity_threshold=AI_CACHE_SIMILARITY_THRESHOLD
+)
@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+"""
+End-to-end API Latency Benchmark
+Jeseci Smart Learning Academy
+
+Boots the FastAPI app from main.py, with the admin, quiz, analytics, system
+and Jaclang routers it includes, and replays weighted request mixes (login,
+dashboard, course list, quizzes, code validation, search, recommendations)
+at a fixed number of concurrent clients. Each run reports per-endpoint
+throughput, status codes and latency percentiles as JSON, so runs from two
+commits can be diffed in CI.
+
+Stand-ins:
+- PostgreSQL: `--postgres embedded` starts a throwaway local server with
+  pgserver (pip install pgserver); `--postgres configured` uses the database
+  the POSTGRES_* variables point at, which should be a disposable one. The
+  schema is created and seeded with content, learners and an admin first
+- Neo4j: SeededGraphManager answers the app's graph reads from the seed
+  data, with optional injected latency per query
+- Redis is not needed; Redis-backed features fall back to per-process state
+
+The app runs in process through httpx's ASGI transport, so startup hooks
+(risk refresh, notification batches) don't run and no server is needed.
+Use --base-url to replay the same mixes against a running server instead;
+the bench_learner_N and bench_admin accounts must already exist in its
+database (an in-process run with --postgres configured against it creates
+them).
+
+Usage:
+    python backend/api_benchmark.py --mix learner --concurrency 1,8,32 \\
+        --requests 2000 --output api-bench.json
+    python backend/api_benchmark.py --baseline main.json --max-regression 20 \\
+        --output api-bench.json
+
+Every 2xx response is checked against its scenario's expected shape, so a
+handler that answers 200 from a fallback path (Jaclang CLI missing, swallowed
+query errors) counts as an error rather than as a fast request. Before each
+run, one request per scenario must pass its check, and in-process must not
+log an error, or the run fails. The clock for throughput starts after the
+warm-up requests.
+
+Latencies include the client, which shares the process; compare runs from
+the same machine and settings only.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import random
+import asyncio
+import logging
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# Add backend and the repository root (for backend.* imports) to path
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+try:
+    import pgserver
+    PGSERVER_AVAILABLE = True
+except ImportError:
+    pgserver = None
+    PGSERVER_AVAILABLE = False
+
+LEARNER_PASSWORD = "Bench-learner-2024"
+ADMIN_USERNAME = "bench_admin"
+ADMIN_PASSWORD = "Bench-admin-2024"
+
+SEARCH_QUERIES = ["jac", "walkers", "graph traversal", "variables", "quiz", "object spatial"]
+
+JAC_SNIPPET = """
+node Lesson {
+    has title: str;
+}
+
+walker Visit {
+    can start with `root entry {
+        visit [-->];
+    }
+}
+
+with entry {
+    root ++> Lesson(title="Variables");
+    Visit() spawn root;
+}
+"""
+
+
+# =============================================================================
+# Scenarios and Mixes
+# =============================================================================
+
+@dataclass
+class Scenario:
+    """One kind of request in a mix"""
+    method: str
+    path: str
+    # None, "learner" or "admin": whose bearer token to send
+    auth: Optional[str] = None
+    # body(rng, learner) -> JSON body
+    body: Optional[Callable[[random.Random, Dict[str, Any]], Dict[str, Any]]] = None
+    # check(response JSON) -> None if the response is the real thing, else the problem
+    check: Optional[Callable[[Any], Optional[str]]] = None
+
+
+def _succeeded(result: Any) -> Optional[str]:
+    if not isinstance(result, dict) or result.get("success") is not True:
+        return "success is not true"
+    return None
+
+
+def _has_items(key: str) -> Callable[[Any], Optional[str]]:
+    """Successful response listing at least one seeded item under key"""
+    def check(result: Any) -> Optional[str]:
+        problem = _succeeded(result)
+        if problem is None and not result.get(key):
+            problem = f"no {key} (seed data missing or query failed)"
+        return problem
+    return check
+
+
+def _check_login(result: Any) -> Optional[str]:
+    return None if isinstance(result, dict) and result.get("access_token") else "no access_token"
+
+
+def _check_dashboard(result: Any) -> Optional[str]:
+    # Failing stats queries are swallowed and reported as zeros
+    problem = _succeeded(result)
+    if problem is None and not ((result.get("data") or {}).get("users") or {}).get("total_users"):
+        problem = "total_users is 0 (stats queries failed)"
+    return problem
+
+
+def _check_validate(result: Any) -> Optional[str]:
+    # JAC_SNIPPET is valid; any error (including "Jaclang CLI not available")
+    # means the check didn't really run
+    if not isinstance(result, dict) or result.get("valid") is not True or result.get("errors"):
+        errors = result.get("errors") if isinstance(result, dict) else None
+        return f"not validated: {errors[0].get('message') if errors else result}"
+    return None
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "login": Scenario(
+        "POST", "/auth/login",
+        body=lambda rng, learner: {"username": learner["username"], "password": LEARNER_PASSWORD},
+        check=_check_login
+    ),
+    "dashboard": Scenario("GET", "/admin/dashboard/stats", auth="admin", check=_check_dashboard),
+    "admin_users": Scenario("GET", "/admin/users", auth="admin", check=_has_items("users")),
+    "courses": Scenario("GET", "/courses", check=_has_items("courses")),
+    "learning_paths": Scenario("GET", "/learning-paths", check=_has_items("paths")),
+    "quizzes": Scenario("GET", "/quizzes", check=_succeeded),
+    "code_run": Scenario(
+        "POST", "/api/jaclang/validate",
+        body=lambda rng, learner: {"source_code": JAC_SNIPPET},
+        check=_check_validate
+    ),
+    "search": Scenario(
+        "POST", "/search/global", auth="learner",
+        body=lambda rng, learner: {"query": rng.choice(SEARCH_QUERIES)},
+        check=_succeeded
+    ),
+    "recommendations": Scenario("GET", "/graph/recommendations/{user_id}", check=_succeeded),
+}
+
+# Scenario weights per named mix
+MIXES: Dict[str, Dict[str, int]] = {
+    "mixed": {
+        "login": 10, "dashboard": 10, "courses": 20, "quizzes": 15,
+        "code_run": 15, "search": 20, "recommendations": 10,
+    },
+    "learner": {
+        "login": 5, "courses": 20, "learning_paths": 10, "quizzes": 15,
+        "code_run": 15, "search": 20, "recommendations": 15,
+    },
+    "admin": {"login": 10, "dashboard": 50, "admin_users": 40},
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """A mix name from MIXES, or explicit weights such as "login=1,search=3" """
+    if value in MIXES:
+        return dict(MIXES[value])
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+# =============================================================================
+# Stand-ins
+# =============================================================================
+
+class SeededGraphManager:
+    """
+    Neo4jManager stand-in answering the app's graph reads from seed data.
+
+    Queries are answered by the first node label they match: Concept rows
+    for concept and recommendation queries, LearningPath rows for path
+    queries, and a count for queries that return count(...). Writes are
+    accepted and ignored.
+    """
+
+    _LABEL = re.compile(r"\(\w*:(\w+)")
+
+    def __init__(self, latency_ms: float = 0.0):
+        import seed
+
+        self.latency = latency_ms / 1000.0
+        self.driver = None
+        self.rows: Dict[str, List[Dict[str, Any]]] = {
+            "Concept": [
+                {
+                    "id": concept["name"],
+                    "name": concept["name"],
+                    "display_name": concept["display_name"],
+                    "category": concept["category"],
+                    "difficulty_level": concept["difficulty_level"],
+                    "description": concept["description"],
+                    "duration": 60,
+                    "prereq_count": 0,
+                }
+                for concept in seed.jac_concepts_data
+            ],
+            "LearningPath": [
+                {
+                    "id": path["path_id"],
+                    "name": path["name"],
+                    "title": path["title"],
+                    "description": path["description"],
+                    "difficulty": path["difficulty_level"],
+                    "duration": path["estimated_duration"],
+                    "total_concepts": len(path["concepts"]),
+                    "concept_count": len(path["concepts"]),
+                }
+                for path in seed.jac_learning_paths
+            ],
+        }
+
+    def connect(self) -> bool:
+        return True
+
+    def disconnect(self):
+        """Nothing to release"""
+
+    def execute_query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        if self.latency:
+            time.sleep(self.latency)
+        labels = [label for label in self._LABEL.findall(query) if label in self.rows]
+        if not labels:
+            return []
+        rows = self.rows[labels[0]]
+        if "RETURN count(" in query:
+            return [{"count": len(rows)}]
+        limit = (parameters or {}).get("limit")
+        return [dict(row) for row in (rows[:limit] if limit else rows)]
+
+    def execute_write(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return []
+
+
+class EmbeddedPostgres:
+    """Throwaway PostgreSQL server in a temporary directory (pgserver)"""
+
+    def __init__(self):
+        if not PGSERVER_AVAILABLE:
+            raise RuntimeError("pgserver is required for --postgres embedded: pip install pgserver")
+        self.directory = tempfile.mkdtemp(prefix="api-bench-pg-")
+        self.server = pgserver.get_server(self.directory, cleanup_mode="delete")
+
+    def environment(self) -> Dict[str, str]:
+        """POSTGRES_* settings pointing the app at this server"""
+        info = self.server.get_postmaster_info()
+        return {
+            "POSTGRES_HOST": str(info.socket_dir),
+            "POSTGRES_PORT": str(info.port),
+            "POSTGRES_DB": "postgres",
+            "POSTGRES_USER": "postgres",
+            "POSTGRES_PASSWORD": "",
+        }
+
+    def close(self):
+        self.server.cleanup()
+
+
+def prepare_database() -> None:
+    """Create the schema and seed the content tables"""
+    import psycopg2
+    from database.initialize_database import initialize_database
+    import seed
+
+    schema = os.getenv("DB_SCHEMA", "jeseci_academy")
+    conn = psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST", "localhost"),
+        port=int(os.getenv("POSTGRES_PORT", 5432)),
+        database=os.getenv("POSTGRES_DB", "jeseci_learning_academy"),
+        user=os.getenv("POSTGRES_USER", "jeseci_academy_user"),
+        password=os.getenv("POSTGRES_PASSWORD", "jeseci_secure_password_2024")
+    )
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+    finally:
+        conn.close()
+
+    if not initialize_database():
+        raise RuntimeError("Database initialization failed; see the log for the failing statement")
+    seed.seed_paths_to_postgres(verbose=False)
+    seed.seed_courses_to_postgres(verbose=False)
+
+
+def seed_users(learners: int) -> List[Dict[str, Any]]:
+    """
+    Register the benchmark learners and admin, skipping email verification.
+    Existing users from an earlier run are reused.
+    """
+    import user_auth as auth_module
+
+    auth_module.register_user(
+        ADMIN_USERNAME, f"{ADMIN_USERNAME}@example.com", ADMIN_PASSWORD,
+        is_admin=True, admin_role="super_admin", skip_verification=True
+    )
+    users = []
+    for index in range(learners):
+        username = f"bench_learner_{index}"
+        auth_module.register_user(
+            username, f"{username}@example.com", LEARNER_PASSWORD, skip_verification=True
+        )
+        users.append({"username": username})
+    return users
+
+
+def boot_app(graph_latency_ms: float = 0.0):
+    """Import main.py with the graph stand-in installed and return the app"""
+    import database
+
+    database.neo4j_manager = SeededGraphManager(graph_latency_ms)
+    import main
+    return main.app
+
+
+# =============================================================================
+# Benchmark
+# =============================================================================
+
+def _latency_summary(values: List[float]) -> Dict[str, float]:
+    from live_metrics import percentile
+
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": round(percentile(ordered, 50), 2),
+        "p90_ms": round(percentile(ordered, 90), 2),
+        "p95_ms": round(percentile(ordered, 95), 2),
+        "p99_ms": round(percentile(ordered, 99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+class _ErrorRecords(logging.Handler):
+    """Collects error log records"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+class ApiBenchmark:
+    """
+    One run: `concurrency` clients each issuing requests back to back, picking
+    scenarios by weight. `warmup` unmeasured requests go first; the clock
+    then starts and runs until `requests` measured requests have completed
+    (or `duration_seconds` has passed).
+
+    A 2xx response that fails its scenario's check is recorded with status
+    "invalid" and counts as an error.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        users: List[Dict[str, Any]],
+        mix: Dict[str, int],
+        concurrency: int = 8,
+        requests: int = 1000,
+        warmup: int = 50,
+        duration_seconds: float = 0.0,
+        seed: int = 42
+    ):
+        self.client_factory = client_factory
+        self.users = users
+        self.mix = {name: weight for name, weight in mix.items() if weight > 0}
+        self.concurrency = max(1, concurrency)
+        self.requests = requests
+        self.warmup = warmup
+        self.duration_seconds = duration_seconds
+        self.seed = seed
+
+        self._issued = 0
+        self._latencies: Dict[str, List[float]] = {name: [] for name in self.mix}
+        self._statuses: Dict[str, Dict[str, int]] = {name: {} for name in self.mix}
+        self._problems: Dict[str, Dict[str, int]] = {name: {} for name in self.mix}
+
+    async def _login(self, client, username: str, password: str) -> Dict[str, Any]:
+        response = await client.post("/auth/login", json={"username": username, "password": password})
+        if response.status_code != 200:
+            raise RuntimeError(f"Benchmark login for {username} failed ({response.status_code}): {response.text[:200]}")
+        return response.json()
+
+    async def _authenticate(self, client) -> str:
+        """Log every learner and the admin in once; returns the admin token"""
+        for user in self.users:
+            if "token" not in user:
+                result = await self._login(client, user["username"], LEARNER_PASSWORD)
+                user["token"] = result["access_token"]
+                user["user_id"] = result["user"]["user_id"]
+        return (await self._login(client, ADMIN_USERNAME, ADMIN_PASSWORD))["access_token"]
+
+    async def _send(self, client, name: str, rng: random.Random, admin_token: str):
+        scenario = SCENARIOS[name]
+        learner = rng.choice(self.users)
+        headers = {}
+        if scenario.auth == "learner":
+            headers["Authorization"] = f"Bearer {learner['token']}"
+        elif scenario.auth == "admin":
+            headers["Authorization"] = f"Bearer {admin_token}"
+        body = scenario.body(rng, learner) if scenario.body else None
+        path = scenario.path.format(user_id=learner["user_id"])
+
+        started = time.perf_counter()
+        problem = None
+        try:
+            response = await client.request(scenario.method, path, json=body, headers=headers)
+            latency_ms = (time.perf_counter() - started) * 1000
+            status = str(response.status_code)
+            if status.startswith("2") and scenario.check is not None:
+                try:
+                    problem = scenario.check(response.json())
+                except ValueError:
+                    problem = "response is not JSON"
+                if problem:
+                    status = "invalid"
+        except Exception as e:
+            latency_ms = (time.perf_counter() - started) * 1000
+            status = type(e).__name__
+        return latency_ms, status, problem
+
+    async def _preflight(self, client, admin_token: str) -> None:
+        """
+        Send each scenario once; fail if any answers from a degraded path:
+        a failed check, a non-2xx/3xx status, or (in process) an error
+        logged while handling it, which catches handlers that swallow
+        failing queries.
+        """
+        rng = random.Random(self.seed)
+        errors = _ErrorRecords()
+        root = logging.getLogger()
+        root.addHandler(errors)
+        failures = []
+        try:
+            for name in self.mix:
+                errors.records.clear()
+                _, status, problem = await self._send(client, name, rng, admin_token)
+                if problem or not status.startswith(("2", "3")):
+                    failures.append(f"{name}: {problem or status}")
+                elif errors.records:
+                    failures.append(f"{name}: logged {errors.records[0].getMessage()[:200]!r}")
+        finally:
+            root.removeHandler(errors)
+        if failures:
+            raise RuntimeError(
+                "Benchmark scenarios are not exercising their real handlers "
+                f"(fix the stand-in or drop them from the mix): {'; '.join(failures)}"
+            )
+
+    async def _client_loop(self, client, rng: random.Random, admin_token: str, total: int,
+                           measured: bool, deadline: Optional[float] = None):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while self._issued < total and (deadline is None or time.perf_counter() < deadline):
+            self._issued += 1
+            name = rng.choices(names, weights)[0]
+            latency_ms, status, problem = await self._send(client, name, rng, admin_token)
+            if measured:
+                self._latencies[name].append(latency_ms)
+                self._statuses[name][status] = self._statuses[name].get(status, 0) + 1
+                if problem:
+                    self._problems[name][problem] = self._problems[name].get(problem, 0) + 1
+
+    async def _phase(self, client, rngs: List[random.Random], admin_token: str, total: int,
+                     measured: bool, deadline: Optional[float] = None):
+        self._issued = 0
+        await asyncio.gather(*(
+            self._client_loop(client, rng, admin_token, total, measured, deadline)
+            for rng in rngs
+        ))
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the benchmark and return its report"""
+        async with self.client_factory() as client:
+            admin_token = await self._authenticate(client)
+            await self._preflight(client, admin_token)
+            rngs = [random.Random(self.seed + worker) for worker in range(self.concurrency)]
+            await self._phase(client, rngs, admin_token, self.warmup, measured=False)
+
+            started = time.perf_counter()
+            deadline = started + self.duration_seconds if self.duration_seconds else None
+            await self._phase(client, rngs, admin_token, self.requests, measured=True, deadline=deadline)
+            elapsed = time.perf_counter() - started
+
+        endpoints = {}
+        for name in self.mix:
+            scenario = SCENARIOS[name]
+            statuses = self._statuses[name]
+            count = len(self._latencies[name])
+            endpoints[name] = {
+                "method": scenario.method,
+                "path": scenario.path,
+                "count": count,
+                "errors": sum(n for status, n in statuses.items() if not status.startswith(("2", "3"))),
+                "status_codes": statuses,
+                "invalid_responses": self._problems[name],
+                "requests_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+                "latency": _latency_summary(self._latencies[name]),
+            }
+        all_latencies = [value for values in self._latencies.values() for value in values]
+        return {
+            "concurrency": self.concurrency,
+            "mix": self.mix,
+            "requests": len(all_latencies),
+            "warmup": self.warmup,
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_per_second": round(len(all_latencies) / elapsed, 1) if elapsed else 0.0,
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+            "latency": _latency_summary(all_latencies),
+            "endpoints": endpoints,
+        }
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], max_regression: float) -> Dict[str, Any]:
+    """
+    Compare runs with the same concurrency, endpoint by endpoint.
+
+    An endpoint regresses when its p95 latency grows, or its throughput
+    drops, by more than max_regression percent.
+    """
+    def change(before, after):
+        return round((after - before) / before * 100, 1) if before else None
+
+    baseline_runs = {run["concurrency"]: run for run in baseline.get("runs", [])}
+    endpoints = []
+    regressions = []
+    for run in current["runs"]:
+        before_run = baseline_runs.get(run["concurrency"])
+        if before_run is None:
+            continue
+        for name, after in run["endpoints"].items():
+            before = before_run["endpoints"].get(name)
+            if not before or not before["count"] or not after["count"]:
+                continue
+            entry = {
+                "concurrency": run["concurrency"],
+                "endpoint": name,
+                "p50_change_pct": change(before["latency"]["p50_ms"], after["latency"]["p50_ms"]),
+                "p95_change_pct": change(before["latency"]["p95_ms"], after["latency"]["p95_ms"]),
+                "p99_change_pct": change(before["latency"]["p99_ms"], after["latency"]["p99_ms"]),
+                "throughput_change_pct": change(before["requests_per_second"], after["requests_per_second"]),
+            }
+            endpoints.append(entry)
+            if ((entry["p95_change_pct"] or 0) > max_regression
+                    or (entry["throughput_change_pct"] or 0) < -max_regression):
+                regressions.append(entry)
+    return {"max_regression_pct": max_regression, "endpoints": endpoints, "regressions": regressions}
+
+
+# =============================================================================
+# Command Line
+# =============================================================================
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def run_benchmarks(
+    concurrency_levels: List[int],
+    mix: Dict[str, int],
+    base_url: Optional[str] = None,
+    postgres: str = "embedded",
+    learners: int = 20,
+    graph_latency_ms: float = 0.0,
+    **options
+) -> Dict[str, Any]:
+    """
+    Set up the app and its stand-ins, then run one benchmark per
+    concurrency level.
+
+    Args:
+        concurrency_levels: Concurrent clients to try
+        mix: Scenario weights
+        base_url: Benchmark a running server instead of booting the app
+        postgres: "embedded" or "configured" (ignored with base_url)
+        learners: Learner accounts to seed and log in as
+        graph_latency_ms: Injected latency per graph query
+        **options: Further ApiBenchmark arguments
+
+    Returns:
+        Report with the environment and one entry per run
+    """
+    import httpx
+
+    embedded = None
+    if base_url is None:
+        if postgres == "embedded":
+            embedded = EmbeddedPostgres()
+            os.environ.update(embedded.environment())
+        # Read by modules at import time, so set before anything loads them
+        os.environ.setdefault("LOG_LEVEL", "warning")
+        os.environ.setdefault("ENABLE_MOCK_DATA", "false")
+        os.environ.setdefault("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "120")
+
+    from logger_config import logger
+
+    try:
+        if base_url is None:
+            prepare_database()
+            app = boot_app(graph_latency_ms)
+            users = seed_users(learners)
+            client_factory = lambda: httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60
+            )
+        else:
+            # Accounts must already exist on the target server
+            users = [{"username": f"bench_learner_{index}"} for index in range(learners)]
+            client_factory = lambda: httpx.AsyncClient(base_url=base_url, timeout=60)
+
+        runs = []
+        for concurrency in concurrency_levels:
+            logger.info(f"API benchmark: concurrency={concurrency} mix={mix}")
+            runs.append(asyncio.run(ApiBenchmark(
+                client_factory, users, mix, concurrency=concurrency, **options
+            ).run()))
+    finally:
+        if embedded is not None:
+            # Write pending last-login updates while the server is still up
+            if "user_auth" in sys.modules:
+                sys.modules["user_auth"].last_login_recorder.stop()
+            embedded.close()
+
+    return {
+        "environment": {
+            "target": base_url or "in-process",
+            "postgres": None if base_url else postgres,
+            "graph_latency_ms": graph_latency_ms,
+            "learners": learners,
+            "python": sys.version.split()[0],
+        },
+        "runs": runs,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="End-to-end API latency benchmark")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("mixed"),
+                        help=f"Mix name ({', '.join(MIXES)}) or weights such as login=1,search=3")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32], help="Comma-separated concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="Measured requests per run")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests before each run's clock starts")
+    parser.add_argument("--duration", type=float, default=0.0, help="Stop a run after this many seconds (0 = no limit)")
+    parser.add_argument("--learners", type=int, default=20, help="Learner accounts to seed and use")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for scenario choice")
+    parser.add_argument("--postgres", choices=["embedded", "configured"], default="embedded",
+                        help="Start a throwaway PostgreSQL (pgserver) or use the POSTGRES_* database")
+    parser.add_argument("--graph-latency-ms", type=float, default=0.0, help="Injected latency per graph query")
+    parser.add_argument("--base-url", type=str, help="Benchmark a running server instead of booting the app")
+    parser.add_argument("--baseline", type=str, help="Earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="With --baseline, exit 1 if an endpoint's p95 or throughput regresses by more than this percent")
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.concurrency,
+        args.mix,
+        base_url=args.base_url,
+        postgres=args.postgres,
+        learners=args.learners,
+        graph_latency_ms=args.graph_latency_ms,
+        requests=args.requests,
+        warmup=args.warmup,
+        duration_seconds=args.duration,
+        seed=args.seed
+    )
+
+    print(f"{'clients':>7} {'endpoint':<16} {'count':>6} {'errors':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for run in report["runs"]:
+        rows = list(run["endpoints"].items()) + [("(all)", run)]
+        for name, stats in rows:
+            latency = stats["latency"]
+            print(
+                f"{run['concurrency']:>7} {name:<16} {latency.get('count', 0):>6} {stats['errors']:>6} "
+                f"{stats['requests_per_second']:>8} {latency.get('p50_ms', 0):>8} "
+                f"{latency.get('p95_ms', 0):>8} {latency.get('p99_ms', 0):>8}"
+            )
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        threshold = args.max_regression if args.max_regression is not None else 10.0
+        report["comparison"] = compare_reports(baseline, report, threshold)
+        for entry in report["comparison"]["regressions"]:
+            print(
+                f"REGRESSION clients={entry['concurrency']} {entry['endpoint']}: "
+                f"p95 {entry['p95_change_pct']}%, throughput {entry['throughput_change_pct']}%"
+            )
+        if args.max_regression is not None and report["comparison"]["regressions"]:
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
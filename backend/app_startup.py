@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Startup Loading and Profiling for the Jac App
+Jeseci Smart Learning Academy
+
+backend/app.jac uses about twenty Python store modules. Importing them up
+front opens database pools, creates tables and builds caches before
+`jac serve` can answer a request, which slows autoscaling and rolling
+deploys. This module provides:
+- lazy_module(): a module proxy that imports on first attribute access
+- A background warm-up that loads the modules and opens pools after the
+  app is up, so the first requests rarely pay for it
+- A startup profile of import and init time per module
+
+Usage:
+    python backend/app_startup.py --profile-startup [--json]
+
+Environment:
+    JAC_LAZY_IMPORTS=false      import every store module when app.jac loads
+    JAC_WARM_UP=false           skip the background warm-up
+    JAC_PROFILE_STARTUP=true    log each module's load time as it happens
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import contextlib
+import importlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_IMPORTS = os.getenv("JAC_LAZY_IMPORTS", "true").lower() == "true"
+WARM_UP = os.getenv("JAC_WARM_UP", "true").lower() == "true"
+PROFILE_STARTUP = os.getenv("JAC_PROFILE_STARTUP", "false").lower() == "true"
+
+# Store modules app.jac binds, in the order it binds them
+APP_MODULES = (
+    "database",
+    "user_auth",
+    "email_verification",
+    "email_notifications",
+    "password_reset",
+    "admin_user_store",
+    "admin_content_store",
+    "admin_quiz_store",
+    "admin_ai_store",
+    "admin_analytics_store",
+    "content_views_store",
+    "notification_store",
+    "activity_store",
+    "collaboration_store",
+    "advanced_collaboration_store",
+    "request_context",
+    "user_dashboard_store",
+)
+
+
+def _open_postgres_pool():
+    import database
+    manager = database.get_postgres_manager()
+    manager.return_connection(manager.get_connection())
+
+
+def _open_user_auth_pool():
+    # The first user auth connection also creates any missing tables
+    import user_auth
+    user_auth.auth_manager._return_connection(user_auth.auth_manager._get_connection())
+
+
+def _open_password_reset_pool():
+    import password_reset
+    password_reset.reset_manager._return_connection(password_reset.reset_manager._get_connection())
+
+
+def _open_content_views_connection():
+    import content_views_store
+    content_views_store.content_views_store._get_connection()
+
+
+def _connect_neo4j():
+    import database
+    if database.neo4j_manager.driver is None:
+        database.neo4j_manager.connect()
+
+
+# Work deferred from import to first use: (name, callable)
+INIT_STEPS: List[Tuple[str, Callable[[], Any]]] = [
+    ("postgres_pool", _open_postgres_pool),
+    ("user_auth_pool_and_schema", _open_user_auth_pool),
+    ("password_reset_pool", _open_password_reset_pool),
+    ("content_views_connection", _open_content_views_connection),
+    ("neo4j_driver", _connect_neo4j),
+]
+
+
+# =============================================================================
+# Startup Profile
+# =============================================================================
+
+_profile_lock = threading.Lock()
+_profile: Dict[str, Dict[str, Any]] = {}
+
+
+def _record(kind: str, name: str, seconds: float, error: Optional[str] = None, **extra):
+    """Record how long a module load or init step took"""
+    entry = {"kind": kind, "name": name, "ms": round(seconds * 1000, 2), "error": error, **extra}
+    with _profile_lock:
+        _profile[f"{kind}:{name}"] = entry
+    if PROFILE_STARTUP:
+        from logger_config import logger
+        status = f" (failed: {error})" if error else ""
+        logger.info(f"Startup {kind} {name}: {entry['ms']} ms{status}")
+
+
+def _recorded(kind: str, name: str) -> bool:
+    with _profile_lock:
+        return f"{kind}:{name}" in _profile
+
+
+def get_startup_profile() -> List[Dict[str, Any]]:
+    """Module loads and init steps recorded so far, slowest first"""
+    with _profile_lock:
+        return sorted(_profile.values(), key=lambda entry: entry["ms"], reverse=True)
+
+
+# =============================================================================
+# Lazy Modules
+# =============================================================================
+
+class LazyModule:
+    """
+    Stand-in for a module that imports it on first attribute access.
+
+    The import runs under a lock, so concurrent first requests load the
+    module once. Afterwards every attribute lookup goes to the real module.
+    """
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_module", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _load(self):
+        module = self._lazy_module
+        if module is not None:
+            return module
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                # A module another one already imported costs nothing here:
+                # its load time is in the importer's entry. It is still listed
+                # (0 ms, already_loaded) so every app module appears in the
+                # profile and a missing entry can't pass for a fast one
+                first_load = self._lazy_name not in sys.modules
+                already_loaded = len(sys.modules)
+                started = time.perf_counter()
+                try:
+                    module = importlib.import_module(self._lazy_name)
+                except Exception as e:
+                    _record("import", self._lazy_name, time.perf_counter() - started, str(e))
+                    raise
+                if first_load:
+                    _record(
+                        "import", self._lazy_name, time.perf_counter() - started,
+                        modules_loaded=len(sys.modules) - already_loaded, already_loaded=False
+                    )
+                elif not _recorded("import", self._lazy_name):
+                    _record("import", self._lazy_name, 0.0, modules_loaded=0, already_loaded=True)
+                object.__setattr__(self, "_lazy_module", module)
+            return self._lazy_module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute: str, value):
+        setattr(self._load(), attribute, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module '{self._lazy_name}' ({state})>"
+
+
+def lazy_module(name: str):
+    """
+    Module binding for app.jac: a LazyModule, loaded right away when
+    JAC_LAZY_IMPORTS=false.
+    """
+    proxy = LazyModule(name)
+    if not LAZY_IMPORTS:
+        proxy._load()
+    return proxy
+
+
+# =============================================================================
+# Warm-up
+# =============================================================================
+
+_warm_up_thread: Optional[threading.Thread] = None
+
+
+def run_init_steps(steps: List[Tuple[str, Callable[[], Any]]] = INIT_STEPS):
+    """Run deferred pool and cache initialization, timing each step"""
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            _record("init", name, time.perf_counter() - started, str(e))
+        else:
+            _record("init", name, time.perf_counter() - started)
+
+
+def warm_up(modules=APP_MODULES):
+    """Load every app module and open pools; failures are left for first use"""
+    for name in modules:
+        try:
+            LazyModule(name)._load()
+        except Exception:
+            pass
+    run_init_steps()
+
+
+def start_warm_up():
+    """Warm up in a daemon thread (once) unless JAC_WARM_UP=false"""
+    global _warm_up_thread
+    if not WARM_UP or not LAZY_IMPORTS:
+        return
+    if _warm_up_thread is None:
+        _warm_up_thread = threading.Thread(target=warm_up, name="jac-warm-up", daemon=True)
+        _warm_up_thread.start()
+
+
+# =============================================================================
+# Command Line
+# =============================================================================
+
+def profile_startup(modules=APP_MODULES, init: bool = True) -> Dict[str, Any]:
+    """
+    Import each app module in app.jac's order, then run the init steps.
+
+    A module's time includes whatever it imports that wasn't loaded yet, so
+    shared dependencies are charged to the first module that pulls them in;
+    app modules loaded that way are listed with 0 ms and already_loaded set.
+    """
+    started = time.perf_counter()
+    for name in modules:
+        try:
+            LazyModule(name)._load()
+        except Exception:
+            pass
+    import_seconds = time.perf_counter() - started
+    if init:
+        run_init_steps()
+    return {
+        "import_ms": round(import_seconds * 1000, 2),
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "entries": get_startup_profile(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Jac app startup loading")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Import the app modules eagerly and report time per module and init step")
+    parser.add_argument("--no-init", action="store_true", help="Only time imports, skip pool and cache init")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.profile_startup:
+        parser.print_help()
+        return {}
+
+    if args.json:
+        # Modules log to stdout as they load; keep stdout for the report
+        with contextlib.redirect_stdout(sys.stderr):
+            report = profile_startup(init=not args.no_init)
+        print(json.dumps(report, indent=2))
+        return report
+
+    report = profile_startup(init=not args.no_init)
+
+    print(f"{'kind':<7} {'name':<30} {'ms':>10} {'modules':>8}  note")
+    for entry in report["entries"]:
+        note = entry["error"] or ("already loaded" if entry.get("already_loaded") else "")
+        print(
+            f"{entry['kind']:<7} {entry['name']:<30} {entry['ms']:>10.2f} "
+            f"{entry.get('modules_loaded', ''):>8}  {note}"
+        )
+    print(f"imports: {report['import_ms']:.2f} ms, total: {report['total_ms']:.2f} ms")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -25,7 +25,9 @@ import tempfile
 import shutil
 import re
 import json
+import shlex
 import resource
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional, Dict, Any, Tuple, List
 from dataclasses import dataclass, field
@@ -41,6 +43,14 @@ logger = logging.getLogger(__name__)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from logger_config import logger as app_logger
+from compile_cache import get_compile_cache
+from live_metrics import get_live_metrics
+
+# Sources whose Jac compile step failed recently; they are run from source
+# directly instead of attempting the compile again
+_failed_jac_compiles: "OrderedDict[str, bool]" = OrderedDict()
+_failed_jac_compiles_lock = threading.Lock()
+_FAILED_JAC_COMPILES_MAX = 1024
 
 
 class Language(Enum):
@@ -263,8 +273,15 @@ class MultiLanguageExecutor:
                 # Write code to file
                 code_file = self.sandbox.write_code_file(temp_dir, code, language)
                 
+                # Run Jac from cached (or freshly compiled) bytecode when possible
+                jac_cache_key = None
+                if language.lower() == 'jac' and not debug_mode:
+                    code_file, jac_cache_key = self._prepare_jac_artifact(code, code_file)
+                
                 # Build execution command
                 cmd = self._build_command(language, code_file, entry_point)
+                if jac_cache_key is not None:
+                    cmd = self._compile_then_run(code_file, cmd)
                 
                 app_logger.info(f"Executing {language} code with command: {' '.join(cmd)}")
                 
@@ -300,6 +317,9 @@ class MultiLanguageExecutor:
                     # Cancel alarm
                     signal.alarm(0)
                     
+                    if jac_cache_key is not None:
+                        self._store_jac_artifact(jac_cache_key, code_file, self.process.returncode)
+                    
                     execution_time = int((time.time() - start_time) * 1000)
                     
                     # Truncate output
@@ -344,6 +364,58 @@ class MultiLanguageExecutor:
                     language=language, error_type="EXECUTION_ERROR"
                 )
     
+    def _prepare_jac_artifact(self, code: str, code_file: str) -> Tuple[str, Optional[str]]:
+        """
+        Resolve the file to run for Jac source, using the compile cache.
+        
+        Returns (path, key). On a hit the cached .jir artifact is written
+        next to the source and key is None. On a miss path is the artifact
+        still to be built and key is where to store it: the caller compiles
+        and runs in one sandboxed process (see _compile_then_run). Source
+        that failed to compile before is run directly, with key None.
+        """
+        cache = get_compile_cache()
+        key = cache.make_key(code, "jir")
+        artifact_path = os.path.splitext(code_file)[0] + '.jir'
+        
+        artifact = cache.get(key)
+        if artifact is not None:
+            with open(artifact_path, 'wb') as f:
+                f.write(artifact)
+            return artifact_path, None
+        
+        with _failed_jac_compiles_lock:
+            if key in _failed_jac_compiles:
+                return code_file, None
+        return artifact_path, key
+    
+    def _compile_then_run(self, artifact_path: str, run_cmd: List[str]) -> List[str]:
+        """
+        Command that compiles the Jac source to artifact_path and then runs it.
+        
+        Both steps share one process, so the execution limits and timeout
+        cover the compile, and compile errors are reported like run errors.
+        """
+        source_file = os.path.splitext(artifact_path)[0] + '.jac'
+        compile_cmd = self.LANGUAGE_COMMANDS['jac']['compile'] + [source_file]
+        return ['sh', '-c', f"{shlex.join(compile_cmd)} || exit $?; exec {shlex.join(run_cmd)}"]
+    
+    def _store_jac_artifact(self, key: str, artifact_path: str, returncode: int) -> None:
+        """Cache the artifact built by _compile_then_run, or remember that the compile failed"""
+        if returncode < 0:
+            # Killed by a signal; the artifact may be incomplete
+            return
+        if os.path.exists(artifact_path):
+            with open(artifact_path, 'rb') as f:
+                get_compile_cache().put(key, f.read())
+            return
+        
+        # Identical source is run directly next time instead of recompiled
+        with _failed_jac_compiles_lock:
+            _failed_jac_compiles[key] = True
+            while len(_failed_jac_compiles) > _FAILED_JAC_COMPILES_MAX:
+                _failed_jac_compiles.popitem(last=False)
+    
     def _build_command(self, language: str, code_file: str, entry_point: str) -> List[str]:
         """Build the execution command for the specified language"""
         lang_config = self.LANGUAGE_COMMANDS.get(language.lower(), self.LANGUAGE_COMMANDS['python'])
@@ -461,10 +533,10 @@ class ErrorAnalyzer:
                 # Use the highest priority match
                 best_match = patterns[0]
                 # Safely get values with default fallbacks
-                result['friendly_message'] = best_match.get('friendly_message') if best_match else None
-                result['suggestion'] = best_match.get('suggestion') if best_match else None
-                result['resource_link'] = best_match.get('documentation_link') if best_match else None
-                result['example_fix'] = best_match.get('example_fix') if best_match else None
+                result['friendly_message'] = best_match.get('friendly_message') or best_match.get('description')
+                result['suggestion'] = best_match.get('suggestion')
+                result['resource_link'] = best_match.get('documentation_link')
+                result['example_fix'] = best_match.get('example_fix') or best_match.get('examples')
             
             # Fallback messages for common errors
             if not result['friendly_message']:
@@ -725,6 +797,7 @@ def execute_code(code: str, language: str = "jac", entry_point: str = "init",
     """
     executor = MultiLanguageExecutor()
     analyzer = ErrorAnalyzer()
+    started = time.perf_counter()
     
     # Handle different modes
     if mode == "grade":
@@ -737,6 +810,8 @@ def execute_code(code: str, language: str = "jac", entry_point: str = "init",
         # Regular execution
         result = executor.execute(code, language, entry_point, timeout, memory_mb, input_data)
     
+    get_live_metrics().record_execution((time.perf_counter() - started) * 1000, result.success)
+    
     # Add educational hints if there was an error
     if not result.success and result.stderr:
         hints = analyzer.analyze_error(result.stderr, language)
@@ -844,6 +919,18 @@ def compile_to_ir(code: str, entry_point: str = "init") -> Dict[str, Any]:
             "ir_output": None
         }
     
+    # Serve previously compiled IR for identical source
+    cache = get_compile_cache()
+    cache_key = cache.make_key(code, "ir", entry_point=entry_point or "")
+    cached_ir = cache.get(cache_key)
+    if cached_ir is not None:
+        return {
+            "success": True,
+            "ir_output": cached_ir.decode("utf-8"),
+            "error": None,
+            "cached": True
+        }
+    
     # Create temporary directory
     temp_dir = tempfile.mkdtemp(prefix="compile_ir_")
     try:
@@ -870,17 +957,14 @@ def compile_to_ir(code: str, entry_point: str = "init") -> Dict[str, Any]:
             if os.path.exists(ir_file):
                 with open(ir_file, 'r') as f:
                     ir_output = f.read()
-                return {
-                    "success": True,
-                    "ir_output": ir_output,
-                    "error": None
-                }
             else:
-                return {
-                    "success": True,
-                    "ir_output": result.stdout,
-                    "error": None
-                }
+                ir_output = result.stdout
+            cache.put(cache_key, ir_output.encode("utf-8"))
+            return {
+                "success": True,
+                "ir_output": ir_output,
+                "error": None
+            }
         else:
             return {
                 "success": False,
@@ -26,6 +26,7 @@ from logger_config import logger
 import psycopg2
 from psycopg2 import extras
 from database import get_db_connection, DB_SCHEMA
+from error_knowledge_matcher import ErrorKnowledgeMatcher
 
 
 @dataclass
@@ -1154,6 +1155,7 @@ class CodeSnippetStore:
             
             conn.commit()
             logger.info(f"Added error knowledge entry: {knowledge_id}")
+            error_knowledge_matcher.invalidate()
             return knowledge_id
             
         except Exception as e:
@@ -1463,6 +1465,15 @@ class CodeSnippetStore:
         Returns:
             List of matching error patterns with suggestions
         """
+        suggestions = error_knowledge_matcher.match(language, error_msg)
+        if error_knowledge_matcher.loaded:
+            return suggestions
+        
+        # Knowledge base could not be loaded into memory; query it directly
+        return self._query_error_suggestions(language, error_msg)
+    
+    def _query_error_suggestions(self, language: str, error_msg: str) -> List[Dict]:
+        """Match error patterns with SQL (fallback when the matcher is unavailable)"""
         conn = get_db_connection()
         try:
             cursor = conn.cursor()
@@ -1646,6 +1657,11 @@ code_execution_store = get_code_snippet_store()
 # Alias for backward compatibility
 CodeExecutionStore = CodeSnippetStore
 
+# In-memory error pattern index shared by every store instance
+error_knowledge_matcher = ErrorKnowledgeMatcher(
+    lambda: get_code_snippet_store().get_all_error_knowledge()
+)
+
 
 # ==============================================================================
 # Module-level functions for Jaclang compatibility
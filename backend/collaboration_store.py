@@ -9,8 +9,12 @@ import os
 import sys
 import uuid
 import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 # Ensure proper path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -21,10 +25,17 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(os.path.abs
 from logger_config import logger
 import psycopg2
 from psycopg2 import extras
+from database.postgres_manager import get_postgres_manager
 
 # Database configuration
 DB_SCHEMA = os.getenv("DB_SCHEMA", "jeseci_academy")
 
+# Forum performance configuration
+FORUM_COUNTER_FLUSH_INTERVAL = float(os.getenv("FORUM_COUNTER_FLUSH_INTERVAL", "2"))
+FORUM_THREAD_CACHE_TTL = int(os.getenv("FORUM_THREAD_CACHE_TTL", "30"))
+FORUM_THREAD_CACHE_SIZE = int(os.getenv("FORUM_THREAD_CACHE_SIZE", "500"))
+FORUM_POSTS_PAGE_SIZE = int(os.getenv("FORUM_POSTS_PAGE_SIZE", "50"))
+
 
 def get_db_connection():
     """Create a database connection"""
@@ -43,23 +54,264 @@ def get_db_connection():
     )
 
 
+def _encode_cursor(*values: Any) -> str:
+    """
+    Build a keyset cursor from the sort key of the last row on a page.
+    
+    Sort keys are NOT NULL columns: a NULL would sort apart from the row
+    comparison the next page uses, so it is rejected rather than encoded.
+    """
+    parts = []
+    for value in values:
+        if value is None:
+            raise ValueError("Keyset sort keys must not be NULL")
+        if isinstance(value, datetime):
+            parts.append(value.isoformat())
+        elif isinstance(value, bool):
+            parts.append("1" if value else "0")
+        else:
+            parts.append(str(value))
+    return "|".join(parts)
+
+
+def _decode_cursor(cursor: str, expected: int) -> List[str]:
+    parts = cursor.split("|")
+    if len(parts) != expected:
+        raise ValueError("Invalid cursor")
+    return parts
+
+
+# Batched counter columns: counter name -> (table, key column, counter column)
+COUNTER_COLUMNS = {
+    "post_likes": ("forum_posts", "post_id", "like_count"),
+    "comment_likes": ("content_comments", "comment_id", "like_count"),
+    "thread_views": ("forum_threads", "thread_id", "view_count"),
+    "thread_replies": ("forum_threads", "thread_id", "reply_count"),
+}
+
+
+class ForumCounterBuffer:
+    """
+    Collects forum counter increments and applies them in batches.
+    
+    Likes, views and replies only add to an in-memory delta; a background
+    thread writes all pending deltas with one UPDATE per counter every flush
+    interval, so busy posts and threads are not updated row by row under
+    contention. Readers add the pending delta to the stored value; deltas
+    being written count as pending until on_flush(flushed, committed_at)
+    has been told about them.
+    """
+    
+    def __init__(self, flush_interval: float = FORUM_COUNTER_FLUSH_INTERVAL, on_flush=None):
+        self.flush_interval = flush_interval
+        self._on_flush = on_flush
+        # (counter, key) -> [delta, latest_at, thread_id]
+        self._pending: Dict[Tuple[str, str], list] = {}
+        self._flushing: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = {"increments": 0, "flushes": 0, "rows_written": 0, "errors": 0}
+    
+    def increment(self, counter: str, key: str, thread_id: Optional[str] = None, delta: int = 1) -> int:
+        """Add to a counter; returns the delta now pending for it"""
+        with self._lock:
+            entry = self._pending.get((counter, key))
+            if entry is None:
+                entry = self._pending[(counter, key)] = [0, None, thread_id]
+            entry[0] += delta
+            entry[1] = datetime.now()
+            self.stats["increments"] += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="forum-counter-flush", daemon=True)
+                self._thread.start()
+            return entry[0]
+    
+    def pending(self, counter: str, key: str) -> int:
+        """Delta not yet written for a counter"""
+        entry = self._pending.get((counter, key))
+        flushing = self._flushing.get((counter, key))
+        return (entry[0] if entry else 0) + (flushing[0] if flushing else 0)
+    
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+    
+    def flush(self) -> int:
+        """Write all pending deltas; returns the number of rows updated"""
+        with self._flush_lock:
+            return self._flush()
+    
+    def _flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+        if not pending:
+            return 0
+        
+        by_counter: Dict[str, list] = {}
+        for (counter, key), (delta, latest_at, _) in pending.items():
+            by_counter.setdefault(counter, []).append((key, delta, latest_at))
+        
+        manager = get_postgres_manager()
+        conn = manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            for counter, rows in by_counter.items():
+                table, key_column, column = COUNTER_COLUMNS[counter]
+                extra = ""
+                if counter == "thread_replies":
+                    # Replies also bump the thread in the "latest activity" ordering
+                    extra = ", last_reply_at = v.at, updated_at = v.at"
+                extras.execute_values(
+                    cursor,
+                    f"""
+                    UPDATE {DB_SCHEMA}.{table} AS t
+                    SET {column} = COALESCE(t.{column}, 0) + v.delta{extra}
+                    FROM (VALUES %s) AS v(key, delta, at)
+                    WHERE t.{key_column} = v.key
+                    """,
+                    rows,
+                    template="(%s, %s, %s::timestamp)"
+                )
+            conn.commit()
+            committed_at = time.monotonic()
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += len(pending)
+        except Exception as e:
+            conn.rollback()
+            self.stats["errors"] += 1
+            logger.error(f"Failed to flush forum counters: {e}")
+            self._requeue(pending)
+            return 0
+        finally:
+            manager.return_connection(conn)
+        
+        try:
+            if self._on_flush is not None:
+                self._on_flush(pending, committed_at)
+        finally:
+            with self._lock:
+                self._flushing = {}
+        return len(pending)
+    
+    def _requeue(self, pending: dict):
+        """Merge deltas that failed to flush back into the pending set"""
+        with self._lock:
+            self._flushing = {}
+            for key, (delta, latest_at, thread_id) in pending.items():
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._pending[key] = [delta, latest_at, thread_id]
+                else:
+                    entry[0] += delta
+    
+    def stop(self):
+        """Stop the background thread and write anything pending"""
+        self._stop.set()
+        self.flush()
+
+
+class HotThreadCache:
+    """
+    LRU cache of thread first pages (header plus first page of posts).
+    
+    Counters are kept apart from the cached page, as the values stored when
+    the page was loaded; flushed counter deltas are added to them (see
+    apply_flushed), so flushes don't evict busy threads. Entries expire after
+    FORUM_THREAD_CACHE_TTL seconds and are invalidated when a post is created
+    in the thread.
+    """
+    
+    def __init__(self, ttl: int = FORUM_THREAD_CACHE_TTL, max_entries: int = FORUM_THREAD_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # thread_id -> (expires_at, page, {(counter, key): stored value}, loaded_at)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], Dict[Tuple[str, str], int], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached page with its stored counter values"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            page, counts = entry[1], dict(entry[2])
+        return {
+            **page,
+            "view_count": counts[("thread_views", key)],
+            "reply_count": counts[("thread_replies", key)],
+            "posts": [
+                {**post, "like_count": counts[("post_likes", post["post_id"])]}
+                for post in page["posts"]
+            ]
+        }
+    
+    def set(self, key: str, value: Dict[str, Any], loaded_at: float):
+        """
+        Cache a page read from the database; loaded_at is the monotonic time
+        taken before the read, so flushes committed after it are applied.
+        """
+        counts = {
+            ("thread_views", key): value["view_count"],
+            ("thread_replies", key): value["reply_count"],
+        }
+        for post in value["posts"]:
+            counts[("post_likes", post["post_id"])] = post["like_count"]
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value, counts, loaded_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def apply_flushed(self, flushed: Dict[Tuple[str, str], list], committed_at: float):
+        """Add counter deltas written by ForumCounterBuffer to cached values"""
+        with self._lock:
+            for (counter, counter_key), (delta, _, thread_id) in flushed.items():
+                entry = self._entries.get(thread_id) if thread_id else None
+                # Pages read after the commit already include the delta
+                if entry is None or entry[3] >= committed_at:
+                    continue
+                counts = entry[2]
+                if (counter, counter_key) in counts:
+                    counts[(counter, counter_key)] += delta
+    
+    def invalidate(self, thread_ids):
+        with self._lock:
+            for thread_id in thread_ids:
+                if self._entries.pop(thread_id, None) is not None:
+                    self.stats["invalidations"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries)}
+
+
 class CollaborationStore:
     """Store class for collaboration and community features"""
     
     def __init__(self):
-        self.conn = None
+        self.thread_cache = HotThreadCache()
+        self.counters = ForumCounterBuffer(on_flush=self.thread_cache.apply_flushed)
     
     def _get_connection(self):
-        """Get database connection, creating if necessary"""
-        if not self.conn or self.conn.closed:
-            self.conn = get_db_connection()
-        return self.conn
+        """
+        Check out a pooled connection for one call. The store is shared by
+        request threads, so connections are never kept on the instance.
+        """
+        return get_postgres_manager().get_connection()
     
-    def _close_connection(self):
-        """Close the database connection"""
-        if self.conn and not self.conn.closed:
-            self.conn.close()
-            self.conn = None
+    def _close_connection(self, conn):
+        """Return a connection from _get_connection to the pool"""
+        if conn is not None:
+            get_postgres_manager().return_connection(conn)
     
     def generate_id(self, prefix: str) -> str:
         """Generate a unique ID with prefix"""
@@ -120,7 +372,7 @@ class CollaborationStore:
             logger.error(f"Error creating connection: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     def respond_to_connection(self, connection_id: str, user_id: int, action: str) -> Dict[str, Any]:
         """Accept or reject a connection request"""
@@ -165,7 +417,7 @@ class CollaborationStore:
             logger.error(f"Error responding to connection: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     def get_user_connections(self, user_id: int, status: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all connections for a user"""
@@ -222,7 +474,7 @@ class CollaborationStore:
             logger.error(f"Error getting user connections: {e}")
             return []
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     def get_connection_requests(self, user_id: int) -> List[Dict[str, Any]]:
         """Get pending connection requests for a user"""
@@ -267,7 +519,7 @@ class CollaborationStore:
             logger.error(f"Error getting connection requests: {e}")
             return []
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     def remove_connection(self, connection_id: str, user_id: int) -> Dict[str, Any]:
         """Soft remove a connection"""
@@ -314,7 +566,7 @@ class CollaborationStore:
             logger.error(f"Error removing connection: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     def search_users(self, user_id: int, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for users to connect with"""
@@ -356,7 +608,7 @@ class CollaborationStore:
             logger.error(f"Error searching users: {e}")
             return []
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     # =========================================================================
     # Forum Methods
@@ -405,7 +657,7 @@ class CollaborationStore:
             logger.error(f"Error getting forums: {e}")
             return []
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     def create_thread(self, forum_id: str, user_id: int, title: str, content: str) -> Dict[str, Any]:
         """Create a new forum thread with initial post"""
@@ -428,6 +680,7 @@ class CollaborationStore:
                 VALUES (%s, %s, %s, %s, %s)
                 RETURNING created_at
             """, (thread_id, forum_id, user_id, title, content))
+            created_at = cursor.fetchone()[0]
             
             # Create initial post
             post_id = self.generate_id("post")
@@ -444,28 +697,42 @@ class CollaborationStore:
                 "thread_id": thread_id,
                 "forum_id": forum_id,
                 "title": title,
-                "created_at": cursor.fetchone()[0].isoformat()
+                "created_at": created_at.isoformat()
             }
         except Exception as e:
             conn.rollback()
             logger.error(f"Error creating thread: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
-    def get_threads(self, forum_id: str, page: int = 1, limit: int = 20) -> Dict[str, Any]:
-        """Get threads for a forum with pagination"""
+    def get_threads(self, forum_id: str, page: int = 1, limit: int = 20,
+                    cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get threads for a forum, pinned first then most recently active.
+        
+        Pages are keyset-based: pass the returned next_cursor as cursor to get
+        the following page. page is still honoured when no cursor is given.
+        The total count is only computed for the first page.
+        """
         conn = self._get_connection()
         try:
-            cursor = conn.cursor()
+            cur = conn.cursor()
             
-            # Get total count
-            cursor.execute(f"SELECT COUNT(*) FROM {DB_SCHEMA}.forum_threads WHERE forum_id = %s", (forum_id,))
-            total_count = cursor.fetchone()[0]
+            total_count = None
+            if not cursor and page <= 1:
+                cur.execute(f"SELECT COUNT(*) FROM {DB_SCHEMA}.forum_threads WHERE forum_id = %s", (forum_id,))
+                total_count = cur.fetchone()[0]
             
-            # Get threads
-            offset = (page - 1) * limit
-            cursor.execute(f"""
+            where = "ft.forum_id = %s"
+            params: List[Any] = [forum_id]
+            if cursor:
+                is_pinned, updated_at, row_id = _decode_cursor(cursor, 3)
+                where += " AND (ft.is_pinned, ft.updated_at, ft.id) < (%s, %s, %s)"
+                params.extend([is_pinned == "1", datetime.fromisoformat(updated_at), int(row_id)])
+            
+            # Fetch one extra row to know whether another page exists
+            query = f"""
                 SELECT 
                     ft.thread_id,
                     ft.title,
@@ -477,22 +744,32 @@ class CollaborationStore:
                     ft.updated_at,
                     u.username,
                     up.first_name,
-                    up.last_name
+                    up.last_name,
+                    ft.id
                 FROM {DB_SCHEMA}.forum_threads ft
                 JOIN {DB_SCHEMA}.users u ON u.id = ft.user_id
                 LEFT JOIN {DB_SCHEMA}.user_profile up ON up.user_id = u.id
-                WHERE ft.forum_id = %s
-                ORDER BY ft.is_pinned DESC, ft.updated_at DESC
-                LIMIT %s OFFSET %s
-            """, (forum_id, limit, offset))
+                WHERE {where}
+                ORDER BY ft.is_pinned DESC, ft.updated_at DESC, ft.id DESC
+                LIMIT %s
+            """
+            params.append(limit + 1)
+            if not cursor and page > 1:
+                query += " OFFSET %s"
+                params.append((page - 1) * limit)
+            cur.execute(query, params)
+            
+            rows = cur.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
             
             threads = []
-            for row in cursor.fetchall():
+            for row in rows:
                 threads.append({
                     "thread_id": row[0],
                     "title": row[1],
-                    "view_count": row[2],
-                    "reply_count": row[3],
+                    "view_count": (row[2] or 0) + self.counters.pending("thread_views", row[0]),
+                    "reply_count": (row[3] or 0) + self.counters.pending("thread_replies", row[0]),
                     "is_pinned": row[4],
                     "is_locked": row[5],
                     "created_at": row[6].isoformat() if row[6] else None,
@@ -504,6 +781,11 @@ class CollaborationStore:
                     }
                 })
             
+            next_cursor = None
+            if has_more and rows:
+                last = rows[-1]
+                next_cursor = _encode_cursor(bool(last[4]), last[7], last[11])
+            
             return {
                 "success": True,
                 "threads": threads,
@@ -511,23 +793,47 @@ class CollaborationStore:
                     "page": page,
                     "limit": limit,
                     "total_count": total_count,
-                    "total_pages": (total_count + limit - 1) // limit
+                    "total_pages": (total_count + limit - 1) // limit if total_count is not None else None,
+                    "has_more": has_more,
+                    "next_cursor": next_cursor
                 }
             }
         except Exception as e:
             logger.error(f"Error getting threads: {e}")
             return {"success": False, "error": str(e), "threads": [], "pagination": {}}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
-    def get_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
-        """Get a single thread with all posts"""
+    def get_thread(self, thread_id: str, cursor: Optional[str] = None,
+                   limit: int = FORUM_POSTS_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """
+        Get a single thread with a page of its posts, oldest first.
+        
+        The first page of busy threads is served from the hot-thread cache;
+        pass the returned next_cursor as cursor to load more posts.
+        """
+        first_page = cursor is None and limit == FORUM_POSTS_PAGE_SIZE
+        thread = self.thread_cache.get(thread_id) if first_page else None
+        
+        if thread is None:
+            loaded_at = time.monotonic()
+            thread = self._load_thread(thread_id, cursor, limit)
+            if thread is None:
+                return None
+            if first_page:
+                self.thread_cache.set(thread_id, thread, loaded_at)
+        
+        self.counters.increment("thread_views", thread_id, thread_id)
+        return self._with_pending_counts(thread)
+    
+    def _load_thread(self, thread_id: str, cursor: Optional[str], limit: int) -> Optional[Dict[str, Any]]:
+        """Read a thread header and one page of posts from the database"""
         conn = self._get_connection()
         try:
-            cursor = conn.cursor()
+            cur = conn.cursor()
             
             # Get thread
-            cursor.execute(f"""
+            cur.execute(f"""
                 SELECT 
                     ft.thread_id,
                     ft.title,
@@ -541,7 +847,8 @@ class CollaborationStore:
                     u.username,
                     up.first_name,
                     up.last_name,
-                    f.name as forum_name
+                    f.name as forum_name,
+                    ft.reply_count
                 FROM {DB_SCHEMA}.forum_threads ft
                 JOIN {DB_SCHEMA}.users u ON u.id = ft.user_id
                 LEFT JOIN {DB_SCHEMA}.user_profile up ON up.user_id = u.id
@@ -549,19 +856,20 @@ class CollaborationStore:
                 WHERE ft.thread_id = %s
             """, (thread_id,))
             
-            thread = cursor.fetchone()
+            thread = cur.fetchone()
             if not thread:
                 return None
             
-            # Increment view count
-            cursor.execute(f"""
-                UPDATE {DB_SCHEMA}.forum_threads
-                SET view_count = view_count + 1
-                WHERE thread_id = %s
-            """, (thread_id,))
-            
             # Get posts
-            cursor.execute(f"""
+            where = "fp.thread_id = %s"
+            params: List[Any] = [thread_id]
+            if cursor:
+                created_at, row_id = _decode_cursor(cursor, 2)
+                where += " AND (fp.created_at, fp.id) > (%s, %s)"
+                params.extend([datetime.fromisoformat(created_at), int(row_id)])
+            params.append(limit + 1)
+            
+            cur.execute(f"""
                 SELECT 
                     fp.post_id,
                     fp.content,
@@ -572,20 +880,26 @@ class CollaborationStore:
                     u.username,
                     up.first_name,
                     up.last_name,
-                    up.avatar_url
+                    up.avatar_url,
+                    fp.id
                 FROM {DB_SCHEMA}.forum_posts fp
                 JOIN {DB_SCHEMA}.users u ON u.id = fp.user_id
                 LEFT JOIN {DB_SCHEMA}.user_profile up ON up.user_id = u.id
-                WHERE fp.thread_id = %s
-                ORDER BY fp.created_at ASC
-            """, (thread_id,))
+                WHERE {where}
+                ORDER BY fp.created_at ASC, fp.id ASC
+                LIMIT %s
+            """, params)
+            
+            rows = cur.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
             
             posts = []
-            for row in cursor.fetchall():
+            for row in rows:
                 posts.append({
                     "post_id": row[0],
                     "content": row[1],
-                    "like_count": row[2],
+                    "like_count": row[2] or 0,
                     "is_accepted_answer": row[3],
                     "created_at": row[4].isoformat() if row[4] else None,
                     "updated_at": row[5].isoformat() if row[5] else None,
@@ -597,14 +911,13 @@ class CollaborationStore:
                     }
                 })
             
-            conn.commit()
-            
             return {
                 "thread_id": thread[0],
                 "title": thread[1],
                 "content": thread[2],
                 "forum_id": thread[3],
-                "view_count": thread[4] + 1,
+                "view_count": thread[4] or 0,
+                "reply_count": thread[13] or 0,
                 "is_pinned": thread[5],
                 "is_locked": thread[6],
                 "created_at": thread[7].isoformat() if thread[7] else None,
@@ -615,13 +928,28 @@ class CollaborationStore:
                     "last_name": thread[11]
                 },
                 "forum_name": thread[12],
-                "posts": posts
+                "posts": posts,
+                "has_more": has_more,
+                "next_cursor": _encode_cursor(rows[-1][4], rows[-1][10]) if has_more and rows else None
             }
         except Exception as e:
             logger.error(f"Error getting thread: {e}")
             return None
         finally:
-            self._close_connection()
+            self._close_connection(conn)
+    
+    def _with_pending_counts(self, thread: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a thread with counter increments not yet flushed added in"""
+        thread_id = thread["thread_id"]
+        return {
+            **thread,
+            "view_count": thread["view_count"] + self.counters.pending("thread_views", thread_id),
+            "reply_count": thread["reply_count"] + self.counters.pending("thread_replies", thread_id),
+            "posts": [
+                {**post, "like_count": post["like_count"] + self.counters.pending("post_likes", post["post_id"])}
+                for post in thread["posts"]
+            ]
+        }
     
     def create_post(self, thread_id: str, user_id: int, content: str, parent_post_id: Optional[str] = None) -> Dict[str, Any]:
         """Create a reply post in a thread"""
@@ -645,30 +973,26 @@ class CollaborationStore:
                 VALUES (%s, %s, %s, %s, %s)
                 RETURNING created_at
             """, (post_id, thread_id, user_id, parent_post_id, content))
-            
-            # Update thread reply count and last reply time
-            cursor.execute(f"""
-                UPDATE {DB_SCHEMA}.forum_threads
-                SET reply_count = reply_count + 1,
-                    last_reply_at = CURRENT_TIMESTAMP,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE thread_id = %s
-            """, (thread_id,))
+            created_at = cursor.fetchone()[0]
             
             conn.commit()
             
+            # Reply count and last reply time are written in the next counter flush
+            self.counters.increment("thread_replies", thread_id, thread_id)
+            self.thread_cache.invalidate([thread_id])
+            
             return {
                 "success": True,
                 "post_id": post_id,
                 "thread_id": thread_id,
-                "created_at": cursor.fetchone()[0].isoformat()
+                "created_at": created_at.isoformat()
             }
         except Exception as e:
             conn.rollback()
             logger.error(f"Error creating post: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     def like_post(self, post_id: str, user_id: int) -> Dict[str, Any]:
         """Toggle like on a forum post"""
@@ -679,24 +1003,21 @@ class CollaborationStore:
             # Check if user already liked
             # For simplicity, we'll just increment/decrement
             cursor.execute(f"""
-                UPDATE {DB_SCHEMA}.forum_posts
-                SET like_count = like_count + 1
+                SELECT like_count, thread_id FROM {DB_SCHEMA}.forum_posts
                 WHERE post_id = %s
-                RETURNING like_count
             """, (post_id,))
             
             result = cursor.fetchone()
-            if result:
-                conn.commit()
-                return {"success": True, "like_count": result[0]}
-            else:
+            if not result:
                 return {"success": False, "error": "Post not found"}
+            
+            pending = self.counters.increment("post_likes", post_id, result[1])
+            return {"success": True, "like_count": (result[0] or 0) + pending}
         except Exception as e:
-            conn.rollback()
             logger.error(f"Error liking post: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     # =========================================================================
     # Content Comment Methods
@@ -717,6 +1038,7 @@ class CollaborationStore:
                 VALUES (%s, %s, %s, %s, %s, %s)
                 RETURNING created_at
             """, (comment_id, user_id, content_id, content_type, parent_comment_id, content))
+            created_at = cursor.fetchone()[0]
             
             conn.commit()
             
@@ -725,31 +1047,44 @@ class CollaborationStore:
                 "comment_id": comment_id,
                 "content_id": content_id,
                 "content_type": content_type,
-                "created_at": cursor.fetchone()[0].isoformat()
+                "created_at": created_at.isoformat()
             }
         except Exception as e:
             conn.rollback()
             logger.error(f"Error adding comment: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
-    def get_content_comments(self, content_id: str, content_type: str, page: int = 1, limit: int = 50) -> Dict[str, Any]:
-        """Get comments for content"""
+    def get_content_comments(self, content_id: str, content_type: str, page: int = 1, limit: int = 50,
+                             cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get comments for content, newest first.
+        
+        Pages are keyset-based: pass the returned next_cursor as cursor to get
+        the following page. page is still honoured when no cursor is given.
+        """
         conn = self._get_connection()
         try:
-            cursor = conn.cursor()
-            
-            # Get total count
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM {DB_SCHEMA}.content_comments
-                WHERE content_id = %s AND content_type = %s
-            """, (content_id, content_type))
-            total_count = cursor.fetchone()[0]
+            cur = conn.cursor()
+            
+            # Total count is only needed for the first page
+            total_count = None
+            if not cursor and page <= 1:
+                cur.execute(f"""
+                    SELECT COUNT(*) FROM {DB_SCHEMA}.content_comments
+                    WHERE content_id = %s AND content_type = %s
+                """, (content_id, content_type))
+                total_count = cur.fetchone()[0]
+            
+            where = "cc.content_id = %s AND cc.content_type = %s"
+            params: List[Any] = [content_id, content_type]
+            if cursor:
+                created_at, row_id = _decode_cursor(cursor, 2)
+                where += " AND (cc.created_at, cc.id) < (%s, %s)"
+                params.extend([datetime.fromisoformat(created_at), int(row_id)])
             
-            # Get comments
-            offset = (page - 1) * limit
-            cursor.execute(f"""
+            query = f"""
                 SELECT 
                     cc.comment_id,
                     cc.content,
@@ -760,21 +1095,31 @@ class CollaborationStore:
                     u.username,
                     up.first_name,
                     up.last_name,
-                    up.avatar_url
+                    up.avatar_url,
+                    cc.id
                 FROM {DB_SCHEMA}.content_comments cc
                 JOIN {DB_SCHEMA}.users u ON u.id = cc.user_id
                 LEFT JOIN {DB_SCHEMA}.user_profile up ON up.user_id = u.id
-                WHERE cc.content_id = %s AND cc.content_type = %s
-                ORDER BY cc.created_at DESC
-                LIMIT %s OFFSET %s
-            """, (content_id, content_type, limit, offset))
+                WHERE {where}
+                ORDER BY cc.created_at DESC, cc.id DESC
+                LIMIT %s
+            """
+            params.append(limit + 1)
+            if not cursor and page > 1:
+                query += " OFFSET %s"
+                params.append((page - 1) * limit)
+            cur.execute(query, params)
+            
+            rows = cur.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
             
             comments = []
-            for row in cursor.fetchall():
+            for row in rows:
                 comments.append({
                     "comment_id": row[0],
                     "content": row[1],
-                    "like_count": row[2],
+                    "like_count": (row[2] or 0) + self.counters.pending("comment_likes", row[0]),
                     "parent_comment_id": row[3],
                     "created_at": row[4].isoformat() if row[4] else None,
                     "updated_at": row[5].isoformat() if row[5] else None,
@@ -792,14 +1137,16 @@ class CollaborationStore:
                 "pagination": {
                     "page": page,
                     "limit": limit,
-                    "total_count": total_count
+                    "total_count": total_count,
+                    "has_more": has_more,
+                    "next_cursor": _encode_cursor(rows[-1][4], rows[-1][10]) if has_more and rows else None
                 }
             }
         except Exception as e:
             logger.error(f"Error getting content comments: {e}")
             return {"success": False, "error": str(e), "comments": [], "pagination": {}}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     def like_comment(self, comment_id: str) -> Dict[str, Any]:
         """Toggle like on a comment"""
@@ -808,24 +1155,21 @@ class CollaborationStore:
             cursor = conn.cursor()
             
             cursor.execute(f"""
-                UPDATE {DB_SCHEMA}.content_comments
-                SET like_count = like_count + 1
+                SELECT like_count FROM {DB_SCHEMA}.content_comments
                 WHERE comment_id = %s
-                RETURNING like_count
             """, (comment_id,))
             
             result = cursor.fetchone()
-            if result:
-                conn.commit()
-                return {"success": True, "like_count": result[0]}
-            else:
+            if not result:
                 return {"success": False, "error": "Comment not found"}
+            
+            pending = self.counters.increment("comment_likes", comment_id)
+            return {"success": True, "like_count": (result[0] or 0) + pending}
         except Exception as e:
-            conn.rollback()
             logger.error(f"Error liking comment: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            self._close_connection()
+            self._close_connection(conn)
     
     # =========================================================================
     # Activity Logging
@@ -852,11 +1196,12 @@ class CollaborationStore:
             logger.error(f"Error logging activity: {e}")
             return False
         finally:
-            self._close_connection()
+            self._close_connection(conn)
 
 
 # Module-level instance for easy access
 collaboration_store = CollaborationStore()
+atexit.register(collaboration_store.counters.stop)
 
 
 if __name__ == "__main__":
@@ -865,4 +1210,6 @@ if __name__ == "__main__":
     
     print("Testing Collaboration Store...")
     print(f"Database: {DB_SCHEMA}")
-    print("Connection test:", "Success" if store._get_connection() else "Failed")
+    conn = store._get_connection()
+    print("Connection test:", "Success" if conn else "Failed")
+    store._close_connection(conn)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Compile Cache - Content-addressed cache for compiled Jac artifacts
+
+Stores compiled IR text and bytecode (.jir) artifacts keyed by a hash of the
+source, the artifact kind, any extra compile options and the installed
+jaclang version, so that repeated runs of lesson examples and test harnesses
+skip the compile phase.
+
+Features:
+- In-memory LRU tier in front of an on-disk tier
+- Atomic disk writes (write to temp file, then rename)
+- Disk usage bounded by JAC_COMPILE_CACHE_MAX_BYTES with LRU eviction
+- Automatic invalidation when the jaclang version changes
+- The cache directory is private (0700) to the server user, since cached
+  artifacts are executed; a directory owned by anyone else is not used
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+
+from logger_config import logger as app_logger
+
+JAC_COMPILE_CACHE_DIR = os.getenv(
+    "JAC_COMPILE_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), f"jeseci_jac_compile_cache_{os.getuid()}")
+)
+JAC_COMPILE_CACHE_MAX_BYTES = int(os.getenv("JAC_COMPILE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+JAC_COMPILE_CACHE_MEMORY_ENTRIES = int(os.getenv("JAC_COMPILE_CACHE_MEMORY_ENTRIES", "256"))
+
+_jaclang_version: Optional[str] = None
+
+
+def get_jaclang_version() -> str:
+    """Get the installed jaclang version (resolved once per process)"""
+    global _jaclang_version
+    if _jaclang_version is None:
+        try:
+            from importlib.metadata import version
+            _jaclang_version = version("jaclang")
+        except Exception:
+            try:
+                result = subprocess.run(['jac', '--version'], capture_output=True, text=True, timeout=5)
+                _jaclang_version = result.stdout.strip() or "unknown"
+            except Exception:
+                _jaclang_version = "unknown"
+    return _jaclang_version
+
+
+class CompileCache:
+    """
+    Two-tier (memory + disk) content-addressed artifact cache.
+
+    Disk entries live at <cache_dir>/<key[:2]>/<key>; reading an entry
+    refreshes its mtime so eviction removes the least recently used first.
+    """
+
+    def __init__(self, cache_dir: str = JAC_COMPILE_CACHE_DIR,
+                 max_bytes: int = JAC_COMPILE_CACHE_MAX_BYTES,
+                 memory_entries: int = JAC_COMPILE_CACHE_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._disk_enabled = self._prepare_cache_dir()
+
+    def _prepare_cache_dir(self) -> bool:
+        """Create the cache directory as 0700, or refuse one others can write to"""
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            st = os.lstat(self.cache_dir)
+            if st.st_uid != os.getuid():
+                app_logger.warning(f"Compile cache directory {self.cache_dir} is owned by another user; "
+                                   f"using the memory tier only")
+                return False
+            if st.st_mode & 0o077:
+                os.chmod(self.cache_dir, 0o700)
+            return True
+        except OSError as e:
+            app_logger.warning(f"Compile cache directory unavailable, using the memory tier only: {e}")
+            return False
+
+    def make_key(self, source: str, kind: str, **options: Any) -> str:
+        """Build the cache key for a source/artifact combination"""
+        digest = hashlib.sha256()
+        digest.update(get_jaclang_version().encode("utf-8"))
+        digest.update(b"\0" + kind.encode("utf-8"))
+        for name in sorted(options):
+            digest.update(f"\0{name}={options[name]}".encode("utf-8"))
+        digest.update(b"\0" + source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get an artifact by key"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return data
+
+        if not self._disk_enabled:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path, None)
+        except OSError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store an artifact atomically"""
+        if not self._disk_enabled:
+            with self._lock:
+                self._remember(key, data)
+                self._stats["writes"] += 1
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            app_logger.warning(f"Could not write compile cache entry: {e}")
+            return
+
+        with self._lock:
+            self._remember(key, data)
+            self._stats["writes"] += 1
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+        self._enforce_disk_limit()
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """Add to the memory tier; caller must hold the lock"""
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _scan_disk(self) -> list:
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.startswith(".tmp_"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _enforce_disk_limit(self) -> None:
+        """Evict least recently used disk entries until under the size limit"""
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+        if self._disk_bytes <= self.max_bytes:
+            return
+
+        entries = sorted(self._scan_disk())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                with self._lock:
+                    self._memory.pop(os.path.basename(path), None)
+                    self._stats["evictions"] += 1
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def clear(self) -> None:
+        """Remove every cached artifact"""
+        with self._lock:
+            self._memory.clear()
+        if not self._disk_enabled:
+            return
+        for _, _, path in self._scan_disk():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        stats["disk_bytes"] = self._disk_bytes
+        stats["jaclang_version"] = get_jaclang_version()
+        return stats
+
+
+_compile_cache: Optional[CompileCache] = None
+
+
+def get_compile_cache() -> CompileCache:
+    """Get the compile cache singleton"""
+    global _compile_cache
+    if _compile_cache is None:
+        _compile_cache = CompileCache()
+    return _compile_cache
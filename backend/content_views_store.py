@@ -47,8 +47,8 @@ class ContentViewsStore:
 
     def __init__(self):
         self._lock = threading.RLock()
+        # Connected on first use by _get_connection
         self._connection = None
-        self._init_connection()
 
     def _init_connection(self):
         """Initialize database connection"""
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Conversation Memory Store
+Per-user, per-session chat memory for the AI tutor and AI code assistant
+
+This module provides:
+- Ring-buffer storage of recent turns for each (user, session) conversation
+- Token-budget-aware context building so prompts stay constant-size
+- Extractive summarization of turns that fall out of the ring buffer
+- In-memory storage with idle eviction, or an optional Redis backend
+
+Author: Jeseci Development Team
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+# Import centralized logging configuration
+from logger_config import logger
+
+# Redis is optional; the in-memory backend is used when it is unavailable
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+
+# Memory configuration from environment
+CHAT_MEMORY_BACKEND = os.getenv("CHAT_MEMORY_BACKEND", "memory").lower()
+CHAT_MEMORY_MAX_TURNS = int(os.getenv("CHAT_MEMORY_MAX_TURNS", "20"))
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "1500"))
+CHAT_MEMORY_SUMMARY_TOKENS = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", "300"))
+CHAT_MEMORY_IDLE_TTL_SECONDS = int(os.getenv("CHAT_MEMORY_IDLE_TTL_SECONDS", "3600"))
+CHAT_MEMORY_MAX_CONVERSATIONS = int(os.getenv("CHAT_MEMORY_MAX_CONVERSATIONS", "10000"))
+CHAT_MEMORY_KEY_PREFIX = "jeseci:chat"
+
+DEFAULT_SESSION_ID = "default"
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class ConversationTurn:
+    """A single chat message"""
+    role: str  # 'user' or 'assistant'
+    content: str
+    timestamp: str = field(default_factory=lambda: datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.content)
+
+    def to_message(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+
+def summarize_turns(previous_summary: str, turns: List[ConversationTurn], max_tokens: int) -> str:
+    """
+    Fold evicted turns into the running summary.
+
+    The summary keeps the first sentence of each evicted turn, newest last,
+    and drops the oldest lines once it exceeds its token budget.
+    """
+    lines = [line for line in previous_summary.split("\n") if line]
+    for turn in turns:
+        first_sentence = _SENTENCE_PATTERN.split(turn.content.strip(), maxsplit=1)[0]
+        if len(first_sentence) > 200:
+            first_sentence = first_sentence[:197] + "..."
+        speaker = "Student" if turn.role == "user" else "Tutor"
+        lines.append(f"{speaker}: {first_sentence}")
+
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class InMemoryConversationBackend:
+    """Process-local storage with a ring buffer per conversation and idle eviction"""
+
+    def __init__(
+        self,
+        max_turns: int = CHAT_MEMORY_MAX_TURNS,
+        summary_tokens: int = CHAT_MEMORY_SUMMARY_TOKENS,
+        idle_ttl_seconds: int = CHAT_MEMORY_IDLE_TTL_SECONDS,
+        max_conversations: int = CHAT_MEMORY_MAX_CONVERSATIONS
+    ):
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_conversations = max_conversations
+        # key -> {"turns": deque, "summary": str, "last_active": float}
+        self._conversations: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def append(self, key: str, turn: ConversationTurn) -> None:
+        with self._lock:
+            conversation = self._conversations.get(key)
+            if conversation is None:
+                conversation = {"turns": deque(maxlen=self.max_turns), "summary": ""}
+                self._conversations[key] = conversation
+
+            turns: Deque[ConversationTurn] = conversation["turns"]
+            if len(turns) == turns.maxlen:
+                conversation["summary"] = summarize_turns(
+                    conversation["summary"], [turns[0]], self.summary_tokens
+                )
+            turns.append(turn)
+            conversation["last_active"] = time.time()
+            self._conversations.move_to_end(key)
+
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+        self._maybe_evict_idle()
+
+    def load(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            conversation = self._conversations.get(key)
+            if conversation is None:
+                return {"turns": [], "summary": ""}
+            conversation["last_active"] = time.time()
+            self._conversations.move_to_end(key)
+            return {"turns": list(conversation["turns"]), "summary": conversation["summary"]}
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conversations.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [k for k in self._conversations if k.startswith(prefix)]
+            for k in keys:
+                del self._conversations[k]
+        return len(keys)
+
+    def evict_idle(self) -> int:
+        """Remove conversations idle for longer than the TTL"""
+        cutoff = time.time() - self.idle_ttl_seconds
+        with self._lock:
+            # Conversations are kept in least-recently-used order
+            expired = []
+            for key, conversation in self._conversations.items():
+                if conversation.get("last_active", 0) >= cutoff:
+                    break
+                expired.append(key)
+            for key in expired:
+                del self._conversations[key]
+            self._last_sweep = time.time()
+        if expired:
+            logger.info(f"Evicted {len(expired)} idle chat conversation(s)")
+        return len(expired)
+
+    def _maybe_evict_idle(self) -> None:
+        if time.time() - self._last_sweep >= min(60, self.idle_ttl_seconds):
+            self.evict_idle()
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._conversations)
+
+
+class RedisConversationBackend:
+    """Redis storage shared across workers; Redis key expiry handles idle eviction"""
+
+    def __init__(
+        self,
+        client: Any = None,
+        max_turns: int = CHAT_MEMORY_MAX_TURNS,
+        summary_tokens: int = CHAT_MEMORY_SUMMARY_TOKENS,
+        idle_ttl_seconds: int = CHAT_MEMORY_IDLE_TTL_SECONDS
+    ):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed")
+            client = redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                db=int(os.getenv("REDIS_DB", 1)),
+                password=os.getenv("REDIS_PASSWORD") or None,
+                decode_responses=True
+            )
+        self.client = client
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+    def _turns_key(self, key: str) -> str:
+        return f"{CHAT_MEMORY_KEY_PREFIX}:{key}:turns"
+
+    def _summary_key(self, key: str) -> str:
+        return f"{CHAT_MEMORY_KEY_PREFIX}:{key}:summary"
+
+    def append(self, key: str, turn: ConversationTurn) -> None:
+        turns_key, summary_key = self._turns_key(key), self._summary_key(key)
+        length = self.client.rpush(turns_key, json.dumps(asdict(turn)))
+
+        overflow = length - self.max_turns
+        if overflow > 0:
+            pipe = self.client.pipeline()
+            pipe.lrange(turns_key, 0, overflow - 1)
+            pipe.ltrim(turns_key, overflow, -1)
+            pipe.get(summary_key)
+            evicted_raw, _, summary = pipe.execute()
+            evicted = [ConversationTurn(**json.loads(raw)) for raw in evicted_raw]
+            self.client.set(summary_key, summarize_turns(summary or "", evicted, self.summary_tokens))
+
+        pipe = self.client.pipeline()
+        pipe.expire(turns_key, self.idle_ttl_seconds)
+        pipe.expire(summary_key, self.idle_ttl_seconds)
+        pipe.execute()
+
+    def load(self, key: str) -> Dict[str, Any]:
+        pipe = self.client.pipeline()
+        pipe.lrange(self._turns_key(key), 0, -1)
+        pipe.get(self._summary_key(key))
+        pipe.expire(self._turns_key(key), self.idle_ttl_seconds)
+        pipe.expire(self._summary_key(key), self.idle_ttl_seconds)
+        turns_raw, summary, _, _ = pipe.execute()
+        return {
+            "turns": [ConversationTurn(**json.loads(raw)) for raw in turns_raw],
+            "summary": summary or ""
+        }
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._turns_key(key), self._summary_key(key))
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = list(self.client.scan_iter(match=f"{CHAT_MEMORY_KEY_PREFIX}:{prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+        return len(keys)
+
+    def evict_idle(self) -> int:
+        # Keys expire on their own after the idle TTL
+        return 0
+
+    def count(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{CHAT_MEMORY_KEY_PREFIX}:*:turns"))
+
+
+class ConversationMemory:
+    """
+    Conversation memory keyed by user and session.
+
+    Anonymous requests (no user_id) are not remembered, so one student's
+    conversation can never leak into another's prompt.
+    """
+
+    def __init__(self, backend: Any = None, token_budget: int = CHAT_MEMORY_TOKEN_BUDGET):
+        self.backend = backend or InMemoryConversationBackend()
+        self.token_budget = token_budget
+
+    @staticmethod
+    def _key(namespace: str, user_id: str, session_id: Optional[str]) -> str:
+        return f"{namespace}:{user_id}:{session_id or DEFAULT_SESSION_ID}"
+
+    def add_exchange(
+        self,
+        namespace: str,
+        user_id: Optional[str],
+        session_id: Optional[str],
+        user_message: str,
+        assistant_message: str
+    ) -> None:
+        """Record a user message and the assistant's reply"""
+        if not user_id:
+            return
+        key = self._key(namespace, user_id, session_id)
+        try:
+            self.backend.append(key, ConversationTurn(role="user", content=user_message))
+            self.backend.append(key, ConversationTurn(role="assistant", content=assistant_message))
+        except Exception as e:
+            logger.error(f"Error recording chat memory: {e}")
+
+    def get_context_messages(
+        self,
+        namespace: str,
+        user_id: Optional[str],
+        session_id: Optional[str],
+        token_budget: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Build prompt messages for a conversation within a token budget.
+
+        Returns the running summary (as a system message) followed by as many
+        of the most recent turns as fit in the budget, oldest first.
+        """
+        if not user_id:
+            return []
+        try:
+            conversation = self.backend.load(self._key(namespace, user_id, session_id))
+        except Exception as e:
+            logger.error(f"Error loading chat memory: {e}")
+            return []
+
+        budget = token_budget if token_budget is not None else self.token_budget
+        messages: List[Dict[str, str]] = []
+        summary = conversation["summary"]
+        if summary:
+            summary_message = {"role": "system", "content": f"Summary of earlier conversation:\n{summary}"}
+            budget -= estimate_tokens(summary_message["content"])
+
+        for turn in reversed(conversation["turns"]):
+            budget -= turn.tokens
+            if budget < 0:
+                break
+            messages.append(turn.to_message())
+        messages.reverse()
+
+        # Never open the window with a reply whose question was cut off
+        if messages and messages[0]["role"] == "assistant":
+            messages.pop(0)
+
+        if summary:
+            messages.insert(0, summary_message)
+        return messages
+
+    def get_history(self, namespace: str, user_id: Optional[str], session_id: Optional[str]) -> List[Dict[str, str]]:
+        """Get the stored turns of a conversation with timestamps"""
+        if not user_id:
+            return []
+        conversation = self.backend.load(self._key(namespace, user_id, session_id))
+        return [asdict(turn) for turn in conversation["turns"]]
+
+    def clear(self, namespace: str, user_id: Optional[str], session_id: Optional[str] = None) -> int:
+        """
+        Clear one session, or every session of a user when session_id is None.
+
+        Returns:
+            Number of conversations removed
+        """
+        if not user_id:
+            return 0
+        if session_id:
+            self.backend.delete(self._key(namespace, user_id, session_id))
+            return 1
+        return self.backend.delete_prefix(f"{namespace}:{user_id}:")
+
+    def evict_idle(self) -> int:
+        """Remove idle conversations (no-op for Redis, which expires keys itself)"""
+        return self.backend.evict_idle()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory store statistics"""
+        return {
+            "backend": type(self.backend).__name__,
+            "conversations": self.backend.count(),
+            "token_budget": self.token_budget
+        }
+
+
+def _create_backend() -> Any:
+    """Create the configured storage backend, falling back to in-memory"""
+    if CHAT_MEMORY_BACKEND == "redis":
+        try:
+            backend = RedisConversationBackend()
+            backend.client.ping()
+            logger.info("Chat memory using Redis backend")
+            return backend
+        except Exception as e:
+            logger.warning(f"Redis chat memory unavailable, using in-memory backend: {e}")
+    return InMemoryConversationBackend()
+
+
+# Global instance shared by the AI tutor and the AI code assistant
+conversation_memory = ConversationMemory(_create_backend())
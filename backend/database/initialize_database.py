@@ -823,7 +823,44 @@ def create_ai_tables(cursor):
     )
     """)
     
-    logger.info("✓ AI tables created: ai_agents, ai_generated_content, ai_usage_stats")
+    # Stored output of the batch risk scoring in ai_predictive
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {DB_SCHEMA}.risk_predictions (
+        user_id VARCHAR(64) PRIMARY KEY,
+        risk_score REAL NOT NULL,
+        risk_level VARCHAR(20) NOT NULL,
+        confidence REAL,
+        contributing_factors JSONB DEFAULT '[]'::jsonb,
+        recommendations JSONB DEFAULT '[]'::jsonb,
+        model_version VARCHAR(20),
+        generated_at TIMESTAMP NOT NULL
+    )
+    """)
+    
+    cursor.execute(f"""
+    CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_risk_predictions_level
+    ON {DB_SCHEMA}.risk_predictions(risk_level, risk_score DESC)
+    """)
+    
+    # One row per batch refresh, used for risk trends
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {DB_SCHEMA}.risk_scoring_runs (
+        id SERIAL PRIMARY KEY,
+        generated_at TIMESTAMP NOT NULL,
+        users_scored INTEGER DEFAULT 0,
+        average_risk_score REAL,
+        risk_distribution JSONB DEFAULT '{{}}'::jsonb,
+        model_version VARCHAR(20),
+        duration_ms INTEGER
+    )
+    """)
+    
+    cursor.execute(f"""
+    CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_risk_scoring_runs_generated
+    ON {DB_SCHEMA}.risk_scoring_runs(generated_at DESC)
+    """)
+    
+    logger.info("✓ AI tables created: ai_agents, ai_generated_content, ai_usage_stats, risk_predictions, risk_scoring_runs")
 
 
 def create_content_views_table(cursor):
@@ -984,7 +1021,7 @@ def create_sync_engine_tables(cursor):
             entity_id VARCHAR(100) NOT NULL,
             entity_type VARCHAR(50) NOT NULL,
             payload JSONB NOT NULL DEFAULT '{{}}',
-            source_version INTEGER NOT NULL DEFAULT 0,
+            source_version BIGINT NOT NULL DEFAULT 0,
             status sync_event_status_enum NOT NULL DEFAULT 'PENDING',
             retry_count INTEGER NOT NULL DEFAULT 0,
             max_retries INTEGER NOT NULL DEFAULT 3,
@@ -1006,9 +1043,9 @@ def create_sync_engine_tables(cursor):
             entity_type VARCHAR(50) NOT NULL,
             is_synced BOOLEAN NOT NULL DEFAULT FALSE,
             last_synced_at TIMESTAMP,
-            last_synced_version INTEGER,
-            source_version INTEGER NOT NULL DEFAULT 0,
-            neo4j_version INTEGER,
+            last_synced_version BIGINT,
+            source_version BIGINT NOT NULL DEFAULT 0,
+            neo4j_version BIGINT,
             neo4j_checksum VARCHAR(256),
             has_pending_changes BOOLEAN NOT NULL DEFAULT FALSE,
             has_conflict BOOLEAN NOT NULL DEFAULT FALSE,
@@ -1027,8 +1064,8 @@ def create_sync_engine_tables(cursor):
             entity_id VARCHAR(100) NOT NULL,
             entity_type VARCHAR(50) NOT NULL,
             conflict_type VARCHAR(50) NOT NULL,
-            source_version INTEGER NOT NULL,
-            target_version INTEGER,
+            source_version BIGINT NOT NULL,
+            target_version BIGINT,
             source_data JSONB NOT NULL,
             target_data JSONB,
             difference_summary TEXT,
@@ -1042,6 +1079,23 @@ def create_sync_engine_tables(cursor):
         )
     """)
 
+    # Widen version columns created before HLC versions (no-op when already BIGINT)
+    cursor.execute(f"""
+        ALTER TABLE {DB_SCHEMA}.sync_event_log
+            ALTER COLUMN source_version TYPE BIGINT
+    """)
+    cursor.execute(f"""
+        ALTER TABLE {DB_SCHEMA}.sync_status
+            ALTER COLUMN last_synced_version TYPE BIGINT,
+            ALTER COLUMN source_version TYPE BIGINT,
+            ALTER COLUMN neo4j_version TYPE BIGINT
+    """)
+    cursor.execute(f"""
+        ALTER TABLE {DB_SCHEMA}.sync_conflicts
+            ALTER COLUMN source_version TYPE BIGINT,
+            ALTER COLUMN target_version TYPE BIGINT
+    """)
+
     # Create reconciliation_runs table
     cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS {DB_SCHEMA}.reconciliation_runs (
@@ -1109,6 +1163,7 @@ def create_sync_engine_indexes(cursor):
         f"CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_sync_event_log_status ON {DB_SCHEMA}.sync_event_log(status)",
         f"CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_sync_event_log_retry ON {DB_SCHEMA}.sync_event_log(status, retry_count) WHERE status IN ('PENDING', 'PUBLISHED', 'FAILED')",
         f"CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_sync_event_log_created ON {DB_SCHEMA}.sync_event_log(created_at DESC)",
+        f"CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_sync_event_log_outbox ON {DB_SCHEMA}.sync_event_log(id) WHERE status IN ('PENDING', 'PUBLISHED')",
 
         # Sync status indexes
         f"CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_sync_status_entity ON {DB_SCHEMA}.sync_status(entity_id, entity_type)",
@@ -1204,7 +1259,30 @@ def create_notification_tables(cursor):
         ON {DB_SCHEMA}.notifications(type)
     """)
     
-    logger.info("✓ Notification tables created: notifications, notification_preferences")
+    # Per-period send markers for the nightly batch jobs
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_SCHEMA}.notification_batch_sends (
+            job VARCHAR(50) NOT NULL,
+            period_key VARCHAR(32) NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES {DB_SCHEMA}.users(id) ON DELETE CASCADE,
+            sent_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            email_sent BOOLEAN,
+            PRIMARY KEY (job, period_key, user_id)
+        )
+    """)
+    
+    # NULL while the email is being sent, FALSE once it failed (retried by the next run)
+    cursor.execute(f"""
+        ALTER TABLE {DB_SCHEMA}.notification_batch_sends
+        ADD COLUMN IF NOT EXISTS email_sent BOOLEAN
+    """)
+    
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_notification_batch_sends_sent_at 
+        ON {DB_SCHEMA}.notification_batch_sends(sent_at)
+    """)
+    
+    logger.info("✓ Notification tables created: notifications, notification_preferences, notification_batch_sends")
 
 
 def create_testimonials_table(cursor):
@@ -1491,14 +1569,14 @@ def create_collaboration_tables(cursor):
             user_id INTEGER NOT NULL REFERENCES {DB_SCHEMA}.users(id) ON DELETE CASCADE,
             title VARCHAR(255) NOT NULL,
             content TEXT NOT NULL,
-            is_pinned BOOLEAN DEFAULT FALSE,
+            is_pinned BOOLEAN NOT NULL DEFAULT FALSE,
             is_locked BOOLEAN DEFAULT FALSE,
             is_active BOOLEAN DEFAULT TRUE,
             view_count INTEGER DEFAULT 0,
             reply_count INTEGER DEFAULT 0,
             last_reply_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
         )
     """)
     
@@ -1514,7 +1592,7 @@ def create_collaboration_tables(cursor):
             like_count INTEGER DEFAULT 0,
             is_accepted_answer BOOLEAN DEFAULT FALSE,
             is_active BOOLEAN DEFAULT TRUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
@@ -1531,7 +1609,7 @@ def create_collaboration_tables(cursor):
             content TEXT NOT NULL,
             like_count INTEGER DEFAULT 0,
             is_active BOOLEAN DEFAULT TRUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
@@ -1931,6 +2009,47 @@ def create_collaboration_tables(cursor):
         ON {DB_SCHEMA}.forum_threads(user_id)
     """)
     
+    # Keyset cursors compare sort keys as row values, which NULLs would break
+    cursor.execute(f"""
+        UPDATE {DB_SCHEMA}.forum_threads
+        SET is_pinned = COALESCE(is_pinned, FALSE),
+            created_at = COALESCE(created_at, updated_at, CURRENT_TIMESTAMP),
+            updated_at = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+        WHERE is_pinned IS NULL OR created_at IS NULL OR updated_at IS NULL
+    """)
+    cursor.execute(f"""
+        ALTER TABLE {DB_SCHEMA}.forum_threads
+        ALTER COLUMN is_pinned SET NOT NULL,
+        ALTER COLUMN created_at SET NOT NULL,
+        ALTER COLUMN updated_at SET NOT NULL
+    """)
+    for table in ("forum_posts", "content_comments"):
+        cursor.execute(f"""
+            UPDATE {DB_SCHEMA}.{table}
+            SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+            WHERE created_at IS NULL
+        """)
+        cursor.execute(f"""
+            ALTER TABLE {DB_SCHEMA}.{table}
+            ALTER COLUMN created_at SET NOT NULL
+        """)
+    
+    # Keyset pagination indexes (order of get_threads / get_thread / get_content_comments)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_forum_threads_keyset 
+        ON {DB_SCHEMA}.forum_threads(forum_id, is_pinned DESC, updated_at DESC, id DESC)
+    """)
+    
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_forum_posts_keyset 
+        ON {DB_SCHEMA}.forum_posts(thread_id, created_at ASC, id ASC)
+    """)
+    
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_content_comments_keyset 
+        ON {DB_SCHEMA}.content_comments(content_id, content_type, created_at DESC, id DESC)
+    """)
+    
     # Forum posts indexes
     cursor.execute(f"""
         CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_forum_posts_thread 
@@ -2000,6 +2119,32 @@ def create_collaboration_tables(cursor):
         ON {DB_SCHEMA}.study_group_messages(group_id, created_at DESC)
     """)
     
+    # Chat cursors are message ids; tail loads and scroll-back read by (group_id, id)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_study_group_messages_cursor 
+        ON {DB_SCHEMA}.study_group_messages(group_id, id DESC)
+    """)
+    
+    # Announce new chat messages on commit so every process can update its
+    # tail buffers (see group_chat.PostgresChatListener)
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {DB_SCHEMA}.notify_group_chat_message()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM pg_notify('group_chat_messages',
+                json_build_object('group_id', NEW.group_id, 'cursor', NEW.id)::text);
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql';
+    """)
+    cursor.execute(f"""
+        DROP TRIGGER IF EXISTS notify_group_chat_message ON {DB_SCHEMA}.study_group_messages;
+        CREATE TRIGGER notify_group_chat_message
+            AFTER INSERT ON {DB_SCHEMA}.study_group_messages
+            FOR EACH ROW
+            EXECUTE FUNCTION {DB_SCHEMA}.notify_group_chat_message();
+    """)
+    
     # Mentorship indexes
     cursor.execute(f"""
         CREATE INDEX IF NOT EXISTS idx_{DB_SCHEMA}_mentorship_profiles_available 
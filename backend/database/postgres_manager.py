@@ -1,4 +1,5 @@
 import os
+import threading
 import psycopg2
 from psycopg2 import pool, extras, extensions
 import logging
@@ -7,14 +8,28 @@ from typing import Optional, List, Dict, Any
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Pool sizing: request threads share one pool, so size it for the number of
+# threads that query at once; callers past POSTGRES_POOL_MAX wait up to
+# POSTGRES_POOL_TIMEOUT seconds for a connection instead of failing at once
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", 1))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", 20))
+POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", 30))
+
 class PostgresManager:
     _instance = None
     _pool = None
+    _pool_lock = threading.Lock()
+    # Connections handed out by get_connection() and not yet returned
+    _checked_out = 0
+    _checkout_lock = threading.Lock()
+    # One slot per pool connection; ThreadedConnectionPool raises PoolError
+    # when exhausted, so checkouts wait on this first
+    _slots = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(PostgresManager, cls).__new__(cls)
-            cls._instance._initialize_pool()
+            cls._instance.schema = os.getenv("DB_SCHEMA", "jeseci_academy")
         return cls._instance
 
     def _initialize_pool(self):
@@ -36,25 +51,58 @@ class PostgresManager:
             
             # Initialize Pool
             self._pool = psycopg2.pool.ThreadedConnectionPool(
-                minconn=1,
-                maxconn=20,
+                minconn=POSTGRES_POOL_MIN,
+                maxconn=POSTGRES_POOL_MAX,
                 host=os.getenv("POSTGRES_HOST", "localhost"),
                 port=int(os.getenv("POSTGRES_PORT", 5432)),
                 database=os.getenv("POSTGRES_DB", "jeseci_learning_academy"),
                 user=os.getenv("POSTGRES_USER", "jeseci_academy_user"),
                 password=os.getenv("POSTGRES_PASSWORD", "jeseci_secure_password_2024")
             )
-            logger.info(f"PostgreSQL connection pool initialized")
+            self._slots = threading.BoundedSemaphore(POSTGRES_POOL_MAX)
+            logger.info(f"PostgreSQL connection pool initialized (max {POSTGRES_POOL_MAX} connections)")
+            self._register_pool_gauges()
         except Exception as e:
             logger.error(f"Failed to initialize PostgreSQL pool: {e}")
             raise
 
+    def _register_pool_gauges(self):
+        """Expose pool usage to the live admin dashboard"""
+        try:
+            from live_metrics import get_live_metrics
+        except ImportError:
+            return
+        metrics = get_live_metrics()
+        metrics.register_gauge("db_pool_in_use", lambda: self._checked_out)
+        metrics.register_gauge("db_pool_size", lambda: self._pool.maxconn if self._pool else 0)
+
     def get_connection(self):
-        return self._pool.getconn()
+        # The pool opens on first use so importing the database package
+        # doesn't wait on PostgreSQL
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._initialize_pool()
+        if not self._slots.acquire(timeout=POSTGRES_POOL_TIMEOUT):
+            raise pool.PoolError(
+                f"No PostgreSQL connection free after {POSTGRES_POOL_TIMEOUT}s "
+                f"({POSTGRES_POOL_MAX} in use); raise POSTGRES_POOL_MAX"
+            )
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._checkout_lock:
+            PostgresManager._checked_out += 1
+        return conn
 
     def return_connection(self, conn):
         if self._pool:
             self._pool.putconn(conn)
+            self._slots.release()
+            with self._checkout_lock:
+                PostgresManager._checked_out -= 1
 
     def execute_query(self, query: str, params: tuple = None, fetch: bool = True) -> Optional[List[Dict[str, Any]]]:
         """Execute a query and return dictionary results"""
@@ -17,6 +17,7 @@ except ImportError:
 
 # Import centralized logging configuration
 from logger_config import logger
+from smtp_pool import get_smtp_pool
 
 # Email configuration
 SMTP_SERVER = os.getenv("SMTP_HOST", os.getenv("SMTP_SERVER", "smtp.gmail.com"))
@@ -105,21 +106,8 @@ def _send_email_sync(to_email: str, subject: str, body: str) -> dict:
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'plain'))
         
-        # Send email using smtplib with proper TLS context
-        import ssl
-        context = ssl.create_default_context()
-        
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
-        server.ehlo()
-        server.starttls(context=context)
-        server.ehlo()  # Re-EHLO after TLS upgrade
-        server.login(FROM_EMAIL, EMAIL_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(FROM_EMAIL, to_email, text)
-        server.quit()
-        
-        logger.info(f"Email sent successfully to {to_email}")
-        return {"success": True}
+        # Reuse a pooled, rate-limited SMTP session
+        return get_smtp_pool().send(msg, to_email)
         
     except Exception as error:
         logger.error(f"Failed to send email to {to_email}: {error}")
@@ -26,6 +26,7 @@ except ImportError:
 
 # Import centralized logging configuration
 from logger_config import logger
+from smtp_pool import get_smtp_pool
 
 # Email configuration
 # Support both new naming convention (SMTP_*) and legacy naming
@@ -267,21 +268,8 @@ def _send_email_sync(email: str, subject: str, content: dict) -> dict:
         msg.attach(part1)
         msg.attach(part2)
         
-        # Send email using smtplib with proper TLS context
-        import ssl
-        context = ssl.create_default_context()
-        
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
-        server.ehlo()
-        server.starttls(context=context)
-        server.ehlo()  # Re-EHLO after TLS upgrade
-        server.login(FROM_EMAIL, EMAIL_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(FROM_EMAIL, email, text)
-        server.quit()
-        
-        logger.info(f"Email sent successfully to {email}")
-        return {"success": True}
+        # Reuse a pooled, rate-limited SMTP session
+        return get_smtp_pool().send(msg, email)
         
     except Exception as error:
         logger.error(f"Failed to send email to {email}: {error}")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Error Knowledge Matcher - In-memory index over the error knowledge base
+
+Loads error_knowledge_base entries once and matches error messages against
+their error_pattern values with an Aho-Corasick automaton per language, so
+a lookup costs one pass over the message however many patterns there are.
+This keeps the lookup that runs on every failed code execution off the
+database.
+
+Patterns are matched as case-insensitive literal substrings; overlapping
+and nested patterns all match. Entries with language 'all' apply to every
+language.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from logger_config import logger
+
+SHARED_LANGUAGE = "all"
+
+
+class PatternAutomaton:
+    """Aho-Corasick automaton reporting every pattern that occurs in a text"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        # Per state: transitions, failure link and the patterns ending there
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                following = self._goto[state].get(char)
+                if following is None:
+                    following = len(self._goto)
+                    self._goto[state][char] = following
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = following
+            self._out[state].append(index)
+
+        # Breadth-first, so a state's failure target is finished before it;
+        # each state inherits the outputs of its failure target, which makes
+        # patterns nested in longer ones match too
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, following in self._goto[state].items():
+                pending.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[following] = self._goto[fallback].get(char, 0)
+                self._out[following] = self._out[following] + self._out[self._fail[following]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def search(self, text: str) -> Set[str]:
+        """Patterns occurring anywhere in the text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return {self.patterns[index] for index in found}
+
+
+class ErrorKnowledgeMatcher:
+    """
+    Precompiled matcher for error knowledge entries, one automaton per language.
+
+    The index is built lazily on first use, rebuilt after invalidate() (called
+    when entries are added) and refreshed periodically so that entries added
+    by other worker processes are picked up.
+    """
+
+    def __init__(self, loader: Callable[[], List[Dict]], refresh_interval: int = 300,
+                 retry_interval: int = 30):
+        """
+        Args:
+            loader: Callable returning all error knowledge entries as dicts
+            refresh_interval: Seconds after which the index is reloaded
+            retry_interval: Seconds to wait after a failed load before retrying
+        """
+        self._loader = loader
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._entries_by_language: Dict[str, List[Dict]] = {}
+        self._indexes: Dict[str, Tuple[PatternAutomaton, Dict[str, List[Dict]]]] = {}
+        self._loaded_at: Optional[float] = None
+        self._failed_at: Optional[float] = None
+        self._stale = True
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the knowledge base has been loaded successfully"""
+        return self._loaded_at is not None
+
+    def invalidate(self) -> None:
+        """Mark the index stale so it is rebuilt on the next match"""
+        self._stale = True
+
+    def refresh(self) -> bool:
+        """
+        Reload entries from the knowledge base and drop compiled indexes.
+
+        Returns:
+            True if the reload succeeded; on failure the previous index is kept
+        """
+        try:
+            entries = self._loader()
+        except Exception as e:
+            self._failed_at = time.time()
+            logger.warning(f"Could not load error knowledge base: {e}")
+            return False
+
+        by_language: Dict[str, List[Dict]] = {}
+        for entry in entries:
+            if not entry.get("error_pattern"):
+                continue
+            language = (entry.get("language") or SHARED_LANGUAGE).lower()
+            by_language.setdefault(language, []).append(entry)
+
+        with self._lock:
+            self._entries_by_language = by_language
+            self._indexes = {}
+            self._loaded_at = time.time()
+            self._failed_at = None
+            self._stale = False
+
+        logger.info(f"Error knowledge matcher loaded {len(entries)} entries")
+        return True
+
+    def _ensure_fresh(self) -> None:
+        now = time.time()
+        expired = self._loaded_at is not None and now - self._loaded_at > self.refresh_interval
+        if not (self._stale or expired):
+            return
+        # While the knowledge base is unreachable, keep serving the previous
+        # index (or nothing) instead of retrying the load on every match
+        if self._failed_at is not None and now - self._failed_at < self.retry_interval:
+            return
+        self.refresh()
+
+    def _get_index(self, language: str) -> Tuple[PatternAutomaton, Dict[str, List[Dict]]]:
+        """Get (building if needed) the automaton for a language"""
+        index = self._indexes.get(language)
+        if index is not None:
+            return index
+
+        with self._lock:
+            index = self._indexes.get(language)
+            if index is not None:
+                return index
+
+            by_pattern: Dict[str, List[Dict]] = {}
+            candidates = self._entries_by_language.get(language, [])
+            if language != SHARED_LANGUAGE:
+                candidates = candidates + self._entries_by_language.get(SHARED_LANGUAGE, [])
+            for entry in candidates:
+                by_pattern.setdefault(entry["error_pattern"].lower(), []).append(entry)
+
+            index = (PatternAutomaton(list(by_pattern)), by_pattern)
+            self._indexes[language] = index
+            return index
+
+    def match(self, language: str, error_msg: str, limit: int = 5) -> List[Dict]:
+        """
+        Find knowledge entries whose pattern occurs in the error message.
+
+        Ranking: an exact match of the whole message first, then longer (more
+        specific) patterns, then the most recently created entries.
+
+        Args:
+            language: Programming language (jac, python, javascript)
+            error_msg: The error message to match
+            limit: Maximum number of entries to return
+
+        Returns:
+            Matching entries, best first
+        """
+        self._ensure_fresh()
+        if not error_msg:
+            return []
+
+        automaton, by_pattern = self._get_index((language or SHARED_LANGUAGE).lower())
+        if not len(automaton):
+            return []
+
+        matched_patterns = automaton.search(error_msg.lower())
+        message = error_msg.strip().lower()
+
+        matches = [entry for pattern in matched_patterns for entry in by_pattern[pattern]]
+        matches.sort(
+            key=lambda e: (
+                e["error_pattern"].lower() == message,
+                len(e["error_pattern"]),
+                e.get("created_at") or ""
+            ),
+            reverse=True
+        )
+        return matches[:limit]
+
+    def get_stats(self) -> Dict:
+        """Get index statistics"""
+        return {
+            "loaded": self.loaded,
+            "entries": sum(len(v) for v in self._entries_by_language.values()),
+            "languages": sorted(self._entries_by_language),
+            "compiled_indexes": len(self._indexes),
+            "loaded_at": self._loaded_at
+        }
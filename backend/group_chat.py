@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+"""
+Study Group Chat Delivery for Jeseci Smart Learning Academy
+
+Delivers study-group chat messages without clients polling the database:
+
+- Each group's messages form an append-only log ordered by a monotonically
+  increasing cursor (the message row id). Sends to one group are serialized
+  with a transaction-scoped advisory lock, so cursors become visible in order
+- The newest GROUP_CHAT_TAIL_SIZE messages of each active group are kept in
+  an in-memory tail buffer; "latest" and "since cursor" reads are served from
+  it, and the database is only read on scroll-back or a cold buffer
+- New messages are pushed to members connected over WebSocket and wake
+  long-poll requests waiting on the group
+- Messages written by other processes (other workers, the `jac serve`
+  walkers) are announced by a trigger on study_group_messages through
+  PostgreSQL LISTEN/NOTIFY; a notification for a buffered group newer than
+  its tail reads just the missing messages
+- With GROUP_CHAT_BACKEND=redis, messages sent through this module are also
+  relayed over Redis pub/sub, which saves that read in the other workers
+- Tails are reloaded after GROUP_CHAT_TAIL_TTL seconds, and dropped when the
+  LISTEN connection or the Redis subscription is re-established, in case
+  notifications were lost
+
+Author: Cavin Otieno
+"""
+
+import os
+import json
+import time
+import uuid
+import select
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+
+# Import centralized logging configuration
+from logger_config import logger
+from admin_auth import get_current_user_from_token
+from realtime_broadcast import BroadcastEngine
+
+# Redis is optional; without it messages are only delivered within this process
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+DB_SCHEMA = os.getenv("DB_SCHEMA", "jeseci_academy")
+GROUP_CHAT_BACKEND = os.getenv("GROUP_CHAT_BACKEND", "memory").lower()
+GROUP_CHAT_TAIL_SIZE = int(os.getenv("GROUP_CHAT_TAIL_SIZE", "200"))
+GROUP_CHAT_MAX_GROUPS = int(os.getenv("GROUP_CHAT_MAX_GROUPS", "1000"))
+GROUP_CHAT_LONG_POLL_MAX = int(os.getenv("GROUP_CHAT_LONG_POLL_MAX", "30"))
+GROUP_CHAT_TAIL_TTL = float(os.getenv("GROUP_CHAT_TAIL_TTL", "60"))
+GROUP_CHAT_LISTEN = os.getenv("GROUP_CHAT_LISTEN", "true").lower() == "true"
+GROUP_CHAT_CHANNEL = os.getenv("GROUP_CHAT_CHANNEL", "jeseci:group_chat")
+
+# NOTIFY channel used by the study_group_messages insert trigger
+GROUP_CHAT_NOTIFY_CHANNEL = "group_chat_messages"
+
+MESSAGE_COLUMNS = f"""
+    m.id AS cursor, m.message_id, m.group_id, m.user_id, m.content,
+    m.message_type, m.file_url, m.created_at, u.username, up.avatar_url
+"""
+
+
+def _query(sql: str, params: tuple) -> List[Dict[str, Any]]:
+    from psycopg2 import extras
+    from database.postgres_manager import get_postgres_manager
+    manager = get_postgres_manager()
+    conn = manager.get_connection()
+    try:
+        with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+            cur.execute(sql, params)
+            return [dict(row) for row in cur.fetchall()]
+    finally:
+        manager.return_connection(conn)
+
+
+def to_message(row: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-ready chat message from a database row"""
+    message = dict(row)
+    if hasattr(message.get("created_at"), "isoformat"):
+        message["created_at"] = message["created_at"].isoformat()
+    return message
+
+
+def fetch_messages(group_id: str, limit: int, before: Optional[int] = None,
+                   after: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Read messages from the database.
+
+    Args:
+        before: Only messages with a smaller cursor (scroll-back), newest first
+        after: Only messages with a larger cursor, oldest first
+
+    Without either, returns the newest messages, newest first.
+    """
+    where = "m.group_id = %s"
+    params: List[Any] = [group_id]
+    if before is not None:
+        where += " AND m.id < %s"
+        params.append(before)
+    if after is not None:
+        where += " AND m.id > %s"
+        params.append(after)
+    params.append(limit)
+    order = "ASC" if after is not None else "DESC"
+    rows = _query(f"""
+        SELECT {MESSAGE_COLUMNS}
+        FROM {DB_SCHEMA}.study_group_messages m
+        JOIN {DB_SCHEMA}.users u ON m.user_id = u.id
+        LEFT JOIN {DB_SCHEMA}.user_profile up ON up.user_id = m.user_id
+        WHERE {where}
+        ORDER BY m.id {order}
+        LIMIT %s
+    """, tuple(params))
+    return [to_message(row) for row in rows]
+
+
+def resolve_group_member(group_id: str, user_id: Any) -> Optional[int]:
+    """users.id of a group member given either users.id or users.user_id"""
+    rows = _query(f"""
+        SELECT u.id
+        FROM {DB_SCHEMA}.study_group_members m
+        JOIN {DB_SCHEMA}.users u ON u.id = m.user_id
+        WHERE m.group_id = %s AND (u.user_id = %s OR u.id::text = %s)
+        LIMIT 1
+    """, (group_id, str(user_id), str(user_id)))
+    return rows[0]["id"] if rows else None
+
+
+class GroupTail:
+    """
+    Newest messages of one group, oldest first.
+
+    The buffer holds every message with a cursor greater than floor, so a
+    read "after cursor c" can be answered from memory whenever c >= floor.
+    """
+
+    def __init__(self, messages: List[Dict[str, Any]], floor: int, size: int = GROUP_CHAT_TAIL_SIZE):
+        self.messages: Deque[Dict[str, Any]] = deque(messages, maxlen=size)
+        self.floor = floor
+        self.loaded_at = self.last_access = time.time()
+
+    @property
+    def newest(self) -> int:
+        """Cursor of the newest buffered message (floor when empty)"""
+        return self.messages[-1]["cursor"] if self.messages else self.floor
+
+    def append(self, message: Dict[str, Any]) -> bool:
+        """Add a message in cursor order; returns False for duplicates"""
+        cursor = message["cursor"]
+        if cursor <= self.floor:
+            return False
+        if not self.messages or cursor > self.messages[-1]["cursor"]:
+            if len(self.messages) == self.messages.maxlen:
+                self.floor = self.messages[0]["cursor"]
+            self.messages.append(message)
+            return True
+        # Relayed messages can arrive slightly out of order
+        ordered = list(self.messages)
+        if any(existing["cursor"] == cursor for existing in ordered):
+            return False
+        ordered.append(message)
+        ordered.sort(key=lambda m: m["cursor"])
+        if len(ordered) > self.messages.maxlen:
+            self.floor = ordered.pop(0)["cursor"]
+        self.messages = deque(ordered, maxlen=self.messages.maxlen)
+        return True
+
+    def after(self, cursor: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Messages after a cursor, oldest first, or None if not buffered"""
+        if cursor < self.floor:
+            return None
+        return [m for m in self.messages if m["cursor"] > cursor][:limit]
+
+    def latest(self, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Newest messages, newest first, or None if not buffered"""
+        if len(self.messages) < limit and self.floor > 0:
+            return None
+        return list(reversed(self.messages))[:limit]
+
+
+class RedisChatRelay:
+    """Relays chat messages between worker processes over Redis pub/sub"""
+
+    def __init__(self, on_message, on_subscribe=None, channel: str = GROUP_CHAT_CHANNEL):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._on_message = on_message
+        self._on_subscribe = on_subscribe
+        self._client = redis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            db=int(os.getenv("REDIS_DB", 1)),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            decode_responses=True
+        )
+        self._client.ping()
+        self._thread = threading.Thread(target=self._listen, name="group-chat-relay", daemon=True)
+        self._thread.start()
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        try:
+            self._client.publish(self.channel, json.dumps({"origin": self.origin, "message": message}, default=str))
+        except Exception as e:
+            logger.warning(f"Group chat relay publish failed: {e}")
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Messages published while unsubscribed were missed
+                if self._on_subscribe is not None:
+                    self._on_subscribe()
+                for item in pubsub.listen():
+                    envelope = json.loads(item["data"])
+                    if envelope.get("origin") != self.origin:
+                        self._on_message(envelope["message"])
+            except Exception as e:
+                logger.warning(f"Group chat relay subscription lost, retrying: {e}")
+                time.sleep(1)
+
+
+class PostgresChatListener:
+    """
+    LISTENs for the notifications the study_group_messages trigger sends on
+    commit, {"group_id", "cursor"}, and hands them to on_notify.
+    """
+
+    def __init__(self, on_notify, on_listen=None, channel: str = GROUP_CHAT_NOTIFY_CHANNEL,
+                 keepalive: float = 60):
+        self.channel = channel
+        self.keepalive = keepalive
+        self.connected = False
+        self._on_notify = on_notify
+        self._on_listen = on_listen
+        self._thread = threading.Thread(target=self._listen, name="group-chat-listener", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        import psycopg2
+        conn = psycopg2.connect(
+            host=os.getenv("POSTGRES_HOST", "localhost"),
+            port=int(os.getenv("POSTGRES_PORT", 5432)),
+            database=os.getenv("POSTGRES_DB", "jeseci_learning_academy"),
+            user=os.getenv("POSTGRES_USER", "jeseci_academy_user"),
+            password=os.getenv("POSTGRES_PASSWORD", "jeseci_secure_password_2024")
+        )
+        conn.autocommit = True
+        return conn
+
+    def _listen(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.channel}")
+                self.connected = True
+                # Notifications sent while not listening were missed
+                if self._on_listen is not None:
+                    self._on_listen()
+                while True:
+                    if select.select([conn], [], [], self.keepalive) == ([], [], []):
+                        # Idle: make sure the connection is still alive
+                        with conn.cursor() as cur:
+                            cur.execute("SELECT 1")
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        payload = json.loads(conn.notifies.pop(0).payload)
+                        self._on_notify(payload["group_id"], int(payload["cursor"]))
+            except Exception as e:
+                logger.warning(f"Group chat LISTEN connection lost, retrying: {e}")
+                time.sleep(1)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+class GroupChatHub:
+    """Tail buffers, long-poll waiters and WebSocket fan-out for group chat"""
+
+    def __init__(self, backend: str = GROUP_CHAT_BACKEND, tail_size: int = GROUP_CHAT_TAIL_SIZE,
+                 max_groups: int = GROUP_CHAT_MAX_GROUPS, loader=fetch_messages,
+                 tail_ttl: float = GROUP_CHAT_TAIL_TTL, listen: bool = GROUP_CHAT_LISTEN):
+        self.tail_size = tail_size
+        self.max_groups = max_groups
+        self.tail_ttl = tail_ttl
+        self._loader = loader
+        self._tails: "OrderedDict[str, GroupTail]" = OrderedDict()
+        # group_id -> [messages delivered during a tail load, loads in flight,
+        #              newest cursor notified during the load]
+        self._loading: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._members: Dict[str, Set[str]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sockets = BroadcastEngine(
+            resolve_group=lambda group_id: self._members.get(group_id, ()),
+            on_slow_consumer=self.disconnect,
+            backend="memory"
+        )
+        self._relay: Optional[RedisChatRelay] = None
+        if backend == "redis":
+            if not REDIS_AVAILABLE:
+                logger.warning("GROUP_CHAT_BACKEND=redis but redis is not installed; delivering locally")
+            else:
+                try:
+                    self._relay = RedisChatRelay(self._on_remote_message, self._drop_tails)
+                    logger.info("Group chat messages relayed over Redis pub/sub")
+                except Exception as e:
+                    logger.warning(f"Redis group chat relay unavailable, delivering locally: {e}")
+        self._listener: Optional[PostgresChatListener] = None
+        if listen:
+            self._listener = PostgresChatListener(self._on_notify, self._drop_tails)
+        self.stats = {
+            "published": 0, "memory_reads": 0, "db_reads": 0, "tail_loads": 0,
+            "notifications": 0, "caught_up": 0, "long_polls": 0
+        }
+
+    # ------------------------------------------------------------------
+    # Tail buffers
+    # ------------------------------------------------------------------
+
+    def _tail(self, group_id: str) -> GroupTail:
+        with self._lock:
+            tail = self._tails.get(group_id)
+            if tail is not None and time.time() - tail.loaded_at < self.tail_ttl:
+                self._tails.move_to_end(group_id)
+                tail.last_access = time.time()
+                return tail
+            if tail is not None:
+                del self._tails[group_id]
+            # Messages delivered while the load runs may be missing from the
+            # rows it reads, so _deliver keeps them for merging afterwards
+            loading = self._loading.setdefault(group_id, [[], 0, 0])
+            loading[1] += 1
+
+        loaded = None
+        notified = 0
+        try:
+            # One extra row tells whether the buffer holds the whole history
+            rows = self._loader(group_id, self.tail_size + 1)
+            floor = rows.pop()["cursor"] if len(rows) > self.tail_size else 0
+            loaded = GroupTail(list(reversed(rows)), floor, self.tail_size)
+            self.stats["tail_loads"] += 1
+        finally:
+            with self._lock:
+                loading[1] -= 1
+                tail = self._tails.get(group_id)
+                if tail is None and loaded is not None:
+                    tail = self._tails[group_id] = loaded
+                    for message in loading[0]:
+                        tail.append(message)
+                    notified = loading[2]
+                    while len(self._tails) > self.max_groups:
+                        # Live members rely on their group's tail for notifications
+                        idle = next((g for g in self._tails if not self._members.get(g)), None)
+                        if idle is None:
+                            break
+                        del self._tails[idle]
+                if tail is not None or loading[1] == 0:
+                    self._loading.pop(group_id, None)
+        # The load may have read before a notified message committed
+        if loaded is not None and notified > loaded.newest:
+            self._read_newer(group_id, notified)
+        return tail
+
+    def _drop_tails(self) -> None:
+        with self._lock:
+            self._tails.clear()
+
+    def _on_notify(self, group_id: str, cursor: int) -> None:
+        """A message with this cursor was committed, possibly by another process"""
+        self.stats["notifications"] += 1
+        with self._lock:
+            loading = self._loading.get(group_id)
+            if loading is not None:
+                loading[2] = max(loading[2], cursor)
+                return
+            tail = self._tails.get(group_id)
+            # Groups without a tail are read fresh when next asked for
+            if tail is None or cursor <= tail.newest:
+                return
+        self._read_newer(group_id, cursor)
+
+    def _read_newer(self, group_id: str, cursor: int) -> None:
+        """Deliver the messages between a tail's newest cursor and a notified one"""
+        with self._lock:
+            tail = self._tails.get(group_id)
+            if tail is None:
+                return
+            newest = tail.newest
+        while newest < cursor:
+            rows = self._loader(group_id, self.tail_size, after=newest)
+            if not rows:
+                break
+            for row in rows:
+                self._deliver(row)
+            self.stats["caught_up"] += len(rows)
+            newest = rows[-1]["cursor"]
+
+    def latest(self, group_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Newest messages of a group, newest first"""
+        tail = self._tail(group_id)
+        with self._lock:
+            messages = tail.latest(limit)
+        if messages is not None:
+            self.stats["memory_reads"] += 1
+            return messages
+        self.stats["db_reads"] += 1
+        return self._loader(group_id, limit)
+
+    def after(self, group_id: str, cursor: int, limit: int) -> List[Dict[str, Any]]:
+        """Messages newer than a cursor, oldest first"""
+        tail = self._tail(group_id)
+        with self._lock:
+            messages = tail.after(cursor, limit)
+        if messages is not None:
+            self.stats["memory_reads"] += 1
+            return messages
+        self.stats["db_reads"] += 1
+        return self._loader(group_id, limit, after=cursor)
+
+    def before(self, group_id: str, cursor: int, limit: int) -> List[Dict[str, Any]]:
+        """Scroll-back: messages older than a cursor, newest first"""
+        self.stats["db_reads"] += 1
+        return self._loader(group_id, limit, before=cursor)
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        """Deliver a committed message to this and every other worker"""
+        self.stats["published"] += 1
+        self._deliver(message)
+        if self._relay is not None:
+            self._relay.publish(message)
+
+    def _on_remote_message(self, message: Dict[str, Any]) -> None:
+        self._deliver(message)
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        group_id = message["group_id"]
+        with self._lock:
+            tail = self._tails.get(group_id)
+            if tail is not None:
+                if not tail.append(message):
+                    return
+            elif group_id in self._loading:
+                self._loading[group_id][0].append(message)
+            waiters = self._waiters.pop(group_id, set())
+
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._wake, future)
+
+        if self._loop is not None and self._members.get(group_id):
+            frame = BroadcastEngine.serialize({"type": "chat_message", "message": message})
+            self._loop.call_soon_threadsafe(self.sockets.deliver, group_id, frame)
+
+    @staticmethod
+    def _wake(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    async def wait(self, group_id: str, cursor: int, timeout: float, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Long-poll: return messages after cursor, waiting up to timeout
+        seconds for one to be delivered or notified.
+        """
+        self.stats["long_polls"] += 1
+        deadline = time.monotonic() + min(timeout, GROUP_CHAT_LONG_POLL_MAX)
+        loop = asyncio.get_running_loop()
+        while True:
+            future = loop.create_future()
+            waiter = (loop, future)
+            with self._lock:
+                self._waiters.setdefault(group_id, set()).add(waiter)
+            messages = await asyncio.to_thread(self.after, group_id, cursor, limit)
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                with self._lock:
+                    self._waiters.get(group_id, set()).discard(waiter)
+                return messages
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._waiters.get(group_id, set()).discard(waiter)
+
+    # ------------------------------------------------------------------
+    # WebSocket members
+    # ------------------------------------------------------------------
+
+    def connect(self, websocket: WebSocket, group_id: str) -> str:
+        """Register an accepted WebSocket as a live member of a group"""
+        self._loop = asyncio.get_running_loop()
+        websocket_id = str(uuid.uuid4())
+        self.sockets.register(websocket_id, websocket)
+        self._members.setdefault(group_id, set()).add(websocket_id)
+        return websocket_id
+
+    async def disconnect(self, websocket_id: str) -> None:
+        for group_id, members in list(self._members.items()):
+            members.discard(websocket_id)
+            if not members:
+                self._members.pop(group_id, None)
+        await self.sockets.unregister(websocket_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = sum(len(tail.messages) for tail in self._tails.values())
+            waiting = sum(len(waiters) for waiters in self._waiters.values())
+        return {
+            **self.stats,
+            "groups_buffered": len(self._tails),
+            "messages_buffered": buffered,
+            "long_poll_waiters": waiting,
+            "connected_members": sum(len(members) for members in self._members.values()),
+            "relay": self._relay is not None,
+            "listening": self._listener is not None and self._listener.connected,
+            "sockets": self.sockets.get_stats()
+        }
+
+
+_hub: Optional[GroupChatHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_group_chat_hub() -> GroupChatHub:
+    """Get the shared group chat hub"""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = GroupChatHub()
+    return _hub
+
+
+# =============================================================================
+# HTTP long-poll and WebSocket endpoints
+# =============================================================================
+
+group_chat_router = APIRouter()
+
+
+@group_chat_router.get("/groups/{group_id}/chat/poll")
+async def poll_group_chat(group_id: str,
+                          after: int = Query(..., ge=0, description="Cursor of the last message seen"),
+                          timeout: int = Query(GROUP_CHAT_LONG_POLL_MAX, ge=0),
+                          limit: int = Query(100, ge=1, le=500),
+                          current_user: Dict[str, Any] = Depends(get_current_user_from_token)):
+    """Wait for messages newer than a cursor (long-poll)"""
+    if await asyncio.to_thread(resolve_group_member, group_id, current_user.get("user_id")) is None:
+        raise HTTPException(status_code=403, detail="You must be a member of this group")
+    messages = await get_group_chat_hub().wait(group_id, after, timeout, limit)
+    return {
+        "success": True,
+        "messages": messages,
+        "cursor": messages[-1]["cursor"] if messages else after
+    }
+
+
+@group_chat_router.websocket("/ws/groups/{group_id}/chat")
+async def group_chat_socket(websocket: WebSocket, group_id: str):
+    """
+    Live group chat.
+
+    The client first sends {"type": "auth", "token": <JWT>, "after": <cursor>}
+    and receives any messages after that cursor as "chat_backlog", then
+    "chat_message" frames as they are sent. Messages can be sent with
+    {"type": "message", "content": ...}.
+    """
+    import user_auth
+    from advanced_collaboration_store import send_group_message
+
+    hub = get_group_chat_hub()
+    await websocket.accept()
+    websocket_id = None
+    try:
+        data = await asyncio.wait_for(websocket.receive_json(), timeout=30)
+        token_data = user_auth.validate_jwt_token(data.get("token", "")) if data.get("type") == "auth" else {}
+        if not token_data.get("valid"):
+            await websocket.close(code=4001)
+            return
+        member_id = await asyncio.to_thread(resolve_group_member, group_id, token_data.get("user_id"))
+        if member_id is None:
+            await websocket.close(code=4003)
+            return
+
+        websocket_id = hub.connect(websocket, group_id)
+        after = data.get("after")
+        if after is not None:
+            backlog = await asyncio.to_thread(hub.after, group_id, int(after), GROUP_CHAT_TAIL_SIZE)
+        else:
+            backlog = list(reversed(await asyncio.to_thread(hub.latest, group_id, 50)))
+        hub.sockets.send_to(websocket_id, {"type": "chat_backlog", "messages": backlog})
+
+        while True:
+            data = await asyncio.wait_for(websocket.receive_json(), timeout=300)
+            if data.get("type") == "ping":
+                hub.sockets.send_to(websocket_id, {"type": "pong"})
+            elif data.get("type") == "message":
+                # Delivered back to this socket by the hub like any other message
+                result = await asyncio.to_thread(
+                    send_group_message, group_id, member_id, data.get("content", ""),
+                    data.get("message_type", "text"), data.get("file_url")
+                )
+                if not result.get("success"):
+                    hub.sockets.send_to(websocket_id, {"type": "error", "error": result.get("error")})
+    except (WebSocketDisconnect, asyncio.TimeoutError):
+        pass
+    except Exception as e:
+        logger.warning(f"Group chat socket error: {e}")
+    finally:
+        if websocket_id is not None:
+            await hub.disconnect(websocket_id)
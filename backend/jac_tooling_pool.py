@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Jac Tooling Worker Pool
+
+Keeps a small pool of long-running jac_tooling_worker processes so that
+validate/format requests do not pay for spawning `jac` and importing the
+jaclang compiler on every call. Results are cached by content hash.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import json
+import queue
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from logger_config import logger
+
+JAC_WORKER_POOL_SIZE = int(os.getenv("JAC_WORKER_POOL_SIZE", "2"))
+JAC_WORKER_TIMEOUT = int(os.getenv("JAC_WORKER_TIMEOUT", "30"))
+JAC_RESULT_CACHE_SIZE = int(os.getenv("JAC_RESULT_CACHE_SIZE", "512"))
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jac_tooling_worker.py")
+
+
+class JacToolingWorker:
+    """A single worker process speaking the JSON-lines protocol"""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        self._next_id = 0
+        handshake = self._read_line(JAC_WORKER_TIMEOUT)
+        self.in_process = bool(handshake and handshake.get("in_process"))
+
+    def _read_line(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Read one response line, returning None on timeout or EOF"""
+        result: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=1)
+        reader = threading.Thread(target=lambda: result.put(self.process.stdout.readline()), daemon=True)
+        reader.start()
+        try:
+            line = result.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return json.loads(line) if line else None
+
+    def request(self, source: str, timeout: float, format: bool = False) -> Optional[Dict[str, Any]]:
+        """Send source to the worker and wait for its response"""
+        self._next_id += 1
+        self.process.stdin.write(json.dumps({"id": self._next_id, "source": source, "format": format}) + "\n")
+        self.process.stdin.flush()
+        return self._read_line(timeout)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def stop(self) -> None:
+        """Close stdin so the worker exits and removes its scratch file; kill it if it doesn't"""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except Exception:
+            try:
+                self.process.kill()
+                self.process.wait(timeout=5)
+            except Exception:
+                pass
+
+
+class JacToolingPool:
+    """
+    Bounded pool of jac tooling workers with a content-hash result cache.
+
+    Workers are started lazily. A worker that times out or dies is killed and
+    replaced on next use.
+    """
+
+    def __init__(self, size: int = JAC_WORKER_POOL_SIZE, cache_size: int = JAC_RESULT_CACHE_SIZE,
+                 timeout: int = JAC_WORKER_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._idle: "queue.Queue[Optional[JacToolingWorker]]" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(None)  # placeholder, started on first use
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._stats = {"requests": 0, "cache_hits": 0, "worker_restarts": 0, "timeouts": 0}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(source: str) -> str:
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _satisfies(result: Dict[str, Any], format: bool) -> bool:
+        """Whether a cached result answers the request (formatting is skipped for invalid code)"""
+        return not format or result.get("format_returncode") is not None or result.get("check_returncode") != 0
+
+    def check_and_format(self, source: str, format: bool = False) -> Dict[str, Any]:
+        """
+        Check source and, if asked and it is valid, format it, in one worker
+        round trip. A cached formatted result also answers a plain check.
+
+        Returns:
+            Dict with check_stderr, check_returncode, formatted_code,
+            format_stderr and format_returncode (see jac_tooling_worker)
+        """
+        self._count("requests")
+        key = self.content_hash(source)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None and self._satisfies(cached, format):
+                self._cache.move_to_end(key)
+                self._count("cache_hits")
+                return cached
+
+        worker = self._idle.get()
+        try:
+            if worker is None or not worker.alive():
+                if worker is not None:
+                    self._count("worker_restarts")
+                worker = JacToolingWorker()
+
+            response = worker.request(source, self.timeout, format=format)
+            if response is None:
+                self._count("timeouts")
+                worker.stop()
+                worker = None
+                return {
+                    "check_stderr": f"Command timed out after {self.timeout} seconds",
+                    "check_returncode": 1,
+                    "formatted_code": source,
+                    "format_stderr": "",
+                    "format_returncode": None
+                }
+            if response.get("error"):
+                raise RuntimeError(response["error"])
+        except Exception:
+            if worker is not None:
+                worker.stop()
+            worker = None
+            raise
+        finally:
+            self._idle.put(worker)
+
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None or not self._satisfies(cached, True):
+                self._cache[key] = response
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self._stats, size=self.size, cached_results=len(self._cache))
+
+    def shutdown(self) -> None:
+        """Stop all idle workers"""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.stop()
+        for _ in range(self.size):
+            self._idle.put(None)
+        logger.info("Jac tooling pool shut down")
+
+
+_pool: Optional[JacToolingPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_jac_tooling_pool() -> JacToolingPool:
+    """Get the shared tooling pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = JacToolingPool()
+    return _pool
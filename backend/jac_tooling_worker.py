@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Jac Tooling Worker
+
+Long-running worker process used by the Jaclang Editor Intelligence service.
+It imports the jaclang compiler once and then serves check/format requests
+read as JSON lines from stdin, writing one JSON line per response to stdout:
+
+    request:  {"id": 1, "source": "...", "format": true}
+    response: {"id": 1, "check_stdout": "...", "check_stderr": "...",
+               "check_returncode": 0, "formatted_code": "...",
+               "format_stderr": "...", "format_returncode": 0}
+
+Formatting is only attempted when the request asks for it and the check
+passes. Sources are written to one scratch file per worker, reused across
+requests. If jaclang cannot be imported in-process, the worker falls back
+to invoking the `jac` CLI.
+
+Author: Cavin Otieno
+"""
+
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+from contextlib import redirect_stdout, redirect_stderr
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    from jaclang.cli import cli as jac_cli
+    JAC_IN_PROCESS = True
+except Exception:
+    jac_cli = None
+    JAC_IN_PROCESS = False
+
+
+def _run_in_process(command: Callable[..., Any], path: str) -> Tuple[str, str, int]:
+    """Run a jaclang CLI command function in this process, capturing its output"""
+    out, err = io.StringIO(), io.StringIO()
+    returncode = 0
+    try:
+        with redirect_stdout(out), redirect_stderr(err):
+            result = command(path)
+        if result is False:
+            returncode = 1
+    except SystemExit as e:
+        returncode = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        err.write(f"{type(e).__name__}: {e}\n")
+        returncode = 1
+    return out.getvalue(), err.getvalue(), returncode
+
+
+def _run_cli(args: list, path: str) -> Tuple[str, str, int]:
+    """Run the jac CLI as a subprocess"""
+    try:
+        result = subprocess.run(['jac'] + args + [path], capture_output=True, text=True, timeout=30)
+        return result.stdout, result.stderr, result.returncode
+    except subprocess.TimeoutExpired:
+        return '', 'Command timed out after 30 seconds', 1
+    except FileNotFoundError:
+        return '', 'jac command not found. Please install jaclang.', 1
+
+
+def _run(command_name: str, path: str) -> Tuple[str, str, int]:
+    if JAC_IN_PROCESS and hasattr(jac_cli, command_name):
+        return _run_in_process(getattr(jac_cli, command_name), path)
+    return _run_cli([command_name], path)
+
+
+def handle_request(request: Dict[str, Any], scratch_path: str) -> Dict[str, Any]:
+    """Check one source and, if asked and it is valid, format it"""
+    source = request.get("source", "")
+    with open(scratch_path, 'w') as f:
+        f.write(source)
+
+    check_stdout, check_stderr, check_returncode = _run("check", scratch_path)
+    response = {
+        "id": request.get("id"),
+        "check_stdout": check_stdout,
+        "check_stderr": check_stderr,
+        "check_returncode": check_returncode,
+        "formatted_code": source,
+        "format_stderr": "",
+        "format_returncode": None
+    }
+
+    if request.get("format") and check_returncode == 0:
+        _, format_stderr, format_returncode = _run("format", scratch_path)
+        response["format_stderr"] = format_stderr
+        response["format_returncode"] = format_returncode
+        if format_returncode == 0:
+            # jac format rewrites the file in place
+            with open(scratch_path, 'r') as f:
+                response["formatted_code"] = f.read()
+    return response
+
+
+def main() -> None:
+    # Keep protocol output separate from anything jaclang prints
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    scratch_dir = tempfile.mkdtemp(prefix="jac_tooling_")
+    scratch_path = os.path.join(scratch_dir, "source.jac")
+
+    protocol_out.write(json.dumps({"ready": True, "in_process": JAC_IN_PROCESS}) + "\n")
+    protocol_out.flush()
+
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                response = handle_request(request, scratch_path)
+            except Exception as e:
+                response = {"id": None, "error": str(e)}
+            protocol_out.write(json.dumps(response) + "\n")
+            protocol_out.flush()
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ Author: Cavin Otieno
 import os
 import sys
 import re
+import time
+import asyncio
 import subprocess
 import tempfile
 from typing import Dict, Any, List, Optional
@@ -24,6 +26,12 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'
 # Add backend to path
 sys.path.insert(0, os.path.dirname(__file__))
 
+from jac_tooling_pool import get_jac_tooling_pool
+
+# How long a `jac --version` probe result is reused
+JAC_AVAILABILITY_TTL_SECONDS = 300
+_jac_availability: Optional[tuple] = None
+
 # Create router
 jaclang_router = APIRouter(prefix="/api/jaclang", tags=["Jaclang Editor Intelligence"])
 
@@ -58,7 +66,18 @@ class HealthResponse(BaseModel):
 # =============================================================================
 
 def check_jac_available() -> tuple[bool, str]:
-    """Check if the `jac` CLI tool is available."""
+    """Check if the `jac` CLI tool is available (probe result is cached briefly)."""
+    global _jac_availability
+    now = time.time()
+    if _jac_availability and now - _jac_availability[0] < JAC_AVAILABILITY_TTL_SECONDS:
+        return _jac_availability[1], _jac_availability[2]
+    available, version = _probe_jac_available()
+    _jac_availability = (now, available, version)
+    return available, version
+
+
+def _probe_jac_available() -> tuple[bool, str]:
+    """Run `jac --version`."""
     try:
         result = subprocess.run(
             ['jac', '--version'],
@@ -187,6 +206,60 @@ def execute_jac_command(args: List[str], source_code: str) -> tuple[str, str, in
             pass
 
 
+async def run_jac_tooling(source_code: str, format: bool = False) -> Dict[str, Any]:
+    """
+    Check (and, if asked, format) source code in one round trip to the tooling pool.
+    
+    Runs in a thread so the event loop is not blocked while the worker runs.
+    """
+    return await asyncio.to_thread(get_jac_tooling_pool().check_and_format, source_code, format)
+
+
+def build_validate_response(result: Dict[str, Any]) -> ValidateResponse:
+    """Convert a tooling result into a ValidateResponse."""
+    errors = parse_jac_errors(result.get("check_stderr", ""))
+    
+    # If returncode is 0, there are no errors
+    if result.get("check_returncode") == 0 and not errors:
+        return ValidateResponse(
+            valid=True,
+            errors=[],
+            message="Code is syntactically valid"
+        )
+    
+    # If returncode is non-zero or we have errors, report them
+    return ValidateResponse(
+        valid=False,
+        errors=errors,
+        message=f"Found {len(errors)} syntax error(s)" if errors else "Validation failed"
+    )
+
+
+def build_format_response(source_code: str, result: Dict[str, Any]) -> FormatResponse:
+    """Convert a tooling result into a FormatResponse."""
+    if result.get("check_returncode") != 0:
+        stderr = result.get("check_stderr", "")
+        return FormatResponse(
+            formatted_code=source_code,
+            changed=False,
+            error=f"Cannot format code with syntax errors: {stderr}"
+        )
+    
+    if result.get("format_returncode") != 0:
+        return FormatResponse(
+            formatted_code=source_code,
+            changed=False,
+            error=f"Formatting failed: {result.get('format_stderr', '')}"
+        )
+    
+    formatted_code = result.get("formatted_code", source_code)
+    return FormatResponse(
+        formatted_code=formatted_code,
+        changed=formatted_code != source_code,
+        error=None
+    )
+
+
 # =============================================================================
 # API Endpoints
 # =============================================================================
@@ -241,26 +314,9 @@ async def validate_jac_code(request: ValidateRequest):
                 message="Jaclang CLI not available"
             )
         
-        # Execute jac check command
-        stdout, stderr, returncode = execute_jac_command(['check'], source_code)
-        
-        # Parse errors from stderr
-        errors = parse_jac_errors(stderr)
-        
-        # If returncode is 0, there are no errors
-        if returncode == 0 and not errors:
-            return ValidateResponse(
-                valid=True,
-                errors=[],
-                message="Code is syntactically valid"
-            )
-        
-        # If returncode is non-zero or we have errors, report them
-        return ValidateResponse(
-            valid=False,
-            errors=errors,
-            message=f"Found {len(errors)} syntax error(s)" if errors else "Validation failed"
-        )
+        # Check through the tooling pool
+        result = await run_jac_tooling(source_code)
+        return build_validate_response(result)
     except Exception as e:
         # Return a valid response with a warning instead of crashing
         return ValidateResponse(
@@ -303,76 +359,9 @@ async def format_jac_code(request: FormatRequest):
                 error="Jaclang CLI not available. Please install jaclang package."
             )
         
-        # Execute jac format command
-        stdout, stderr, returncode = execute_jac_command(['format'], source_code)
-        
-        # Read the formatted code from the file
-        # jac format modifies the file in place, so we need to get the result
-        # The stdout will contain the path of the formatted file
-        
-        # For now, let's use a different approach - jac format outputs to the file
-        # We need to get the formatted content from stdout if available
-        
-        if returncode != 0:
-            # Check if it's a parse error (can't format invalid code)
-            if 'parse' in stderr.lower() or 'syntax' in stderr.lower():
-                return FormatResponse(
-                    formatted_code=source_code,
-                    changed=False,
-                    error=f"Cannot format code with syntax errors: {stderr}"
-                )
-            else:
-                return FormatResponse(
-                    formatted_code=source_code,
-                    changed=False,
-                    error=f"Formatting failed: {stderr}"
-                )
-        
-        # jac format modifies the file in place. Since we've deleted the temp file,
-        # we need to get the formatted content another way.
-        # Let's try with the --stdin flag if available, or use a different approach
-        
-        # Alternative: format to stdout if supported
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.jac', delete=False) as tmp:
-            tmp.write(source_code)
-            tmp_path = tmp.name
-        
-        try:
-            # Try jac format with output to stdout
-            result = subprocess.run(
-                ['jac', 'format', '--check', tmp_path] if '--check' in subprocess.run(
-                    ['jac', 'format', '--help'],
-                    capture_output=True,
-                    text=True
-                ).stdout else ['jac', 'format', tmp_path],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            # Read the file content back (jac format modifies in place)
-            with open(tmp_path, 'r') as f:
-                formatted_code = f.read()
-            
-            # Check if formatting changed anything
-            changed = formatted_code != source_code
-            
-            return FormatResponse(
-                formatted_code=formatted_code,
-                changed=changed,
-                error=None
-            )
-        except Exception as e:
-            return FormatResponse(
-                formatted_code=source_code,
-                changed=False,
-                error=str(e)
-            )
-        finally:
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
+        # Check and format through the tooling pool
+        result = await run_jac_tooling(source_code, format=True)
+        return build_format_response(source_code, result)
     except Exception as e:
         # Return original code with error message instead of crashing
         return FormatResponse(
@@ -419,8 +408,9 @@ async def validate_and_format_jac_code(request: ValidateRequest):
                 "message": "Jaclang CLI not available"
             }
         
-        # First, validate the code
-        validate_response = await validate_jac_code(ValidateRequest(source_code=source_code))
+        # Validate and format in a single tooling round trip
+        result = await run_jac_tooling(source_code, format=True)
+        validate_response = build_validate_response(result)
         
         if not validate_response.valid:
             # If there are errors, don't format
@@ -432,8 +422,8 @@ async def validate_and_format_jac_code(request: ValidateRequest):
                 "message": validate_response.message
             }
         
-        # Code is valid, so we can format it
-        format_response = await format_jac_code(FormatRequest(source_code=source_code))
+        # Code is valid, so the same result carries the formatted code
+        format_response = build_format_response(source_code, result)
         
         return {
             "valid": True,
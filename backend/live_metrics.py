@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Live Metrics Collector
+Jeseci Smart Learning Academy
+
+Collects real operational metrics for the real-time admin dashboard:
+HTTP request latency, code execution latency, sync engine event processing
+and database pool usage.
+
+Recording is a single append to a bounded per-process ring buffer, so the
+hot path takes no locks. A background thread drains the ring once a second
+into per-second buckets (count, sum, min, max and a bounded sample reservoir
+for percentiles), which are rolled up into 1s, 1m and 1h series. With the
+Redis backend every worker publishes its per-second buckets and aggregates
+the buckets of all workers, so each process sees cluster-wide numbers.
+
+Author: Cavin Otieno
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from logger_config import logger
+
+# Redis is optional; without it metrics cover the current process only
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+LIVE_METRICS_BACKEND = os.getenv("LIVE_METRICS_BACKEND", "memory").lower()
+LIVE_METRICS_RING_SIZE = int(os.getenv("LIVE_METRICS_RING_SIZE", "65536"))
+LIVE_METRICS_RESERVOIR_SIZE = int(os.getenv("LIVE_METRICS_RESERVOIR_SIZE", "512"))
+LIVE_METRICS_KEY_PREFIX = "jeseci:metrics"
+
+# Points kept per resolution: 5 minutes of seconds, 3 hours of minutes, 7 days of hours
+RESOLUTIONS = {"1s": (1, 300), "1m": (60, 180), "1h": (3600, 168)}
+
+# Metric name -> (kind, unit). Timers carry latency samples; counters count
+# events; gauges are sampled once per second.
+METRIC_DEFINITIONS = {
+    "http_request": ("timer", "ms"),
+    "http_error": ("counter", "requests"),
+    "code_execution": ("timer", "ms"),
+    "code_execution_error": ("counter", "executions"),
+    "sync_event": ("timer", "ms"),
+    "sync_event_failure": ("counter", "events"),
+    "db_pool_in_use": ("gauge", "connections"),
+    "db_pool_size": ("gauge", "connections"),
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class MetricBucket:
+    """Aggregate of one metric over one time interval"""
+
+    __slots__ = ("start", "count", "total", "min", "max", "samples", "_seen")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.samples: List[float] = []
+        self._seen = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        # Reservoir sampling keeps percentiles unbiased with bounded memory
+        self._seen += 1
+        if len(self.samples) < LIVE_METRICS_RESERVOIR_SIZE:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self._seen)
+            if slot < LIVE_METRICS_RESERVOIR_SIZE:
+                self.samples[slot] = value
+
+    def merge(self, other: "MetricBucket") -> None:
+        if other.count == 0:
+            return
+        samples = self.samples + other.samples
+        if len(samples) > LIVE_METRICS_RESERVOIR_SIZE:
+            # Each reservoir stands for its bucket's whole count, so draw from
+            # each in proportion to that count, not to its sample size
+            size = LIVE_METRICS_RESERVOIR_SIZE
+            from_self = round(size * self.count / (self.count + other.count))
+            from_self = min(max(from_self, size - len(other.samples)), len(self.samples))
+            samples = random.sample(self.samples, from_self) + random.sample(other.samples, size - from_self)
+        self.samples = samples
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._seen += other._seen or other.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start": self.start, "count": self.count, "total": self.total,
+            "min": self.min, "max": self.max, "samples": self.samples
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricBucket":
+        bucket = cls(data["start"])
+        bucket.count = data["count"]
+        bucket.total = data["total"]
+        bucket.min = data["min"]
+        bucket.max = data["max"]
+        bucket.samples = list(data["samples"])
+        bucket._seen = bucket.count
+        return bucket
+
+    def summary(self, seconds: int, kind: str) -> Dict[str, Any]:
+        """Summarize the bucket as covering `seconds` seconds"""
+        if kind == "gauge":
+            return {"value": self.max or 0.0, "avg": round(self.total / self.count, 2) if self.count else 0.0}
+        result = {
+            "count": self.count,
+            "rate_per_second": round(self.count / seconds, 3) if seconds else 0.0,
+        }
+        if kind == "timer":
+            values = sorted(self.samples)
+            result.update({
+                "avg": round(self.total / self.count, 2) if self.count else 0.0,
+                "min": round(self.min, 2) if self.min is not None else 0.0,
+                "max": round(self.max, 2) if self.max is not None else 0.0,
+                "p50": round(percentile(values, 50), 2),
+                "p95": round(percentile(values, 95), 2),
+                "p99": round(percentile(values, 99), 2),
+            })
+        return result
+
+
+class LiveMetricsCollector:
+    """
+    Per-process metrics collector with 1s/1m/1h downsampled series.
+
+    record*() methods may be called from any thread. All aggregation happens
+    on the collector's own thread in tick().
+    """
+
+    def __init__(self, backend: str = LIVE_METRICS_BACKEND, ring_size: int = LIVE_METRICS_RING_SIZE):
+        # deque.append/popleft are atomic, so producers never block
+        self._ring: Deque[tuple] = deque(maxlen=ring_size)
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        # second -> metric name -> bucket, for seconds not yet finalized
+        self._open: Dict[int, Dict[str, MetricBucket]] = {}
+        self._series: Dict[str, Dict[str, Deque[MetricBucket]]] = {
+            resolution: {} for resolution in RESOLUTIONS
+        }
+        self._rollup: Dict[str, Dict[str, MetricBucket]] = {"1m": {}, "1h": {}}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._redis = None
+        self._last_finalized: Optional[int] = None
+        if backend == "redis":
+            self._connect_redis()
+
+    def _connect_redis(self) -> None:
+        if not REDIS_AVAILABLE:
+            logger.warning("LIVE_METRICS_BACKEND=redis but redis is not installed; using per-process metrics")
+            return
+        try:
+            client = redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                db=int(os.getenv("REDIS_DB", 1)),
+                password=os.getenv("REDIS_PASSWORD") or None,
+                decode_responses=True,
+                socket_timeout=2
+            )
+            client.ping()
+            self._redis = client
+            logger.info("Live metrics aggregated across workers via Redis")
+        except Exception as e:
+            logger.warning(f"Redis metrics aggregation unavailable, using per-process metrics: {e}")
+
+    # ------------------------------------------------------------------
+    # Recording (hot path)
+    # ------------------------------------------------------------------
+
+    def record(self, name: str, value: float = 1.0) -> None:
+        """Record one observation of a metric"""
+        self._ring.append((time.time(), name, value))
+
+    def record_request(self, duration_ms: float, status_code: int) -> None:
+        self._ring.append((time.time(), "http_request", duration_ms))
+        if status_code >= 500:
+            self._ring.append((time.time(), "http_error", 1.0))
+
+    def record_execution(self, duration_ms: float, success: bool) -> None:
+        self._ring.append((time.time(), "code_execution", duration_ms))
+        if not success:
+            self._ring.append((time.time(), "code_execution_error", 1.0))
+
+    def record_sync_event(self, duration_ms: float, success: bool) -> None:
+        self._ring.append((time.time(), "sync_event", duration_ms))
+        if not success:
+            self._ring.append((time.time(), "sync_event_failure", 1.0))
+
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Register a callable sampled once per second (e.g. pool usage)"""
+        self._gauges[name] = read
+
+    # ------------------------------------------------------------------
+    # Aggregation (collector thread)
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the aggregation thread if it is not running"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="live-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(1.0 - (time.time() % 1.0)):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Live metrics aggregation failed: {e}")
+
+    def tick(self, now: Optional[float] = None) -> None:
+        """Drain the ring, sample gauges and finalize completed seconds"""
+        now = time.time() if now is None else now
+        current_second = int(now)
+
+        while True:
+            try:
+                timestamp, name, value = self._ring.popleft()
+            except IndexError:
+                break
+            second = int(timestamp)
+            bucket = self._open.setdefault(second, {}).get(name)
+            if bucket is None:
+                bucket = self._open[second][name] = MetricBucket(second)
+            bucket.add(value)
+
+        for name, read in list(self._gauges.items()):
+            try:
+                value = float(read())
+            except Exception:
+                continue
+            bucket = self._open.setdefault(current_second, {}).get(name)
+            if bucket is None:
+                bucket = self._open[current_second][name] = MetricBucket(current_second)
+            bucket.add(value)
+
+        for second in sorted(s for s in self._open if s < current_second):
+            local = self._open.pop(second)
+            if self._redis is not None:
+                self._publish(second, local)
+            else:
+                self._finalize(second, local)
+
+        if self._redis is not None:
+            # Aggregate one second behind so slower workers have published
+            target = current_second - 2
+            start = target if self._last_finalized is None else self._last_finalized + 1
+            for second in range(max(start, target - 5), target + 1):
+                self._finalize(second, self._collect(second))
+
+    def _publish(self, second: int, buckets: Dict[str, MetricBucket]) -> None:
+        key = f"{LIVE_METRICS_KEY_PREFIX}:{second}"
+        payload = json.dumps({name: bucket.to_dict() for name, bucket in buckets.items()})
+        try:
+            pipe = self._redis.pipeline()
+            pipe.rpush(key, payload)
+            pipe.expire(key, 120)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not publish live metrics: {e}")
+
+    def _collect(self, second: int) -> Dict[str, MetricBucket]:
+        merged: Dict[str, MetricBucket] = {}
+        try:
+            payloads = self._redis.lrange(f"{LIVE_METRICS_KEY_PREFIX}:{second}", 0, -1)
+        except Exception as e:
+            logger.warning(f"Could not read live metrics: {e}")
+            return merged
+        gauge_totals: Dict[str, float] = {}
+        for payload in payloads:
+            for name, data in json.loads(payload).items():
+                bucket = MetricBucket.from_dict(data)
+                if METRIC_DEFINITIONS.get(name, ("counter",))[0] == "gauge":
+                    # Gauges add up across workers (e.g. pool connections)
+                    if bucket.count:
+                        gauge_totals[name] = gauge_totals.get(name, 0.0) + bucket.total / bucket.count
+                elif name in merged:
+                    merged[name].merge(bucket)
+                else:
+                    merged[name] = bucket
+        for name, value in gauge_totals.items():
+            merged[name] = MetricBucket(second)
+            merged[name].add(value)
+        return merged
+
+    def _finalize(self, second: int, buckets: Dict[str, MetricBucket]) -> None:
+        """Append a completed second to the series and roll it up"""
+        with self._lock:
+            self._last_finalized = second
+            names = set(buckets) | set(self._series["1s"])
+            for name in names:
+                bucket = buckets.get(name) or MetricBucket(second)
+                self._append("1s", name, bucket)
+                for resolution in ("1m", "1h"):
+                    step = RESOLUTIONS[resolution][0]
+                    start = second - second % step
+                    rollup = self._rollup[resolution].get(name)
+                    if rollup is not None and rollup.start != start:
+                        self._append(resolution, name, rollup)
+                        rollup = None
+                    if rollup is None:
+                        rollup = self._rollup[resolution][name] = MetricBucket(start)
+                    rollup.merge(bucket)
+
+    def _append(self, resolution: str, name: str, bucket: MetricBucket) -> None:
+        series = self._series[resolution].get(name)
+        if series is None:
+            series = self._series[resolution][name] = deque(maxlen=RESOLUTIONS[resolution][1])
+        series.append(bucket)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def summary(self, window_seconds: int = 60) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize every metric over the most recent window of 1s buckets.
+
+        Timers report count, rate, avg, min, max, p50, p95 and p99; counters
+        report count and rate; gauges report their latest value.
+        """
+        result = {}
+        with self._lock:
+            for name, series in self._series["1s"].items():
+                kind, unit = METRIC_DEFINITIONS.get(name, ("counter", "events"))
+                recent = list(series)[-window_seconds:]
+                if kind == "gauge":
+                    latest = next((b for b in reversed(recent) if b.count), None)
+                    summary = latest.summary(1, kind) if latest else {"value": 0.0, "avg": 0.0}
+                else:
+                    merged = MetricBucket(recent[0].start if recent else 0)
+                    for bucket in recent:
+                        merged.merge(bucket)
+                    summary = merged.summary(max(len(recent), 1), kind)
+                result[name] = {"kind": kind, "unit": unit, **summary}
+        return result
+
+    def get_series(self, name: str, resolution: str = "1s", limit: int = 60) -> List[Dict[str, Any]]:
+        """Get the downsampled series for one metric"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        step = RESOLUTIONS[resolution][0]
+        kind = METRIC_DEFINITIONS.get(name, ("counter", "events"))[0]
+        with self._lock:
+            buckets = list(self._series[resolution].get(name, ()))[-limit:]
+        return [{"start": b.start, **b.summary(step, kind)} for b in buckets]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self._redis is not None else "memory",
+            "ring_pending": len(self._ring),
+            "ring_size": self._ring.maxlen,
+            "metrics": sorted(self._series["1s"]),
+            "gauges": sorted(self._gauges),
+            "last_finalized": self._last_finalized,
+        }
+
+
+_collector: Optional[LiveMetricsCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_live_metrics() -> LiveMetricsCollector:
+    """Get the process-wide collector, starting its aggregation thread"""
+    global _collector
+    if _collector is None:
+        with _collector_lock:
+            if _collector is None:
+                _collector = LiveMetricsCollector()
+                _collector.start()
+    return _collector
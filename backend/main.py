@@ -10,6 +10,7 @@ Author: Cavin Otieno
 
 import os
 import sys
+import time
 import logging
 from typing import Optional, Dict, Any, List
 from fastapi import FastAPI, HTTPException, Query
@@ -42,11 +43,14 @@ from content_admin import content_admin_router
 from admin_content_store import initialize_concepts
 from quiz_admin import quiz_admin_router
 from analytics_admin import analytics_admin_router
-from ai_predictive import ai_predictive_router
+from ai_predictive import ai_predictive_router, start_risk_refresh
 from realtime_admin import realtime_router
+from group_chat import group_chat_router
 from lms_integration import lms_router
 from system_core import system_router
 from jaclang_service import jaclang_router
+from live_metrics import get_live_metrics
+from notification_scheduler import start_batch_scheduler
 
 # Conditionally import AI content router based on configuration
 if app_config.is_ai_content_enabled():
@@ -74,6 +78,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record request latency for the live admin dashboard
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        get_live_metrics().record_request((time.perf_counter() - started) * 1000, status_code)
+
 # Include API routers
 app.include_router(admin_router)
 app.include_router(content_admin_router)
@@ -87,10 +103,21 @@ app.include_router(quiz_admin_router)
 app.include_router(analytics_admin_router)
 app.include_router(ai_predictive_router)
 app.include_router(realtime_router)
+app.include_router(group_chat_router)
 app.include_router(lms_router)
 app.include_router(system_router)
 app.include_router(jaclang_router)
 
+
+# Nightly streak reminder and digest jobs (only when NOTIFICATION_BATCH_ENABLED)
+@app.on_event("startup")
+async def start_notification_batch():
+    start_batch_scheduler()
+
+@app.on_event("startup")
+async def start_risk_prediction_refresh():
+    start_risk_refresh()
+
 # =============================================================================
 # Pydantic Models for HTTP API
 # =============================================================================
@@ -423,7 +450,7 @@ async def get_verification_status(user_id: str):
 @app.post("/auth/login", response_model=TokenResponse)
 async def login_user(request: UserLoginRequest):
     """Authenticate user and return JWT token"""
-    result = auth_module.authenticate_user(request.username, request.password)
+    result = await auth_module.authenticate_user_async(request.username, request.password)
     
     if result['success']:
         return TokenResponse(
@@ -92,7 +92,7 @@ CREATE TABLE IF NOT EXISTS jeseci_academy.sync_event_log (
     payload JSONB NOT NULL DEFAULT '{}',
     
     -- Source version for conflict detection
-    source_version INTEGER NOT NULL DEFAULT 0,
+    source_version BIGINT NOT NULL DEFAULT 0,
     
     -- Processing status
     status sync_event_status_enum NOT NULL DEFAULT 'PENDING',
@@ -157,13 +157,13 @@ CREATE TABLE IF NOT EXISTS jeseci_academy.sync_status (
     -- Sync status
     is_synced BOOLEAN NOT NULL DEFAULT FALSE,
     last_synced_at TIMESTAMP WITH TIME ZONE,
-    last_synced_version INTEGER,
+    last_synced_version BIGINT,
     
     -- Source data version
-    source_version INTEGER NOT NULL DEFAULT 0,
+    source_version BIGINT NOT NULL DEFAULT 0,
     
     -- Neo4j data version (for conflict detection)
-    neo4j_version INTEGER,
+    neo4j_version BIGINT,
     neo4j_checksum VARCHAR(256),
     
     -- Status flags
@@ -217,8 +217,8 @@ CREATE TABLE IF NOT EXISTS jeseci_academy.sync_conflicts (
     
     -- Conflict details
     conflict_type VARCHAR(50) NOT NULL,
-    source_version INTEGER NOT NULL,
-    target_version INTEGER,
+    source_version BIGINT NOT NULL,
+    target_version BIGINT,
     
     -- Data comparison
     source_data JSONB NOT NULL,
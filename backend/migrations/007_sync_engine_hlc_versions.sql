@@ -0,0 +1,18 @@
+-- Migration: Widen sync engine version columns for hybrid logical clock versions
+-- Run this in PostgreSQL before deploying publishers that issue HLC versions
+--
+-- Versions are now microsecond timestamps times 1000 plus a logical counter,
+-- which no longer fit INTEGER. Existing whole-second versions are kept as-is;
+-- the sync engine normalizes them when comparing.
+
+ALTER TABLE jeseci_academy.sync_event_log
+ALTER COLUMN source_version TYPE BIGINT;
+
+ALTER TABLE jeseci_academy.sync_status
+ALTER COLUMN last_synced_version TYPE BIGINT,
+ALTER COLUMN source_version TYPE BIGINT,
+ALTER COLUMN neo4j_version TYPE BIGINT;
+
+ALTER TABLE jeseci_academy.sync_conflicts
+ALTER COLUMN source_version TYPE BIGINT,
+ALTER COLUMN target_version TYPE BIGINT;
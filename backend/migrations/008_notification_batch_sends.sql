@@ -0,0 +1,16 @@
+-- Migration: Record per-period sends of the nightly notification batch jobs
+-- Run this in PostgreSQL before deploying the batch scheduler
+--
+-- Each streak reminder or digest run claims its recipients here for the day
+-- before sending, so overlapping workers and retries don't send twice.
+
+CREATE TABLE IF NOT EXISTS jeseci_academy.notification_batch_sends (
+    job VARCHAR(50) NOT NULL,
+    period_key VARCHAR(32) NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES jeseci_academy.users(id) ON DELETE CASCADE,
+    sent_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (job, period_key, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_batch_sends_sent_at
+ON jeseci_academy.notification_batch_sends(sent_at);
@@ -0,0 +1,21 @@
+-- Migration: Announce new study group chat messages over LISTEN/NOTIFY
+-- Run this in PostgreSQL before deploying the group chat hub
+--
+-- Each backend worker LISTENs on group_chat_messages and reads the messages
+-- it hasn't seen when a notification names a group it has buffered, so
+-- messages written by other processes arrive without polling.
+
+CREATE OR REPLACE FUNCTION jeseci_academy.notify_group_chat_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('group_chat_messages',
+        json_build_object('group_id', NEW.group_id, 'cursor', NEW.id)::text);
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_group_chat_message ON jeseci_academy.study_group_messages;
+CREATE TRIGGER notify_group_chat_message
+    AFTER INSERT ON jeseci_academy.study_group_messages
+    FOR EACH ROW
+    EXECUTE FUNCTION jeseci_academy.notify_group_chat_message();
@@ -0,0 +1,14 @@
+-- Migration: Track the email of each notification batch claim
+-- Run this in PostgreSQL before deploying the batch scheduler
+--
+-- email_sent is NULL while a claimed recipient's email is being sent, TRUE
+-- once it was sent (or none was due) and FALSE after a failure. The next
+-- run of the job retries FALSE claims without repeating in-app notifications.
+
+ALTER TABLE jeseci_academy.notification_batch_sends
+ADD COLUMN IF NOT EXISTS email_sent BOOLEAN;
+
+-- Claims made before this migration had their email sent or released
+UPDATE jeseci_academy.notification_batch_sends
+SET email_sent = TRUE
+WHERE email_sent IS NULL;
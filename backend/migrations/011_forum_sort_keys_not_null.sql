@@ -0,0 +1,32 @@
+-- Migration: Make the forum keyset pagination sort keys NOT NULL
+-- Run this in PostgreSQL before deploying keyset cursors for forums and comments
+--
+-- Thread, post and comment pages continue after the last row with a row-value
+-- comparison on (is_pinned, updated_at, id) or (created_at, id). A NULL key
+-- compares as unknown, so such rows would be skipped by every later page;
+-- existing NULLs are backfilled from the other timestamp.
+
+UPDATE jeseci_academy.forum_threads
+SET is_pinned = COALESCE(is_pinned, FALSE),
+    created_at = COALESCE(created_at, updated_at, CURRENT_TIMESTAMP),
+    updated_at = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+WHERE is_pinned IS NULL OR created_at IS NULL OR updated_at IS NULL;
+
+ALTER TABLE jeseci_academy.forum_threads
+ALTER COLUMN is_pinned SET NOT NULL,
+ALTER COLUMN created_at SET NOT NULL,
+ALTER COLUMN updated_at SET NOT NULL;
+
+UPDATE jeseci_academy.forum_posts
+SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+WHERE created_at IS NULL;
+
+ALTER TABLE jeseci_academy.forum_posts
+ALTER COLUMN created_at SET NOT NULL;
+
+UPDATE jeseci_academy.content_comments
+SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+WHERE created_at IS NULL;
+
+ALTER TABLE jeseci_academy.content_comments
+ALTER COLUMN created_at SET NOT NULL;
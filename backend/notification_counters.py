@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Notification Counters - Cached per-user notification counts
+
+Keeps each user's unread and total (non-archived) notification counts in a
+cache so that the unread badge polled by every open browser tab does not
+run COUNT(*) queries. notification_store updates the counters on create,
+read and archive; a cache miss is filled from the database by the caller.
+
+Counters expire after NOTIFICATION_COUNTER_TTL seconds, which bounds any
+drift (for example from rows changed outside notification_store, or from
+other workers when the in-memory backend is used). Use the Redis backend to
+share counters across workers.
+
+Author: Cavin Otieno
+"""
+
+import os
+import time
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+# Import centralized logging configuration
+from logger_config import logger
+
+# Redis is optional; the in-memory backend is used when it is unavailable
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+NOTIFICATION_COUNTER_BACKEND = os.getenv("NOTIFICATION_COUNTER_BACKEND", "memory").lower()
+NOTIFICATION_COUNTER_TTL = int(os.getenv("NOTIFICATION_COUNTER_TTL", "300"))
+NOTIFICATION_COUNTER_MAX_USERS = int(os.getenv("NOTIFICATION_COUNTER_MAX_USERS", "100000"))
+NOTIFICATION_COUNTER_KEY_PREFIX = "jeseci:notifications"
+
+# Counter kinds kept per user
+UNREAD = "unread"
+TOTAL = "total"
+
+# Increment only if the counter is cached; a missing counter must be
+# recomputed from the database rather than started from the delta
+_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+    if value < 0 then
+        redis.call('DEL', KEYS[1])
+        return nil
+    end
+    return value
+end
+return nil
+"""
+
+
+class InMemoryCounterBackend:
+    """Process-local counters with per-entry expiry"""
+
+    def __init__(self, ttl: int = NOTIFICATION_COUNTER_TTL, max_users: int = NOTIFICATION_COUNTER_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._values: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key: str, value: int) -> None:
+        with self._lock:
+            if len(self._values) >= self.max_users and key not in self._values:
+                self._evict_expired()
+                if len(self._values) >= self.max_users:
+                    # Drop the entry closest to expiry
+                    oldest = min(self._values, key=lambda k: self._values[k][1])
+                    del self._values[oldest]
+            self._values[key] = (value, time.time() + self.ttl)
+
+    def incr_many(self, keys: Iterable[str], delta: int) -> None:
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._values.get(key)
+                if entry is None or entry[1] < now:
+                    self._values.pop(key, None)
+                    continue
+                value = entry[0] + delta
+                if value < 0:
+                    del self._values[key]
+                else:
+                    self._values[key] = (value, entry[1])
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        for key in [k for k, (_, expires_at) in self._values.items() if expires_at < now]:
+            del self._values[key]
+
+    def count(self) -> int:
+        return len(self._values)
+
+
+class RedisCounterBackend:
+    """Counters shared across workers"""
+
+    def __init__(self, client: Any = None, ttl: int = NOTIFICATION_COUNTER_TTL):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed")
+            client = redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                db=int(os.getenv("REDIS_DB", 1)),
+                password=os.getenv("REDIS_PASSWORD") or None,
+                decode_responses=True
+            )
+        self.client = client
+        self.ttl = ttl
+        self._incr = client.register_script(_INCR_IF_EXISTS)
+
+    def _key(self, key: str) -> str:
+        return f"{NOTIFICATION_COUNTER_KEY_PREFIX}:{key}"
+
+    def get(self, key: str) -> Optional[int]:
+        value = self.client.get(self._key(key))
+        return int(value) if value is not None else None
+
+    def set(self, key: str, value: int) -> None:
+        self.client.set(self._key(key), value, ex=self.ttl)
+
+    def incr_many(self, keys: Iterable[str], delta: int) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            self._incr(keys=[self._key(key)], args=[delta], client=pipe)
+        pipe.execute()
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._key(key))
+
+    def count(self) -> int:
+        return -1  # not tracked
+
+
+class NotificationCounters:
+    """Unread and total notification counters keyed by user"""
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self._stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    @staticmethod
+    def _key(user_id: Any, kind: str) -> str:
+        return f"{user_id}:{kind}"
+
+    def get(self, user_id: Any, kind: str = UNREAD) -> Optional[int]:
+        """Get a cached counter, or None if it must be loaded from the database"""
+        try:
+            value = self.backend.get(self._key(user_id, kind))
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Notification counter read failed: {e}")
+            return None
+        self._stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, user_id: Any, kind: str, value: int) -> None:
+        try:
+            self.backend.set(self._key(user_id, kind), int(value))
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Notification counter write failed: {e}")
+
+    def adjust(self, user_ids: Iterable[Any], delta: int, kinds: Iterable[str] = (UNREAD, TOTAL)) -> None:
+        """Apply a delta to cached counters; uncached counters are left to load lazily"""
+        if not delta:
+            return
+        keys = [self._key(user_id, kind) for user_id in user_ids for kind in kinds]
+        try:
+            self.backend.incr_many(keys, delta)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Notification counter update failed: {e}")
+            for key in keys:
+                try:
+                    self.backend.delete(key)
+                except Exception:
+                    pass
+
+    def invalidate(self, user_id: Any) -> None:
+        for kind in (UNREAD, TOTAL):
+            try:
+                self.backend.delete(self._key(user_id, kind))
+            except Exception:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "backend": type(self.backend).__name__,
+            "cached_counters": self.backend.count()
+        }
+
+
+def _create_backend() -> Any:
+    """Create the configured counter backend, falling back to in-memory"""
+    if NOTIFICATION_COUNTER_BACKEND == "redis":
+        try:
+            backend = RedisCounterBackend()
+            backend.client.ping()
+            logger.info("Notification counters using Redis backend")
+            return backend
+        except Exception as e:
+            logger.warning(f"Redis notification counters unavailable, using in-memory backend: {e}")
+    return InMemoryCounterBackend()
+
+
+# Global instance used by notification_store
+notification_counters = NotificationCounters(_create_backend())
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Notification Batch Scheduler for Jeseci Smart Learning Academy
+
+Nightly batch jobs for streak reminders and unread-notification digests:
+
+- Recipients are selected with one set-based query per job, with
+  notification preferences applied in SQL
+- Email templates are rendered once per message variant; only the
+  per-user fields are substituted for each recipient
+- In-app notifications are written with the bulk fan-out insert
+- Emails go through the pooled, rate-limited SMTP sessions in smtp_pool
+
+Jobs select their recipients under a transaction-level PostgreSQL advisory
+lock and, in the same transaction, claim each recipient for the day in
+notification_batch_sends. The lock and connection are released before any
+email is sent; a second worker, an overlapping cron run or a retry skips
+recipients already claimed. Each claim records whether its email went out
+(email_sent: NULL while sending, FALSE after a failure), and a later run
+retries failed emails without creating the in-app notification again.
+Periods are the database's CURRENT_DATE. Run from cron with:
+
+    python notification_scheduler.py --job all
+
+or set NOTIFICATION_BATCH_ENABLED=true to run them daily inside the API
+process at NOTIFICATION_BATCH_HOUR (UTC).
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import html
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from psycopg2.extras import execute_values
+
+from database import get_db_connection, get_postgres_manager
+from notification_store import (
+    DB_SCHEMA,
+    STREAK_REMINDER_MESSAGES,
+    streak_reminder_variant,
+    create_bulk_notification
+)
+from smtp_pool import get_smtp_pool, FROM_EMAIL
+
+# Import centralized logging configuration
+from logger_config import logger
+
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+NOTIFICATION_BATCH_ENABLED = os.getenv("NOTIFICATION_BATCH_ENABLED", "false").lower() == "true"
+NOTIFICATION_BATCH_HOUR = int(os.getenv("NOTIFICATION_BATCH_HOUR", "18"))
+NOTIFICATION_DIGEST_WINDOW_HOURS = int(os.getenv("NOTIFICATION_DIGEST_WINDOW_HOURS", "24"))
+NOTIFICATION_DIGEST_MAX_ITEMS = int(os.getenv("NOTIFICATION_DIGEST_MAX_ITEMS", "5"))
+
+# Advisory lock keys, one per job
+STREAK_JOB_LOCK = 7301
+DIGEST_JOB_LOCK = 7302
+
+# Job names recorded in notification_batch_sends
+STREAK_JOB = 'streak_reminder'
+DIGEST_JOB = 'digest'
+NOTIFICATION_SENDS_RETENTION_DAYS = int(os.getenv("NOTIFICATION_SENDS_RETENTION_DAYS", "30"))
+
+_EMAIL_HTML = Template("""<!DOCTYPE html>
+<html>
+<body style="font-family: Arial, sans-serif; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
+    <h2 style="color: #4F46E5;">$heading</h2>
+    <p>Hi $$username,</p>
+    $body
+    <p><a href="$link" style="display: inline-block; background: #4F46E5; color: #fff; padding: 12px 24px; text-decoration: none; border-radius: 6px;">$action</a></p>
+    <p style="font-size: 12px; color: #888;">You can change which emails you receive in your notification settings.</p>
+    <p>Best regards,<br>The Jeseci Team</p>
+</body>
+</html>""")
+
+
+def _render_variant(heading: str, body_plain: str, body_html: str, link: str, action: str) -> Tuple[Template, Template]:
+    """Render the static parts of an email once, leaving $username and message fields"""
+    plain = Template(f"Hi $username,\n\n{body_plain}\n\n{action}: {link}\n\nBest regards,\nThe Jeseci Team")
+    rich = Template(_EMAIL_HTML.substitute(heading=heading, body=body_html, link=link, action=action))
+    return plain, rich
+
+
+def _build_message(to_email: str, subject: str, plain: str, rich: str) -> MIMEMultipart:
+    msg = MIMEMultipart('alternative')
+    msg['From'] = FROM_EMAIL
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(plain, 'plain'))
+    msg.attach(MIMEText(rich, 'html'))
+    return msg
+
+
+@contextmanager
+def _job_lock(key: int):
+    """
+    Run a transaction holding a job's advisory lock.
+
+    Yields a cursor on the locked transaction, or None if another worker
+    holds the lock. The transaction commits (releasing the lock) when the
+    block exits, so keep slow work such as sending email outside it.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (key,))
+            if not cur.fetchone()[0]:
+                conn.rollback()
+                yield None
+                return
+            try:
+                yield cur
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    finally:
+        get_postgres_manager().return_connection(conn)
+
+
+def _period_key(cur) -> str:
+    """The batch period a run belongs to: the database's current date"""
+    # Same clock as the CURRENT_DATE comparisons in the recipient queries
+    cur.execute("SELECT CURRENT_DATE::text")
+    return cur.fetchone()[0]
+
+
+def _wants_email(recipient: Dict[str, Any]) -> bool:
+    return bool(recipient.get('send_email', True) and recipient['email'])
+
+
+def _claim_recipients(cur, job: str, period_key: str, recipients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Record recipients as handled for the period; returns those not already
+    claimed by an earlier or concurrent run, plus those whose email failed
+    in an earlier run, which are claimed again for a retry.
+    """
+    if not recipients:
+        return []
+    cur.execute(
+        f"""
+        DELETE FROM {DB_SCHEMA}.notification_batch_sends
+        WHERE sent_at < NOW() - make_interval(days => %s)
+        """,
+        (NOTIFICATION_SENDS_RETENTION_DAYS,)
+    )
+    # email_sent starts NULL (sending) for recipients who get an email and
+    # TRUE (nothing to send) for the rest
+    claimed = execute_values(
+        cur,
+        f"""
+        INSERT INTO {DB_SCHEMA}.notification_batch_sends AS b (job, period_key, user_id, email_sent)
+        VALUES %s
+        ON CONFLICT (job, period_key, user_id) DO UPDATE
+            SET email_sent = EXCLUDED.email_sent, sent_at = NOW()
+            WHERE b.email_sent = FALSE
+        RETURNING user_id
+        """,
+        [
+            (job, period_key, recipient['id'], None if _wants_email(recipient) else True)
+            for recipient in recipients
+        ],
+        template="(%s, %s, %s, %s::boolean)",
+        fetch=True
+    )
+    claimed_ids = {row[0] for row in claimed}
+    return [recipient for recipient in recipients if recipient['id'] in claimed_ids]
+
+
+def _record_email_results(job: str, period_key: str, recipients: List[Dict[str, Any]],
+                          failed_emails: List[str]) -> None:
+    """Mark each emailed recipient's claim as sent or failed; failed ones are retried by a later run"""
+    emailed = [recipient for recipient in recipients if _wants_email(recipient)]
+    if not emailed:
+        return
+    failed = set(failed_emails)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                UPDATE {DB_SCHEMA}.notification_batch_sends
+                SET email_sent = NOT (user_id = ANY(%s))
+                WHERE job = %s AND period_key = %s AND user_id = ANY(%s)
+                """,
+                (
+                    [recipient['id'] for recipient in emailed if recipient['email'] in failed],
+                    job, period_key,
+                    [recipient['id'] for recipient in emailed]
+                )
+            )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Could not record {job} email results: {e}")
+    finally:
+        get_postgres_manager().return_connection(conn)
+
+
+def select_streak_reminder_recipients(cur, period_key: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Users whose streak breaks tonight: active yesterday, not yet today,
+    reminders enabled and not already reminded today. Users whose reminder
+    email failed earlier in the period are included with email_retry set;
+    they already have the in-app notification.
+    """
+    cur.execute(
+        f"""
+        SELECT u.id, u.username, u.email, s.current_streak,
+               COALESCE(np.email_enabled, TRUE) AND COALESCE(lp.email_reminders, TRUE) AS send_email,
+               b.user_id IS NOT NULL AS email_retry
+        FROM {DB_SCHEMA}.user_activity_streaks s
+        JOIN {DB_SCHEMA}.users u ON u.id = s.user_id
+        LEFT JOIN {DB_SCHEMA}.notification_preferences np ON np.user_id = u.id
+        LEFT JOIN {DB_SCHEMA}.user_learning_preferences lp ON lp.user_id = u.id
+        LEFT JOIN {DB_SCHEMA}.notification_batch_sends b
+            ON b.job = %s AND b.period_key = %s AND b.user_id = u.id
+        WHERE s.streak_type = 'LESSON_COMPLETED'
+          AND s.current_streak > 0
+          AND s.last_activity_date = CURRENT_DATE - 1
+          AND u.is_active = TRUE
+          AND COALESCE(u.is_deleted, FALSE) = FALSE
+          AND COALESCE((np.types_config ->> 'STREAK_REMINDER')::boolean, TRUE)
+          AND (b.user_id IS NULL OR b.email_sent = FALSE)
+          AND (b.user_id IS NOT NULL OR NOT EXISTS (
+              SELECT 1 FROM {DB_SCHEMA}.notifications n
+              WHERE n.user_id = u.id
+                AND n.type = 'STREAK_REMINDER'
+                AND n.created_at >= CURRENT_DATE
+          ))
+        """,
+        (STREAK_JOB, period_key or _period_key(cur))
+    )
+    columns = ["id", "username", "email", "current_streak", "send_email", "email_retry"]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def select_digest_recipients(cur, window_hours: int = NOTIFICATION_DIGEST_WINDOW_HOURS,
+                             max_items: int = NOTIFICATION_DIGEST_MAX_ITEMS,
+                             period_key: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Users with unread notifications from the digest window who accept email
+    and haven't been sent the digest for the period yet (or whose digest
+    email failed earlier in the period)
+    """
+    cur.execute(
+        f"""
+        SELECT u.id, u.username, u.email, COUNT(*) AS unread_count,
+               (ARRAY_AGG(n.title ORDER BY n.created_at DESC))[1:%s] AS titles
+        FROM {DB_SCHEMA}.notifications n
+        JOIN {DB_SCHEMA}.users u ON u.id = n.user_id
+        LEFT JOIN {DB_SCHEMA}.notification_preferences np ON np.user_id = u.id
+        WHERE n.is_read = FALSE
+          AND n.is_archived = FALSE
+          AND n.created_at >= NOW() - make_interval(hours => %s)
+          AND u.is_active = TRUE
+          AND COALESCE(u.is_deleted, FALSE) = FALSE
+          AND COALESCE(np.email_enabled, TRUE)
+          AND NOT EXISTS (
+              SELECT 1 FROM {DB_SCHEMA}.notification_batch_sends b
+              WHERE b.job = %s AND b.period_key = %s AND b.user_id = u.id
+                AND b.email_sent IS DISTINCT FROM FALSE
+          )
+        GROUP BY u.id, u.username, u.email
+        """,
+        (max_items, window_hours, DIGEST_JOB, period_key or _period_key(cur))
+    )
+    columns = ["id", "username", "email", "unread_count", "titles"]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def run_streak_reminders(dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Create streak reminder notifications and emails for at-risk streaks.
+
+    Args:
+        dry_run: Select and render only; nothing is written or sent
+
+    Returns:
+        dict with recipient, notification and email counts
+    """
+    started = time.time()
+    with _job_lock(STREAK_JOB_LOCK) as cur:
+        if cur is None:
+            return {'success': False, 'error': 'Streak reminder job is already running'}
+        period_key = _period_key(cur)
+        recipients = select_streak_reminder_recipients(cur, period_key)
+        if not dry_run:
+            recipients = _claim_recipients(cur, STREAK_JOB, period_key, recipients)
+    return _run_streak_batch(recipients, started, dry_run, period_key)
+
+
+def _run_streak_batch(recipients: List[Dict[str, Any]], started: float, dry_run: bool,
+                      period_key: Optional[str] = None) -> Dict[str, Any]:
+    # In-app notifications: one bulk insert per distinct message; email
+    # retries already have theirs
+    groups: Dict[Tuple[str, int], List[Any]] = {}
+    for recipient in recipients:
+        if recipient.get('email_retry'):
+            continue
+        days = recipient['current_streak']
+        groups.setdefault((streak_reminder_variant(days), days), []).append(recipient['id'])
+
+    created = 0
+    if not dry_run:
+        for (variant, days), user_ids in groups.items():
+            result = create_bulk_notification(
+                user_ids,
+                'STREAK_REMINDER',
+                'Learning Streak Alert',
+                STREAK_REMINDER_MESSAGES[variant].format(days=days),
+                link='/dashboard',
+                metadata={'current_streak': days},
+                check_preferences=False
+            )
+            created += result.get('created_count', 0)
+
+    # Emails: templates rendered once per variant
+    link = f"{FRONTEND_URL}/dashboard"
+    templates = {
+        variant: _render_variant(
+            "Don't break your streak!",
+            message.replace("{days}", "$days") + "\nComplete a lesson today to keep it going.",
+            f"<p>{html.escape(message).replace('{days}', '$days')}</p><p>Complete a lesson today to keep it going.</p>",
+            link,
+            "Continue learning"
+        )
+        for variant, message in STREAK_REMINDER_MESSAGES.items()
+    }
+    messages = []
+    for recipient in recipients:
+        if not _wants_email(recipient):
+            continue
+        plain, rich = templates[streak_reminder_variant(recipient['current_streak'])]
+        fields = {'username': recipient['username'], 'days': recipient['current_streak']}
+        messages.append((
+            _build_message(
+                recipient['email'],
+                "Your learning streak ends tonight",
+                plain.safe_substitute(fields),
+                rich.safe_substitute(username=html.escape(recipient['username']), days=recipient['current_streak'])
+            ),
+            recipient['email']
+        ))
+
+    email_result = {'sent': 0, 'failed': 0, 'failed_recipients': []}
+    if not dry_run:
+        email_result = get_smtp_pool().send_many(messages)
+        if period_key:
+            _record_email_results(STREAK_JOB, period_key, recipients, email_result['failed_recipients'])
+
+    summary = {
+        'success': True,
+        'recipients': len(recipients),
+        'email_retries': sum(1 for recipient in recipients if recipient.get('email_retry')),
+        'notifications_created': created,
+        'emails_queued': len(messages),
+        'emails_sent': email_result['sent'],
+        'emails_failed': email_result['failed'],
+        'dry_run': dry_run,
+        'duration_seconds': round(time.time() - started, 2)
+    }
+    logger.info(f"Streak reminder batch finished: {summary}")
+    return summary
+
+
+def run_notification_digest(dry_run: bool = False,
+                            window_hours: int = NOTIFICATION_DIGEST_WINDOW_HOURS) -> Dict[str, Any]:
+    """
+    Email each user a digest of their recent unread notifications.
+
+    Args:
+        dry_run: Select and render only; nothing is sent
+        window_hours: Include notifications created within this many hours
+
+    Returns:
+        dict with recipient and email counts
+    """
+    started = time.time()
+    with _job_lock(DIGEST_JOB_LOCK) as cur:
+        if cur is None:
+            return {'success': False, 'error': 'Digest job is already running'}
+        period_key = _period_key(cur)
+        recipients = select_digest_recipients(cur, window_hours, period_key=period_key)
+        if not dry_run:
+            recipients = _claim_recipients(cur, DIGEST_JOB, period_key, recipients)
+    return _run_digest_batch(recipients, started, dry_run, period_key)
+
+
+def _run_digest_batch(recipients: List[Dict[str, Any]], started: float, dry_run: bool,
+                      period_key: Optional[str] = None) -> Dict[str, Any]:
+    plain, rich = _render_variant(
+        "Your learning digest",
+        "You have $count unread notifications:\n$items",
+        "<p>You have <strong>$count</strong> unread notifications:</p><ul>$items</ul>",
+        f"{FRONTEND_URL}/notifications",
+        "View notifications"
+    )
+
+    messages = []
+    for recipient in recipients:
+        if not recipient['email']:
+            continue
+        titles = recipient['titles'] or []
+        messages.append((
+            _build_message(
+                recipient['email'],
+                f"You have {recipient['unread_count']} unread notifications",
+                plain.safe_substitute(
+                    username=recipient['username'],
+                    count=recipient['unread_count'],
+                    items="\n".join(f"- {title}" for title in titles)
+                ),
+                rich.safe_substitute(
+                    username=html.escape(recipient['username']),
+                    count=recipient['unread_count'],
+                    items="".join(f"<li>{html.escape(title)}</li>" for title in titles)
+                )
+            ),
+            recipient['email']
+        ))
+
+    email_result = {'sent': 0, 'failed': 0, 'failed_recipients': []}
+    if not dry_run:
+        email_result = get_smtp_pool().send_many(messages)
+        if period_key:
+            _record_email_results(DIGEST_JOB, period_key, recipients, email_result['failed_recipients'])
+
+    summary = {
+        'success': True,
+        'recipients': len(recipients),
+        'emails_queued': len(messages),
+        'emails_sent': email_result['sent'],
+        'emails_failed': email_result['failed'],
+        'dry_run': dry_run,
+        'duration_seconds': round(time.time() - started, 2)
+    }
+    logger.info(f"Notification digest batch finished: {summary}")
+    return summary
+
+
+def run_nightly_batch(dry_run: bool = False) -> Dict[str, Any]:
+    """Run every notification batch job"""
+    return {
+        'streak_reminders': run_streak_reminders(dry_run),
+        'digest': run_notification_digest(dry_run)
+    }
+
+
+_scheduler_thread: Optional[threading.Thread] = None
+
+
+def _seconds_until(hour: int) -> float:
+    now = datetime.utcnow()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def _scheduler_loop(hour: int) -> None:
+    while True:
+        time.sleep(_seconds_until(hour))
+        try:
+            run_nightly_batch()
+        except Exception as e:
+            logger.error(f"Notification batch failed: {e}")
+
+
+def start_batch_scheduler(hour: int = NOTIFICATION_BATCH_HOUR) -> bool:
+    """
+    Run the nightly batch daily at the given UTC hour in a background thread.
+
+    Safe to call from every worker: the advisory locks let only one run
+    each job. Does nothing unless NOTIFICATION_BATCH_ENABLED is true.
+    """
+    global _scheduler_thread
+    if not NOTIFICATION_BATCH_ENABLED:
+        return False
+    if _scheduler_thread is None or not _scheduler_thread.is_alive():
+        _scheduler_thread = threading.Thread(
+            target=_scheduler_loop, args=(hour,), name="notification-batch", daemon=True
+        )
+        _scheduler_thread.start()
+        logger.info(f"Notification batch scheduled daily at {hour:02d}:00 UTC")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run notification batch jobs")
+    parser.add_argument("--job", choices=["streak", "digest", "all"], default="all")
+    parser.add_argument("--dry-run", action="store_true", help="Select and render without writing or sending")
+    args = parser.parse_args()
+
+    if args.job == "streak":
+        print(run_streak_reminders(args.dry_run))
+    elif args.job == "digest":
+        print(run_notification_digest(args.dry_run))
+    else:
+        print(run_nightly_batch(args.dry_run))
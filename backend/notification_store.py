@@ -1,18 +1,27 @@
 # Notification store module for managing user notifications
 # This module handles all database operations for notifications
 
+import io
 import os
+import csv
 import uuid
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 import json
 
+from psycopg2.extras import execute_values
+
 # Import database connection
-from database import get_db_connection
+from database import get_db_connection, get_postgres_manager
+from notification_counters import notification_counters, UNREAD, TOTAL
 
 # Database schema configuration
 DB_SCHEMA = os.getenv("DB_SCHEMA", "jeseci_academy")
 
+# Fan-out tuning: multi-row INSERT below the threshold, COPY at or above it
+NOTIFICATION_COPY_THRESHOLD = int(os.getenv("NOTIFICATION_COPY_THRESHOLD", "500"))
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.getenv("NOTIFICATION_FANOUT_CHUNK_SIZE", "5000"))
+
 # Notification types enum
 NOTIFICATION_TYPES = [
     'ACHIEVEMENT',
@@ -40,6 +49,46 @@ DEFAULT_PREFERENCES = {
 }
 
 
+def _release_connection(conn) -> None:
+    """Return a pooled connection"""
+    get_postgres_manager().return_connection(conn)
+
+
+def _encode_cursor(created_at: datetime, notification_id: str) -> str:
+    """Build the keyset cursor for the row after which the next page starts"""
+    return f"{created_at.isoformat()}|{notification_id}"
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    created_at, notification_id = cursor.rsplit("|", 1)
+    return datetime.fromisoformat(created_at), str(uuid.UUID(notification_id))
+
+
+def _load_counts(cur, user_id: str) -> Dict[str, int]:
+    """Count unread and total notifications in one query and cache them"""
+    cur.execute(
+        f"""
+        SELECT COUNT(*) FILTER (WHERE is_read = FALSE), COUNT(*)
+        FROM {DB_SCHEMA}.notifications
+        WHERE user_id = %s AND is_archived = FALSE
+        """,
+        (user_id,)
+    )
+    unread, total = cur.fetchone()
+    notification_counters.set(user_id, UNREAD, unread)
+    notification_counters.set(user_id, TOTAL, total)
+    return {UNREAD: unread, TOTAL: total}
+
+
+def _get_counts(cur, user_id: str) -> Dict[str, int]:
+    """Get cached unread and total counts, loading them on a miss"""
+    unread = notification_counters.get(user_id, UNREAD)
+    total = notification_counters.get(user_id, TOTAL)
+    if unread is None or total is None:
+        return _load_counts(cur, user_id)
+    return {UNREAD: unread, TOTAL: total}
+
+
 def create_notification(
     user_id: str,
     notification_type: str,
@@ -110,6 +159,7 @@ def create_notification(
 
             result = cur.fetchone()
             conn.commit()
+            notification_counters.adjust([user_id], 1)
 
             return {
                 'success': True,
@@ -135,7 +185,115 @@ def create_notification(
             'error': str(e)
         }
     finally:
-        conn.close()
+        _release_connection(conn)
+
+
+def create_bulk_notification(
+    user_ids: List[str],
+    notification_type: str,
+    title: str,
+    message: str,
+    link: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    check_preferences: bool = True
+) -> Dict[str, Any]:
+    """
+    Create the same notification for many users (announcements, system alerts)
+
+    Users who disabled the notification type are skipped with a single
+    preferences query. Rows are written with a multi-row INSERT, or with
+    COPY for large recipient lists, in chunks of NOTIFICATION_FANOUT_CHUNK_SIZE.
+
+    Args:
+        user_ids: Recipient user IDs
+        notification_type: Type of notification (from NOTIFICATION_TYPES)
+        title: Notification title
+        message: Notification message body
+        link: Optional URL to navigate to
+        metadata: Optional additional context data
+        check_preferences: Skip users who disabled the type; callers whose
+            recipient query already applied preferences can pass False
+
+    Returns:
+        dict with created_count and skipped_count
+    """
+    if notification_type not in NOTIFICATION_TYPES:
+        return {'success': False, 'error': f"Invalid notification type: {notification_type}"}
+
+    recipients = list(dict.fromkeys(str(user_id) for user_id in user_ids if user_id))
+    if not recipients:
+        return {'success': True, 'created_count': 0, 'skipped_count': 0}
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            disabled = set()
+            if check_preferences:
+                cur.execute(
+                    f"""
+                    SELECT user_id::text FROM {DB_SCHEMA}.notification_preferences
+                    WHERE user_id = ANY(%s::int[])
+                      AND (types_config ->> %s)::boolean = FALSE
+                    """,
+                    (recipients, notification_type)
+                )
+                disabled = {row[0] for row in cur.fetchall()}
+            targets = [user_id for user_id in recipients if user_id not in disabled]
+
+            metadata_json = json.dumps(metadata) if metadata else '{}'
+            for start in range(0, len(targets), NOTIFICATION_FANOUT_CHUNK_SIZE):
+                chunk = targets[start:start + NOTIFICATION_FANOUT_CHUNK_SIZE]
+                rows = [
+                    (str(uuid.uuid4()), user_id, notification_type, title, message, link, metadata_json)
+                    for user_id in chunk
+                ]
+                if len(rows) >= NOTIFICATION_COPY_THRESHOLD:
+                    buffer = io.StringIO()
+                    # Quoted fields are never NULL in CSV COPY, so empty titles
+                    # and messages stay empty strings; only an empty link is NULL
+                    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+                    for row in rows:
+                        writer.writerow(['' if value is None else value for value in row])
+                    buffer.seek(0)
+                    cur.copy_expert(
+                        f"""
+                        COPY {DB_SCHEMA}.notifications (id, user_id, type, title, message, link, metadata)
+                        FROM STDIN WITH (FORMAT csv, FORCE_NULL (link))
+                        """,
+                        buffer
+                    )
+                else:
+                    execute_values(
+                        cur,
+                        f"""
+                        INSERT INTO {DB_SCHEMA}.notifications (
+                            id, user_id, type, title, message, link, metadata
+                        ) VALUES %s
+                        """,
+                        rows,
+                        page_size=len(rows)
+                    )
+
+            conn.commit()
+            notification_counters.adjust(targets, 1)
+
+            return {
+                'success': True,
+                'created_count': len(targets),
+                'skipped_count': len(recipients) - len(targets)
+            }
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error creating bulk notification: {e}")
+        return {
+            'success': False,
+            'error': str(e),
+            'created_count': 0,
+            'skipped_count': 0
+        }
+    finally:
+        _release_connection(conn)
 
 
 def get_notifications(
@@ -143,17 +301,22 @@ def get_notifications(
     limit: int = 20,
     offset: int = 0,
     filter_type: Optional[str] = None,
-    unread_only: bool = False
+    unread_only: bool = False,
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Get notifications for a user
 
+    Pages are keyset-based: pass the returned next_cursor as cursor to get
+    the following page. offset is still honoured when no cursor is given.
+
     Args:
         user_id: The user's UUID
         limit: Maximum number of notifications to return
-        offset: Number of notifications to skip
+        offset: Number of notifications to skip (when no cursor is given)
         filter_type: Optional type to filter by
         unread_only: If True, only return unread notifications
+        cursor: Keyset cursor from a previous page
 
     Returns:
         dict with notifications list and metadata
@@ -177,22 +340,33 @@ def get_notifications(
             if unread_only:
                 base_query += " AND is_read = FALSE"
 
-            # Get total count
-            count_query = "SELECT COUNT(*) " + base_query.replace("SELECT id, user_id, type, title, message, link, is_read, is_archived, metadata, created_at", "")
-            cur.execute(count_query, params)
-            total_count = cur.fetchone()[0]
+            counts = _get_counts(cur, user_id)
+            unread_count = counts[UNREAD]
+            if filter_type:
+                count_query = f"SELECT COUNT(*) FROM {DB_SCHEMA}.notifications WHERE user_id = %s AND is_archived = FALSE AND type = %s"
+                if unread_only:
+                    count_query += " AND is_read = FALSE"
+                cur.execute(count_query, (user_id, filter_type))
+                total_count = cur.fetchone()[0]
+            else:
+                total_count = unread_count if unread_only else counts[TOTAL]
 
-            # Get unread count
-            unread_query = f"SELECT COUNT(*) FROM {DB_SCHEMA}.notifications WHERE user_id = %s AND is_archived = FALSE AND is_read = FALSE"
-            cur.execute(unread_query, (user_id,))
-            unread_count = cur.fetchone()[0]
+            if cursor:
+                cursor_created_at, cursor_id = _decode_cursor(cursor)
+                base_query += " AND (created_at, id) < (%s, %s::uuid)"
+                params.extend([cursor_created_at, cursor_id])
 
-            # Add ordering and pagination
-            base_query += " ORDER BY created_at DESC LIMIT %s OFFSET %s"
-            params.extend([limit, offset])
+            # Fetch one extra row to know whether another page exists
+            base_query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+            params.append(limit + 1)
+            if offset and not cursor:
+                base_query += " OFFSET %s"
+                params.append(offset)
 
             cur.execute(base_query, params)
             rows = cur.fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
 
             notifications = []
             for row in rows:
@@ -213,12 +387,17 @@ def get_notifications(
                     'created_at': row[9].isoformat() if row[9] else None
                 })
 
+            next_cursor = None
+            if has_more and rows:
+                next_cursor = _encode_cursor(rows[-1][9], str(rows[-1][0]))
+
             return {
                 'success': True,
                 'notifications': notifications,
                 'total_count': total_count,
                 'unread_count': unread_count,
-                'has_more': (offset + len(notifications)) < total_count
+                'has_more': has_more,
+                'next_cursor': next_cursor
             }
 
     except Exception as e:
@@ -229,33 +408,37 @@ def get_notifications(
             'notifications': [],
             'total_count': 0,
             'unread_count': 0,
-            'has_more': False
+            'has_more': False,
+            'next_cursor': None
         }
     finally:
-        conn.close()
+        _release_connection(conn)
 
 
 def get_unread_count(user_id: str) -> Dict[str, Any]:
     """
     Get the count of unread notifications for a user
 
+    Served from the notification counter cache; the database is only
+    queried when the counter is not cached.
+
     Args:
         user_id: The user's UUID
 
     Returns:
         dict with unread_count
     """
+    count = notification_counters.get(user_id, UNREAD)
+    if count is not None:
+        return {
+            'success': True,
+            'unread_count': count
+        }
+
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
-            cur.execute(
-                f"""
-                SELECT COUNT(*) FROM {DB_SCHEMA}.notifications
-                WHERE user_id = %s AND is_archived = FALSE AND is_read = FALSE
-                """,
-                (user_id,)
-            )
-            count = cur.fetchone()[0]
+            count = _load_counts(cur, user_id)[UNREAD]
 
             return {
                 'success': True,
@@ -270,7 +453,7 @@ def get_unread_count(user_id: str) -> Dict[str, Any]:
             'unread_count': 0
         }
     finally:
-        conn.close()
+        _release_connection(conn)
 
 
 def mark_as_read(user_id: str, notification_ids: List[str]) -> Dict[str, Any]:
@@ -297,13 +480,18 @@ def mark_as_read(user_id: str, notification_ids: List[str]) -> Dict[str, Any]:
                 f"""
                 UPDATE {DB_SCHEMA}.notifications
                 SET is_read = TRUE
-                WHERE user_id = %s AND id = ANY(%s) AND is_read = FALSE
+                WHERE user_id = %s AND id = ANY(%s::uuid[]) AND is_read = FALSE
+                RETURNING is_archived
                 """,
                 (user_id, id_list)
             )
 
-            updated_count = cur.rowcount
+            archived_flags = [row[0] for row in cur.fetchall()]
+            updated_count = len(archived_flags)
             conn.commit()
+            notification_counters.adjust(
+                [user_id], -archived_flags.count(False), kinds=(UNREAD,)
+            )
 
             return {
                 'success': True,
@@ -319,7 +507,7 @@ def mark_as_read(user_id: str, notification_ids: List[str]) -> Dict[str, Any]:
             'updated_count': 0
         }
     finally:
-        conn.close()
+        _release_connection(conn)
 
 
 def mark_all_as_read(user_id: str) -> Dict[str, Any]:
@@ -346,6 +534,7 @@ def mark_all_as_read(user_id: str) -> Dict[str, Any]:
 
             updated_count = cur.rowcount
             conn.commit()
+            notification_counters.set(user_id, UNREAD, 0)
 
             return {
                 'success': True,
@@ -361,7 +550,7 @@ def mark_all_as_read(user_id: str) -> Dict[str, Any]:
             'updated_count': 0
         }
     finally:
-        conn.close()
+        _release_connection(conn)
 
 
 def delete_notification(user_id: str, notification_id: str) -> Dict[str, Any]:
@@ -380,15 +569,27 @@ def delete_notification(user_id: str, notification_id: str) -> Dict[str, Any]:
         with conn.cursor() as cur:
             cur.execute(
                 f"""
-                UPDATE {DB_SCHEMA}.notifications
+                UPDATE {DB_SCHEMA}.notifications AS n
                 SET is_archived = TRUE
-                WHERE user_id = %s AND id = %s
+                FROM (
+                    SELECT id, is_archived, is_read
+                    FROM {DB_SCHEMA}.notifications
+                    WHERE user_id = %s AND id = %s
+                    FOR UPDATE
+                ) AS previous
+                WHERE n.id = previous.id
+                RETURNING previous.is_archived, previous.is_read
                 """,
                 (user_id, notification_id)
             )
 
-            success = cur.rowcount > 0
+            row = cur.fetchone()
+            success = row is not None
             conn.commit()
+            if success and not row[0]:
+                notification_counters.adjust([user_id], -1, kinds=(TOTAL,))
+                if not row[1]:
+                    notification_counters.adjust([user_id], -1, kinds=(UNREAD,))
 
             return {
                 'success': success,
@@ -403,7 +604,7 @@ def delete_notification(user_id: str, notification_id: str) -> Dict[str, Any]:
             'error': str(e)
         }
     finally:
-        conn.close()
+        _release_connection(conn)
 
 
 def get_notification_preferences(user_id: str) -> Dict[str, Any]:
@@ -466,7 +667,7 @@ def get_notification_preferences(user_id: str) -> Dict[str, Any]:
             'preferences': {**DEFAULT_PREFERENCES}
         }
     finally:
-        conn.close()
+        _release_connection(conn)
 
 
 def update_notification_preferences(
@@ -565,7 +766,7 @@ def update_notification_preferences(
             'error': str(e)
         }
     finally:
-        conn.close()
+        _release_connection(conn)
 
 
 def create_achievement_notification(
@@ -586,20 +787,33 @@ def create_achievement_notification(
     )
 
 
+# Streak reminder message per variant; {days} is the current streak
+STREAK_REMINDER_MESSAGES = {
+    'start': "Start your learning streak today! Complete a lesson to begin.",
+    'building': "You're on a {days}-day streak! Keep it up!",
+    'strong': "Amazing! {days} days and counting. You're unstoppable!",
+    'master': "Incredible! {days} days straight. You're a true Jac master!"
+}
+
+
+def streak_reminder_variant(current_streak: int) -> str:
+    """Pick the streak reminder message variant for a streak length"""
+    if current_streak <= 1:
+        return 'start'
+    if current_streak < 7:
+        return 'building'
+    if current_streak < 30:
+        return 'strong'
+    return 'master'
+
+
 def create_streak_reminder_notification(
     user_id: str,
     current_streak: int,
     link: Optional[str] = '/dashboard'
 ) -> Dict[str, Any]:
     """Helper to create a streak reminder notification"""
-    if current_streak == 1:
-        message = "Start your learning streak today! Complete a lesson to begin."
-    elif current_streak < 7:
-        message = f"You're on a {current_streak}-day streak! Keep it up!"
-    elif current_streak < 30:
-        message = f"Amazing! {current_streak} days and counting. You're unstoppable!"
-    else:
-        message = f"Incredible! {current_streak} days straight. You're a true Jac master!"
+    message = STREAK_REMINDER_MESSAGES[streak_reminder_variant(current_streak)].format(days=current_streak)
 
     return create_notification(
         user_id=user_id,
@@ -631,3 +845,25 @@ def create_course_milestone_notification(
             'progress_percent': progress_percent
         }
     )
+
+
+def create_course_milestone_notifications(
+    user_ids: List[str],
+    course_name: str,
+    milestone_name: str,
+    progress_percent: int,
+    link: Optional[str] = None
+) -> Dict[str, Any]:
+    """Helper to notify every learner who reached the same course milestone"""
+    return create_bulk_notification(
+        user_ids=user_ids,
+        notification_type='COURSE_MILESTONE',
+        title=f'Course Progress: {course_name}',
+        message=f"Congratulations! You've reached the '{milestone_name}' milestone at {progress_percent}% completion.",
+        link=link,
+        metadata={
+            'course_name': course_name,
+            'milestone_name': milestone_name,
+            'progress_percent': progress_percent
+        }
+    )
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Service - Off-loop bcrypt hashing and verification
+
+bcrypt at cost 12 takes hundreds of milliseconds of CPU per call. Running it
+on the request thread (or on the event loop inside an async endpoint) stalls
+every other request handled by that worker. This service runs hashing and
+verification in a dedicated process pool with bounded concurrency, and keeps
+queue-depth metrics so saturation is visible.
+
+Features:
+- Dedicated ProcessPoolExecutor sized by PASSWORD_HASH_WORKERS
+- Bounded number of pending operations (PASSWORD_HASH_MAX_PENDING); callers
+  beyond the bound wait up to PASSWORD_HASH_QUEUE_WAIT seconds for a slot,
+  so a login burst is smoothed out, and are only rejected after that
+- Worker processes are spawned rather than forked, since forking a threaded
+  server can copy held locks into the child
+- Sync and async entry points
+- Falls back to hashing in-process if the pool cannot be started
+
+Author: Cavin Otieno
+"""
+
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Any, Dict, Optional
+
+import bcrypt
+
+from logger_config import logger
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+PASSWORD_HASH_QUEUE_WAIT = float(os.getenv("PASSWORD_HASH_QUEUE_WAIT", "5"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when no pending-operation slot frees up within the queue wait"""
+
+
+def _hashpw(password: str, rounds: int) -> str:
+    """Hash a password (runs in a pool process)"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _checkpw(password: str, password_hash: str) -> bool:
+    """Verify a password against its hash (runs in a pool process)"""
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed stored hash
+        return False
+
+
+class PasswordHashingService:
+    """
+    Runs bcrypt operations in a process pool with bounded concurrency.
+
+    At most `workers` operations execute at a time; up to `max_pending`
+    operations may be queued or running, and further callers wait up to
+    `queue_wait` seconds for one to finish. The pool is started lazily.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING,
+                 timeout: float = PASSWORD_HASH_TIMEOUT,
+                 queue_wait: float = PASSWORD_HASH_QUEUE_WAIT):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.timeout = timeout
+        self.queue_wait = queue_wait
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_failed = False
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "waited": 0,
+            "errors": 0,
+            "inline": 0,
+            "peak_pending": 0,
+            "total_seconds": 0.0
+        }
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and not self._executor_failed:
+            with self._lock:
+                if self._executor is None and not self._executor_failed:
+                    try:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context("spawn")
+                        )
+                        logger.info(f"Password hashing pool started with {self.workers} workers")
+                    except Exception as e:
+                        logger.warning(f"Password hashing pool unavailable, hashing in-process: {e}")
+                        self._executor_failed = True
+        return self._executor
+
+    def _acquire_slot(self) -> None:
+        """Wait up to queue_wait for a pending-operation slot"""
+        if self._slots.acquire(blocking=False):
+            return
+        with self._lock:
+            self._stats["waited"] += 1
+        if not self._slots.acquire(timeout=self.queue_wait):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise PasswordHashingBusy("Too many pending password hashing operations")
+
+    async def _acquire_slot_async(self) -> None:
+        """Like _acquire_slot, waiting in a thread so the event loop keeps running"""
+        if self._slots.acquire(blocking=False):
+            return
+        await asyncio.to_thread(self._acquire_slot)
+
+    def _submit(self, fn, *args) -> Future:
+        """Submit an operation; the caller must hold a slot"""
+        started = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+            self._stats["submitted"] += 1
+            self._stats["peak_pending"] = max(self._stats["peak_pending"], self._pending)
+
+        def _release(future: Future) -> None:
+            with self._lock:
+                self._pending -= 1
+                self._stats["completed"] += 1
+                self._stats["total_seconds"] += time.perf_counter() - started
+                if future.exception() is not None:
+                    self._stats["errors"] += 1
+            self._slots.release()
+
+        executor = self._get_executor()
+        if executor is None:
+            future: Future = Future()
+            with self._lock:
+                self._stats["inline"] += 1
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            try:
+                future = executor.submit(fn, *args)
+            except Exception:
+                # Pool broken (e.g. a worker was killed); restart it on next use
+                with self._lock:
+                    self._executor = None
+                    self._pending -= 1
+                self._slots.release()
+                raise
+        future.add_done_callback(_release)
+        return future
+
+    def hash_password(self, password: str, rounds: int = PASSWORD_HASH_ROUNDS) -> str:
+        """Hash a password, blocking the calling thread until done"""
+        self._acquire_slot()
+        return self._submit(_hashpw, password, rounds).result(timeout=self.timeout)
+
+    def verify_password(self, password: str, password_hash: str) -> bool:
+        """Verify a password, blocking the calling thread until done"""
+        self._acquire_slot()
+        return self._submit(_checkpw, password, password_hash).result(timeout=self.timeout)
+
+    async def hash_password_async(self, password: str, rounds: int = PASSWORD_HASH_ROUNDS) -> str:
+        """Hash a password without blocking the event loop"""
+        await self._acquire_slot_async()
+        future = asyncio.wrap_future(self._submit(_hashpw, password, rounds))
+        return await asyncio.wait_for(future, self.timeout)
+
+    async def verify_password_async(self, password: str, password_hash: str) -> bool:
+        """Verify a password without blocking the event loop"""
+        await self._acquire_slot_async()
+        future = asyncio.wrap_future(self._submit(_checkpw, password, password_hash))
+        return await asyncio.wait_for(future, self.timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and throughput metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending
+        stats["queue_depth"] = max(0, stats["pending"] - self.workers)
+        stats["workers"] = self.workers
+        stats["max_pending"] = self.max_pending
+        stats["avg_seconds"] = (
+            round(stats["total_seconds"] / stats["completed"], 4) if stats["completed"] else 0.0
+        )
+        stats["total_seconds"] = round(stats["total_seconds"], 4)
+        return stats
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+            logger.info("Password hashing pool shut down")
+
+
+_service: Optional[PasswordHashingService] = None
+_service_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHashingService:
+    """Get the shared password hashing service"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PasswordHashingService()
+    return _service
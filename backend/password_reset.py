@@ -13,6 +13,7 @@ License: MIT License
 
 import os
 import secrets
+import threading
 from datetime import datetime, timedelta, timezone
 import psycopg2
 from psycopg2 import pool, extras
@@ -41,11 +42,11 @@ class PasswordResetManager:
     
     _instance = None
     _pool = None
+    _pool_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._initialize_pool()
         return cls._instance
     
     def _initialize_pool(self):
@@ -78,9 +79,11 @@ class PasswordResetManager:
         }
     
     def _get_connection(self):
-        """Get a connection from the pool"""
+        """Get a connection from the pool, opening it on first use"""
         if PasswordResetManager._pool is None:
-            self._initialize_pool()
+            with PasswordResetManager._pool_lock:
+                if PasswordResetManager._pool is None:
+                    self._initialize_pool()
         if PasswordResetManager._pool:
             return PasswordResetManager._pool.getconn()
         return None
@@ -389,20 +392,15 @@ reset_manager = PasswordResetManager()
 
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    import bcrypt
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
+    """Hash a password using bcrypt (runs in the password hashing pool)"""
+    from password_hashing import get_password_hasher
+    return get_password_hasher().hash_password(password)
 
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password against its hash"""
-    import bcrypt
-    password_bytes = password.encode('utf-8')
-    hashed_bytes = hashed.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
+    """Verify a password against its hash (runs in the password hashing pool)"""
+    from password_hashing import get_password_hasher
+    return get_password_hasher().verify_password(password, hashed)
 
 
 def send_password_reset_email(email: str, username: str, reset_link: str) -> bool:
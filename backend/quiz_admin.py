@@ -31,6 +31,7 @@ sys.path.insert(0, os.path.dirname(__file__))
 # Import modules
 import admin_auth
 from admin_auth import AdminRole, ContentAdminUser, AnalyticsAdminUser, SuperAdminUser
+from quiz_catalog import CatalogIndex, field, multi_field
 
 # =============================================================================
 # Quiz Management Models
@@ -194,7 +195,30 @@ class QuizManager:
         self.question_bank = {}
         self.quiz_attempts = {}
         self.quiz_analytics = {}
+        # Secondary indexes over quizzes_db and the question bank
+        self.quiz_catalog = CatalogIndex({
+            "status": field("status"),
+            "difficulty": field("difficulty"),
+            "concept_id": field("concept_id"),
+            "course_id": field("course_id"),
+            "topic": multi_field("tags"),
+        }, sort_key=lambda quiz: quiz.get("created_at", ""), sums={
+            "question_count": lambda quiz: quiz.get("question_count", 0),
+            "total_points": lambda quiz: quiz.get("total_points", 0),
+        })
+        self.question_catalog = CatalogIndex({
+            "category": field("category"),
+            "difficulty": field("difficulty"),
+            "topic": multi_field("tags"),
+        })
+        # Per-quiz attempt aggregates, so analytics don't rescan every attempt
+        self.attempt_stats = {}
         self._init_sample_data()
+        self.quiz_catalog.add_many(self.quizzes_db.items())
+        for category, bank in self.question_bank.items():
+            self._index_bank_questions(category, bank["questions"])
+        for attempt in self.quiz_attempts.values():
+            self._update_attempt_stats(attempt)
 
     def get_domain_for_category(self, category: str, provided_domain: Optional[str] = None) -> str:
         """
@@ -336,10 +360,35 @@ class QuizManager:
             }
         }
 
+    def _update_attempt_stats(self, attempt: Dict[str, Any], weight: int = 1):
+        """Fold one attempt into the running aggregates of its quiz (weight -1 takes it out)"""
+        stats = self.attempt_stats.setdefault(attempt.get("quiz_id"), {
+            "attempts": 0,
+            "completions": 0,
+            "completion_score_sum": 0.0,
+            "time_sum": 0
+        })
+        stats["attempts"] += weight
+        stats["time_sum"] += weight * attempt.get("time_taken", 0)
+        if attempt.get("passed", False):
+            stats["completions"] += weight
+            stats["completion_score_sum"] += weight * attempt.get("score", 0)
+
+    def record_attempt(self, attempt: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a graded quiz attempt and fold it into its quiz's attempt stats"""
+        attempt_id = attempt.get("attempt_id") or f"attempt_{uuid.uuid4().hex[:12]}"
+        attempt["attempt_id"] = attempt_id
+        previous = self.quiz_attempts.get(attempt_id)
+        if previous is not None:
+            # Regraded attempt: take the old grade out before adding the new one
+            self._update_attempt_stats(previous, weight=-1)
+        self.quiz_attempts[attempt_id] = attempt
+        self._update_attempt_stats(attempt)
+        return {"success": True, "attempt_id": attempt_id}
+
     def calculate_quiz_analytics(self, quiz_id: str) -> Dict[str, Any]:
         """
-        Calculate quiz analytics dynamically from actual quiz attempt data.
-        In production, this would query the quiz attempts database.
+        Calculate quiz analytics from the running per-quiz attempt aggregates.
         """
         if quiz_id not in self.quiz_analytics:
             return {
@@ -355,23 +404,17 @@ class QuizManager:
                 "last_updated": datetime.now().isoformat()
             }
 
-        # Get attempts for this quiz
-        attempts = [a for a in self.quiz_attempts.values() if a.get("quiz_id") == quiz_id]
+        stats = self.attempt_stats.get(quiz_id)
 
-        if not attempts:
+        if not stats or not stats["attempts"]:
             return self.quiz_analytics[quiz_id]
 
-        # Calculate statistics from actual attempts
-        completions = [a for a in attempts if a.get("passed", False)]
-        scores = [a.get("score", 0) for a in completions]
-        times = [a.get("time_taken", 0) for a in attempts]
-
-        total_attempts = len(attempts)
-        total_completions = len(completions)
-        completion_rate = (total_completions / total_attempts * 100) if total_attempts > 0 else 0.0
-        average_score = sum(scores) / len(scores) if scores else 0.0
-        pass_rate = (total_completions / total_attempts * 100) if total_attempts > 0 else 0.0
-        average_time = sum(times) / len(times) if times else 0
+        total_attempts = stats["attempts"]
+        total_completions = stats["completions"]
+        completion_rate = total_completions / total_attempts * 100
+        average_score = stats["completion_score_sum"] / total_completions if total_completions else 0.0
+        pass_rate = total_completions / total_attempts * 100
+        average_time = stats["time_sum"] / total_attempts
 
         return {
             "quiz_id": quiz_id,
@@ -426,6 +469,7 @@ class QuizManager:
         }
         
         self.quizzes_db[quiz_id] = quiz
+        self.quiz_catalog.add(quiz_id, quiz)
         
         return {
             "success": True,
@@ -456,6 +500,7 @@ class QuizManager:
         
         quiz["updated_at"] = datetime.now().isoformat()
         quiz["last_updated_by"] = admin_user.get("user_id")
+        self.quiz_catalog.add(quiz_id, quiz)
         
         return {
             "success": True,
@@ -464,57 +509,54 @@ class QuizManager:
         }
     
     def get_quizzes(self, limit: int = 50, offset: int = 0, filters: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Get quizzes with filtering"""
-        quizzes = list(self.quizzes_db.values())
-        
-        # Apply filters
-        if filters:
-            if filters.get("status"):
-                quizzes = [q for q in quizzes if q.get("status") == filters["status"]]
-            if filters.get("difficulty"):
-                quizzes = [q for q in quizzes if q.get("difficulty") == filters["difficulty"]]
-            if filters.get("concept_id"):
-                quizzes = [q for q in quizzes if q.get("concept_id") == filters["concept_id"]]
-            if filters.get("course_id"):
-                quizzes = [q for q in quizzes if q.get("course_id") == filters["course_id"]]
-            if filters.get("search"):
-                search_term = filters["search"].lower()
-                quizzes = [
-                    q for q in quizzes 
-                    if search_term in q.get("title", "").lower() or 
-                       search_term in q.get("description", "").lower()
-                ]
-        
-        # Sort by creation date (newest first)
-        quizzes.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+        """Get quizzes with filtering, newest first, from the catalog indexes"""
+        filters = filters or {}
+        index_filters = {
+            key: filters.get(key)
+            for key in ("status", "difficulty", "concept_id", "course_id", "topic")
+        }
         
-        # Statistics
-        total = len(quizzes)
-        status_counts = {}
-        difficulty_counts = {}
+        predicate = None
+        if filters.get("search"):
+            search_term = filters["search"].lower()
+            predicate = lambda q: (search_term in q.get("title", "").lower() or
+                                   search_term in q.get("description", "").lower())
         
-        for quiz in quizzes:
-            status = quiz.get("status", "unknown")
-            status_counts[status] = status_counts.get(status, 0) + 1
-            
-            difficulty = quiz.get("difficulty", "unknown")
-            difficulty_counts[difficulty] = difficulty_counts.get(difficulty, 0) + 1
+        paginated_quizzes, total = self.quiz_catalog.search(
+            index_filters, predicate=predicate, offset=offset, limit=limit
+        )
         
-        # Apply pagination
-        paginated_quizzes = quizzes[offset:offset + limit]
+        # Statistics over every match, from the index postings
+        summary = self.quiz_catalog.summarize(
+            index_filters, predicate=predicate, count_fields=("status", "difficulty")
+        )
         
         return {
             "success": True,
             "quizzes": paginated_quizzes,
             "total": total,
             "statistics": {
-                "status_distribution": status_counts,
-                "difficulty_distribution": difficulty_counts,
-                "average_questions": statistics.mean([q.get("question_count", 0) for q in quizzes]) if quizzes else 0,
-                "total_points_available": sum(q.get("total_points", 0) for q in quizzes)
+                "status_distribution": summary["counts"]["status"],
+                "difficulty_distribution": summary["counts"]["difficulty"],
+                "average_questions": summary["sums"]["question_count"] / total if total else 0,
+                "total_points_available": summary["sums"]["total_points"]
             }
         }
     
+    def _index_bank_questions(self, category: str, questions: List[Dict[str, Any]]):
+        """Add question bank entries to the question catalog"""
+        for question in questions:
+            self.question_catalog.add(question["question_id"], {**question, "category": category})
+    
+    def find_bank_questions(self, category: Optional[str] = None, difficulty: Optional[str] = None,
+                            topic: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Look up question bank entries by category, difficulty and topic tag"""
+        questions, _ = self.question_catalog.search(
+            {"category": category, "difficulty": difficulty, "topic": topic},
+            limit=limit, newest_first=False
+        )
+        return questions
+    
     def add_to_question_bank(self, bank_data: Dict[str, Any], admin_user: Dict[str, Any]) -> Dict[str, Any]:
         """Add questions to the question bank"""
         category = bank_data["category"]
@@ -541,6 +583,7 @@ class QuizManager:
                 "created_by": admin_user.get("user_id"),
                 "question_count": len(bank_data["questions"])
             }
+        self._index_bank_questions(category, bank_data["questions"])
         
         return {
             "success": True,
@@ -659,6 +702,7 @@ def create_quiz_admin_router() -> APIRouter:
         difficulty: Optional[QuizDifficulty] = Query(default=None, description="Filter by difficulty"),
         concept_id: Optional[str] = Query(default=None, description="Filter by concept"),
         course_id: Optional[str] = Query(default=None, description="Filter by course"),
+        topic: Optional[str] = Query(default=None, description="Filter by topic tag"),
         search: Optional[str] = Query(default=None, description="Search title/description"),
         admin_user: Dict[str, Any] = ContentAdminUser
     ):
@@ -669,6 +713,7 @@ def create_quiz_admin_router() -> APIRouter:
                 "difficulty": difficulty,
                 "concept_id": concept_id,
                 "course_id": course_id,
+                "topic": topic,
                 "search": search
             }
             
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Quiz Catalog Index - In-memory secondary indexes for quizzes and questions
+
+Keeps a posting set per indexed field value (topic, difficulty, status,
+course, concept, ...) and, for each posting, the item ids ordered by a sort
+key such as created_at. Lookups intersect the postings of the requested
+filters instead of scanning every item, so the admin quiz grid and quiz
+generation cost grows with the result size rather than the catalog size:
+
+- no filter or a single filter value: the ordered posting is sliced directly
+- several filters: postings are intersected starting from the smallest
+- free-text search and other predicates are applied to the candidates only
+- totals, per-field counts and sums of numeric fields (kept per posting)
+  come from summarize() without materialising the list of matches
+
+Used by QuizManager (quiz_admin) and AssessmentAgent (agents/assessment).
+
+Author: Cavin Otieno
+"""
+
+import bisect
+import heapq
+import itertools
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# Key used for the posting that holds every item
+_ALL = ("*", None)
+
+
+def normalize(value: Any) -> Hashable:
+    """Index key for a field value; enums are indexed by their value"""
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def field(name: str) -> Callable[[Any], List[Hashable]]:
+    """Extractor for a single-valued field of a dict or object"""
+    def extract(item: Any) -> List[Hashable]:
+        value = item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+        return [] if value is None else [normalize(value)]
+    return extract
+
+
+def multi_field(name: str) -> Callable[[Any], List[Hashable]]:
+    """Extractor for a list-valued field (e.g. tags)"""
+    def extract(item: Any) -> List[Hashable]:
+        values = item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+        return [normalize(value) for value in (values or [])]
+    return extract
+
+
+class _Posting:
+    """Ids with one field value, as a set and ordered by sort key"""
+
+    __slots__ = ("ids", "ordered", "sums")
+
+    def __init__(self):
+        self.ids: Set[Hashable] = set()
+        self.ordered: List[Tuple[Any, int, Hashable]] = []
+        self.sums: Dict[str, float] = {}
+
+
+class CatalogIndex:
+    """
+    Items indexed by field values, with every posting ordered by a sort key.
+
+    Args:
+        fields: field name -> extractor returning the item's index keys
+        sort_key: item -> sortable key (e.g. created_at); items with equal
+            keys keep insertion order
+        sums: name -> item -> number, totalled per posting for summarize()
+    """
+
+    def __init__(self, fields: Dict[str, Callable[[Any], Iterable[Hashable]]],
+                 sort_key: Optional[Callable[[Any], Any]] = None,
+                 sums: Optional[Dict[str, Callable[[Any], float]]] = None):
+        self.fields = fields
+        self.sort_key = sort_key
+        self.sums = sums or {}
+        self._items: Dict[Hashable, Any] = {}
+        self._entries: Dict[Hashable, Tuple[Any, int, List[Tuple[str, Hashable]], Dict[str, float]]] = {}
+        self._postings: Dict[Tuple[str, Hashable], _Posting] = {_ALL: _Posting()}
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._items
+
+    def get(self, item_id: Hashable) -> Optional[Any]:
+        return self._items.get(item_id)
+
+    def add(self, item_id: Hashable, item: Any) -> None:
+        """Index an item, replacing its previous entry (call again after changing it)"""
+        with self._lock:
+            if item_id in self._entries:
+                self._unindex(item_id)
+            sort_value = self.sort_key(item) if self.sort_key else 0
+            sequence = next(self._sequence)
+            keys = [(name, key) for name, extract in self.fields.items() for key in set(extract(item))]
+            amounts = {name: amount(item) or 0 for name, amount in self.sums.items()}
+            entry = (sort_value, sequence, item_id)
+            for posting_key in [_ALL] + keys:
+                posting = self._postings.get(posting_key)
+                if posting is None:
+                    posting = self._postings[posting_key] = _Posting()
+                posting.ids.add(item_id)
+                bisect.insort(posting.ordered, entry)
+                for name, value in amounts.items():
+                    posting.sums[name] = posting.sums.get(name, 0) + value
+            self._items[item_id] = item
+            self._entries[item_id] = (sort_value, sequence, keys, amounts)
+
+    def add_many(self, items: Iterable[Tuple[Hashable, Any]]) -> None:
+        for item_id, item in items:
+            self.add(item_id, item)
+
+    def remove(self, item_id: Hashable) -> Optional[Any]:
+        with self._lock:
+            if item_id not in self._entries:
+                return None
+            self._unindex(item_id)
+            return self._items.pop(item_id)
+
+    def _unindex(self, item_id: Hashable) -> None:
+        sort_value, sequence, keys, amounts = self._entries.pop(item_id)
+        entry = (sort_value, sequence, item_id)
+        for posting_key in [_ALL] + keys:
+            posting = self._postings[posting_key]
+            posting.ids.discard(item_id)
+            for name, value in amounts.items():
+                posting.sums[name] -= value
+            position = bisect.bisect_left(posting.ordered, entry)
+            if position < len(posting.ordered) and posting.ordered[position] == entry:
+                posting.ordered.pop(position)
+            if not posting.ids and posting_key != _ALL:
+                del self._postings[posting_key]
+
+    def _posting(self, name: str, value: Any) -> Optional[_Posting]:
+        return self._postings.get((name, normalize(value)))
+
+    def _candidates(self, filters: Dict[str, Any]) -> Tuple[Optional[_Posting], Optional[Set[Hashable]]]:
+        """
+        Resolve filters to an ordered posting (one exact value or none) or
+        to an id set. A list/tuple/set filter value matches any of its values.
+        """
+        active = {name: value for name, value in (filters or {}).items()
+                  if value is not None and value != "" and value != []}
+        if not active:
+            return self._postings[_ALL], None
+
+        sets: List[Set[Hashable]] = []
+        for name, value in active.items():
+            if isinstance(value, (list, tuple, set, frozenset)):
+                union: Set[Hashable] = set()
+                for option in value:
+                    posting = self._posting(name, option)
+                    if posting is not None:
+                        union |= posting.ids
+                sets.append(union)
+            else:
+                posting = self._posting(name, value)
+                if posting is None:
+                    return None, set()
+                if len(active) == 1:
+                    return posting, None
+                sets.append(posting.ids)
+
+        sets.sort(key=len)
+        matched = set(sets[0])
+        for other in sets[1:]:
+            matched &= other
+            if not matched:
+                break
+        return None, matched
+
+    def search(self, filters: Optional[Dict[str, Any]] = None,
+               predicate: Optional[Callable[[Any], bool]] = None,
+               offset: int = 0, limit: Optional[int] = None,
+               newest_first: bool = True) -> Tuple[List[Any], int]:
+        """
+        Find items matching every filter and the optional predicate.
+
+        Only the requested page is collected; with a single ordered posting
+        and no predicate it is sliced directly from the posting.
+
+        Returns:
+            (page of items in sort order, number of matches)
+        """
+        with self._lock:
+            posting, matched = self._candidates(filters or {})
+            end = None if limit is None else offset + limit
+
+            if posting is not None:
+                ordered = reversed(posting.ordered) if newest_first else iter(posting.ordered)
+                if predicate is None:
+                    page = itertools.islice(ordered, offset, end)
+                    return [self._items[entry[2]] for entry in page], len(posting.ids)
+                page, total = [], 0
+                for entry in ordered:
+                    item = self._items[entry[2]]
+                    if predicate(item):
+                        if total >= offset and (end is None or total < end):
+                            page.append(item)
+                        total += 1
+                return page, total
+
+            if predicate is not None:
+                matched = {i for i in matched if predicate(self._items[i])}
+            order = lambda i: self._entries[i][:2]
+            if end is None:
+                page_ids = sorted(matched, key=order, reverse=newest_first)[offset:]
+            elif newest_first:
+                page_ids = heapq.nlargest(end, matched, key=order)[offset:]
+            else:
+                page_ids = heapq.nsmallest(end, matched, key=order)[offset:]
+            return [self._items[i] for i in page_ids], len(matched)
+
+    def summarize(self, filters: Optional[Dict[str, Any]] = None,
+                  predicate: Optional[Callable[[Any], bool]] = None,
+                  count_fields: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Totals over every match: the number of matches, counts per value of
+        each count field and the configured sums. With a single posting and
+        no predicate these come from the posting without visiting items.
+        """
+        with self._lock:
+            posting, matched = self._candidates(filters or {})
+            if posting is not None and predicate is None:
+                selected = None if posting is self._postings[_ALL] else posting.ids
+                return {
+                    "total": len(posting.ids),
+                    "counts": {name: self.counts(name, selected) for name in count_fields},
+                    "sums": {name: posting.sums.get(name, 0) for name in self.sums},
+                }
+
+            candidates = posting.ids if posting is not None else matched
+            if predicate is not None:
+                candidates = {i for i in candidates if predicate(self._items[i])}
+            sums = {name: 0 for name in self.sums}
+            for item_id in candidates:
+                for name, value in self._entries[item_id][3].items():
+                    sums[name] += value
+            return {
+                "total": len(candidates),
+                "counts": {name: self.counts(name, candidates) for name in count_fields},
+                "sums": sums,
+            }
+
+    def ids(self, filters: Optional[Dict[str, Any]] = None) -> Set[Hashable]:
+        """Ids matching the filters, unordered"""
+        with self._lock:
+            posting, matched = self._candidates(filters or {})
+            return set(posting.ids) if posting is not None else matched
+
+    def counts(self, name: str, ids: Optional[Iterable[Hashable]] = None) -> Dict[Hashable, int]:
+        """Number of items per value of a field, within ids (default: all items)"""
+        with self._lock:
+            values = {key: posting for (field_name, key), posting in self._postings.items()
+                      if field_name == name}
+            if ids is None:
+                return {key: len(posting.ids) for key, posting in values.items()}
+            selected = ids if isinstance(ids, (set, frozenset)) else set(ids)
+            counts = {}
+            for key, posting in values.items():
+                smaller, larger = (selected, posting.ids) if len(selected) < len(posting.ids) else (posting.ids, selected)
+                count = sum(1 for i in smaller if i in larger)
+                if count:
+                    counts[key] = count
+            return counts
+
+    def values(self, name: str) -> List[Hashable]:
+        """Distinct indexed values of a field"""
+        with self._lock:
+            return [key for (field_name, key) in self._postings if field_name == name]
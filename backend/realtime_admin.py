@@ -22,13 +22,18 @@ from enum import Enum
 import uuid
 import json
 import asyncio
+import hmac
+import time
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Query
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Query, Header
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 from admin_auth import get_current_user_from_token, AdminRole
+from realtime_broadcast import BroadcastEngine
+from live_metrics import get_live_metrics, RESOLUTIONS, METRIC_DEFINITIONS
 
 # Initialize router
 realtime_router = APIRouter()
@@ -46,6 +51,9 @@ class ConnectionManager:
     - Connection grouping by admin role
     - Broadcast to specific groups or all connections
     - Connection lifecycle management
+    
+    Outbound messages go through a BroadcastEngine, which gives every
+    connection its own bounded send queue and writer task.
     """
     
     def __init__(self):
@@ -71,6 +79,14 @@ class ConnectionManager:
         
         # Connection metadata
         self.connection_metadata: Dict[str, Dict[str, Any]] = {}
+        
+        # Per-connection send queues and cross-worker relay
+        self.broadcaster = BroadcastEngine(
+            resolve_group=lambda group_name: self.groups.get(group_name, ()),
+            on_slow_consumer=self._drop_connection
+        )
+        # id(websocket) -> websocket_id, for send_personal_message
+        self._socket_ids: Dict[int, str] = {}
     
     async def connect(self, websocket: WebSocket, admin_id: str, admin_role: str):
         """Accept new WebSocket connection"""
@@ -80,6 +96,8 @@ class ConnectionManager:
         
         self.active_connections[websocket_id] = websocket
         self.admin_connections.setdefault(admin_id, set()).add(websocket_id)
+        self._socket_ids[id(websocket)] = websocket_id
+        self.broadcaster.register(websocket_id, websocket)
         
         # Add to appropriate groups
         self.groups["all_admins"].add(websocket_id)
@@ -124,8 +142,11 @@ class ConnectionManager:
     
     async def disconnect(self, websocket_id: str, admin_id: str):
         """Handle WebSocket disconnection"""
+        await self.broadcaster.unregister(websocket_id)
+        
         if websocket_id in self.active_connections:
-            del self.active_connections[websocket_id]
+            websocket = self.active_connections.pop(websocket_id)
+            self._socket_ids.pop(id(websocket), None)
         
         if admin_id in self.admin_connections:
             self.admin_connections[admin_id].discard(websocket_id)
@@ -148,37 +169,40 @@ class ConnectionManager:
         for lock_key in locks_to_release:
             del self.content_locks[lock_key]
     
+    async def _drop_connection(self, websocket_id: str):
+        """Disconnect a client whose socket failed or cannot keep up"""
+        websocket = self.active_connections.get(websocket_id)
+        admin_id = self.connection_metadata.get(websocket_id, {}).get("admin_id")
+        await self.disconnect(websocket_id, admin_id)
+        if websocket is not None:
+            try:
+                await websocket.close(code=1013)
+            except Exception:
+                pass
+    
     async def send_personal_message(self, message: Dict[str, Any], websocket: WebSocket):
         """Send message to single connection"""
+        websocket_id = self._socket_ids.get(id(websocket))
+        if websocket_id is not None:
+            # Queue behind pending broadcasts so the socket has a single writer
+            self.broadcaster.send_to(websocket_id, message)
+            return
         try:
             await websocket.send_json(message)
         except Exception as e:
             print(f"Error sending message: {e}")
     
     async def broadcast_to_group(self, group_name: str, message: Dict[str, Any]):
-        """Broadcast message to all connections in a group"""
+        """
+        Broadcast message to all connections in a group.
+        
+        The message is serialized once and queued on each member's send
+        queue; with the Redis backend it is also relayed to other workers.
+        """
         if group_name not in self.groups:
             return
         
-        disconnected = []
-        
-        for websocket_id in self.groups[group_name]:
-            if websocket_id in self.active_connections:
-                try:
-                    await self.active_connections[websocket_id].send_json(message)
-                    # Update last activity
-                    if websocket_id in self.connection_metadata:
-                        self.connection_metadata[websocket_id]["last_activity"] = (
-                            datetime.now().isoformat()
-                        )
-                except Exception:
-                    disconnected.append(websocket_id)
-        
-        # Clean up disconnected clients
-        for ws_id in disconnected:
-            if ws_id in self.active_connections:
-                del self.active_connections[ws_id]
-            self.groups[group_name].discard(ws_id)
+        await self.broadcaster.broadcast(group_name, message)
     
     async def broadcast_to_all(self, message: Dict[str, Any]):
         """Broadcast message to all connected admins"""
@@ -312,6 +336,7 @@ class ConnectionManager:
                 for group, members in self.groups.items()
             },
             "active_locks": len(self.content_locks),
+            "broadcast": self.broadcaster.get_stats(),
             "connections_by_role": {
                 "super_admins": len(self.groups["super_admins"]),
                 "content_admins": len(self.groups["content_admins"]),
@@ -372,6 +397,48 @@ live_metrics: Dict[str, LiveMetric] = {}
 # System alerts
 system_alerts: List[Dict[str, Any]] = []
 
+# Dashboard metric -> (collector metric, summary field, multiplier, unit)
+LIVE_METRIC_SOURCES = {
+    "api_requests_per_minute": ("http_request", "rate_per_second", 60, "requests"),
+    "average_response_time": ("http_request", "avg", 1, "ms"),
+    "response_time_p50": ("http_request", "p50", 1, "ms"),
+    "response_time_p95": ("http_request", "p95", 1, "ms"),
+    "response_time_p99": ("http_request", "p99", 1, "ms"),
+    "api_errors_per_minute": ("http_error", "rate_per_second", 60, "requests"),
+    "code_executions_per_minute": ("code_execution", "rate_per_second", 60, "executions"),
+    "code_execution_time_p95": ("code_execution", "p95", 1, "ms"),
+    "sync_events_per_minute": ("sync_event", "rate_per_second", 60, "events"),
+    "sync_event_time_p95": ("sync_event", "p95", 1, "ms"),
+    "database_connections": ("db_pool_in_use", "value", 1, "connections"),
+}
+
+# Seconds between live metric pushes, and pushes between full snapshots
+LIVE_METRICS_PUSH_INTERVAL = float(os.getenv("LIVE_METRICS_PUSH_INTERVAL", "1"))
+LIVE_METRICS_SNAPSHOT_EVERY = int(os.getenv("LIVE_METRICS_SNAPSHOT_EVERY", "30"))
+LIVE_METRICS_WINDOW_SECONDS = int(os.getenv("LIVE_METRICS_WINDOW_SECONDS", "60"))
+
+# Dashboard metric -> (sync health field, unit). Sync consumers run in their
+# own processes, so these come from the snapshots they publish to Redis and
+# from the stream itself rather than from the in-process collector
+SYNC_HEALTH_SOURCES = {
+    "sync_stream_lag": ("group_lag", "entries"),
+    "sync_pending_entries": ("pending", "entries"),
+    "sync_oldest_pending_age": ("oldest_pending_age_seconds", "seconds"),
+    "sync_queue_wait_p95": ("queue_wait_p95_ms", "ms"),
+    "sync_graph_write_p95": ("handler_p95_ms", "ms"),
+    "sync_status_update_p95": ("status_update_p95_ms", "ms"),
+    "sync_retries_per_minute": ("retries_per_minute", "retries"),
+    "sync_dead_letters_per_minute": ("dead_letters_per_minute", "events"),
+}
+
+# Seconds sync health is cached for, and seconds to wait after Redis or the
+# sync engine couldn't be reached
+SYNC_HEALTH_REFRESH_SECONDS = float(os.getenv("SYNC_HEALTH_REFRESH_SECONDS", "5"))
+SYNC_HEALTH_RETRY_SECONDS = float(os.getenv("SYNC_HEALTH_RETRY_SECONDS", "30"))
+
+# Bearer token required by /metrics/sync when set
+SYNC_METRICS_TOKEN = os.getenv("SYNC_METRICS_TOKEN")
+
 # Initialize some mock data
 def initialize_realtime_data():
     """Initialize sample real-time data"""
@@ -393,30 +460,6 @@ def initialize_realtime_data():
             trend="down",
             timestamp=datetime.now()
         ),
-        LiveMetric(
-            metric_name="api_requests_per_minute",
-            current_value=1250.0,
-            unit="requests",
-            change_percent=8.7,
-            trend="up",
-            timestamp=datetime.now()
-        ),
-        LiveMetric(
-            metric_name="average_response_time",
-            current_value=145.0,
-            unit="ms",
-            change_percent=-15.3,
-            trend="down",
-            timestamp=datetime.now()
-        ),
-        LiveMetric(
-            metric_name="database_connections",
-            current_value=45.0,
-            unit="connections",
-            change_percent=2.1,
-            trend="stable",
-            timestamp=datetime.now()
-        ),
         LiveMetric(
             metric_name="cache_hit_rate",
             current_value=94.2,
@@ -427,6 +470,19 @@ def initialize_realtime_data():
         )
     ]
     
+    # Metrics backed by the live metrics collector or sync health start at zero
+    units = [(name, source[-1]) for name, source in LIVE_METRIC_SOURCES.items()]
+    units += [(name, source[-1]) for name, source in SYNC_HEALTH_SOURCES.items()]
+    for metric_name, unit in units:
+        metrics.append(LiveMetric(
+            metric_name=metric_name,
+            current_value=0.0,
+            unit=unit,
+            change_percent=0.0,
+            trend="stable",
+            timestamp=datetime.now()
+        ))
+    
     for metric in metrics:
         live_metrics[metric.metric_name] = metric
     
@@ -527,6 +583,7 @@ async def websocket_dashboard(websocket: WebSocket):
         
         # Establish connection
         websocket_id = await manager.connect(websocket, admin_id, admin_role)
+        ensure_metrics_push_task()
         
         # Send initial dashboard data
         await manager.send_personal_message({
@@ -627,17 +684,7 @@ async def websocket_dashboard(websocket: WebSocket):
 
 def get_live_metrics_data() -> List[Dict[str, Any]]:
     """Convert live metrics to serializable format"""
-    return [
-        {
-            "name": metric.metric_name,
-            "value": metric.current_value,
-            "unit": metric.unit,
-            "change_percent": metric.change_percent,
-            "trend": metric.trend,
-            "timestamp": metric.timestamp.isoformat()
-        }
-        for metric in live_metrics.values()
-    ]
+    return [serialize_metric(metric) for metric in live_metrics.values()]
 
 # =============================================================================
 # REST API Endpoints
@@ -920,18 +967,42 @@ async def get_specific_metric(
             detail={"success": False, "error": "Metric not found"}
         )
     
-    metric = live_metrics[metric_name]
+    return {
+        "success": True,
+        "metric": serialize_metric(live_metrics[metric_name])
+    }
+
+@realtime_router.get("/realtime/metrics/{metric_name}/series")
+async def get_metric_series(
+    metric_name: str,
+    resolution: str = Query("1s", description="Series resolution: 1s, 1m or 1h"),
+    limit: int = Query(60, ge=1, le=300),
+    current_user: Dict = Depends(get_current_user_from_token)
+):
+    """
+    Get the downsampled series for a collector metric.
+    
+    metric_name is either a dashboard metric (e.g. response_time_p95) or a
+    collector metric (http_request, code_execution, sync_event, ...).
+    """
+    source = LIVE_METRIC_SOURCES.get(metric_name, (metric_name,))[0]
+    if source not in METRIC_DEFINITIONS:
+        raise HTTPException(
+            status_code=404,
+            detail={"success": False, "error": "Metric not found"}
+        )
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail={"success": False, "error": f"Resolution must be one of {', '.join(RESOLUTIONS)}"}
+        )
     
     return {
         "success": True,
-        "metric": {
-            "name": metric.metric_name,
-            "value": metric.current_value,
-            "unit": metric.unit,
-            "change_percent": metric.change_percent,
-            "trend": metric.trend,
-            "timestamp": metric.timestamp.isoformat()
-        }
+        "metric": source,
+        "resolution": resolution,
+        "points": get_live_metrics().get_series(source, resolution, limit),
+        "collector": get_live_metrics().get_stats()
     }
 
 @realtime_router.post("/realtime/broadcast")
@@ -974,38 +1045,223 @@ async def broadcast_message(
     }
 
 # =============================================================================
-# Event Simulation (for demonstration)
+# Sync Engine Health
 # =============================================================================
 
-async def simulate_metric_updates():
-    """Simulate periodic metric updates (for demonstration)"""
-    while True:
-        await asyncio.sleep(30)  # Update every 30 seconds
+_sync_health: Dict[str, Any] = {
+    "module": None,
+    "redis": None,
+    "state": None,
+    "values": {},
+    "totals": None,
+    "refreshed_at": 0.0,
+    "retry_at": 0.0,
+}
+
+def _sync_metrics_module():
+    """
+    Import the sync engine metrics on first use. The sync engine package
+    connects to its databases on import, which API startup shouldn't wait for.
+    """
+    if _sync_health["module"] is None:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if project_root not in sys.path:
+            sys.path.append(project_root)
+        from backend.sync_engine import metrics
+        _sync_health["module"] = metrics
+    return _sync_health["module"]
+
+def read_sync_health() -> Optional[Dict[str, Any]]:
+    """
+    Read sync engine snapshots and stream stats from Redis.
+    
+    Results are cached for SYNC_HEALTH_REFRESH_SECONDS; after a failure
+    nothing is attempted for SYNC_HEALTH_RETRY_SECONDS. Blocks on Redis, so
+    call it from a worker thread.
+    
+    Returns:
+        Snapshots, stream stats and their summary, or None when unavailable
+    """
+    now = time.monotonic()
+    if now < _sync_health["retry_at"]:
+        return None
+    if _sync_health["state"] is not None and now - _sync_health["refreshed_at"] < SYNC_HEALTH_REFRESH_SECONDS:
+        return _sync_health["state"]
+    
+    try:
+        metrics = _sync_metrics_module()
+        if _sync_health["redis"] is None:
+            _sync_health["redis"] = metrics.connect_redis()
+        stream = metrics.collect_stream_stats(_sync_health["redis"])
+        if "error" in stream:
+            raise ConnectionError(stream["error"])
+        snapshots = metrics.load_snapshots(_sync_health["redis"])
+    except Exception as e:
+        print(f"Sync health unavailable: {e}")
+        _sync_health["state"] = None
+        _sync_health["values"] = {}
+        _sync_health["totals"] = None
+        _sync_health["retry_at"] = now + SYNC_HEALTH_RETRY_SECONDS
+        return None
+    
+    summary = metrics.summarize_snapshots(snapshots)
+    stages = summary["stages"]
+    values = {
+        "group_lag": stream["group_lag"],
+        "pending": stream["pending"],
+        "oldest_pending_age_seconds": stream["oldest_pending_age_seconds"],
+        "queue_wait_p95_ms": stages.get("queue_wait", {}).get("p95_ms", 0.0),
+        "handler_p95_ms": stages.get("handler", {}).get("p95_ms", 0.0),
+        "status_update_p95_ms": stages.get("status_update", {}).get("p95_ms", 0.0),
+    }
+    
+    # Rates come from the change in totals between reads; a restarted
+    # consumer resets its counters, so negative changes count as zero
+    previous = _sync_health["totals"]
+    if previous is not None:
+        elapsed = now - _sync_health["refreshed_at"]
+        for total, field_name in (("retries", "retries_per_minute"), ("dead_letters", "dead_letters_per_minute")):
+            delta = max(summary["totals"][total] - previous[total], 0)
+            values[field_name] = delta / elapsed * 60 if elapsed > 0 else 0.0
+    
+    state = {"snapshots": snapshots, "stream": stream, "summary": summary}
+    _sync_health.update(state=state, values=values, totals=summary["totals"], refreshed_at=now)
+    return state
+
+@realtime_router.get("/metrics/sync", response_class=PlainTextResponse)
+async def get_sync_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Sync engine metrics in the Prometheus text format.
+    
+    Open to scrapers unless SYNC_METRICS_TOKEN is set, in which case the
+    request must carry it as a bearer token.
+    """
+    if SYNC_METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {SYNC_METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=401,
+            detail={"success": False, "error": "Invalid metrics token"}
+        )
+    
+    state = await asyncio.to_thread(read_sync_health)
+    if state is None:
+        raise HTTPException(
+            status_code=503,
+            detail={"success": False, "error": "Sync engine metrics unavailable"}
+        )
+    
+    return PlainTextResponse(
+        _sync_health["module"].render_prometheus(state["snapshots"], state["stream"]),
+        media_type="text/plain; version=0.0.4"
+    )
+
+# =============================================================================
+# Live Metrics Push
+# =============================================================================
+
+def serialize_metric(metric: LiveMetric) -> Dict[str, Any]:
+    """Convert a live metric to serializable format"""
+    return {
+        "name": metric.metric_name,
+        "value": metric.current_value,
+        "unit": metric.unit,
+        "change_percent": metric.change_percent,
+        "trend": metric.trend,
+        "timestamp": metric.timestamp.isoformat()
+    }
+
+def refresh_live_metrics() -> List[Dict[str, Any]]:
+    """
+    Update collector-backed live metrics from the latest summary window.
+    
+    Returns:
+        Serialized metrics whose value changed
+    """
+    summary = get_live_metrics().summary(LIVE_METRICS_WINDOW_SECONDS)
+    changed = []
+    now = datetime.now()
+    
+    values = {
+        metric_name: summary.get(source, {}).get(field_name, 0.0) * multiplier
+        for metric_name, (source, field_name, multiplier, _) in LIVE_METRIC_SOURCES.items()
+    }
+    sync_values = _sync_health["values"]
+    for metric_name, (field_name, _) in SYNC_HEALTH_SOURCES.items():
+        if sync_values.get(field_name) is not None:
+            values[metric_name] = sync_values[field_name]
+    
+    for metric_name, raw_value in values.items():
+        metric = live_metrics.get(metric_name)
+        if metric is None:
+            continue
+        value = round(raw_value, 2)
+        if value == metric.current_value:
+            continue
         
-        # Update some metrics with small random changes
-        for metric in live_metrics.values():
-            change = (hash(metric.metric_name) % 20 - 10) / 100  # -0.1 to 0.1
-            metric.current_value = max(0, metric.current_value * (1 + change))
-            metric.change_percent = change * 100
-            
-            if change > 0.05:
-                metric.trend = "up"
-            elif change < -0.05:
-                metric.trend = "down"
+        previous = metric.current_value
+        change = (value - previous) / previous if previous else 0.0
+        metric.current_value = value
+        metric.change_percent = round(change * 100, 2)
+        if change > 0.05:
+            metric.trend = "up"
+        elif change < -0.05:
+            metric.trend = "down"
+        else:
+            metric.trend = "stable"
+        metric.timestamp = now
+        changed.append(serialize_metric(metric))
+    
+    return changed
+
+async def push_live_metrics():
+    """
+    Push changed metrics to dashboard connections in this worker.
+    
+    Sends a metrics_delta with only the changed metrics every interval and a
+    full metrics_update snapshot periodically so clients that dropped frames
+    resynchronize. Delivery is local because every worker computes the same
+    aggregates for its own connections.
+    """
+    ticks = 0
+    while True:
+        await asyncio.sleep(LIVE_METRICS_PUSH_INTERVAL)
+        ticks += 1
+        try:
+            await asyncio.to_thread(read_sync_health)
+            changed = refresh_live_metrics()
+            if not manager.groups["all_admins"]:
+                continue
+            if ticks % LIVE_METRICS_SNAPSHOT_EVERY == 0:
+                message = {
+                    "type": "metrics_update",
+                    "metrics": get_live_metrics_data(),
+                    "timestamp": datetime.now().isoformat()
+                }
+            elif changed:
+                message = {
+                    "type": "metrics_delta",
+                    "metrics": changed,
+                    "timestamp": datetime.now().isoformat()
+                }
             else:
-                metric.trend = "stable"
-            
-            metric.timestamp = datetime.now()
-        
-        # Broadcast update to dashboard connections
-        await manager.broadcast_to_group("all_admins", {
-            "type": "metrics_update",
-            "metrics": get_live_metrics_data(),
-            "timestamp": datetime.now().isoformat()
-        })
+                continue
+            manager.broadcaster.deliver(
+                "all_admins",
+                manager.broadcaster.serialize(message),
+                manager.broadcaster.coalesce_key_for(message)
+            )
+        except Exception as e:
+            print(f"Live metrics push error: {e}")
+
+_metrics_push_task: Optional[asyncio.Task] = None
+
+def ensure_metrics_push_task():
+    """Start the live metrics push loop on the running event loop (once)"""
+    global _metrics_push_task
+    if _metrics_push_task is None or _metrics_push_task.done():
+        _metrics_push_task = asyncio.create_task(push_live_metrics())
 
-# Start background task for metric simulation
-try:
-    asyncio.create_task(simulate_metric_updates())
-except Exception:
-    pass  # Task already running
\ No newline at end of file
+@realtime_router.on_event("startup")
+async def start_live_metrics():
+    manager.broadcaster.start()
+    get_live_metrics()
+    ensure_metrics_push_task()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Real-time Broadcast Engine
+Jeseci Smart Learning Academy
+
+Fan-out layer used by the real-time admin ConnectionManager:
+
+- Each message is serialized to JSON once per broadcast, not once per socket
+- Every connection has its own bounded send queue drained by its own writer
+  task, so sockets are written concurrently and one slow admin client never
+  stalls delivery to the others
+- Frames of coalescible types (e.g. metrics_update) replace an older pending
+  frame of the same type instead of queueing behind it; partial frames
+  (metrics_delta) are merged into the pending one instead, so no value is
+  lost. When a queue is full the oldest replaceable frame is dropped, and a
+  client that still cannot keep up is disconnected
+- Optional Redis pub/sub relay so that a broadcast made in one worker
+  process reaches admins connected to every other worker
+
+Author: Cavin Otieno
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+from logger_config import logger
+
+# Redis is optional; without it broadcasts stay within the current process
+try:
+    import redis.asyncio as redis_async
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis_async = None
+    REDIS_AVAILABLE = False
+
+REALTIME_BROADCAST_BACKEND = os.getenv("REALTIME_BROADCAST_BACKEND", "memory").lower()
+REALTIME_SEND_QUEUE_SIZE = int(os.getenv("REALTIME_SEND_QUEUE_SIZE", "100"))
+REALTIME_SEND_TIMEOUT = float(os.getenv("REALTIME_SEND_TIMEOUT", "10"))
+REALTIME_BROADCAST_CHANNEL = os.getenv("REALTIME_BROADCAST_CHANNEL", "jeseci:realtime:broadcast")
+
+# Message types where only the newest pending frame matters
+COALESCIBLE_TYPES = {"metrics_update", "metrics_delta", "heartbeat"}
+
+
+def _merge_metrics_delta(pending: str, frame: str) -> str:
+    """Fold a newer metrics_delta into a pending one, keyed by metric name"""
+    older, newer = json.loads(pending), json.loads(frame)
+    metrics = {m["name"]: m for m in older.get("metrics", [])}
+    metrics.update((m["name"], m) for m in newer.get("metrics", []))
+    newer["metrics"] = list(metrics.values())
+    return json.dumps(newer, default=str)
+
+
+# Coalescible types whose frames carry only part of the state; a pending
+# frame is merged with the next one rather than replaced, and never dropped
+MERGEABLE_TYPES: Dict[str, Callable[[str, str], str]] = {
+    "metrics_delta": _merge_metrics_delta,
+}
+
+
+class ConnectionSender:
+    """
+    Bounded outbound queue and writer task for one WebSocket.
+
+    Frames are pre-serialized JSON strings. The writer task is started by
+    start() and stops when the socket fails or close() is called.
+    """
+
+    def __init__(self, websocket_id: str, websocket: Any,
+                 max_queue: int = REALTIME_SEND_QUEUE_SIZE,
+                 send_timeout: float = REALTIME_SEND_TIMEOUT,
+                 on_failure: Optional[Callable[[str], Awaitable[None]]] = None):
+        self.websocket_id = websocket_id
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._on_failure = on_failure
+        # Entries are [coalesce_key, frame]; a coalesced frame is replaced in place
+        self._queue: Deque[List[Optional[str]]] = deque()
+        self._pending_by_key: Dict[str, List[Optional[str]]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.last_sent_at: Optional[float] = None
+        self.stats = {"sent": 0, "coalesced": 0, "dropped": 0}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, frame: str, coalesce_key: Optional[str] = None) -> bool:
+        """
+        Queue a frame without blocking.
+
+        Returns:
+            False if the client is too slow and should be disconnected
+        """
+        if self._closed:
+            return False
+
+        if coalesce_key is not None:
+            pending = self._pending_by_key.get(coalesce_key)
+            if pending is not None:
+                merge = MERGEABLE_TYPES.get(coalesce_key)
+                pending[1] = merge(pending[1], frame) if merge is not None else frame
+                self.stats["coalesced"] += 1
+                return True
+
+        if len(self._queue) >= self.max_queue:
+            if not self._drop_oldest_coalescible():
+                self.stats["dropped"] += 1
+                return False
+
+        entry = [coalesce_key, frame]
+        self._queue.append(entry)
+        if coalesce_key is not None:
+            self._pending_by_key[coalesce_key] = entry
+        self._wakeup.set()
+        return True
+
+    def _drop_oldest_coalescible(self) -> bool:
+        for entry in self._queue:
+            if entry[0] is not None and entry[0] not in MERGEABLE_TYPES:
+                self._queue.remove(entry)
+                self._pending_by_key.pop(entry[0], None)
+                self.stats["dropped"] += 1
+                return True
+        return False
+
+    async def _run(self) -> None:
+        try:
+            while not self._closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                coalesce_key, frame = self._queue.popleft()
+                if coalesce_key is not None:
+                    self._pending_by_key.pop(coalesce_key, None)
+                await asyncio.wait_for(self.websocket.send_text(frame), self.send_timeout)
+                self.stats["sent"] += 1
+                self.last_sent_at = time.time()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"WebSocket {self.websocket_id} send failed: {e}")
+            self._closed = True
+            if self._on_failure is not None:
+                await self._on_failure(self.websocket_id)
+
+    async def close(self) -> None:
+        """Stop the writer task, discarding anything still queued"""
+        self._closed = True
+        self._queue.clear()
+        self._pending_by_key.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+
+
+class RedisBroadcastRelay:
+    """Relays serialized broadcasts between worker processes over Redis pub/sub"""
+
+    def __init__(self, deliver: Callable[[str, str, Optional[str]], int],
+                 channel: str = REALTIME_BROADCAST_CHANNEL):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._deliver = deliver
+        self._client = redis_async.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            db=int(os.getenv("REDIS_DB", 1)),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            decode_responses=True
+        )
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"published": 0, "received": 0, "errors": 0}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def publish(self, group_name: str, frame: str, coalesce_key: Optional[str]) -> None:
+        envelope = json.dumps({
+            "origin": self.origin,
+            "group": group_name,
+            "coalesce_key": coalesce_key,
+            "frame": frame
+        })
+        try:
+            await self._client.publish(self.channel, envelope)
+            self.stats["published"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Broadcast relay publish failed: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._client.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    envelope = json.loads(message["data"])
+                    if envelope.get("origin") == self.origin:
+                        continue
+                    self.stats["received"] += 1
+                    self._deliver(envelope["group"], envelope["frame"], envelope.get("coalesce_key"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Broadcast relay subscription lost, retrying: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self._client.aclose()
+
+
+class BroadcastEngine:
+    """
+    Serialize-once, queue-per-connection broadcaster.
+
+    The engine owns the ConnectionSender for every registered socket; group
+    membership stays with the caller, which passes the target ids to deliver().
+    """
+
+    def __init__(self, resolve_group: Callable[[str], Iterable[str]],
+                 on_slow_consumer: Optional[Callable[[str], Awaitable[None]]] = None,
+                 backend: str = REALTIME_BROADCAST_BACKEND):
+        """
+        Args:
+            resolve_group: Returns the websocket ids that belong to a group
+            on_slow_consumer: Called (as a task) for connections that fail or
+                cannot keep up, so the caller can drop them
+            backend: 'redis' to relay broadcasts across workers, else 'memory'
+        """
+        self._resolve_group = resolve_group
+        self._on_slow_consumer = on_slow_consumer
+        self.senders: Dict[str, ConnectionSender] = {}
+        self._relay: Optional[RedisBroadcastRelay] = None
+        self._use_redis = backend == "redis"
+        self.stats = {"broadcasts": 0, "frames_enqueued": 0, "slow_consumers": 0}
+
+    def _ensure_relay(self) -> None:
+        if self._relay is not None or not self._use_redis:
+            return
+        if not REDIS_AVAILABLE:
+            logger.warning("REALTIME_BROADCAST_BACKEND=redis but redis is not installed; broadcasting locally")
+            self._use_redis = False
+            return
+        try:
+            self._relay = RedisBroadcastRelay(self.deliver)
+            self._relay.start()
+            logger.info("Real-time broadcasts relayed over Redis pub/sub")
+        except Exception as e:
+            logger.warning(f"Redis broadcast relay unavailable, broadcasting locally: {e}")
+            self._use_redis = False
+
+    def start(self) -> None:
+        """Start the Redis relay, so broadcasts from other workers arrive before any local connection"""
+        self._ensure_relay()
+
+    def register(self, websocket_id: str, websocket: Any) -> ConnectionSender:
+        """Create and start the sender for a new connection"""
+        self._ensure_relay()
+        sender = ConnectionSender(websocket_id, websocket, on_failure=self._on_slow_consumer)
+        self.senders[websocket_id] = sender
+        sender.start()
+        return sender
+
+    async def unregister(self, websocket_id: str) -> None:
+        sender = self.senders.pop(websocket_id, None)
+        if sender is not None:
+            await sender.close()
+
+    @staticmethod
+    def serialize(message: Dict[str, Any]) -> str:
+        return json.dumps(message, default=str)
+
+    @staticmethod
+    def coalesce_key_for(message: Dict[str, Any]) -> Optional[str]:
+        message_type = message.get("type")
+        return message_type if message_type in COALESCIBLE_TYPES else None
+
+    def send_to(self, websocket_id: str, message: Dict[str, Any]) -> bool:
+        """Queue a message for a single connection"""
+        sender = self.senders.get(websocket_id)
+        if sender is None:
+            return False
+        return self._enqueue(sender, self.serialize(message), self.coalesce_key_for(message))
+
+    def _enqueue(self, sender: ConnectionSender, frame: str, coalesce_key: Optional[str]) -> bool:
+        if sender.enqueue(frame, coalesce_key):
+            self.stats["frames_enqueued"] += 1
+            return True
+        self.stats["slow_consumers"] += 1
+        logger.info(f"Dropping slow WebSocket consumer {sender.websocket_id}")
+        if self._on_slow_consumer is not None:
+            asyncio.create_task(self._on_slow_consumer(sender.websocket_id))
+        return False
+
+    def deliver(self, group_name: str, frame: str, coalesce_key: Optional[str] = None) -> int:
+        """Queue an already serialized frame for every local member of a group"""
+        delivered = 0
+        for websocket_id in list(self._resolve_group(group_name)):
+            sender = self.senders.get(websocket_id)
+            if sender is not None and self._enqueue(sender, frame, coalesce_key):
+                delivered += 1
+        return delivered
+
+    async def broadcast(self, group_name: str, message: Dict[str, Any]) -> int:
+        """
+        Broadcast a message to a group in this and (with Redis) every other worker.
+
+        Returns:
+            Number of local connections the frame was queued for
+        """
+        self._ensure_relay()
+        self.stats["broadcasts"] += 1
+        frame = self.serialize(message)
+        coalesce_key = self.coalesce_key_for(message)
+        delivered = self.deliver(group_name, frame, coalesce_key)
+        if self._relay is not None:
+            await self._relay.publish(group_name, frame, coalesce_key)
+        return delivered
+
+    def get_stats(self) -> Dict[str, Any]:
+        queue_depths = [sender.queue_depth for sender in self.senders.values()]
+        totals = {"sent": 0, "coalesced": 0, "dropped": 0}
+        for sender in self.senders.values():
+            for key in totals:
+                totals[key] += sender.stats[key]
+        return {
+            **self.stats,
+            **totals,
+            "backend": "redis" if self._relay is not None else "memory",
+            "relay": dict(self._relay.stats) if self._relay is not None else None,
+            "max_queue_depth": max(queue_depths) if queue_depths else 0,
+            "queued_frames": sum(queue_depths)
+        }
+
+    async def close(self) -> None:
+        for websocket_id in list(self.senders):
+            await self.unregister(websocket_id)
+        if self._relay is not None:
+            await self._relay.close()
+            self._relay = None
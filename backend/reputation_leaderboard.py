@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+Reputation Leaderboard for Jeseci Smart Learning Academy
+
+Keeps reputation rankings in sorted sets so that leaderboard reads do not
+sort the user_reputation table:
+
+- global: total reputation points per user
+- weekly: points earned in the current ISO week (from reputation_events)
+- group: study group members ranked by their global points
+
+Boards are updated incrementally by advanced_collaboration_store on every
+reputation event and are only rebuilt from the database when they are not
+loaded yet (cold start, new week, or expiry of an in-memory board). Group
+boards are derived from the global board and a cached member list.
+
+A rebuild reads the database in one snapshot and keeps it with the board.
+Every increment carries the id of the transaction that wrote the event, so
+an event the snapshot already counted is skipped, and increments arriving
+while the rebuild runs are buffered and applied once the board is in place.
+
+Use the Redis backend to share boards across workers; in-memory boards are
+per process and are rebuilt every LEADERBOARD_MEMORY_TTL seconds to pick up
+events recorded by other workers.
+
+Author: Cavin Otieno
+"""
+
+import os
+import time
+import bisect
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Import centralized logging configuration
+from logger_config import logger
+
+# Redis is optional; the in-memory backend is used when it is unavailable
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+DB_SCHEMA = os.getenv("DB_SCHEMA", "jeseci_academy")
+LEADERBOARD_BACKEND = os.getenv("LEADERBOARD_BACKEND", "memory").lower()
+LEADERBOARD_MEMORY_TTL = int(os.getenv("LEADERBOARD_MEMORY_TTL", "300"))
+LEADERBOARD_GROUP_CACHE_TTL = int(os.getenv("LEADERBOARD_GROUP_CACHE_TTL", "300"))
+LEADERBOARD_REBUILD_TIMEOUT = int(os.getenv("LEADERBOARD_REBUILD_TIMEOUT", "120"))
+LEADERBOARD_KEY_PREFIX = "jeseci:leaderboard"
+
+# Weekly boards are kept a little past the end of their week
+WEEKLY_BOARD_TTL = 8 * 24 * 3600
+
+GLOBAL = "global"
+WEEKLY = "weekly"
+GROUP = "group"
+
+# Lua twin of snapshot_includes(); txids stay well below 2^53
+_LUA_SNAPSHOT_INCLUDES = """
+local function snapshot_includes(snapshot, xid)
+    if xid == nil then
+        return false
+    end
+    local xmin, xmax, xip = string.match(snapshot, '^(%d+):(%d+):(.*)$')
+    if xmin == nil then
+        return false
+    end
+    if xid < tonumber(xmin) then
+        return true
+    end
+    if xid >= tonumber(xmax) then
+        return false
+    end
+    for running in string.gmatch(xip, '%d+') do
+        if tonumber(running) == xid then
+            return false
+        end
+    end
+    return true
+end
+"""
+
+# Increment a loaded board unless its snapshot already counted the event.
+# While a rebuild is running the increment is buffered instead; otherwise
+# the board is unloaded and its rebuild will include the event.
+# KEYS: board, loaded marker (holds the snapshot), rebuilding marker, buffer
+# ARGV: delta, member, xid ('' if unknown)
+_INCR_IF_LOADED = _LUA_SNAPSHOT_INCLUDES + """
+local snapshot = redis.call('GET', KEYS[2])
+if snapshot then
+    if snapshot_includes(snapshot, tonumber(ARGV[3])) then
+        return nil
+    end
+    return redis.call('ZINCRBY', KEYS[1], ARGV[1], ARGV[2])
+end
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('RPUSH', KEYS[4], ARGV[1] .. ' ' .. ARGV[2] .. ' ' .. ARGV[3])
+end
+return nil
+"""
+
+# Swap in a rebuilt board and apply the increments buffered meanwhile.
+# KEYS: board, loaded marker, rebuilding marker, buffer, staging board
+# ARGV: snapshot, ttl (0 for none), '1' if the staging board has members
+_INSTALL_BOARD = _LUA_SNAPSHOT_INCLUDES + """
+if ARGV[3] == '1' then
+    redis.call('RENAME', KEYS[5], KEYS[1])
+else
+    redis.call('DEL', KEYS[1], KEYS[5])
+end
+local applied = 0
+for _, entry in ipairs(redis.call('LRANGE', KEYS[4], 0, -1)) do
+    local delta, member, xid = string.match(entry, '^(%S+) (%S+) (%S*)$')
+    if not snapshot_includes(ARGV[1], tonumber(xid)) then
+        redis.call('ZINCRBY', KEYS[1], delta, member)
+        applied = applied + 1
+    end
+end
+redis.call('DEL', KEYS[3], KEYS[4])
+redis.call('SET', KEYS[2], ARGV[1])
+if tonumber(ARGV[2]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+end
+return applied
+"""
+
+
+def weekly_board(at: Optional[datetime] = None) -> str:
+    year, week, _ = (at or datetime.now()).isocalendar()
+    return f"{WEEKLY}:{year}-W{week:02d}"
+
+
+def snapshot_includes(snapshot: Optional[str], xid: Optional[int]) -> bool:
+    """
+    Whether a transaction's writes are visible in a snapshot.
+
+    Args:
+        snapshot: txid_current_snapshot() text, "xmin:xmax:xip1,xip2"
+        xid: txid_current() of the writing transaction
+
+    Returns:
+        False when either is unknown, so the event is counted
+    """
+    if not snapshot or xid is None:
+        return False
+    xmin, xmax, running = snapshot.split(":")
+    xid = int(xid)
+    if xid < int(xmin):
+        return True
+    if xid >= int(xmax):
+        return False
+    return str(xid) not in running.split(",")
+
+
+class _SortedBoard:
+    """Scores plus an ordered list of (-score, member) for rank queries"""
+
+    def __init__(self, mapping: Dict[int, float], ttl: Optional[int], snapshot: Optional[str] = None):
+        self.scores = dict(mapping)
+        self.order = sorted((-score, member) for member, score in self.scores.items())
+        self.expires_at = time.time() + ttl if ttl else None
+        self.snapshot = snapshot
+
+    def incr(self, member: int, delta: float) -> float:
+        old = self.scores.get(member)
+        if old is not None:
+            del self.order[bisect.bisect_left(self.order, (-old, member))]
+        new = (old or 0) + delta
+        self.scores[member] = new
+        bisect.insort(self.order, (-new, member))
+        return new
+
+    def rank(self, member: int) -> Optional[int]:
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        return bisect.bisect_left(self.order, (-score, member))
+
+
+class InMemoryLeaderboardBackend:
+    """Process-local sorted boards"""
+
+    default_ttl = LEADERBOARD_MEMORY_TTL
+
+    def __init__(self):
+        self._boards: Dict[str, _SortedBoard] = {}
+        # Increments buffered per board while it is being rebuilt
+        self._rebuilding: Dict[str, List[Tuple[int, float, Optional[int]]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, board: str) -> Optional[_SortedBoard]:
+        entry = self._boards.get(board)
+        if entry is not None and entry.expires_at is not None and entry.expires_at < time.time():
+            del self._boards[board]
+            return None
+        return entry
+
+    def exists(self, board: str) -> bool:
+        with self._lock:
+            return self._get(board) is not None
+
+    def begin_rebuild(self, board: str) -> bool:
+        # Rebuilds are serialized by the caller within the process
+        with self._lock:
+            self._rebuilding[board] = []
+        return True
+
+    def is_rebuilding(self, board: str) -> bool:
+        with self._lock:
+            return board in self._rebuilding
+
+    def abort_rebuild(self, board: str) -> None:
+        with self._lock:
+            self._rebuilding.pop(board, None)
+
+    def replace(self, board: str, mapping: Dict[int, float], ttl: Optional[int],
+                snapshot: Optional[str] = None) -> None:
+        loaded = _SortedBoard(mapping, ttl, snapshot)
+        with self._lock:
+            for member, delta, xid in self._rebuilding.pop(board, ()):
+                if not snapshot_includes(snapshot, xid):
+                    loaded.incr(member, delta)
+            if board.startswith(WEEKLY):
+                # Only the current week is read; drop boards of past weeks
+                for name in [n for n in self._boards if n.startswith(WEEKLY)]:
+                    del self._boards[name]
+            self._boards[board] = loaded
+
+    def delete(self, board: str) -> None:
+        with self._lock:
+            self._boards.pop(board, None)
+
+    def incr(self, board: str, member: int, delta: float, xid: Optional[int] = None) -> None:
+        with self._lock:
+            entry = self._get(board)
+            if entry is not None:
+                if not snapshot_includes(entry.snapshot, xid):
+                    entry.incr(member, delta)
+            elif board in self._rebuilding:
+                self._rebuilding[board].append((member, delta, xid))
+
+    def top(self, board: str, start: int, stop: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            entry = self._get(board)
+            if entry is None:
+                return []
+            return [(member, -neg_score) for neg_score, member in entry.order[start:stop]]
+
+    def rank(self, board: str, member: int) -> Optional[int]:
+        with self._lock:
+            entry = self._get(board)
+            return entry.rank(member) if entry is not None else None
+
+    def scores(self, board: str, members: List[int]) -> List[Optional[float]]:
+        with self._lock:
+            entry = self._get(board)
+            if entry is None:
+                return [None] * len(members)
+            return [entry.scores.get(member) for member in members]
+
+    def count(self, board: str) -> int:
+        with self._lock:
+            entry = self._get(board)
+            return len(entry.scores) if entry is not None else 0
+
+
+class RedisLeaderboardBackend:
+    """Sorted sets shared across workers"""
+
+    default_ttl = None
+
+    def __init__(self, client: Any = None):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed")
+            client = redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                db=int(os.getenv("REDIS_DB", 1)),
+                password=os.getenv("REDIS_PASSWORD") or None,
+                decode_responses=True
+            )
+        self.client = client
+        self._incr = client.register_script(_INCR_IF_LOADED)
+        self._install = client.register_script(_INSTALL_BOARD)
+
+    def _key(self, board: str) -> str:
+        return f"{LEADERBOARD_KEY_PREFIX}:{board}"
+
+    def _loaded_key(self, board: str) -> str:
+        # Separate marker so that an empty board still counts as loaded;
+        # it holds the snapshot the board was rebuilt from
+        return f"{LEADERBOARD_KEY_PREFIX}:{board}:loaded"
+
+    def _rebuilding_key(self, board: str) -> str:
+        return f"{LEADERBOARD_KEY_PREFIX}:{board}:rebuilding"
+
+    def _buffer_key(self, board: str) -> str:
+        return f"{LEADERBOARD_KEY_PREFIX}:{board}:buffer"
+
+    def exists(self, board: str) -> bool:
+        return bool(self.client.exists(self._loaded_key(board)))
+
+    def begin_rebuild(self, board: str) -> bool:
+        """Claim the rebuild of a board; False if another worker holds it"""
+        # Expires so that a worker dying mid-rebuild doesn't block the board.
+        # Entries left in the buffer by such a worker are filtered against
+        # the next snapshot like any other.
+        return bool(self.client.set(self._rebuilding_key(board), 1, ex=LEADERBOARD_REBUILD_TIMEOUT, nx=True))
+
+    def is_rebuilding(self, board: str) -> bool:
+        return bool(self.client.exists(self._rebuilding_key(board)))
+
+    def abort_rebuild(self, board: str) -> None:
+        self.client.delete(self._rebuilding_key(board))
+
+    def replace(self, board: str, mapping: Dict[int, float], ttl: Optional[int],
+                snapshot: Optional[str] = None) -> None:
+        key = self._key(board)
+        staging = f"{key}:staging"
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(staging)
+        items = list(mapping.items())
+        for i in range(0, len(items), 1000):
+            pipe.zadd(staging, dict(items[i:i + 1000]))
+        pipe.execute()
+
+        self._install(
+            keys=[key, self._loaded_key(board), self._rebuilding_key(board), self._buffer_key(board), staging],
+            args=[snapshot or "", ttl or 0, "1" if items else "0"]
+        )
+
+    def delete(self, board: str) -> None:
+        self.client.delete(self._loaded_key(board), self._key(board))
+
+    def incr(self, board: str, member: int, delta: float, xid: Optional[int] = None) -> None:
+        self._incr(
+            keys=[self._key(board), self._loaded_key(board), self._rebuilding_key(board), self._buffer_key(board)],
+            args=[delta, member, "" if xid is None else int(xid)]
+        )
+
+    def top(self, board: str, start: int, stop: int) -> List[Tuple[int, float]]:
+        if stop <= start:
+            return []
+        rows = self.client.zrevrange(self._key(board), start, stop - 1, withscores=True)
+        return [(int(member), score) for member, score in rows]
+
+    def rank(self, board: str, member: int) -> Optional[int]:
+        return self.client.zrevrank(self._key(board), member)
+
+    def scores(self, board: str, members: List[int]) -> List[Optional[float]]:
+        if not members:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for member in members:
+            pipe.zscore(self._key(board), member)
+        return pipe.execute()
+
+    def count(self, board: str) -> int:
+        return self.client.zcard(self._key(board))
+
+
+def _query(sql: str, params: tuple) -> List[tuple]:
+    from database.postgres_manager import get_postgres_manager
+    manager = get_postgres_manager()
+    conn = manager.get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+    finally:
+        manager.return_connection(conn)
+
+
+def _snapshot_query(sql: str, params: tuple) -> Tuple[List[tuple], str]:
+    """Run a query and return its rows with the snapshot they were read in"""
+    from database.postgres_manager import get_postgres_manager
+    manager = get_postgres_manager()
+    conn = manager.get_connection()
+    try:
+        with conn.cursor() as cur:
+            # Both statements must see the same snapshot
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cur.execute("SELECT txid_current_snapshot()::text")
+            snapshot = cur.fetchone()[0]
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        conn.rollback()
+        return rows, snapshot
+    finally:
+        manager.return_connection(conn)
+
+
+def load_board_scores(board: str) -> Tuple[Dict[int, float], str]:
+    """
+    Rebuild a global or weekly board from the database.
+
+    Returns:
+        (scores by user_id, txid_current_snapshot() the scores were read in)
+    """
+    if board == GLOBAL:
+        rows, snapshot = _snapshot_query(
+            f"SELECT user_id, reputation_points FROM {DB_SCHEMA}.user_reputation WHERE reputation_points IS NOT NULL",
+            ()
+        )
+    else:
+        year, week = board.split(":", 1)[1].split("-W")
+        start = datetime.fromisocalendar(int(year), int(week), 1)
+        rows, snapshot = _snapshot_query(
+            f"""
+            SELECT user_id, SUM(points_change)
+            FROM {DB_SCHEMA}.reputation_events
+            WHERE created_at >= %s AND created_at < %s
+            GROUP BY user_id
+            """,
+            (start, start + timedelta(days=7))
+        )
+    return {int(user_id): float(points) for user_id, points in rows}, snapshot
+
+
+def load_group_members(group_id: str) -> List[int]:
+    rows = _query(f"SELECT user_id FROM {DB_SCHEMA}.study_group_members WHERE group_id = %s", (group_id,))
+    return [int(row[0]) for row in rows]
+
+
+class ReputationLeaderboard:
+    """Global, weekly and per-group reputation rankings"""
+
+    def __init__(self, backend: Any, board_loader=load_board_scores, members_loader=load_group_members,
+                 group_cache_ttl: int = LEADERBOARD_GROUP_CACHE_TTL):
+        self.backend = backend
+        self._board_loader = board_loader
+        self._members_loader = members_loader
+        self.group_cache_ttl = group_cache_ttl
+        self._load_lock = threading.Lock()
+        self._groups: Dict[str, Tuple[float, List[int]]] = {}
+        self._groups_lock = threading.Lock()
+        self._stats = {"events": 0, "rebuilds": 0, "reads": 0, "errors": 0}
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def board_key(board: str = GLOBAL, at: Optional[datetime] = None) -> str:
+        if board == WEEKLY:
+            return weekly_board(at)
+        if board == GLOBAL:
+            return GLOBAL
+        raise ValueError(f"Unknown leaderboard: {board}")
+
+    def _ensure_loaded(self, key: str) -> None:
+        if self.backend.exists(key):
+            return
+        with self._load_lock:
+            if self.backend.exists(key):
+                return
+            if not self.backend.begin_rebuild(key):
+                self._wait_for_rebuild(key)
+                return
+            started = time.time()
+            try:
+                scores, snapshot = self._board_loader(key)
+                ttl = WEEKLY_BOARD_TTL if key.startswith(WEEKLY) else self.backend.default_ttl
+                self.backend.replace(key, scores, ttl, snapshot)
+            except Exception:
+                self.backend.abort_rebuild(key)
+                raise
+            self._stats["rebuilds"] += 1
+            logger.info(f"Rebuilt leaderboard {key} with {len(scores)} users in {time.time() - started:.2f}s")
+
+    def _wait_for_rebuild(self, key: str) -> None:
+        """Wait for another worker's rebuild of a board to finish"""
+        deadline = time.time() + LEADERBOARD_REBUILD_TIMEOUT
+        while time.time() < deadline and not self.backend.exists(key) and self.backend.is_rebuilding(key):
+            time.sleep(0.05)
+
+    def _group_members(self, group_id: str) -> List[int]:
+        now = time.time()
+        with self._groups_lock:
+            cached = self._groups.get(group_id)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+        members = self._members_loader(group_id)
+        with self._groups_lock:
+            self._groups[group_id] = (now + self.group_cache_ttl, members)
+        return members
+
+    def invalidate_group(self, group_id: str) -> None:
+        """Forget a cached member list (after joins and leaves)"""
+        with self._groups_lock:
+            self._groups.pop(group_id, None)
+
+    def _group_ranking(self, group_id: str) -> List[Tuple[int, float]]:
+        self._ensure_loaded(GLOBAL)
+        members = self._group_members(group_id)
+        scores = self.backend.scores(GLOBAL, members)
+        ranking = [(member, float(score or 0)) for member, score in zip(members, scores)]
+        ranking.sort(key=lambda item: (-item[1], item[0]))
+        return ranking
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def record(self, events: Iterable[Tuple[int, float]], at: Optional[datetime] = None) -> None:
+        """
+        Apply committed reputation changes to the global and weekly boards.
+
+        Args:
+            events: (user_id, points_change, xid) tuples, where xid is the
+                txid_current() of the transaction that wrote the event; it
+                may be omitted, and then the event is always counted
+            at: Time of the events (defaults to now)
+        """
+        weekly = weekly_board(at)
+        try:
+            for user_id, points, *xid in events:
+                if not points:
+                    continue
+                xid = xid[0] if xid else None
+                self.backend.incr(GLOBAL, int(user_id), points, xid)
+                self.backend.incr(weekly, int(user_id), points, xid)
+                self._stats["events"] += 1
+        except Exception as e:
+            # A missed increment must not leave the board silently wrong
+            self._stats["errors"] += 1
+            logger.warning(f"Leaderboard update failed, boards will be rebuilt: {e}")
+            self.reset()
+
+    def reset(self) -> None:
+        """Force every board to be rebuilt on next read"""
+        for key in (GLOBAL, weekly_board()):
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                logger.warning(f"Could not reset leaderboard {key}: {e}")
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def top(self, limit: int = 10, offset: int = 0, board: str = GLOBAL,
+            group_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        A page of a leaderboard.
+
+        Returns:
+            dict with entries ({rank, user_id, points}) and total
+        """
+        self._stats["reads"] += 1
+        if board == GROUP:
+            ranking = self._group_ranking(group_id)
+            rows, total = ranking[offset:offset + limit], len(ranking)
+        else:
+            key = self.board_key(board)
+            self._ensure_loaded(key)
+            rows, total = self.backend.top(key, offset, offset + limit), self.backend.count(key)
+        return {
+            "entries": [
+                {"rank": offset + i + 1, "user_id": user_id, "points": int(points)}
+                for i, (user_id, points) in enumerate(rows)
+            ],
+            "total": total
+        }
+
+    def rank(self, user_id: int, board: str = GLOBAL, group_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Rank (1-based) and points of one user, or None if not on the board"""
+        self._stats["reads"] += 1
+        user_id = int(user_id)
+        if board == GROUP:
+            ranking = self._group_ranking(group_id)
+            for position, (member, points) in enumerate(ranking):
+                if member == user_id:
+                    return {"rank": position + 1, "points": int(points), "total": len(ranking)}
+            return None
+        key = self.board_key(board)
+        self._ensure_loaded(key)
+        position = self.backend.rank(key, user_id)
+        if position is None:
+            return None
+        points = self.backend.scores(key, [user_id])[0]
+        return {"rank": position + 1, "points": int(points or 0), "total": self.backend.count(key)}
+
+    def around(self, user_id: int, radius: int = 5, board: str = GLOBAL,
+               group_id: Optional[str] = None) -> Dict[str, Any]:
+        """The users ranked just above and below a user"""
+        position = self.rank(user_id, board, group_id)
+        if position is None:
+            return {"entries": [], "total": 0, "rank": None}
+        start = max(0, position["rank"] - 1 - radius)
+        page = self.top(limit=2 * radius + 1, offset=start, board=board, group_id=group_id)
+        page["rank"] = position["rank"]
+        return page
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "backend": type(self.backend).__name__, "cached_groups": len(self._groups)}
+
+
+def _create_backend() -> Any:
+    """Create the configured leaderboard backend, falling back to in-memory"""
+    if LEADERBOARD_BACKEND == "redis":
+        try:
+            backend = RedisLeaderboardBackend()
+            backend.client.ping()
+            logger.info("Reputation leaderboard using Redis backend")
+            return backend
+        except Exception as e:
+            logger.warning(f"Redis leaderboard unavailable, using in-memory backend: {e}")
+    return InMemoryLeaderboardBackend()
+
+
+# Global instance used by advanced_collaboration_store
+reputation_leaderboard = ReputationLeaderboard(_create_backend())
@@ -0,0 +1,781 @@
+#!/usr/bin/env python3
+"""
+Risk Model Pipeline - Feature store, offline training and model registry
+
+Offline pipeline behind POST /ai/model/retrain for the dropout risk model:
+
+- RiskFeatureStore keeps per-learner aggregates of user_activities,
+  quiz_attempts and learning_sessions in columnar NumPy memmaps. An update
+  reads only the rows past each table's id watermark, and writes a dated
+  snapshot of the model features at most every RISK_SNAPSHOT_INTERVAL_HOURS.
+  SERIAL ids are assigned before commit, so ids skipped below the
+  watermark are remembered and re-read for RISK_LATE_ROW_SECONDS in case
+  their transaction commits late.
+- train_risk_model fits a logistic regression. Labels are taken
+  point-in-time: features come from a snapshot at least RISK_CHURN_DAYS old
+  and a learner is labelled as dropped out if they have not been active
+  since. Until such a snapshot exists, current features are labelled by
+  current inactivity.
+- RiskModelRegistry keeps every trained model by version and records the
+  active one in registry.json. Processes pick up a newly activated model
+  within RISK_MODEL_RELOAD_SECONDS, without a restart.
+
+Pipeline jobs run in a separate spawned process so that reading the tables
+and training never block an API worker; a file lock keeps concurrent runs
+on the same host apart. Set RISK_PIPELINE_DIR to persistent storage in
+production.
+
+Author: Cavin Otieno
+"""
+
+import os
+import json
+import time
+import uuid
+import fcntl
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Import centralized logging configuration
+from logger_config import logger
+
+DB_SCHEMA = os.getenv("DB_SCHEMA", "jeseci_academy")
+RISK_PIPELINE_DIR = os.getenv(
+    "RISK_PIPELINE_DIR",
+    os.path.join(tempfile.gettempdir(), "jeseci_risk_pipeline")
+)
+RISK_FEATURE_BATCH_SIZE = int(os.getenv("RISK_FEATURE_BATCH_SIZE", "50000"))
+RISK_SNAPSHOT_INTERVAL_HOURS = float(os.getenv("RISK_SNAPSHOT_INTERVAL_HOURS", "24"))
+RISK_SNAPSHOT_RETENTION_DAYS = int(os.getenv("RISK_SNAPSHOT_RETENTION_DAYS", "120"))
+RISK_CHURN_DAYS = int(os.getenv("RISK_CHURN_DAYS", "14"))
+RISK_MIN_TRAINING_SAMPLES = int(os.getenv("RISK_MIN_TRAINING_SAMPLES", "50"))
+RISK_MODEL_MIN_AUC = float(os.getenv("RISK_MODEL_MIN_AUC", "0.6"))
+RISK_MODEL_KEEP_VERSIONS = int(os.getenv("RISK_MODEL_KEEP_VERSIONS", "10"))
+RISK_MODEL_RELOAD_SECONDS = float(os.getenv("RISK_MODEL_RELOAD_SECONDS", "5"))
+RISK_LATE_ROW_SECONDS = float(os.getenv("RISK_LATE_ROW_SECONDS", "3600"))
+RISK_MAX_TRACKED_GAPS = int(os.getenv("RISK_MAX_TRACKED_GAPS", "10000"))
+
+WEEK_SECONDS = 7 * 24 * 3600
+DAY_SECONDS = 24 * 3600
+
+# Aggregate columns kept per learner
+AGGREGATE_COLUMNS = (
+    "first_seen", "last_active", "activities", "lessons_completed",
+    "quiz_attempts", "quiz_score_sum", "sessions", "session_seconds"
+)
+
+KEY_DTYPE = "S64"
+
+# Incremental sources: table -> (count column, sum column, query). Each query
+# returns (id, users.user_id, epoch seconds, value summed into the sum column)
+# in id order, for the rows selected by {id_filter}: "> %s" for rows past the
+# watermark, or "= ANY(%s)" for skipped ids being re-read.
+FEATURE_SOURCES = {
+    "user_activities": ("activities", "lessons_completed", f"""
+        SELECT a.id, u.user_id, EXTRACT(EPOCH FROM a.created_at),
+               CASE WHEN a.activity_type IN ('lesson_completed', 'module_completed') THEN 1 ELSE 0 END
+        FROM {DB_SCHEMA}.user_activities a
+        JOIN {DB_SCHEMA}.users u ON u.id = a.user_id
+        WHERE a.id {{id_filter}} AND a.created_at IS NOT NULL
+        ORDER BY a.id
+        LIMIT %s
+    """),
+    "quiz_attempts": ("quiz_attempts", "quiz_score_sum", f"""
+        SELECT q.id, u.user_id, EXTRACT(EPOCH FROM COALESCE(q.completed_at, q.created_at)),
+               COALESCE(q.score, 0)
+        FROM {DB_SCHEMA}.quiz_attempts q
+        JOIN {DB_SCHEMA}.users u ON u.id = q.user_id
+        WHERE q.id {{id_filter}} AND COALESCE(q.completed_at, q.created_at) IS NOT NULL
+        ORDER BY q.id
+        LIMIT %s
+    """),
+    "learning_sessions": ("sessions", "session_seconds", f"""
+        SELECT s.id, u.user_id, EXTRACT(EPOCH FROM s.start_time),
+               COALESCE(s.duration_seconds, 0)
+        FROM {DB_SCHEMA}.learning_sessions s
+        JOIN {DB_SCHEMA}.users u ON u.id = s.user_id
+        WHERE s.id {{id_filter}} AND s.start_time IS NOT NULL
+        ORDER BY s.id
+        LIMIT %s
+    """),
+}
+
+# Model inputs derived from the aggregates; NaN where a learner has no data
+MODEL_FEATURES = (
+    "events_per_week", "lessons_per_week", "quiz_attempts_per_week",
+    "quiz_average", "session_minutes", "tenure_weeks"
+)
+
+
+def derive_features(columns: Dict[str, np.ndarray], now: float) -> np.ndarray:
+    """Build the (n, len(MODEL_FEATURES)) model input from aggregate columns"""
+    tenure = np.maximum(1.0, (now - columns["first_seen"]) / WEEK_SECONDS)
+    quizzes = columns["quiz_attempts"]
+    sessions = columns["sessions"]
+    events = columns["activities"] + quizzes + sessions
+    with np.errstate(divide="ignore", invalid="ignore"):
+        quiz_average = np.where(quizzes > 0, columns["quiz_score_sum"] / quizzes, np.nan)
+        session_minutes = np.where(sessions > 0, columns["session_seconds"] / sessions / 60.0, np.nan)
+    return np.column_stack([
+        events / tenure,
+        columns["lessons_completed"] / tenure,
+        quizzes / tenure,
+        quiz_average,
+        session_minutes,
+        tenure
+    ])
+
+
+def _fetch_source_rows(query: str, watermark: int, limit: int) -> List[tuple]:
+    from database.postgres_manager import get_postgres_manager
+    manager = get_postgres_manager()
+    conn = manager.get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, (watermark, limit))
+            return cur.fetchall()
+    finally:
+        manager.return_connection(conn)
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """Replace a JSON file atomically"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class RiskFeatureStore:
+    """Columnar per-learner aggregates in NumPy memmaps"""
+
+    def __init__(self, directory: str = RISK_PIPELINE_DIR, fetch_rows: Callable = _fetch_source_rows):
+        self.directory = os.path.join(directory, "features")
+        self.snapshot_dir = os.path.join(self.directory, "snapshots")
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self._fetch_rows = fetch_rows
+        self.meta = self._load_meta()
+        self._columns: Dict[str, np.memmap] = {}
+        self._index: Optional[Dict[bytes, int]] = None
+
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"]
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.col")
+
+    def _load_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"rows": 0, "capacity": 0, "watermarks": {}, "gaps": {}, "updated_at": None, "last_snapshot": 0}
+
+    def _column(self, name: str) -> np.memmap:
+        if name not in self._columns:
+            dtype = KEY_DTYPE if name == "key" else np.float64
+            self._columns[name] = np.memmap(
+                self._column_path(name), dtype=dtype, mode="r+", shape=(self.meta["capacity"],)
+            )
+        return self._columns[name]
+
+    def _grow(self, needed: int) -> None:
+        """Reallocate every column with at least `needed` rows"""
+        capacity = max(1024, self.meta["capacity"])
+        while capacity < needed:
+            capacity *= 2
+        for name in ("key",) + AGGREGATE_COLUMNS:
+            dtype = KEY_DTYPE if name == "key" else np.float64
+            tmp = self._column_path(name) + ".tmp"
+            grown = np.memmap(tmp, dtype=dtype, mode="w+", shape=(capacity,))
+            if self.rows:
+                grown[:self.rows] = self._column(name)[:self.rows]
+            grown.flush()
+            del grown
+            self._columns.pop(name, None)
+            os.replace(tmp, self._column_path(name))
+        self.meta["capacity"] = capacity
+
+    def _load_index(self) -> Dict[bytes, int]:
+        if self._index is None:
+            keys = self._column("key")[:self.rows] if self.rows else []
+            self._index = {bytes(key): row for row, key in enumerate(keys)}
+        return self._index
+
+    def _rows_for(self, keys: np.ndarray) -> np.ndarray:
+        """Map learner keys to rows, appending rows for new learners"""
+        index = self._load_index()
+        unique, inverse = np.unique(keys, return_inverse=True)
+        new_keys = [key for key in unique if key not in index]
+        if new_keys:
+            start = self.rows
+            if start + len(new_keys) > self.meta["capacity"]:
+                self._grow(start + len(new_keys))
+            key_column = self._column("key")
+            key_column[start:start + len(new_keys)] = new_keys
+            self._column("first_seen")[start:start + len(new_keys)] = np.inf
+            for offset, key in enumerate(new_keys):
+                index[key] = start + offset
+            self.meta["rows"] = start + len(new_keys)
+        return np.array([index[key] for key in unique], dtype=np.int64)[inverse]
+
+    def _apply(self, count_column: str, sum_column: str, rows: List[tuple]) -> None:
+        keys = np.array([str(row[1]).encode() for row in rows], dtype=KEY_DTYPE)
+        at = np.array([float(row[2]) for row in rows])
+        values = np.array([float(row[3]) for row in rows])
+        positions = self._rows_for(keys)
+        np.add.at(self._column(count_column), positions, 1.0)
+        np.add.at(self._column(sum_column), positions, values)
+        np.maximum.at(self._column("last_active"), positions, at)
+        np.minimum.at(self._column("first_seen"), positions, at)
+
+    def _flush(self) -> None:
+        for column in self._columns.values():
+            column.flush()
+        self.meta["updated_at"] = datetime.now().isoformat()
+        _write_json(self._meta_path(), self.meta)
+
+    def update(self, batch_size: int = RISK_FEATURE_BATCH_SIZE) -> Dict[str, int]:
+        """Fold source rows past the watermarks into the aggregates"""
+        if not self.meta["capacity"]:
+            self._grow(1024)
+        applied: Dict[str, int] = {}
+        for table, (count_column, sum_column, query) in FEATURE_SOURCES.items():
+            applied[table] = self._update_gaps(table, count_column, sum_column, query)
+            while True:
+                watermark = self.meta["watermarks"].get(table, 0)
+                rows = self._fetch_rows(query.format(id_filter="> %s"), watermark, batch_size)
+                if not rows:
+                    break
+                self._apply(count_column, sum_column, rows)
+                # Ids skipped within the batch may belong to transactions that
+                # haven't committed yet
+                self._track_gaps(table, watermark, [int(row[0]) for row in rows])
+                self.meta["watermarks"][table] = int(rows[-1][0])
+                # Columns are flushed before the watermark is recorded
+                self._flush()
+                applied[table] += len(rows)
+                if len(rows) < batch_size:
+                    break
+        return applied
+
+    def _track_gaps(self, table: str, watermark: int, ids: List[int]) -> None:
+        """Remember ids between the watermark and the last fetched id that weren't returned"""
+        gaps = self.meta.setdefault("gaps", {}).setdefault(table, {})
+        now = time.time()
+        previous = watermark
+        for row_id in ids:
+            for missing in range(previous + 1, min(row_id, previous + 1 + RISK_MAX_TRACKED_GAPS)):
+                gaps[str(missing)] = now
+            previous = row_id
+        # Late commits are close to the head; old holes (e.g. deleted rows
+        # seen by the first load) are the first to go
+        if len(gaps) > RISK_MAX_TRACKED_GAPS:
+            for missing in sorted(gaps, key=int)[:len(gaps) - RISK_MAX_TRACKED_GAPS]:
+                del gaps[missing]
+
+    def _update_gaps(self, table: str, count_column: str, sum_column: str, query: str) -> int:
+        """Apply rows that committed late into skipped ids; forget ids skipped too long ago"""
+        gaps = self.meta.setdefault("gaps", {}).get(table)
+        if not gaps:
+            return 0
+        rows = self._fetch_rows(query.format(id_filter="= ANY(%s)"), [int(i) for i in gaps], len(gaps))
+        if rows:
+            self._apply(count_column, sum_column, rows)
+            for row in rows:
+                gaps.pop(str(int(row[0])), None)
+        cutoff = time.time() - RISK_LATE_ROW_SECONDS
+        for missing in [i for i, seen in gaps.items() if seen < cutoff]:
+            del gaps[missing]
+        self._flush()
+        return len(rows)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: np.asarray(self._column(name)[:self.rows]) for name in AGGREGATE_COLUMNS}
+
+    def keys(self) -> np.ndarray:
+        return np.asarray(self._column("key")[:self.rows]) if self.rows else np.array([], dtype=KEY_DTYPE)
+
+    def features(self, now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get (keys, model features, last active epoch) for every learner"""
+        now = now or time.time()
+        if not self.rows:
+            return self.keys(), np.empty((0, len(MODEL_FEATURES))), np.empty(0)
+        columns = self.columns()
+        return self.keys(), derive_features(columns, now), columns["last_active"]
+
+    def vectors(self, user_ids: List[str], now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Get model features for the given users, and a mask of users found in the store"""
+        matrix = np.full((len(user_ids), len(MODEL_FEATURES)), np.nan)
+        found = np.zeros(len(user_ids), dtype=bool)
+        if not self.rows or not user_ids:
+            return matrix, found
+        index = self._load_index()
+        positions = np.array([index.get(str(user_id).encode(), -1) for user_id in user_ids])
+        found = positions >= 0
+        if found.any():
+            columns = {name: values[positions[found]] for name, values in self.columns().items()}
+            matrix[found] = derive_features(columns, now or time.time())
+        return matrix, found
+
+    def last_active_for(self, keys: np.ndarray) -> np.ndarray:
+        """Current last activity for the given keys (NaN if unknown)"""
+        index = self._load_index()
+        positions = np.array([index.get(bytes(key), -1) for key in keys], dtype=np.int64)
+        last_active = np.full(len(keys), np.nan)
+        known = positions >= 0
+        if known.any():
+            last_active[known] = self._column("last_active")[positions[known]]
+        return last_active
+
+    def snapshot(self, now: Optional[float] = None, force: bool = False) -> Optional[str]:
+        """Save the current model features for point-in-time labels"""
+        now = now or time.time()
+        if not force and now - self.meta.get("last_snapshot", 0) < RISK_SNAPSHOT_INTERVAL_HOURS * 3600:
+            return None
+        keys, features, last_active = self.features(now)
+        path = os.path.join(self.snapshot_dir, f"{int(now)}.npz")
+        np.savez(path, keys=keys, features=features, last_active=last_active)
+        self.meta["last_snapshot"] = now
+        _write_json(self._meta_path(), self.meta)
+
+        cutoff = now - RISK_SNAPSHOT_RETENTION_DAYS * DAY_SECONDS
+        for taken_at, old_path in self.snapshots():
+            if taken_at < cutoff:
+                os.remove(old_path)
+        return path
+
+    def snapshots(self) -> List[Tuple[float, str]]:
+        """Snapshots as (epoch, path), oldest first"""
+        found = []
+        for name in os.listdir(self.snapshot_dir):
+            if name.endswith(".npz"):
+                try:
+                    found.append((float(name[:-4]), os.path.join(self.snapshot_dir, name)))
+                except ValueError:
+                    continue
+        return sorted(found)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "learners": self.rows,
+            "capacity": self.meta["capacity"],
+            "watermarks": dict(self.meta["watermarks"]),
+            "tracked_gaps": {table: len(ids) for table, ids in self.meta.get("gaps", {}).items()},
+            "updated_at": self.meta["updated_at"],
+            "snapshots": len(self.snapshots())
+        }
+
+
+class RiskModel:
+    """Logistic regression over MODEL_FEATURES"""
+
+    def __init__(self, version: str, coef: np.ndarray, intercept: float, mean: np.ndarray,
+                 scale: np.ndarray, fill: np.ndarray, metadata: Optional[Dict[str, Any]] = None):
+        self.version = version
+        self.coef = coef
+        self.intercept = intercept
+        self.mean = mean
+        self.scale = scale
+        self.fill = fill
+        self.metadata = metadata or {}
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Dropout probability per row; missing features take the training means"""
+        features = np.where(np.isnan(features), self.fill, features)
+        logits = ((features - self.mean) / self.scale) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-np.clip(logits, -30, 30)))
+
+    def save(self, path: str) -> None:
+        np.savez(path, coef=self.coef, intercept=self.intercept, mean=self.mean,
+                 scale=self.scale, fill=self.fill)
+
+    @classmethod
+    def load(cls, path: str, version: str, metadata: Dict[str, Any]) -> "RiskModel":
+        with np.load(path) as data:
+            return cls(version, data["coef"], float(data["intercept"]), data["mean"],
+                       data["scale"], data["fill"], metadata)
+
+
+def _sigmoid(values: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(values, -30, 30)))
+
+
+def fit_logistic(features: np.ndarray, labels: np.ndarray, l2: float = 1e-3,
+                 iterations: int = 50) -> Tuple[np.ndarray, float]:
+    """Fit standardized logistic regression with Newton steps; returns (coef, intercept)"""
+    design = np.column_stack([np.ones(len(features)), features])
+    weights = np.zeros(design.shape[1])
+    penalty = np.full(design.shape[1], l2)
+    penalty[0] = 0.0  # intercept is not regularized
+    for _ in range(iterations):
+        p = _sigmoid(design @ weights)
+        gradient = design.T @ (p - labels) / len(labels) + penalty * weights
+        hessian = (design.T * (p * (1 - p))) @ design / len(labels) + np.diag(penalty)
+        step = np.linalg.solve(hessian + 1e-9 * np.eye(len(weights)), gradient)
+        weights -= step
+        if np.max(np.abs(step)) < 1e-6:
+            break
+    return weights[1:], float(weights[0])
+
+
+def roc_auc(labels: np.ndarray, scores: np.ndarray) -> float:
+    positives = labels.sum()
+    negatives = len(labels) - positives
+    if not positives or not negatives:
+        return float("nan")
+    ranks = np.empty(len(scores))
+    ranks[np.argsort(scores, kind="mergesort")] = np.arange(1, len(scores) + 1)
+    return float((ranks[labels == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def train_risk_model(features: np.ndarray, labels: np.ndarray, version: str,
+                     metadata: Optional[Dict[str, Any]] = None, holdout: float = 0.2) -> RiskModel:
+    """Fit on a training split and evaluate on the held-out rows"""
+    labels = labels.astype(float)
+    fill = np.nan_to_num(np.nanmean(np.where(np.isfinite(features), features, np.nan), axis=0))
+    features = np.where(np.isnan(features), fill, features)
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+
+    order = np.random.default_rng(len(labels)).permutation(len(labels))
+    test_size = int(len(labels) * holdout)
+    test, train = order[:test_size], order[test_size:]
+
+    coef, intercept = fit_logistic((features[train] - mean) / scale, labels[train])
+    model = RiskModel(version, coef, intercept, mean, scale, fill, dict(metadata or {}))
+
+    evaluated = test if test_size else train
+    probabilities = model.predict_proba(features[evaluated])
+    expected = labels[evaluated]
+    clipped = np.clip(probabilities, 1e-9, 1 - 1e-9)
+    model.metadata.update({
+        "samples": int(len(labels)),
+        "positive_rate": round(float(labels.mean()), 4),
+        "auc": round(roc_auc(expected, probabilities), 4),
+        "accuracy": round(float(((probabilities >= 0.5) == (expected == 1)).mean()), 4),
+        "log_loss": round(float(-np.mean(expected * np.log(clipped) + (1 - expected) * np.log(1 - clipped))), 4),
+        "coefficients": {name: round(float(value), 4) for name, value in zip(MODEL_FEATURES, coef)},
+        "features": list(MODEL_FEATURES)
+    })
+    return model
+
+
+def build_training_set(store: RiskFeatureStore, range_days: int, churn_days: int = RISK_CHURN_DAYS,
+                       now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """
+    Get (features, dropout labels, label info) for training.
+
+    Uses the newest snapshot that is at least churn_days old and within
+    range_days: learners active in the churn_days before the snapshot are
+    labelled 1 if they have not been active since. Without such a snapshot,
+    current features are labelled by inactivity in the last churn_days.
+    """
+    now = now or time.time()
+    horizon = churn_days * DAY_SECONDS
+    eligible = [
+        (taken_at, path) for taken_at, path in store.snapshots()
+        if now - range_days * DAY_SECONDS <= taken_at <= now - horizon
+    ]
+    if eligible:
+        taken_at, path = eligible[-1]
+        with np.load(path) as snapshot:
+            keys, features, last_then = snapshot["keys"], snapshot["features"], snapshot["last_active"]
+        active_then = last_then >= taken_at - horizon
+        last_now = store.last_active_for(keys[active_then])
+        labels = (np.nan_to_num(last_now, nan=0.0) <= taken_at).astype(float)
+        info = {"label_mode": "snapshot", "snapshot_at": datetime.fromtimestamp(taken_at).isoformat()}
+        return features[active_then], labels, info
+
+    keys, features, last_active = store.features(now)
+    recent = last_active >= now - range_days * DAY_SECONDS
+    labels = (last_active[recent] < now - horizon).astype(float)
+    return features[recent], labels, {"label_mode": "current"}
+
+
+class RiskModelRegistry:
+    """Versioned risk models with an active pointer shared through registry.json"""
+
+    def __init__(self, directory: str = RISK_PIPELINE_DIR, reload_seconds: float = RISK_MODEL_RELOAD_SECONDS):
+        self.directory = os.path.join(directory, "models")
+        os.makedirs(self.directory, exist_ok=True)
+        self.reload_seconds = reload_seconds
+        self._active: Optional[RiskModel] = None
+        self._loaded_version: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _registry_path(self) -> str:
+        return os.path.join(self.directory, "registry.json")
+
+    def _model_path(self, version: str) -> str:
+        return os.path.join(self.directory, f"{version}.npz")
+
+    def read(self) -> Dict[str, Any]:
+        try:
+            with open(self._registry_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"active": None, "models": []}
+
+    def register(self, model: RiskModel, activate: bool) -> Dict[str, Any]:
+        """Save a model and optionally make it the active one"""
+        model.save(self._model_path(model.version))
+        registry = self.read()
+        registry["models"].append({"version": model.version, **model.metadata})
+        if activate:
+            registry["active"] = model.version
+
+        # Keep the newest versions, and always the active one
+        keep = {entry["version"] for entry in registry["models"][-RISK_MODEL_KEEP_VERSIONS:]}
+        keep.add(registry["active"])
+        for entry in registry["models"]:
+            if entry["version"] not in keep:
+                try:
+                    os.remove(self._model_path(entry["version"]))
+                except OSError:
+                    pass
+        registry["models"] = [entry for entry in registry["models"] if entry["version"] in keep]
+        _write_json(self._registry_path(), registry)
+        return registry
+
+    def activate(self, version: str) -> bool:
+        """Make a registered version active (for rollback)"""
+        registry = self.read()
+        if not any(entry["version"] == version for entry in registry["models"]):
+            return False
+        registry["active"] = version
+        _write_json(self._registry_path(), registry)
+        self.active_model(force_reload=True)
+        return True
+
+    def active_model(self, force_reload: bool = False) -> Optional[RiskModel]:
+        """Get the active model, reloading when another process changed it"""
+        now = time.monotonic()
+        if not force_reload and now - self._checked_at < self.reload_seconds:
+            return self._active
+        with self._lock:
+            self._checked_at = now
+            registry = self.read()
+            version = registry.get("active")
+            if version != self._loaded_version:
+                model = None
+                if version:
+                    metadata = next((e for e in registry["models"] if e["version"] == version), {})
+                    try:
+                        model = RiskModel.load(self._model_path(version), version, metadata)
+                    except (OSError, KeyError, ValueError) as e:
+                        logger.error(f"Failed to load risk model {version}: {e}")
+                        return self._active
+                # Swap the reference; scorers holding the old model finish with it
+                self._active = model
+                self._loaded_version = version
+                logger.info(f"Active risk model is now {version}")
+            return self._active
+
+
+@contextmanager
+def _pipeline_lock(directory: str = RISK_PIPELINE_DIR):
+    """Exclusive lock on the pipeline directory; yields False if another run holds it"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def run_feature_update() -> Dict[str, Any]:
+    """Pipeline job: fold new rows into the feature store and snapshot (runs in the worker process)"""
+    with _pipeline_lock() as locked:
+        if not locked:
+            return {"success": False, "error": "Risk pipeline is already running"}
+        store = RiskFeatureStore()
+        applied = store.update()
+        snapshot = store.snapshot()
+        return {"success": True, "applied": applied, "snapshot": snapshot, "store": store.get_stats()}
+
+
+def run_training_pipeline(range_days: int, churn_days: int = RISK_CHURN_DAYS) -> Dict[str, Any]:
+    """Pipeline job: update features, train, evaluate and register (runs in the worker process)"""
+    started = time.time()
+    with _pipeline_lock() as locked:
+        if not locked:
+            return {"success": False, "error": "Risk pipeline is already running"}
+        store = RiskFeatureStore()
+        applied = store.update()
+        store.snapshot()
+
+        features, labels, info = build_training_set(store, range_days, churn_days)
+        positives = int(labels.sum())
+        if len(labels) < RISK_MIN_TRAINING_SAMPLES or positives == 0 or positives == len(labels):
+            return {
+                "success": False,
+                "error": f"Not enough labelled learners to train ({len(labels)} samples, {positives} dropouts)",
+                "applied": applied
+            }
+
+        version = f"risk-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        model = train_risk_model(features, labels, version, {
+            **info,
+            "trained_at": datetime.now().isoformat(),
+            "training_data_range_days": range_days,
+            "churn_days": churn_days
+        })
+        auc = model.metadata["auc"]
+        activate = bool(not np.isnan(auc) and auc >= RISK_MODEL_MIN_AUC)
+        RiskModelRegistry().register(model, activate)
+
+    return {
+        "success": True,
+        "version": version,
+        "activated": activate,
+        "metrics": {key: model.metadata[key] for key in ("samples", "auc", "accuracy", "log_loss")},
+        "label_mode": info["label_mode"],
+        "applied": applied,
+        "duration_seconds": round(time.time() - started, 2)
+    }
+
+
+class RiskTrainingService:
+    """Runs pipeline jobs in a single spawned worker process and tracks their status"""
+
+    def __init__(self, registry: Optional[RiskModelRegistry] = None, max_jobs: int = 20):
+        self.registry = registry or RiskModelRegistry()
+        self.max_jobs = max_jobs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._running: Optional[str] = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned, not forked: the child must not share the API
+            # process's database connections or threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call listener(result) after a job that activated a new model"""
+        self._listeners.append(listener)
+
+    def _submit(self, kind: str, fn: Callable, *args) -> Dict[str, Any]:
+        with self._lock:
+            if self._running is not None:
+                return dict(self._jobs[self._running])
+            job_id = uuid.uuid4().hex[:12]
+            job = {"job_id": job_id, "kind": kind, "status": "running",
+                   "started_at": datetime.now().isoformat()}
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except Exception:
+                # Broken pool (worker killed); start a new one next time
+                self._executor = None
+                raise
+            self._jobs[job_id] = job
+            self._running = job_id
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.pop(next(iter(self._jobs)))
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+        return dict(job)
+
+    def _finish(self, job_id: str, future: Future) -> None:
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+            if isinstance(e, BrokenProcessPool):
+                # Worker died; start a new one for the next job
+                with self._lock:
+                    self._executor = None
+        with self._lock:
+            job = self._jobs.get(job_id, {"job_id": job_id})
+            job.update(status="completed" if result.get("success") else "failed",
+                       finished_at=datetime.now().isoformat(), result=result)
+            self._running = None
+        logger.info(f"Risk pipeline job {job_id} {job['status']}: {result}")
+        if result.get("activated"):
+            self.registry.active_model(force_reload=True)
+            for listener in self._listeners:
+                try:
+                    listener(result)
+                except Exception as e:
+                    logger.error(f"Risk model listener failed: {e}")
+
+    def submit_retraining(self, range_days: int) -> Dict[str, Any]:
+        """Start a training run, or return the job already running"""
+        return self._submit("training", run_training_pipeline, range_days)
+
+    def submit_feature_update(self) -> Dict[str, Any]:
+        """Start a feature store update, or return the job already running"""
+        return self._submit("features", run_feature_update)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def score_users(model: RiskModel, user_ids: List[str], store: Optional[RiskFeatureStore] = None) -> np.ndarray:
+    """Risk scores (0-100) from the model; NaN for learners not in the feature store"""
+    store = store or RiskFeatureStore()
+    features, found = store.vectors(user_ids)
+    scores = np.full(len(user_ids), np.nan)
+    if found.any():
+        scores[found] = 100.0 * model.predict_proba(features[found])
+    return scores
+
+
+_service: Optional[RiskTrainingService] = None
+_service_lock = threading.Lock()
+
+
+def get_risk_training_service() -> RiskTrainingService:
+    """Get the shared risk training service"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = RiskTrainingService()
+    return _service
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the risk model pipeline")
+    parser.add_argument("--job", choices=["features", "train"], default="train")
+    parser.add_argument("--days", type=int, default=90, help="Training data range in days")
+    args = parser.parse_args()
+
+    if args.job == "features":
+        print(run_feature_update())
+    else:
+        print(run_training_pipeline(args.days))
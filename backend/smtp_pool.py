@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+SMTP Session Pool for Jeseci Smart Learning Academy
+
+Reuses authenticated SMTP sessions instead of connecting, upgrading to TLS,
+logging in and quitting for every message. Sending is rate limited with a
+token bucket and transient failures are retried with exponential backoff.
+
+Used by the synchronous email senders and by the notification batch jobs.
+Interactive sends (verification, password reset) have their own sessions
+and token bucket, so a running batch never makes them wait.
+
+Author: Cavin Otieno
+"""
+
+import os
+import ssl
+import time
+import queue
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import Any, Dict, List, Optional, Tuple
+
+# Import centralized logging configuration
+from logger_config import logger
+
+SMTP_SERVER = os.getenv("SMTP_HOST", os.getenv("SMTP_SERVER", "smtp.gmail.com"))
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+FROM_EMAIL = os.getenv("SMTP_FROM", os.getenv("FROM_EMAIL", "noreply@jeseci.com"))
+EMAIL_PASSWORD = os.getenv("SMTP_PASSWORD", os.getenv("EMAIL_PASSWORD", ""))
+
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_MAX_MESSAGES_PER_SESSION = int(os.getenv("SMTP_MAX_MESSAGES_PER_SESSION", "100"))
+SMTP_SESSION_IDLE_SECONDS = int(os.getenv("SMTP_SESSION_IDLE_SECONDS", "60"))
+SMTP_RATE_PER_SECOND = float(os.getenv("SMTP_RATE_PER_SECOND", "5"))
+SMTP_INTERACTIVE_SESSIONS = int(os.getenv("SMTP_INTERACTIVE_SESSIONS", "1"))
+SMTP_INTERACTIVE_RATE_PER_SECOND = float(os.getenv("SMTP_INTERACTIVE_RATE_PER_SECOND", "1"))
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+SMTP_RETRY_BASE_SECONDS = float(os.getenv("SMTP_RETRY_BASE_SECONDS", "2"))
+
+
+class RateLimiter:
+    """Token bucket shared by all sessions in a pool"""
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = rate_per_second
+        self.capacity = float(burst if burst is not None else max(1, int(rate_per_second)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMTPSession:
+    """One authenticated SMTP connection, recycled after a number of messages"""
+
+    def __init__(self):
+        self.server: Optional[smtplib.SMTP] = None
+        self.sent = 0
+        self.last_used = 0.0
+
+    def _connect(self) -> None:
+        context = ssl.create_default_context()
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+        server.ehlo()
+        server.starttls(context=context)
+        server.ehlo()  # Re-EHLO after TLS upgrade
+        server.login(FROM_EMAIL, EMAIL_PASSWORD)
+        self.server = server
+        self.sent = 0
+
+    def _usable(self) -> bool:
+        if self.server is None or self.sent >= SMTP_MAX_MESSAGES_PER_SESSION:
+            return False
+        if time.monotonic() - self.last_used > SMTP_SESSION_IDLE_SECONDS:
+            # Servers drop idle sessions; check before reusing
+            try:
+                return self.server.noop()[0] == 250
+            except smtplib.SMTPException:
+                return False
+            except OSError:
+                return False
+        return True
+
+    def send(self, msg: Message, to_addrs: List[str]) -> None:
+        if not self._usable():
+            self.close()
+            self._connect()
+        self.server.sendmail(FROM_EMAIL, to_addrs, msg.as_string())
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+
+def _is_transient(error: Exception) -> bool:
+    """Connection problems and 4xx replies are worth retrying; 5xx are not"""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+class _Lane:
+    """Sessions and token bucket serving one class of sends"""
+
+    def __init__(self, size: int, rate_per_second: float):
+        self.size = size
+        self.limiter = RateLimiter(rate_per_second)
+        self.sessions: "queue.Queue[SMTPSession]" = queue.Queue()
+        for _ in range(size):
+            self.sessions.put(SMTPSession())
+
+
+class SMTPSessionPool:
+    """
+    Bounded pool of reusable SMTP sessions with rate limiting and retry.
+
+    Bulk sends (send_many) use `size` sessions at `rate_per_second`;
+    interactive sends (send) use `interactive_sessions` further sessions
+    with their own `interactive_rate` bucket. The two rates together are
+    what the SMTP provider sees.
+    """
+
+    def __init__(self, size: int = SMTP_POOL_SIZE, rate_per_second: float = SMTP_RATE_PER_SECOND,
+                 max_retries: int = SMTP_MAX_RETRIES,
+                 interactive_sessions: int = SMTP_INTERACTIVE_SESSIONS,
+                 interactive_rate: float = SMTP_INTERACTIVE_RATE_PER_SECOND):
+        self.size = max(1, size)
+        self.max_retries = max_retries
+        self._bulk = _Lane(self.size, rate_per_second)
+        # Without reserved sessions interactive sends share the bulk lane
+        self._interactive = (_Lane(interactive_sessions, interactive_rate)
+                             if interactive_sessions > 0 else self._bulk)
+        self._stats = {"sent": 0, "failed": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def limiter(self) -> RateLimiter:
+        """Token bucket of the bulk lane"""
+        return self._bulk.limiter
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def send(self, msg: Message, to_email: str, bulk: bool = False) -> Dict[str, Any]:
+        """
+        Send one message, retrying transient failures.
+
+        Args:
+            bulk: Send on the batch lane instead of the interactive one
+
+        Returns:
+            dict with 'success' key, and 'error' on failure
+        """
+        if not EMAIL_PASSWORD:
+            logger.info(f"Email credentials not configured - email would be sent to: {to_email}")
+            return {"success": True}
+
+        if not msg.get('From'):
+            msg['From'] = FROM_EMAIL
+        if not msg.get('To'):
+            msg['To'] = to_email
+
+        lane = self._bulk if bulk else self._interactive
+        attempt = 0
+        while True:
+            lane.limiter.acquire()
+            session = lane.sessions.get()
+            try:
+                session.send(msg, [to_email])
+                self._count("sent")
+                return {"success": True}
+            except Exception as error:
+                session.close()
+                if attempt < self.max_retries and _is_transient(error):
+                    attempt += 1
+                    self._count("retries")
+                    delay = SMTP_RETRY_BASE_SECONDS * (2 ** (attempt - 1))
+                    logger.warning(f"Transient SMTP error for {to_email}, retry {attempt} in {delay}s: {error}")
+                else:
+                    self._count("failed")
+                    logger.error(f"Failed to send email to {to_email}: {error}")
+                    return {"success": False, "error": str(error)}
+            finally:
+                lane.sessions.put(session)
+            time.sleep(delay)
+
+    def send_many(self, messages: List[Tuple[Message, str]]) -> Dict[str, Any]:
+        """
+        Send a batch of (message, recipient) pairs over the bulk lane.
+
+        Returns:
+            dict with sent and failed counts and the failed recipients
+        """
+        if not messages:
+            return {"sent": 0, "failed": 0, "failed_recipients": []}
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="smtp") as executor:
+            results = list(executor.map(lambda item: (item[1], self.send(*item, bulk=True)), messages))
+
+        failed = [to_email for to_email, result in results if not result["success"]]
+        return {"sent": len(results) - len(failed), "failed": len(failed), "failed_recipients": failed}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return dict(
+            stats, size=self.size, rate_per_second=self._bulk.limiter.rate,
+            interactive_sessions=self._interactive.size if self._interactive is not self._bulk else 0,
+            interactive_rate_per_second=self._interactive.limiter.rate
+        )
+
+    def close(self) -> None:
+        """Quit every idle session"""
+        lanes = [self._bulk] if self._interactive is self._bulk else [self._bulk, self._interactive]
+        for lane in lanes:
+            for _ in range(lane.size):
+                session = lane.sessions.get()
+                session.close()
+                lane.sessions.put(session)
+
+
+_pool: Optional[SMTPSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPSessionPool:
+    """Get the shared SMTP session pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPSessionPool()
+    return _pool
@@ -0,0 +1,483 @@
+"""
+Throughput and Lag Benchmark for Sync Engine
+
+This module drives SyncEventPublisher, SyncEventConsumer and
+ReconciliationJob end to end against the local stand-ins in
+backend.sync_engine.stand_ins (SQLite, in-memory graph, fakeredis) and
+reports, for each combination of publish batch size (SYNC_BATCH_SIZE) and
+consumer prefetch (SYNC_PREFETCH_COUNT):
+- Events per second from first publish to last applied event
+- End-to-end lag percentiles (event creation to completion)
+- Per-stage timings for publishing, consuming and reconciliation
+- Database and graph round trips per event
+
+Usage:
+    PYTHONPATH=.:backend python -m backend.sync_engine.benchmark --events 2000 --batch-sizes 1,10,50 \\
+        --prefetch 1,10,50 --db-latency-ms 0.5 --graph-latency-ms 1 --output bench.json
+
+Round-trip counts are independent of the host; absolute timings are only
+comparable between runs on the same machine with the same latency settings.
+
+Author: Jeseci Development Team
+"""
+
+import argparse
+import functools
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Optional, Dict, Any, List
+
+from backend.sync_engine.events import SyncEvent, EventType, EventBatch
+from backend.sync_engine.stand_ins import StandInEnvironment
+
+# Import centralized logging configuration
+from logger_config import logger
+from live_metrics import percentile
+
+PUBLISHER_THREAD = "sync-bench-publisher"
+CONSUMER_THREAD = "sync-bench-consumer"
+RECONCILIATION_THREAD = "sync-bench-reconciliation"
+
+
+class StageTimer:
+    """Collects durations per named stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, duration_ms: float):
+        with self._lock:
+            self.samples[stage].append(duration_ms)
+
+    def wrap(self, obj: Any, attribute: str, stage: str):
+        """Time every call of obj.attribute under the given stage name"""
+        original = getattr(obj, attribute)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(stage, (time.perf_counter() - started) * 1000)
+
+        setattr(obj, attribute, timed)
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, values in sorted(self.samples.items()):
+            ordered = sorted(values)
+            result[stage] = {
+                "count": len(ordered),
+                "total_ms": round(sum(ordered), 2),
+                "mean_ms": round(sum(ordered) / len(ordered), 3),
+                "p50_ms": round(percentile(ordered, 50), 3),
+                "p99_ms": round(percentile(ordered, 99), 3),
+            }
+        return result
+
+
+def _latency_summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": round(percentile(ordered, 50), 2),
+        "p90_ms": round(percentile(ordered, 90), 2),
+        "p99_ms": round(percentile(ordered, 99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+class SyncBenchmark:
+    """
+    One benchmark run: a fresh stand-in environment, a publisher thread
+    producing concept and learning path updates, and a consumer thread
+    draining the stream with the production read/process path.
+    """
+
+    def __init__(
+        self,
+        events: int = 1000,
+        entities: int = 200,
+        batch_size: int = 10,
+        prefetch_count: int = 10,
+        rate: float = 0.0,
+        drift: int = 0,
+        db_latency_ms: float = 0.0,
+        graph_latency_ms: float = 0.0,
+        timeout_seconds: float = 300.0,
+        coalesce: bool = True
+    ):
+        self.events = events
+        self.entities = max(1, entities)
+        self.batch_size = max(1, batch_size)
+        self.prefetch_count = max(1, prefetch_count)
+        self.rate = rate
+        self.drift = drift
+        self.db_latency_ms = db_latency_ms
+        self.graph_latency_ms = graph_latency_ms
+        self.timeout_seconds = timeout_seconds
+        self.coalesce = coalesce
+
+        self.timer = StageTimer()
+        self._created_at: Dict[str, float] = {}
+        self._lags: List[float] = []
+        self._lock = threading.Lock()
+        self._first_publish: Optional[float] = None
+        self._last_done: Optional[float] = None
+        self._done = threading.Event()
+        self._finished = 0
+
+    # -- workload -------------------------------------------------------
+
+    def _entity(self, index: int) -> Dict[str, Any]:
+        """Payload of the index-th update; entities are updated round robin"""
+        slot = index % self.entities
+        if slot % 4 == 3:
+            return {
+                "path_id": f"bench-path-{slot}",
+                "name": f"bench-path-{slot}",
+                "title": f"Benchmark path {slot} rev {index}",
+                "category": "benchmark",
+                "difficulty_level": "beginner",
+                "description": "Benchmark learning path",
+                "concepts": [f"bench-concept-{slot - 1}"],
+            }
+        return {
+            "concept_id": f"bench-concept-{slot}",
+            "name": f"bench-concept-{slot}",
+            "display_name": f"Benchmark concept {slot} rev {index}",
+            "category": "benchmark",
+            "difficulty_level": "beginner",
+            "description": "Benchmark concept",
+        }
+
+    def _event(self, index: int) -> SyncEvent:
+        payload = self._entity(index)
+        if "path_id" in payload:
+            return SyncEvent.create_learning_path_event(payload, EventType.LEARNING_PATH_UPDATED)
+        return SyncEvent.create_concept_event(payload, EventType.CONCEPT_UPDATED)
+
+    def _seed_source_rows(self, env: StandInEnvironment):
+        """Insert the source rows reconciliation reads"""
+        schema = env.postgres.schema
+        with env.postgres.engine.begin() as conn:
+            for slot in range(min(self.entities, self.events)):
+                payload = self._entity(slot)
+                if "path_id" in payload:
+                    conn.exec_driver_sql(
+                        f"INSERT INTO {schema}.learning_paths (path_id, name, title, category, difficulty_level, description, updated_at) "
+                        f"VALUES (?, ?, ?, ?, ?, ?, '2000-01-01 00:00:00')",
+                        (payload["path_id"], payload["name"], payload["title"], payload["category"],
+                         payload["difficulty_level"], payload["description"])
+                    )
+                else:
+                    conn.exec_driver_sql(
+                        f"INSERT INTO {schema}.concepts (concept_id, name, display_name, category, difficulty_level, description, updated_at) "
+                        f"VALUES (?, ?, ?, ?, ?, ?, '2000-01-01 00:00:00')",
+                        (payload["concept_id"], payload["name"], payload["display_name"], payload["category"],
+                         payload["difficulty_level"], payload["description"])
+                    )
+
+    # -- instrumentation ------------------------------------------------
+
+    def _instrument_publisher(self, publisher):
+        self.timer.wrap(publisher, "enqueue_events", "publish.enqueue")
+        self.timer.wrap(publisher, "publish_event", "publish.xadd_and_status")
+        self.timer.wrap(publisher, "_xadd_batch", "publish.xadd_batch")
+        self.timer.wrap(publisher, "_record_batch_outcome", "publish.record_outcome")
+
+    def _instrument_consumer(self, consumer):
+        self.timer.wrap(consumer, "_read_events", "consume.read")
+        self.timer.wrap(consumer, "_update_event_status", "consume.mark_processing")
+        self.timer.wrap(consumer, "_should_skip_event", "consume.stale_check")
+        self.timer.wrap(consumer, "_update_sync_status", "consume.sync_status")
+        for event_type, handler in list(consumer.event_handlers.items()):
+            consumer.event_handlers[event_type] = self._timed_handler(handler)
+
+        parse = consumer._parse_event
+
+        def parse_and_track(data):
+            event = parse(data)
+            if event is not None:
+                with self._lock:
+                    self._created_at.setdefault(event.event_id, float(event.timestamp))
+            return event
+
+        consumer._parse_event = parse_and_track
+
+        complete = self.timer.wrap(consumer, "_complete_event", "consume.complete")
+        skip = consumer._skip_event
+
+        def complete_and_measure(event_id, redis_message_id):
+            complete(event_id, redis_message_id)
+            self._finish(event_id)
+
+        def skip_and_measure(event, reason):
+            skip(event, reason)
+            self._finish(event.event_id)
+
+        coalesce = self.timer.wrap(consumer, "_skip_coalesced", "consume.coalesce")
+
+        def coalesce_and_measure(dropped):
+            coalesce(dropped)
+            for _, event, _ in dropped:
+                with self._lock:
+                    self._created_at.setdefault(event.event_id, float(event.timestamp))
+                self._finish(event.event_id)
+
+        consumer._complete_event = complete_and_measure
+        consumer._skip_event = skip_and_measure
+        consumer._skip_coalesced = coalesce_and_measure
+
+    def _timed_handler(self, handler):
+        @functools.wraps(handler)
+        def timed(event):
+            started = time.perf_counter()
+            try:
+                return handler(event)
+            finally:
+                self.timer.record("consume.apply", (time.perf_counter() - started) * 1000)
+        return timed
+
+    def _finish(self, event_id: str):
+        now = time.time()
+        with self._lock:
+            created = self._created_at.pop(event_id, None)
+            if created is not None:
+                self._lags.append((now - created) * 1000)
+            self._finished += 1
+            self._last_done = now
+            if self._finished >= self.events:
+                self._done.set()
+
+    # -- phases ---------------------------------------------------------
+
+    def _produce(self, publisher):
+        interval = self.batch_size / self.rate if self.rate else 0.0
+        next_at = time.perf_counter()
+        self._first_publish = time.time()
+        for start in range(0, self.events, self.batch_size):
+            indexes = range(start, min(start + self.batch_size, self.events))
+            if self.batch_size == 1:
+                payload = self._entity(start)
+                if "path_id" in payload:
+                    publisher.publish_learning_path(payload, EventType.LEARNING_PATH_UPDATED)
+                else:
+                    publisher.publish_concept(payload, EventType.CONCEPT_UPDATED)
+            else:
+                batch = EventBatch()
+                for index in indexes:
+                    batch.add_event(self._event(index))
+                publisher.publish_batch(batch)
+            if interval:
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _consume(self, consumer):
+        # The production read/process path, without the idle sleep of
+        # _consume_loop since the stand-in stream never blocks
+        deadline = time.time() + self.timeout_seconds
+        while not self._done.is_set() and time.time() < deadline:
+            events = consumer._read_events()
+            if not events:
+                time.sleep(0.001)
+                continue
+            for stream_id, data in consumer._coalesce(events):
+                consumer._process_event(stream_id, data)
+
+    def _reconcile(self, env: StandInEnvironment) -> Dict[str, Any]:
+        from backend.sync_engine.reconciliation import ReconciliationJob
+
+        # Drop some nodes so the drift check has repairs to publish
+        for label, nodes in env.neo4j.nodes.items():
+            for key in list(nodes)[:self.drift]:
+                del nodes[key]
+
+        job = ReconciliationJob()
+        self.timer.wrap(job, "_process_stuck_events", "reconcile.stuck_events")
+        self.timer.wrap(job, "_check_data_drift", "reconcile.drift_check")
+        self.timer.wrap(job, "_detect_conflicts", "reconcile.conflicts")
+
+        result: Dict[str, Any] = {}
+
+        def run():
+            result.update(job.run_reconciliation(run_type="benchmark"))
+
+        db_before = env.postgres.round_trips_by_thread[RECONCILIATION_THREAD]
+        graph_before = env.neo4j.round_trips_by_thread[RECONCILIATION_THREAD]
+        thread = threading.Thread(target=run, name=RECONCILIATION_THREAD)
+        thread.start()
+        thread.join()
+        result["db_round_trips"] = env.postgres.round_trips_by_thread[RECONCILIATION_THREAD] - db_before
+        result["graph_round_trips"] = env.neo4j.round_trips_by_thread[RECONCILIATION_THREAD] - graph_before
+        return result
+
+    def run(self) -> Dict[str, Any]:
+        """Run the benchmark and return its report"""
+        from backend.sync_engine.publisher import SyncEventPublisher
+        from backend.sync_engine.consumer import SyncEventConsumer
+
+        with StandInEnvironment(self.db_latency_ms, self.graph_latency_ms) as env:
+            self._seed_source_rows(env)
+
+            publisher = SyncEventPublisher()
+            publisher.sync_config.batch_size = self.batch_size
+            publisher.sync_config.relay_batch_size = self.batch_size
+            publisher.sync_config.outbox_mode = False
+            publisher.sync_config.stream_max_length = max(publisher.sync_config.stream_max_length, self.events * 2)
+
+            consumer = SyncEventConsumer(consumer_name="bench-consumer")
+            consumer.sync_config.prefetch_count = self.prefetch_count
+            consumer.sync_config.coalesce_events = self.coalesce
+            consumer.running = True
+            consumer._warm_version_cache()
+
+            self._instrument_publisher(publisher)
+            self._instrument_consumer(consumer)
+
+            db_before = Counter(env.postgres.round_trips_by_thread)
+            graph_before = Counter(env.neo4j.round_trips_by_thread)
+
+            consumer_thread = threading.Thread(target=self._consume, args=(consumer,), name=CONSUMER_THREAD)
+            consumer_thread.start()
+            publish_started = time.perf_counter()
+            producer_thread = threading.Thread(target=self._produce, args=(publisher,), name=PUBLISHER_THREAD)
+            producer_thread.start()
+            producer_thread.join()
+            publish_seconds = time.perf_counter() - publish_started
+            consumer_thread.join()
+
+            db_trips = Counter(env.postgres.round_trips_by_thread)
+            db_trips.subtract(db_before)
+            graph_trips = Counter(env.neo4j.round_trips_by_thread)
+            graph_trips.subtract(graph_before)
+
+            groups = env.redis.get_client().xinfo_groups(publisher.redis_config.stream_name)
+            reconciliation = self._reconcile(env)
+
+            consumer_stats = consumer.get_stats()
+            publisher_stats = publisher.get_stats()
+            elapsed = (self._last_done - self._first_publish) if self._last_done and self._first_publish else 0.0
+            per_event = lambda value: round(value / self.events, 3) if self.events else 0.0
+
+            report = {
+                "batch_size": self.batch_size,
+                "prefetch_count": self.prefetch_count,
+                "events": self.events,
+                "entities": self.entities,
+                "rate_limit": self.rate or None,
+                "db_latency_ms": self.db_latency_ms,
+                "graph_latency_ms": self.graph_latency_ms,
+                "completed": self._finished,
+                "timed_out": self._finished < self.events,
+                "processed": consumer_stats["events_processed"],
+                "skipped": consumer_stats["events_skipped"],
+                "coalesced": consumer_stats["events_coalesced"],
+                "failed": consumer_stats["events_failed"],
+                "publish_seconds": round(publish_seconds, 3),
+                "elapsed_seconds": round(elapsed, 3),
+                "events_per_second": round(self._finished / elapsed, 1) if elapsed else 0.0,
+                "lag": _latency_summary(self._lags),
+                "stages": self.timer.summary(),
+                "round_trips_per_event": {
+                    "db_publish": per_event(db_trips[PUBLISHER_THREAD]),
+                    "db_consume": per_event(db_trips[CONSUMER_THREAD]),
+                    "graph_consume": per_event(graph_trips[CONSUMER_THREAD]),
+                },
+                "consumer_group": groups[0] if groups else {},
+                "publisher": publisher_stats,
+                "version_cache": consumer_stats["version_cache"],
+                "consumer_stages": consumer_stats["stages"],
+                "reconciliation": reconciliation,
+            }
+            consumer.stop()
+            return report
+
+
+def run_benchmarks(
+    batch_sizes: List[int],
+    prefetch_counts: List[int],
+    **options
+) -> List[Dict[str, Any]]:
+    """
+    Run one benchmark per (batch size, prefetch count) combination.
+
+    Args:
+        batch_sizes: Publish batch sizes to try (SYNC_BATCH_SIZE)
+        prefetch_counts: Consumer read counts to try (SYNC_PREFETCH_COUNT)
+        **options: Further SyncBenchmark arguments
+
+    Returns:
+        List of run reports
+    """
+    reports = []
+    for batch_size in batch_sizes:
+        for prefetch_count in prefetch_counts:
+            logger.info(f"Sync benchmark: batch_size={batch_size} prefetch_count={prefetch_count}")
+            reports.append(SyncBenchmark(
+                batch_size=batch_size,
+                prefetch_count=prefetch_count,
+                **options
+            ).run())
+    return reports
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description="Sync engine throughput and lag benchmark")
+    parser.add_argument("--events", type=int, default=1000, help="Events per run")
+    parser.add_argument("--entities", type=int, default=200, help="Distinct entities updated round robin")
+    parser.add_argument("--batch-sizes", type=_int_list, default=[1, 10, 50], help="Comma-separated publish batch sizes")
+    parser.add_argument("--prefetch", type=_int_list, default=[1, 10, 50], help="Comma-separated consumer prefetch counts")
+    parser.add_argument("--rate", type=float, default=0.0, help="Publish rate in events/second (0 = unthrottled)")
+    parser.add_argument("--drift", type=int, default=0, help="Graph nodes per label to drop before reconciliation")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Injected latency per database round trip")
+    parser.add_argument("--graph-latency-ms", type=float, default=0.0, help="Injected latency per graph round trip")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for a run to drain")
+    parser.add_argument("--no-coalesce", action="store_true", help="Apply every event instead of coalescing per batch")
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    reports = run_benchmarks(
+        args.batch_sizes,
+        args.prefetch,
+        events=args.events,
+        entities=args.entities,
+        rate=args.rate,
+        drift=args.drift,
+        db_latency_ms=args.db_latency_ms,
+        graph_latency_ms=args.graph_latency_ms,
+        timeout_seconds=args.timeout,
+        coalesce=not args.no_coalesce
+    )
+
+    print(f"{'batch':>6} {'prefetch':>8} {'ev/s':>9} {'lag p50':>9} {'lag p99':>9} {'db/ev':>7} {'graph/ev':>9}")
+    for report in reports:
+        trips = report["round_trips_per_event"]
+        print(
+            f"{report['batch_size']:>6} {report['prefetch_count']:>8} {report['events_per_second']:>9} "
+            f"{report['lag'].get('p50_ms', 0):>9} {report['lag'].get('p99_ms', 0):>9} "
+            f"{trips['db_publish'] + trips['db_consume']:>7.2f} {trips['graph_consume']:>9.2f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2, default=str)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
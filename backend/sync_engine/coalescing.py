@@ -0,0 +1,114 @@
+"""
+Event Coalescing for Sync Engine
+
+An editing session or bulk import produces several events for the same
+entity in quick succession. Concept and learning path handlers MERGE the
+full payload, so within one consumer batch only the net change needs to
+reach Neo4j:
+
+- Creates and updates collapse into the one with the highest source_version
+- Creates and updates before a delete are dropped; of several deletes only
+  the last is kept
+- A create and delete that cancel out are both dropped, as long as the
+  entity was never applied to the graph before this batch
+- Upserts after the last delete are kept (collapsed) after that delete, so
+  the node still loses its old relationships
+
+Relationship events and unversioned entity types pass through unchanged.
+A collapsed upsert takes the stream position of the earliest upsert it
+replaces, so relationship events later in the batch still find the node
+(e.g. CREATED v1, RELATIONSHIP_CREATED, UPDATED v2 runs UPDATED v2 first).
+Other surviving events keep their stream order.
+
+Author: Jeseci Development Team
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+from backend.sync_engine.events import SyncEvent, EventType
+from backend.sync_engine.version_cache import VERSIONED_ENTITIES
+
+
+@dataclass
+class CoalescedBatch:
+    """Result of coalescing one batch of stream entries"""
+    # (stream_id, data) entries to process, in processing order
+    keep: List[Tuple[str, Dict[str, str]]] = field(default_factory=list)
+    # (stream_id, event, reason) entries that need no processing
+    dropped: List[Tuple[str, SyncEvent, str]] = field(default_factory=list)
+
+
+def coalesce_events(
+    entries: List[Tuple[str, Dict[str, str], SyncEvent]],
+    was_applied: Callable[[str, str], bool]
+) -> CoalescedBatch:
+    """
+    Collapse events for the same entity within a batch.
+
+    Args:
+        entries: (stream_id, data, event) per stream entry; event is None
+            for entries that couldn't be parsed, which are kept
+        was_applied: was_applied(entity_type, entity_id) tells whether the
+            entity exists in the graph, so create/delete pairs can cancel
+
+    Returns:
+        Entries to process and entries dropped with the reason
+    """
+    by_entity: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for index, (_, _, event) in enumerate(entries):
+        if event is None or event.entity_type not in VERSIONED_ENTITIES or not event.entity_id:
+            continue
+        if EventType.is_relationship_event(event.event_type):
+            continue
+        by_entity[(event.entity_type, event.entity_id)].append(index)
+
+    dropped: Dict[int, str] = {}
+    # stream position -> surviving upsert processed there (after the entry
+    # at that position, if it is kept)
+    moved: Dict[int, int] = {}
+    for (entity_type, entity_id), indexes in by_entity.items():
+        if len(indexes) < 2:
+            continue
+        history = sorted(indexes, key=lambda i: entries[i][2].source_version)
+        deletes = [i for i in history if EventType.is_delete_event(entries[i][2].event_type)]
+        keep = set()
+        if deletes:
+            last_delete = deletes[-1]
+            after = history[history.index(last_delete) + 1:]
+            first = entries[history[0]][2]
+            if (not after and EventType.is_create_event(first.event_type)
+                    and not was_applied(entity_type, entity_id)):
+                for i in history:
+                    dropped[i] = "Coalesced: created and deleted in the same batch"
+                continue
+            keep.add(last_delete)
+            upserts = after
+            # The upsert must run after the delete even if the stream has
+            # it earlier (e.g. a retried event)
+            slot = min((i for i in after if i > last_delete), default=last_delete)
+        else:
+            upserts = history
+            slot = min(history)
+        if upserts:
+            survivor_index = max(upserts, key=lambda i: entries[i][2].source_version)
+            keep.add(survivor_index)
+            moved[slot] = survivor_index
+
+        survivor = entries[max(keep, key=lambda i: entries[i][2].source_version)][2]
+        for i in history:
+            if i not in keep:
+                dropped[i] = f"Coalesced into event {survivor.event_id}"
+
+    batch = CoalescedBatch()
+    placed = set(moved.values())
+    for index, (stream_id, data, event) in enumerate(entries):
+        if index in dropped:
+            batch.dropped.append((stream_id, event, dropped[index]))
+        elif index not in placed:
+            batch.keep.append((stream_id, data))
+        if index in moved:
+            survivor_id, survivor_data, _ = entries[moved[index]]
+            batch.keep.append((survivor_id, survivor_data))
+    return batch
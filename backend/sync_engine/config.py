@@ -15,31 +15,34 @@ Author: Jeseci Development Team
 """
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', 'config', '.env'))
 
+# Field defaults are default factories so each get_*_config() call reads the
+# environment as it is then, not as it was when this module was imported
+
 
 @dataclass
 class RedisConfig:
     """Redis connection configuration"""
-    host: str = os.getenv("REDIS_HOST", "localhost")
-    port: int = int(os.getenv("REDIS_PORT", 6379))
-    db: int = int(os.getenv("REDIS_DB", 1))
-    password: Optional[str] = os.getenv("REDIS_PASSWORD", None)
-    ssl: bool = os.getenv("REDIS_SSL", "false").lower() == "true"
+    host: str = field(default_factory=lambda: os.getenv("REDIS_HOST", "localhost"))
+    port: int = field(default_factory=lambda: int(os.getenv("REDIS_PORT", 6379)))
+    db: int = field(default_factory=lambda: int(os.getenv("REDIS_DB", 1)))
+    password: Optional[str] = field(default_factory=lambda: os.getenv("REDIS_PASSWORD", None))
+    ssl: bool = field(default_factory=lambda: os.getenv("REDIS_SSL", "false").lower() == "true")
     
     # Stream configuration
-    stream_name: str = os.getenv("REDIS_STREAM_NAME", "jeseci:sync:stream")
-    consumer_group: str = os.getenv("REDIS_CONSUMER_GROUP", "jeseci:sync:consumers")
+    stream_name: str = field(default_factory=lambda: os.getenv("REDIS_STREAM_NAME", "jeseci:sync:stream"))
+    consumer_group: str = field(default_factory=lambda: os.getenv("REDIS_CONSUMER_GROUP", "jeseci:sync:consumers"))
     
     # Connection pool settings
-    max_connections: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 10))
-    socket_timeout: int = int(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
-    socket_connect_timeout: int = int(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 5))
+    max_connections: int = field(default_factory=lambda: int(os.getenv("REDIS_MAX_CONNECTIONS", 10)))
+    socket_timeout: int = field(default_factory=lambda: int(os.getenv("REDIS_SOCKET_TIMEOUT", 5)))
+    socket_connect_timeout: int = field(default_factory=lambda: int(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 5)))
     
     def to_url(self) -> str:
         """Generate Redis connection URL"""
@@ -56,29 +59,44 @@ class SyncConfig:
     """Synchronization engine configuration"""
     
     # Batch processing
-    batch_size: int = int(os.getenv("SYNC_BATCH_SIZE", 10))
-    prefetch_count: int = int(os.getenv("SYNC_PREFETCH_COUNT", 10))
+    batch_size: int = field(default_factory=lambda: int(os.getenv("SYNC_BATCH_SIZE", 10)))
+    prefetch_count: int = field(default_factory=lambda: int(os.getenv("SYNC_PREFETCH_COUNT", 10)))
+    
+    # Outbox relay: domain writes only insert sync_event_log rows and the
+    # relay publishes them to Redis in batches
+    outbox_mode: bool = field(default_factory=lambda: os.getenv("SYNC_OUTBOX_MODE", "false").lower() == "true")
+    relay_batch_size: int = field(default_factory=lambda: int(os.getenv("SYNC_RELAY_BATCH_SIZE", 500)))
+    relay_interval_seconds: float = field(default_factory=lambda: float(os.getenv("SYNC_RELAY_INTERVAL", 1.0)))
+    stream_max_length: int = field(default_factory=lambda: int(os.getenv("SYNC_STREAM_MAXLEN", 10000)))
+    
+    # Collapse events for the same entity within a consumer batch
+    coalesce_events: bool = field(default_factory=lambda: os.getenv("SYNC_COALESCE_EVENTS", "true").lower() == "true")
     
     # Retry settings
-    max_retries: int = int(os.getenv("SYNC_MAX_RETRIES", 3))
-    retry_delay_seconds: int = int(os.getenv("SYNC_RETRY_DELAY", 5))
-    retry_backoff_multiplier: float = float(os.getenv("SYNC_RETRY_BACKOFF", 2.0))
+    max_retries: int = field(default_factory=lambda: int(os.getenv("SYNC_MAX_RETRIES", 3)))
+    retry_delay_seconds: int = field(default_factory=lambda: int(os.getenv("SYNC_RETRY_DELAY", 5)))
+    retry_backoff_multiplier: float = field(default_factory=lambda: float(os.getenv("SYNC_RETRY_BACKOFF", 2.0)))
+    retry_max_delay_seconds: int = field(default_factory=lambda: int(os.getenv("SYNC_RETRY_MAX_DELAY", 300)))
+    dead_letter_max_length: int = field(default_factory=lambda: int(os.getenv("SYNC_DEAD_LETTER_MAXLEN", 10000)))
     
     # Timeout settings
-    event_processing_timeout_seconds: int = int(os.getenv("SYNC_PROCESSING_TIMEOUT", 30))
-    consumer_idle_timeout_seconds: int = int(os.getenv("SYNC_CONSUMER_IDLE_TIMEOUT", 300))
+    event_processing_timeout_seconds: int = field(default_factory=lambda: int(os.getenv("SYNC_PROCESSING_TIMEOUT", 30)))
+    consumer_idle_timeout_seconds: int = field(default_factory=lambda: int(os.getenv("SYNC_CONSUMER_IDLE_TIMEOUT", 300)))
     
     # Reconciliation job settings
-    reconciliation_interval_seconds: int = int(os.getenv("SYNC_RECONCILIATION_INTERVAL", 300))
-    reconciliation_batch_size: int = int(os.getenv("SYNC_RECONCILIATION_BATCH", 50))
-    stale_event_threshold_minutes: int = int(os.getenv("SYNC_STALE_EVENT_THRESHOLD", 5))
+    reconciliation_interval_seconds: int = field(default_factory=lambda: int(os.getenv("SYNC_RECONCILIATION_INTERVAL", 300)))
+    reconciliation_batch_size: int = field(default_factory=lambda: int(os.getenv("SYNC_RECONCILIATION_BATCH", 50)))
+    stale_event_threshold_minutes: int = field(default_factory=lambda: int(os.getenv("SYNC_STALE_EVENT_THRESHOLD", 5)))
     
     # Conflict resolution
-    conflict_detection_enabled: bool = os.getenv("SYNC_CONFLICT_DETECTION", "true").lower() == "true"
-    auto_repair_enabled: bool = os.getenv("SYNC_AUTO_REPAIR", "true").lower() == "true"
+    conflict_detection_enabled: bool = field(default_factory=lambda: os.getenv("SYNC_CONFLICT_DETECTION", "true").lower() == "true")
+    auto_repair_enabled: bool = field(default_factory=lambda: os.getenv("SYNC_AUTO_REPAIR", "true").lower() == "true")
+    
+    # Seconds between metrics snapshots published to Redis by each consumer
+    metrics_publish_interval_seconds: float = field(default_factory=lambda: float(os.getenv("SYNC_METRICS_INTERVAL", 10)))
     
     # Logging
-    log_level: str = os.getenv("SYNC_LOG_LEVEL", "INFO")
+    log_level: str = field(default_factory=lambda: os.getenv("SYNC_LOG_LEVEL", "INFO"))
     
     def __repr__(self) -> str:
         return f"SyncConfig(batch_size={self.batch_size}, max_retries={self.max_retries}, reconciliation_interval={self.reconciliation_interval_seconds}s)"
@@ -89,18 +107,18 @@ class DatabaseConfig:
     """Database connection configuration"""
     
     # PostgreSQL (Source)
-    postgres_host: str = os.getenv("POSTGRES_HOST", "localhost")
-    postgres_port: int = int(os.getenv("POSTGRES_PORT", 5432))
-    postgres_db: str = os.getenv("POSTGRES_DB", "jeseci_learning_academy")
-    postgres_user: str = os.getenv("POSTGRES_USER", "jeseci_academy_user")
-    postgres_password: str = os.getenv("POSTGRES_PASSWORD", "jeseci_secure_password_2024")
-    postgres_schema: str = os.getenv("POSTGRES_SCHEMA", "jeseci_academy")
+    postgres_host: str = field(default_factory=lambda: os.getenv("POSTGRES_HOST", "localhost"))
+    postgres_port: int = field(default_factory=lambda: int(os.getenv("POSTGRES_PORT", 5432)))
+    postgres_db: str = field(default_factory=lambda: os.getenv("POSTGRES_DB", "jeseci_learning_academy"))
+    postgres_user: str = field(default_factory=lambda: os.getenv("POSTGRES_USER", "jeseci_academy_user"))
+    postgres_password: str = field(default_factory=lambda: os.getenv("POSTGRES_PASSWORD", "jeseci_secure_password_2024"))
+    postgres_schema: str = field(default_factory=lambda: os.getenv("POSTGRES_SCHEMA", "jeseci_academy"))
     
     # Neo4j (Target)
-    neo4j_uri: str = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-    neo4j_user: str = os.getenv("NEO4J_USER", "neo4j")
-    neo4j_password: str = os.getenv("NEO4J_PASSWORD", "neo4j_secure_password_2024")
-    neo4j_database: str = os.getenv("NEO4J_DATABASE", "jeseci_academy")
+    neo4j_uri: str = field(default_factory=lambda: os.getenv("NEO4J_URI", "bolt://localhost:7687"))
+    neo4j_user: str = field(default_factory=lambda: os.getenv("NEO4J_USER", "neo4j"))
+    neo4j_password: str = field(default_factory=lambda: os.getenv("NEO4J_PASSWORD", "neo4j_secure_password_2024"))
+    neo4j_database: str = field(default_factory=lambda: os.getenv("NEO4J_DATABASE", "jeseci_academy"))
     
     def to_postgres_url(self) -> str:
         """Generate PostgreSQL connection URL"""
@@ -24,6 +24,7 @@ from typing import Any, Dict, List, Optional, Callable
 from backend.sync_engine.config import get_sync_config
 from backend.sync_engine.database import get_postgres_sync_manager, get_neo4j_sync_manager
 from backend.sync_engine.models import SyncConflict, SyncStatus, ConflictResolutionStatus
+from backend.sync_engine.hlc import get_clock, to_datetime, to_version
 
 # Import centralized logging configuration
 from logger_config import logger
@@ -51,7 +52,6 @@ class ResolutionStrategy(str, Enum):
 @dataclass
 class ConflictInfo:
     """Information about a detected conflict"""
-    differences: Dict[str, Any] = field(default_factory=dict)
     entity_id: str
     entity_type: str
     conflict_type: ConflictType
@@ -61,6 +61,7 @@ class ConflictInfo:
     target_version: int
     source_updated_at: datetime
     target_updated_at: datetime
+    differences: Dict[str, Any] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -86,6 +87,15 @@ class ConflictDetector:
     and identifies conflicts based on various criteria.
     """
     
+    # Entity type -> (PostgreSQL table, Neo4j label, id field)
+    ENTITY_SOURCES = {
+        "concept": ("concepts", "Concept", "concept_id"),
+        "learning_path": ("learning_paths", "LearningPath", "path_id")
+    }
+    
+    # Entities fetched per bulk query in batch_detect_conflicts
+    BULK_FETCH_SIZE = 500
+    
     def __init__(self):
         self.postgres_manager = get_postgres_sync_manager()
         self.neo4j_manager = get_neo4j_sync_manager()
@@ -109,6 +119,15 @@ class ConflictDetector:
         source_data = self._get_source_data(entity_type, entity_id)
         target_data = self._get_target_data(entity_type, entity_id)
         
+        return self._compare(entity_type, source_data, target_data)
+    
+    def _compare(
+        self,
+        entity_type: str,
+        source_data: Optional[Dict[str, Any]],
+        target_data: Optional[Dict[str, Any]]
+    ) -> Optional[ConflictInfo]:
+        """Compare one entity's source and target data"""
         if not source_data and not target_data:
             return None
         
@@ -133,61 +152,49 @@ class ConflictDetector:
     
     def _get_source_data(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
         """Get entity data from PostgreSQL (source)"""
-        table_map = {
-            "concept": "concepts",
-            "learning_path": "learning_paths"
-        }
-        
-        table = table_map.get(entity_type)
-        if not table:
-            return None
-        
-        # Get schema from configuration
-        from backend.sync_engine.config import get_sync_config
-        config = get_sync_config()
-        schema = config.postgres_schema
-        id_field = "concept_id" if entity_type == "concept" else "path_id"
+        return self._get_source_data_bulk(entity_type, [entity_id]).get(entity_id)
+    
+    def _get_source_data_bulk(self, entity_type: str, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several entities from PostgreSQL in one query, keyed by id"""
+        source = self.ENTITY_SOURCES.get(entity_type)
+        if not source or not entity_ids:
+            return {}
+        table, _, id_field = source
         
         query = f"""
-        SELECT * FROM {schema}.{table}
-        WHERE {id_field} = %s
+        SELECT * FROM {self.postgres_manager.schema}.{table}
+        WHERE {id_field} = ANY(%s)
         """
         
-        results = self.postgres_manager.execute_query(query, (entity_id,))
-        if results:
-            data = results[0]
+        rows = {}
+        for data in self.postgres_manager.execute_query(query, (list(entity_ids),)):
             # Convert datetime fields
             for key, value in data.items():
                 if hasattr(value, 'isoformat'):
                     data[key] = value.isoformat()
-            return data
-        
-        return None
+            rows[data.get(id_field)] = data
+        return rows
     
     def _get_target_data(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
         """Get entity data from Neo4j (target)"""
-        label_map = {
-            "concept": "Concept",
-            "learning_path": "LearningPath"
-        }
-        
-        label = label_map.get(entity_type)
-        if not label:
-            return None
-        
-        property_name = "concept_id" if entity_type == "concept" else "path_id"
-        node = self.neo4j_manager.get_node(label, property_name, entity_id)
-        
-        if node:
+        return self._get_target_data_bulk(entity_type, [entity_id]).get(entity_id)
+    
+    def _get_target_data_bulk(self, entity_type: str, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several entities from Neo4j in one query, keyed by id"""
+        source = self.ENTITY_SOURCES.get(entity_type)
+        if not source or not entity_ids:
+            return {}
+        _, label, property_name = source
+        
+        nodes = self.neo4j_manager.get_nodes(label, property_name, list(entity_ids))
+        for node in nodes.values():
             # Convert Neo4j types to serializable
             for key, value in node.items():
                 if hasattr(value, 'isoformat'):
                     node[key] = value.isoformat()
                 elif hasattr(value, 'timestamp'):
                     node[key] = value.timestamp()
-            return node
-        
-        return None
+        return nodes
     
     def _check_version_conflict(
         self, 
@@ -201,36 +208,13 @@ class ConflictDetector:
         A version conflict occurs when both databases have been modified
         independently after the last synchronization.
         """
-        # Get last sync time from Neo4j
-        last_sync = target_data.get("last_synced_at")
-        if last_sync:
-            if hasattr(last_sync, 'timestamp'):
-                last_sync_ts = last_sync
-            else:
-                last_sync_ts = datetime.fromisoformat(str(last_sync))
-        else:
-            last_sync_ts = datetime.min
-        
-        # Get update times
-        source_updated = source_data.get("updated_at")
-        target_updated = target_data.get("updated_at")
-        
-        if hasattr(source_updated, 'timestamp'):
-            source_updated_ts = source_updated
-        elif source_updated:
-            source_updated_ts = datetime.fromisoformat(str(source_updated))
-        else:
-            source_updated_ts = datetime.min
-        
-        if hasattr(target_updated, 'timestamp'):
-            target_updated_ts = target_updated
-        elif target_updated:
-            target_updated_ts = datetime.fromisoformat(str(target_updated))
-        else:
-            target_updated_ts = datetime.min
+        # Compare on the HLC scale so sub-second edits are ordered exactly
+        last_sync_version = to_version(target_data.get("last_synced_at"))
+        source_version = to_version(source_data.get("updated_at"))
+        target_version = to_version(target_data.get("updated_at"))
         
         # Check if both were modified after last sync
-        if source_updated_ts > last_sync_ts and target_updated_ts > last_sync_ts:
+        if source_version > last_sync_version and target_version > last_sync_version:
             # Conflict detected
             return ConflictInfo(
                 entity_id=source_data.get("concept_id") or source_data.get("path_id") or "",
@@ -238,10 +222,10 @@ class ConflictDetector:
                 conflict_type=ConflictType.VERSION_MISMATCH,
                 source_data=source_data,
                 target_data=target_data,
-                source_version=int(source_updated_ts.timestamp()),
-                target_version=int(target_updated_ts.timestamp()),
-                source_updated_at=source_updated_ts,
-                target_updated_at=target_updated_ts
+                source_version=source_version,
+                target_version=target_version,
+                source_updated_at=to_datetime(source_version),
+                target_updated_at=to_datetime(target_version)
             )
         
         return None
@@ -282,19 +266,8 @@ class ConflictDetector:
             source_updated = source_data.get("updated_at", datetime.min)
             target_updated = target_data.get("updated_at", datetime.min)
             
-            if hasattr(source_updated, 'timestamp'):
-                source_version = int(source_updated.timestamp())
-            elif source_updated:
-                source_version = int(datetime.fromisoformat(str(source_updated)).timestamp())
-            else:
-                source_version = 0
-            
-            if hasattr(target_updated, 'timestamp'):
-                target_version = int(target_updated.timestamp())
-            elif target_updated:
-                target_version = int(datetime.fromisoformat(str(target_updated)).timestamp())
-            else:
-                target_version = 0
+            source_version = to_version(source_updated) if source_updated != datetime.min else 0
+            target_version = to_version(target_updated) if target_updated != datetime.min else 0
             
             return ConflictInfo(
                 entity_id=source_data.get("concept_id") or source_data.get("path_id") or "",
@@ -319,6 +292,9 @@ class ConflictDetector:
         """
         Detect conflicts for multiple entities.
         
+        Entities are fetched from both databases in bulk, BULK_FETCH_SIZE
+        ids per query, and compared in memory.
+        
         Args:
             entity_type: Type of entities
             entity_ids: List of entity IDs to check
@@ -327,11 +303,17 @@ class ConflictDetector:
             List of detected conflicts
         """
         conflicts = []
+        unique_ids = list(dict.fromkeys(entity_ids))
         
-        for entity_id in entity_ids:
-            conflict = self.detect_conflicts(entity_type, entity_id)
-            if conflict:
-                conflicts.append(conflict)
+        for start in range(0, len(unique_ids), self.BULK_FETCH_SIZE):
+            chunk = unique_ids[start:start + self.BULK_FETCH_SIZE]
+            source_rows = self._get_source_data_bulk(entity_type, chunk)
+            target_nodes = self._get_target_data_bulk(entity_type, chunk)
+            
+            for entity_id in chunk:
+                conflict = self._compare(entity_type, source_rows.get(entity_id), target_nodes.get(entity_id))
+                if conflict:
+                    conflicts.append(conflict)
         
         return conflicts
 
@@ -501,7 +483,7 @@ class ConflictResolver:
             "difficulty_level": data.get("difficulty_level", ""),
             "description": data.get("description", ""),
             "detailed_description": data.get("detailed_description", ""),
-            "source_version": data.get("updated_at", 0)
+            "source_version": self._resolution_version(data)
         }
         
         success = self.neo4j_manager.execute_write(query, {
@@ -537,7 +519,7 @@ class ConflictResolver:
             "description": data.get("description", ""),
             "category": data.get("category", ""),
             "difficulty_level": data.get("difficulty_level", ""),
-            "source_version": data.get("updated_at", 0)
+            "source_version": self._resolution_version(data)
         }
         
         success = self.neo4j_manager.execute_write(query, {
@@ -551,6 +533,13 @@ class ConflictResolver:
         
         return success
     
+    @staticmethod
+    def _resolution_version(data: Dict[str, Any]) -> int:
+        """Version for a resolution write: newer than the source row's updated_at"""
+        clock = get_clock()
+        clock.observe(data.get("updated_at"))
+        return clock.now()
+    
     def _update_sync_status(
         self,
         entity_id: str,
@@ -4,13 +4,15 @@ Event Consumer for Sync Engine
 This module provides the event consumer that processes synchronization events
 from Redis streams and applies changes to Neo4j. The consumer implements:
 - Idempotent event processing
-- Conflict detection
-- Retry logic with exponential backoff
-- Error handling and dead letter queue
+- Coalescing of repeated events for the same entity within a batch
+- Conflict detection against an in-memory cache of applied versions
+- Retry logic with exponential backoff (delayed retries in a Redis sorted set)
+- Error handling and a dead-letter stream
 
 Author: Jeseci Development Team
 """
 
+import functools
 import json
 import logging
 import threading
@@ -25,9 +27,28 @@ from backend.sync_engine.config import get_redis_config, get_sync_config
 from backend.sync_engine.events import SyncEvent, EventType
 from backend.sync_engine.models import SyncEventLog, SyncEventStatus, SyncStatus
 from backend.sync_engine.database import get_postgres_sync_manager, get_neo4j_sync_manager, get_redis_sync_manager
+from backend.sync_engine.version_cache import AppliedVersionCache, VERSIONED_ENTITIES
+from backend.sync_engine.hlc import to_version
+from backend.sync_engine.metrics import SyncMetrics
+from backend.sync_engine.retry_scheduler import RetryScheduler, DeadLetterQueue
+from backend.sync_engine.coalescing import coalesce_events
+from backend.sync_engine.publisher import get_sync_publisher
 
 # Import centralized logging configuration
 from logger_config import logger
+from live_metrics import get_live_metrics
+
+
+def _status_write(method: Callable) -> Callable:
+    """Add a method's time to the current event's status_update stage"""
+    @functools.wraps(method)
+    def timed(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._status_seconds += time.perf_counter() - started
+    return timed
 
 
 class SyncEventConsumer:
@@ -63,12 +84,22 @@ class SyncEventConsumer:
         # State
         self.running = False
         self.redis_client = None
+        self.retry_scheduler: Optional[RetryScheduler] = None
+        self.dead_letters: Optional[DeadLetterQueue] = None
         self._processing_lock = threading.Lock()
         
+        # Last applied source_version per entity, so stale checks skip Neo4j
+        self.version_cache = AppliedVersionCache()
+        
+        # Stage histograms and counters, published to Redis for /metrics/sync
+        self.metrics = SyncMetrics()
+        self._status_seconds = 0.0
+        
         # Statistics
         self.events_processed = 0
         self.events_failed = 0
         self.events_skipped = 0
+        self.events_coalesced = 0
         self.start_time: Optional[datetime] = None
         
         # Event handlers (can be customized)
@@ -95,6 +126,9 @@ class SyncEventConsumer:
             self.redis_config.consumer_group
         )
         
+        self.retry_scheduler = RetryScheduler(self.redis_client, self.redis_config.stream_name)
+        self.dead_letters = DeadLetterQueue(self.redis_client, self.redis_config.stream_name)
+        
         logger.info(f"SyncEventConsumer '{self.consumer_name}' initialized")
     
     def start(self):
@@ -106,6 +140,7 @@ class SyncEventConsumer:
         self.running = True
         self.start_time = datetime.now(timezone.utc)
         logger.info(f"Consumer '{self.consumer_name}' starting...")
+        self._warm_version_cache()
         
         try:
             self._consume_loop()
@@ -113,6 +148,7 @@ class SyncEventConsumer:
             logger.error(f"Consumer loop error: {e}")
         finally:
             self.running = False
+            self.metrics.publish(self.redis_client, self.consumer_name, force=True)
             logger.info(f"Consumer '{self.consumer_name}' stopped")
     
     def stop(self):
@@ -124,14 +160,22 @@ class SyncEventConsumer:
         """Main consumption loop"""
         while self.running:
             try:
+                self.metrics.publish(self.redis_client, self.consumer_name)
+                
+                # Requeue retries that are due, and don't block past the next one
+                next_retry = self.retry_scheduler.promote_due()
+                
                 # Read events from stream
-                events = self._read_events()
+                events = self._read_events(next_retry)
                 
                 if not events:
                     # No events, wait before next poll
                     time.sleep(1)
                     continue
                 
+                # Only net changes per entity reach Neo4j
+                events = self._coalesce(events)
+                
                 # Process each event
                 for stream_id, data in events:
                     if not self.running:
@@ -146,13 +190,21 @@ class SyncEventConsumer:
                 logger.error(f"Consume loop error: {e}")
                 time.sleep(5)  # Wait before retrying
     
-    def _read_events(self) -> list:
+    def _read_events(self, next_retry: Optional[float] = None) -> list:
         """
         Read events from Redis stream.
         
+        Args:
+            next_retry: Seconds until the next scheduled retry is due
+        
         Returns:
             List of (stream_id, event_data) tuples
         """
+        # Block up to 5 seconds, or until the next retry is due
+        block_ms = 5000
+        if next_retry is not None:
+            block_ms = int(min(block_ms, max(next_retry * 1000, 100)))
+        
         try:
             # Read with blocking for efficiency
             result = self.redis_client.xreadgroup(
@@ -160,7 +212,7 @@ class SyncEventConsumer:
                 self.consumer_name,
                 {self.redis_config.stream_name: ">"},
                 count=self.sync_config.prefetch_count,
-                block=5000  # 5 second blocking
+                block=block_ms
             )
             
             if not result:
@@ -183,54 +235,164 @@ class SyncEventConsumer:
         """
         Process a single event from the stream.
         
+        Each stage is timed per event type: queue_wait (Redis backlog),
+        parse, stale_check, handler (Neo4j, excluding its sync_status write)
+        and status_update (all PostgreSQL status writes plus the XACK).
+        
         Args:
             stream_id: Redis stream message ID
             data: Event data from stream
         """
-        with self._processing_lock:
-            try:
-                # Parse event
-                event = self._parse_event(data)
-                if not event:
-                    logger.warning(f"Could not parse event: {data}")
-                    return
+        started = time.perf_counter()
+        failures_before = self.events_failed
+        event = None
+        event_type = "unknown"
+        outcome = "failed"
+        try:
+            with self._processing_lock:
+                self._status_seconds = 0.0
+                try:
+                    # Parse event
+                    parse_started = time.perf_counter()
+                    event = self._parse_event(data)
+                    if not event:
+                        logger.warning(f"Could not parse event: {data}")
+                        self._dead_letter_invalid(stream_id, data)
+                        outcome = "invalid"
+                        return
+                    event_type = event.event_type.value
+                    self.metrics.observe("parse", event_type, time.perf_counter() - parse_started)
+                    # A retried event's age includes its backoff, not backlog
+                    queue_wait = self._event_age(event)
+                    if queue_wait is not None and not event.retry_count:
+                        self.metrics.observe("queue_wait", event_type, queue_wait)
                 
-                logger.debug(f"Processing event: {event.event_id} ({event.event_type.value})")
+                    logger.debug(f"Processing event: {event.event_id} ({event.event_type.value})")
                 
-                # Update status to PROCESSING
-                self._update_event_status(event.event_id, SyncEventStatus.PROCESSING, stream_id)
+                    # Update status to PROCESSING
+                    self._update_event_status(event.event_id, SyncEventStatus.PROCESSING, stream_id)
                 
-                # Check for conflicts (idempotency)
-                if self._should_skip_event(event):
-                    self._skip_event(event, "Conflict detected - event is stale")
-                    self.events_skipped += 1
-                    return
+                    # Check for conflicts (idempotency)
+                    with self.metrics.time_stage("stale_check", event_type):
+                        stale = self._should_skip_event(event)
+                    if stale:
+                        self._skip_event(event, "Conflict detected - event is stale")
+                        self.events_skipped += 1
+                        outcome = "skipped"
+                        return
                 
-                # Get handler and process
-                handler = self.event_handlers.get(event.event_type)
-                if not handler:
-                    logger.warning(f"No handler for event type: {event.event_type}")
-                    self._skip_event(event, f"No handler for {event.event_type}")
-                    self.events_skipped += 1
-                    return
+                    # Get handler and process
+                    handler = self.event_handlers.get(event.event_type)
+                    if not handler:
+                        logger.warning(f"No handler for event type: {event.event_type}")
+                        self._skip_event(event, f"No handler for {event.event_type}")
+                        self.events_skipped += 1
+                        outcome = "skipped"
+                        return
                 
-                # Process the event
-                success = handler(event)
+                    # Process the event
+                    status_before = self._status_seconds
+                    handler_started = time.perf_counter()
+                    success = handler(event)
+                    self.metrics.observe(
+                        "handler", event_type,
+                        time.perf_counter() - handler_started - (self._status_seconds - status_before)
+                    )
                 
-                if success:
-                    # Mark as completed
-                    self._complete_event(event.event_id, stream_id)
-                    self.events_processed += 1
-                    logger.info(f"Event {event.event_id} processed successfully")
-                else:
-                    # Handle failure
-                    self._handle_event_failure(event, stream_id)
-                    self.events_failed += 1
+                    if success:
+                        # Mark as completed
+                        self._complete_event(event.event_id, stream_id)
+                        self.events_processed += 1
+                        outcome = "processed"
+                        logger.info(f"Event {event.event_id} processed successfully")
+                    else:
+                        # Handle failure
+                        self._handle_event_failure(event, stream_id)
+                        self.events_failed += 1
                     
-            except Exception as e:
-                logger.error(f"Error processing event {stream_id}: {e}")
-                self._update_event_error(data.get("event_id", "unknown"), str(e))
-                self.events_failed += 1
+                except Exception as e:
+                    logger.error(f"Error processing event {stream_id}: {e}")
+                    self.events_failed += 1
+                    if event is not None:
+                        self._handle_event_failure(event, stream_id, str(e))
+                    else:
+                        self._update_event_error(data.get("event_id", "unknown"), str(e))
+                finally:
+                    if event_type != "unknown":
+                        self.metrics.observe("status_update", event_type, self._status_seconds)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.observe("total", event_type, elapsed)
+            self.metrics.count_event(event_type, outcome)
+            get_live_metrics().record_sync_event(
+                elapsed * 1000,
+                self.events_failed == failures_before
+            )
+    
+    def _coalesce(self, events: list) -> list:
+        """
+        Drop events superseded by later events for the same entity in this
+        batch (see coalescing.py).
+        
+        Dropped events are marked SKIPPED and acknowledged in bulk. If that
+        fails the batch is processed in full instead.
+        
+        Returns:
+            (stream_id, data) entries left to process
+        """
+        if not self.sync_config.coalesce_events or len(events) < 2:
+            return events
+        
+        entries = []
+        for stream_id, data in events:
+            try:
+                event = SyncEvent.from_json(data.get("data", "{}"))
+            except Exception:
+                # Left for _process_event to report and dead-letter
+                event = None
+            entries.append((stream_id, data, event))
+        
+        try:
+            batch = coalesce_events(
+                entries,
+                lambda entity_type, entity_id: self._get_applied_version(entity_type, entity_id) is not None
+            )
+            if batch.dropped:
+                self._skip_coalesced(batch.dropped)
+        except Exception as e:
+            logger.warning(f"Event coalescing failed, processing batch in full: {e}")
+            return events
+        return batch.keep
+    
+    def _skip_coalesced(self, dropped: list):
+        """Mark coalesced events SKIPPED and acknowledge them with one XACK"""
+        reasons = {event.event_id: reason for _, event, reason in dropped}
+        with self.postgres_manager.get_session() as session:
+            event_logs = session.query(SyncEventLog).filter(
+                SyncEventLog.event_id.in_(list(reasons))
+            ).all()
+            for event_log in event_logs:
+                event_log.mark_skipped(reasons[event_log.event_id])
+            session.flush()
+        
+        self.redis_client.xack(
+            self.redis_config.stream_name,
+            self.redis_config.consumer_group,
+            *[stream_id for stream_id, _, _ in dropped]
+        )
+        
+        for _, event, _ in dropped:
+            self.metrics.count_event(event.event_type.value, "coalesced")
+        self.events_coalesced += len(dropped)
+        logger.debug(f"Coalesced {len(dropped)} superseded events")
+    
+    @staticmethod
+    def _event_age(event: SyncEvent) -> Optional[float]:
+        """Seconds since the event was created, if its timestamp is usable"""
+        try:
+            return max(time.time() - float(event.timestamp), 0.0)
+        except (TypeError, ValueError):
+            return None
     
     def _parse_event(self, data: Dict[str, str]) -> Optional[SyncEvent]:
         """Parse event data from stream"""
@@ -241,25 +403,48 @@ class SyncEventConsumer:
             logger.error(f"Failed to parse event: {e}")
             return None
     
+    def _warm_version_cache(self):
+        """Load applied versions from sync_status in bulk"""
+        if not self.sync_config.conflict_detection_enabled:
+            return
+        try:
+            self.version_cache.warm(self.postgres_manager, self.postgres_manager.schema)
+        except Exception as e:
+            logger.warning(f"Could not warm applied-version cache: {e}")
+    
+    def _get_applied_version(self, entity_type: str, entity_id: str) -> Optional[int]:
+        """
+        Get the last source_version applied to Neo4j for an entity.
+        
+        Served from the version cache; only misses on an incomplete cache
+        go to Neo4j, and the answer is cached.
+        """
+        version = self.version_cache.get(entity_type, entity_id)
+        if version is not None or self.version_cache.is_complete:
+            return version
+        
+        label, property_name = VERSIONED_ENTITIES[entity_type]
+        version = self.neo4j_manager.get_node_versions(label, property_name, [entity_id]).get(entity_id)
+        self.version_cache.record(entity_type, entity_id, version)
+        return version
+    
     def _should_skip_event(self, event: SyncEvent) -> bool:
         """
         Check if event should be skipped (conflict detection).
         
-        Uses last-write-wins strategy with timestamp comparison.
+        Uses last-write-wins strategy: an event whose HLC version is older
+        than the version already applied for its entity is stale.
         """
         if not self.sync_config.conflict_detection_enabled:
             return False
         
-        # Check Neo4j for existing data with newer version
-        if event.entity_type == "concept":
-            version = self.neo4j_manager.get_node_version("Concept", "concept_id", event.entity_id)
-        elif event.entity_type == "learning_path":
-            version = self.neo4j_manager.get_node_version("LearningPath", "path_id", event.entity_id)
-        else:
+        if event.entity_type not in VERSIONED_ENTITIES:
             return False
         
-        if version and version > event.source_version:
-            logger.info(f"Skipping stale event {event.event_id}: Neo4j version {version} > source version {event.source_version}")
+        version = self._get_applied_version(event.entity_type, event.entity_id)
+        
+        if version and version > to_version(event.source_version):
+            logger.info(f"Skipping stale event {event.event_id}: applied version {version} > source version {event.source_version}")
             return True
         
         return False
@@ -270,6 +455,7 @@ class SyncEventConsumer:
         
         query = """
         MERGE (c:Concept {concept_id: $concept_id})
+        WITH c WHERE coalesce(c.source_version, 0) <= $source_version
         SET c.name = $name,
             c.display_name = $display_name,
             c.category = $category,
@@ -338,6 +524,7 @@ class SyncEventConsumer:
         
         query = """
         MERGE (p:LearningPath {path_id: $path_id})
+        WITH p WHERE coalesce(p.source_version, 0) <= $source_version
         SET p.name = $name,
             p.title = $title,
             p.description = $description,
@@ -456,6 +643,7 @@ class SyncEventConsumer:
             "concept_name": concept_name
         })
     
+    @_status_write
     def _update_event_status(self, event_id: str, status: SyncEventStatus, redis_message_id: str = None):
         """Update event status in database"""
         with self.postgres_manager.get_session() as session:
@@ -469,6 +657,7 @@ class SyncEventConsumer:
                     event_log.redis_message_id = redis_message_id
                 session.flush()
     
+    @_status_write
     def _update_event_error(self, event_id: str, error_message: str):
         """Update event with error message"""
         with self.postgres_manager.get_session() as session:
@@ -480,6 +669,7 @@ class SyncEventConsumer:
                 event_log.mark_failed(error_message)
                 session.flush()
     
+    @_status_write
     def _complete_event(self, event_id: str, redis_message_id: str):
         """Mark event as completed and acknowledge in Redis"""
         with self.postgres_manager.get_session() as session:
@@ -501,6 +691,7 @@ class SyncEventConsumer:
         except Exception as e:
             logger.error(f"Failed to acknowledge message: {e}")
     
+    @_status_write
     def _skip_event(self, event: SyncEvent, reason: str):
         """Skip event due to conflict or other reason"""
         with self.postgres_manager.get_session() as session:
@@ -514,26 +705,47 @@ class SyncEventConsumer:
         
         logger.info(f"Event {event.event_id} skipped: {reason}")
     
-    def _handle_event_failure(self, event: SyncEvent, stream_id: str):
-        """Handle event processing failure"""
+    @_status_write
+    def _handle_event_failure(self, event: SyncEvent, stream_id: str, error: str = "Event handler failed"):
+        """
+        Handle event processing failure.
+        
+        The event's retry_count travels with it through the retry schedule.
+        While retries remain it is scheduled with exponential backoff and
+        stays PUBLISHED; after that it is marked FAILED and dead-lettered.
+        The stream entry is acknowledged either way. If scheduling fails the
+        row is still picked up by the reconciliation sweep.
+        """
+        retry = event.should_retry()
+        event.increment_retry(error)
+        
         with self.postgres_manager.get_session() as session:
             event_log = session.query(SyncEventLog).filter(
                 SyncEventLog.event_id == event.event_id
             ).first()
             
             if event_log:
-                if event_log.should_retry():
-                    # Increment retry and requeue
-                    event_log.increment_retry()
-                    logger.warning(f"Event {event.event_id} failed, retry {event_log.retry_count}/{event_log.max_retries}")
+                if retry:
+                    event_log.mark_retry_scheduled(event.retry_count, error)
                 else:
-                    # Mark as failed
-                    event_log.mark_failed("Max retries exceeded")
-                    logger.error(f"Event {event.event_id} failed permanently")
-                
+                    event_log.mark_failed(f"Max retries exceeded: {error}")
                 session.flush()
         
-        # Acknowledge to remove from queue (will be retried from DB)
+        if retry:
+            try:
+                due = self.retry_scheduler.schedule(event)
+                logger.warning(
+                    f"Event {event.event_id} failed, retry {event.retry_count}/{event.max_retries} "
+                    f"in {due - time.time():.1f}s: {error}"
+                )
+            except Exception as e:
+                logger.error(f"Failed to schedule retry for event {event.event_id}: {e}")
+            self.metrics.count_retry(event.event_type.value)
+        else:
+            self.dead_letters.add(f"Max retries exceeded: {error}", event=event, stream_id=stream_id)
+            self.metrics.count_dead_letter(event.event_type.value)
+            logger.error(f"Event {event.event_id} failed permanently: {error}")
+        
         try:
             self.redis_client.xack(
                 self.redis_config.stream_name,
@@ -543,13 +755,40 @@ class SyncEventConsumer:
         except Exception as e:
             logger.error(f"Failed to acknowledge failed message: {e}")
     
+    @_status_write
+    def _dead_letter_invalid(self, stream_id: str, data: Dict[str, str]):
+        """Dead-letter and acknowledge a stream entry that couldn't be parsed"""
+        self.dead_letters.add("Could not parse event", raw=data, stream_id=stream_id)
+        self.metrics.count_dead_letter("unknown")
+        try:
+            self.redis_client.xack(
+                self.redis_config.stream_name,
+                self.redis_config.consumer_group,
+                stream_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to acknowledge invalid message: {e}")
+    
+    @_status_write
     def _update_sync_status(self, entity_id: str, entity_type: str, version: int, is_deleted: bool = False):
-        """Update sync status after successful processing"""
+        """
+        Update sync status after successful processing.
+        
+        A stale event can still reach here (the version cache is per
+        process and may lag), in which case the versioned Cypher write was a
+        no-op; the status is then left alone so versions never go backwards.
+        """
         with self.postgres_manager.get_session() as session:
             status = session.query(SyncStatus).filter(
                 SyncStatus.entity_id == entity_id,
                 SyncStatus.entity_type == entity_type
-            ).first()
+            ).with_for_update().first()
+            
+            if status and status.last_synced_version and to_version(status.last_synced_version) > to_version(version):
+                logger.debug(f"Not lowering sync status of {entity_type} {entity_id} "
+                             f"from version {status.last_synced_version} to {version}")
+                self.version_cache.record(entity_type, entity_id, status.last_synced_version)
+                return
             
             if not status:
                 status = SyncStatus(
@@ -561,10 +800,13 @@ class SyncEventConsumer:
             if is_deleted:
                 status.is_synced = True
                 status.has_pending_changes = False
+                status.last_synced_version = version
             else:
                 status.update_after_sync(version)
             
             session.flush()
+        
+        self.version_cache.record(entity_type, entity_id, version)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get consumer statistics"""
@@ -574,6 +816,10 @@ class SyncEventConsumer:
             "events_processed": self.events_processed,
             "events_failed": self.events_failed,
             "events_skipped": self.events_skipped,
+            "events_coalesced": self.events_coalesced,
+            "version_cache": self.version_cache.get_stats(),
+            "stages": self.metrics.stage_summary(),
+            "retries": self.retry_scheduler.get_stats() if self.retry_scheduler else {},
             "uptime_seconds": (datetime.now(timezone.utc) - self.start_time).total_seconds() if self.start_time else 0
         }
     
@@ -595,18 +841,32 @@ def run_consumer(consumer_name: Optional[str] = None):
     """
     consumer = SyncEventConsumer(consumer_name)
     
+    # In outbox mode nothing reaches the stream until the relay publishes the
+    # rows content writes inserted; relays claim rows with SKIP LOCKED, so
+    # every consumer process can run one
+    publisher = None
+    if consumer.sync_config.outbox_mode:
+        publisher = get_sync_publisher()
+        publisher.start_relay()
+    
     import signal
     import sys
     
     def signal_handler(sig, frame):
         logger.info("Received shutdown signal")
         consumer.stop()
+        if publisher is not None:
+            publisher.stop_relay()
         sys.exit(0)
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
-    consumer.start()
+    try:
+        consumer.start()
+    finally:
+        if publisher is not None:
+            publisher.stop_relay()
 
 
 if __name__ == "__main__":
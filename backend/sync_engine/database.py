@@ -21,6 +21,7 @@ from sqlalchemy.pool import QueuePool
 
 from backend.sync_engine.config import get_database_config, get_redis_config
 from backend.sync_engine.models import Base
+from backend.sync_engine.hlc import to_version
 
 # Import centralized logging configuration
 from logger_config import logger
@@ -115,11 +116,19 @@ class PostgresSyncManager:
         finally:
             session.close()
     
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
-        """Execute a query and return results as list of dicts"""
+    def execute_query(self, query: str, params: Optional[tuple] = None,
+                      raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """
+        Execute a query and return results as list of dicts.
+        
+        Errors are logged and give an empty result unless raise_errors is set,
+        for callers that must tell a failure from no rows.
+        """
         conn = self.get_connection()
         if conn is None:
             logger.error("No PostgreSQL connection available")
+            if raise_errors:
+                raise RuntimeError("No PostgreSQL connection available")
             return []
         
         try:
@@ -129,6 +138,8 @@ class PostgresSyncManager:
             return [dict(row) for row in results]
         except Exception as e:
             logger.error(f"PostgreSQL query error: {e}")
+            if raise_errors:
+                raise
             return []
         finally:
             self.return_connection(conn)
@@ -280,6 +291,40 @@ class Neo4jSyncManager:
         if results and results[0].get("version"):
             return int(results[0]["version"].timestamp())
         return None
+    
+    def get_nodes(self, label: str, property_name: str, property_values: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several nodes by label and property in one query, keyed by property value"""
+        if not property_values:
+            return {}
+        query = f"""
+        MATCH (n:{label})
+        WHERE n.{property_name} IN $values
+        RETURN n.{property_name} as key, n
+        """
+        results = self.execute_query(query, {"values": list(property_values)})
+        return {row["key"]: row["n"] for row in results}
+    
+    def get_node_versions(self, label: str, property_name: str, property_values: List[str]) -> Dict[str, int]:
+        """
+        Get the applied source_version of several nodes in one query.
+        
+        Nodes written before source_version was stored fall back to their
+        updated_at timestamp, as in get_node_version.
+        """
+        if not property_values:
+            return {}
+        query = f"""
+        MATCH (n:{label})
+        WHERE n.{property_name} IN $values
+        RETURN n.{property_name} as key, n.source_version as source_version, n.updated_at as updated_at
+        """
+        versions = {}
+        for row in self.execute_query(query, {"values": list(property_values)}):
+            if row.get("source_version") is not None:
+                versions[row["key"]] = int(row["source_version"])
+            elif row.get("updated_at"):
+                versions[row["key"]] = to_version(row["updated_at"])
+        return versions
 
 
 class RedisSyncManager:
@@ -18,13 +18,16 @@ Each event contains:
 Author: Jeseci Development Team
 """
 
+import time
 import uuid
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional
 import json
 
+from backend.sync_engine.hlc import next_version
+
 
 class EventType(str, Enum):
     """
@@ -108,9 +111,9 @@ class SyncEvent:
         event_type: Type of event (creation, update, deletion)
         entity_id: ID of the entity being synchronized
         entity_type: Type of entity (concept, learning_path, relationship)
-        timestamp: Unix timestamp when event was created
+        timestamp: Unix timestamp (fractional seconds) when event was created
         payload: Event data (serialized entity data)
-        source_version: Version/timestamp of source data for conflict detection
+        source_version: Hybrid logical clock version for conflict detection
         retry_count: Number of processing attempts
         max_retries: Maximum allowed retry attempts
         error_message: Error message if processing failed
@@ -123,9 +126,9 @@ class SyncEvent:
     event_type: EventType = EventType.CONCEPT_CREATED
     entity_id: str = ""
     entity_type: str = "concept"
-    timestamp: int = field(default_factory=lambda: int(datetime.utcnow().timestamp()))
+    timestamp: float = field(default_factory=time.time)
     payload: Dict[str, Any] = field(default_factory=dict)
-    source_version: int = field(default_factory=lambda: int(datetime.utcnow().timestamp()))
+    source_version: int = field(default_factory=next_version)
     retry_count: int = 0
     max_retries: int = 3
     error_message: Optional[str] = None
@@ -172,9 +175,9 @@ class SyncEvent:
             event_type=event_type,
             entity_id=data.get("entity_id", ""),
             entity_type=data.get("entity_type", "concept"),
-            timestamp=data.get("timestamp", int(datetime.utcnow().timestamp())),
+            timestamp=data.get("timestamp", time.time()),
             payload=data.get("payload", {}),
-            source_version=data.get("source_version", int(datetime.utcnow().timestamp())),
+            source_version=data.get("source_version") or next_version(),
             retry_count=data.get("retry_count", 0),
             max_retries=data.get("max_retries", 3),
             error_message=data.get("error_message"),
@@ -237,7 +240,7 @@ class SyncEvent:
             entity_id=entity_id,
             entity_type="concept",
             payload=concept_data,
-            source_version=int(datetime.utcnow().timestamp())
+            source_version=next_version()
         )
     
     @staticmethod
@@ -259,7 +262,7 @@ class SyncEvent:
             entity_id=entity_id,
             entity_type="learning_path",
             payload=path_data,
-            source_version=int(datetime.utcnow().timestamp())
+            source_version=next_version()
         )
     
     @staticmethod
@@ -284,10 +287,16 @@ class SyncEvent:
             entity_id=entity_id,
             entity_type="relationship",
             payload=relationship_data,
-            source_version=int(datetime.utcnow().timestamp())
+            source_version=next_version()
         )
 
 
+# Module-level factories (re-exported by the sync_engine package)
+create_concept_event = SyncEvent.create_concept_event
+create_learning_path_event = SyncEvent.create_learning_path_event
+create_relationship_event = SyncEvent.create_relationship_event
+
+
 @dataclass
 class EventBatch:
     """
@@ -324,3 +333,11 @@ class EventBatch:
     def get_events_by_entity(self, entity_type: str) -> list[SyncEvent]:
         """Get all events for a specific entity type"""
         return [e for e in self.events if e.entity_type == entity_type]
+    
+    def chunks(self, size: int) -> Iterator["EventBatch"]:
+        """Split the batch into sub-batches of at most size events"""
+        for start in range(0, len(self.events), max(size, 1)):
+            yield EventBatch(
+                events=self.events[start:start + size],
+                correlation_id=self.correlation_id
+            )
@@ -0,0 +1,135 @@
+"""
+Hybrid Logical Clock Versions for Sync Engine
+
+Event versions combine microsecond physical time with a logical counter,
+packed into one integer so they compare exactly and fit a BIGINT:
+
+    version = physical_microseconds * LOGICAL_SCALE + logical_counter
+
+The clock never goes backwards: if the wall clock stalls or steps back, or
+several versions are issued within one microsecond, the logical counter
+advances instead. Observing a version from elsewhere (a row's updated_at,
+a node's stored source_version) moves the clock past it, so a version
+issued afterwards is always newer than anything observed.
+
+Versions written before this scheme were whole Unix seconds; to_version
+maps them (and datetimes) onto the same scale before comparison. Naive
+datetimes, as read from TIMESTAMP columns, are taken to be in
+SYNC_DB_TIMEZONE, or in the process's local time (as the whole-second
+versions were) when it is unset.
+
+Author: Jeseci Development Team
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+from zoneinfo import ZoneInfo
+
+# Logical counter values per microsecond
+LOGICAL_SCALE = 1000
+
+# Versions below this are legacy whole-second timestamps
+_HLC_MIN_VERSION = 10 ** 15
+
+# Time zone of naive database timestamps (the PostgreSQL session TimeZone);
+# empty means the process's local time
+SYNC_DB_TIMEZONE = os.getenv("SYNC_DB_TIMEZONE", "")
+_NAIVE_TZ = ZoneInfo(SYNC_DB_TIMEZONE) if SYNC_DB_TIMEZONE else None
+
+
+class HybridLogicalClock:
+    """Thread-safe issuer of monotonic HLC versions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = 0
+
+    @staticmethod
+    def _physical_version() -> int:
+        return time.time_ns() // 1000 * LOGICAL_SCALE
+
+    def now(self) -> int:
+        """Issue a version greater than every version issued or observed so far"""
+        with self._lock:
+            physical = self._physical_version()
+            self._last = physical if physical > self._last else self._last + 1
+            return self._last
+
+    def observe(self, version: Optional[int]) -> None:
+        """Advance the clock past a version seen elsewhere"""
+        try:
+            version = to_version(version)
+        except (TypeError, ValueError):
+            return
+        if not version:
+            return
+        with self._lock:
+            if version > self._last:
+                self._last = version
+
+    @property
+    def last(self) -> int:
+        return self._last
+
+
+def from_datetime(value: datetime) -> int:
+    """Version of a timestamp (logical counter 0); naive datetimes are in SYNC_DB_TIMEZONE"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=_NAIVE_TZ) if _NAIVE_TZ else value.astimezone()
+    delta = value - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return micros * LOGICAL_SCALE
+
+
+def to_datetime(version: int) -> datetime:
+    """Physical time of a version"""
+    micros = to_version(version) // LOGICAL_SCALE
+    return datetime.fromtimestamp(micros / 1_000_000, tz=timezone.utc)
+
+
+def is_hlc(version: Optional[int]) -> bool:
+    """Whether a version uses the HLC encoding rather than legacy seconds"""
+    return bool(version) and int(version) >= _HLC_MIN_VERSION
+
+
+def to_version(value: Any) -> int:
+    """
+    Normalize a stored version or timestamp to an HLC version.
+
+    Accepts HLC integers, legacy whole-second integers, datetimes (including
+    Neo4j DateTime via to_native) and ISO-8601 strings.
+    """
+    if value is None or value == "":
+        return 0
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if isinstance(value, datetime):
+        return from_datetime(value)
+    if isinstance(value, str):
+        try:
+            return to_version(int(value))
+        except ValueError:
+            return from_datetime(datetime.fromisoformat(value))
+    if isinstance(value, float):
+        return int(value * 1_000_000) * LOGICAL_SCALE
+    value = int(value)
+    if 0 < value < _HLC_MIN_VERSION:
+        return value * 1_000_000 * LOGICAL_SCALE
+    return value
+
+
+# Process-wide clock shared by the publisher, consumer and reconciliation
+_clock = HybridLogicalClock()
+
+
+def get_clock() -> HybridLogicalClock:
+    """Get the process-wide hybrid logical clock"""
+    return _clock
+
+
+def next_version() -> int:
+    """Issue a new version from the process-wide clock"""
+    return _clock.now()
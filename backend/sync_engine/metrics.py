@@ -0,0 +1,428 @@
+"""
+Metrics for Sync Engine
+
+This module instruments the consumer and reconciliation job so graph
+staleness can be attributed to a stage:
+- queue_wait: event creation until the consumer parses it (Redis backlog)
+- parse, stale_check: consumer CPU and version cache
+- handler: the Neo4j write
+- status_update: PostgreSQL sync_event_log / sync_status writes and XACK
+
+Each stage has a histogram per event type. Counters track processed,
+skipped and failed events, retries and dead-lettered events. Stream health
+(consumer group lag, pending entries, age of the oldest pending entry) is
+read from Redis with XINFO / XPENDING by whoever renders the metrics.
+
+Consumers and the reconciliation job run in their own processes, so each
+publishes a snapshot of its metrics to Redis; the API process combines the
+snapshots with live stream stats into Prometheus text format.
+
+Author: Jeseci Development Team
+"""
+
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
+
+from backend.sync_engine.config import get_redis_config, get_sync_config
+from backend.sync_engine.retry_scheduler import retry_schedule_key, dead_letter_key
+
+# Import centralized logging configuration
+from logger_config import logger
+
+# Histogram upper bounds in seconds; queue_wait needs the long tail
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+STAGES = ("queue_wait", "parse", "stale_check", "handler", "status_update", "total")
+
+
+def _metrics_key(source: str) -> str:
+    return f"{get_redis_config().stream_name}:metrics:{source}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus model"""
+
+    def __init__(self, bounds: Tuple[float, ...] = STAGE_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (capped at the last bound)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        return self.bounds[min(index, len(self.bounds) - 1)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": list(self.counts), "sum": self.total, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.total = data["sum"]
+        histogram.count = data["count"]
+        return histogram
+
+
+class SyncMetrics:
+    """
+    Metrics of one consumer or reconciliation job.
+
+    Recording takes one short lock; snapshots are plain dicts that can be
+    published to Redis and rendered by another process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (stage, event_type) -> Histogram
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        # (name, event_type, outcome) -> count
+        self.counters: Dict[Tuple[str, str, str], int] = {}
+        self.reconciliation: Dict[str, Any] = {}
+        self.publish_interval = get_sync_config().metrics_publish_interval_seconds
+        self._last_published = 0.0
+
+    def observe(self, stage: str, event_type: str, seconds: float):
+        """Record one stage duration"""
+        key = (stage, event_type)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(max(seconds, 0.0))
+
+    @contextmanager
+    def time_stage(self, stage: str, event_type: str):
+        """Time a block as one stage observation"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, event_type, time.perf_counter() - started)
+
+    def increment(self, name: str, event_type: str, outcome: str = ""):
+        key = (name, event_type, outcome)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def count_event(self, event_type: str, outcome: str):
+        """Count a finished event: processed, skipped or failed"""
+        self.increment("events", event_type, outcome)
+
+    def count_retry(self, event_type: str):
+        self.increment("retries", event_type)
+
+    def count_dead_letter(self, event_type: str):
+        self.increment("dead_letters", event_type)
+
+    def record_reconciliation(self, result: Dict[str, Any]):
+        """Keep the outcome of the latest reconciliation run"""
+        with self._lock:
+            runs = self.reconciliation.get("runs_total", 0) + 1
+            failures = self.reconciliation.get("failures_total", 0) + (result.get("status") != "COMPLETED")
+            self.reconciliation = {
+                "runs_total": runs,
+                "failures_total": failures,
+                "last_run_timestamp": time.time(),
+                "last_run_duration_seconds": result.get("duration_seconds", 0.0),
+                "last_run_stuck_events": result.get("stuck_events_processed", 0),
+                "last_run_inconsistencies": result.get("inconsistencies_found", 0),
+                "last_run_repaired": result.get("inconsistencies_repaired", 0),
+                "last_run_conflicts": result.get("conflicts_detected", 0),
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable copy of all metrics"""
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "histograms": [
+                    {"stage": stage, "event_type": event_type, **histogram.to_dict()}
+                    for (stage, event_type), histogram in self.histograms.items()
+                ],
+                "counters": [
+                    {"name": name, "event_type": event_type, "outcome": outcome, "value": value}
+                    for (name, event_type, outcome), value in self.counters.items()
+                ],
+                "reconciliation": dict(self.reconciliation),
+            }
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean and approximate p95 per stage across event types"""
+        return summarize_snapshots({"local": self.snapshot()})["stages"]
+
+    def publish(self, redis_client, source: str, force: bool = False) -> bool:
+        """
+        Publish a snapshot to Redis under the given source name.
+
+        Rate limited to SYNC_METRICS_INTERVAL unless forced; the key expires
+        after a few intervals so stopped consumers drop out.
+        """
+        now = time.time()
+        if not force and now - self._last_published < self.publish_interval:
+            return False
+        self._last_published = now
+        try:
+            redis_client.set(
+                _metrics_key(source),
+                json.dumps(self.snapshot()),
+                ex=max(int(self.publish_interval * 3), 30)
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"Could not publish sync metrics: {e}")
+            return False
+
+
+def connect_redis():
+    """
+    Redis client for reading snapshots and stream stats from processes that
+    don't run the sync engine (the API). Short timeouts keep a Redis outage
+    from stalling the caller.
+    """
+    import redis
+
+    redis_config = get_redis_config()
+    return redis.Redis(
+        host=redis_config.host,
+        port=redis_config.port,
+        db=redis_config.db,
+        password=redis_config.password or None,
+        ssl=redis_config.ssl,
+        decode_responses=True,
+        socket_timeout=1,
+        socket_connect_timeout=1
+    )
+
+
+def load_snapshots(redis_client) -> Dict[str, Dict[str, Any]]:
+    """Get the published snapshots of all consumers and reconciliation jobs"""
+    prefix = _metrics_key("")
+    snapshots = {}
+    try:
+        keys = list(redis_client.scan_iter(match=f"{prefix}*", count=100))
+        values = redis_client.mget(keys) if keys else []
+    except Exception as e:
+        logger.warning(f"Could not read sync metrics snapshots: {e}")
+        return snapshots
+    for key, value in zip(keys, values):
+        if value:
+            snapshots[key[len(prefix):]] = json.loads(value)
+    return snapshots
+
+
+def summarize_snapshots(snapshots: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine snapshots across sources for dashboards.
+
+    Returns:
+        Per-stage count, mean and approximate p95 in milliseconds, and
+        event, retry and dead-letter totals
+    """
+    stages: Dict[str, Histogram] = {}
+    totals = {"processed": 0, "skipped": 0, "coalesced": 0, "failed": 0, "retries": 0, "dead_letters": 0}
+    for snapshot in snapshots.values():
+        for entry in snapshot.get("histograms", []):
+            histogram = Histogram.from_dict(entry)
+            target = stages.setdefault(entry["stage"], Histogram())
+            target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+            target.total += histogram.total
+            target.count += histogram.count
+        for entry in snapshot.get("counters", []):
+            key = entry["outcome"] if entry["name"] == "events" else entry["name"]
+            if key in totals:
+                totals[key] += entry["value"]
+    return {
+        "stages": {
+            stage: {
+                "count": stages[stage].count,
+                "mean_ms": round(stages[stage].total / stages[stage].count * 1000, 3) if stages[stage].count else 0.0,
+                "p95_ms": round(stages[stage].quantile(0.95) * 1000, 3),
+            }
+            for stage in STAGES if stage in stages
+        },
+        "totals": totals,
+    }
+
+
+def collect_stream_stats(redis_client, stream_name: Optional[str] = None, group_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Read stream health from Redis.
+
+    Returns:
+        Stream length, consumer group lag (entries not yet delivered),
+        pending entries (delivered but not acknowledged), the age of the
+        oldest pending entry, events waiting for a retry, dead letters and
+        pending entries per consumer; "error" is
+        set when Redis couldn't be read
+    """
+    redis_config = get_redis_config()
+    stream_name = stream_name or redis_config.stream_name
+    group_name = group_name or redis_config.consumer_group
+
+    stats: Dict[str, Any] = {
+        "stream_length": 0,
+        "group_lag": None,
+        "pending": 0,
+        "oldest_pending_age_seconds": 0.0,
+        "oldest_pending_idle_seconds": 0.0,
+        "retry_scheduled": 0,
+        "dead_letters": 0,
+        "consumers": {},
+    }
+    try:
+        stats["stream_length"] = redis_client.xlen(stream_name)
+        stats["retry_scheduled"] = redis_client.zcard(retry_schedule_key(stream_name))
+        stats["dead_letters"] = redis_client.xlen(dead_letter_key(stream_name))
+        group = next(
+            (g for g in redis_client.xinfo_groups(stream_name) if g.get("name") == group_name),
+            None
+        )
+        if group is None:
+            return stats
+        # "lag" needs Redis 7; older servers leave it unknown
+        stats["group_lag"] = group.get("lag")
+
+        summary = redis_client.xpending(stream_name, group_name)
+        stats["pending"] = summary.get("pending", 0)
+        for consumer in summary.get("consumers") or []:
+            stats["consumers"][consumer["name"]] = int(consumer["pending"])
+
+        if stats["pending"]:
+            oldest = redis_client.xpending_range(stream_name, group_name, min="-", max="+", count=1)
+            if oldest:
+                entry = oldest[0]
+                # Stream IDs start with the millisecond they were added
+                added_ms = int(str(entry["message_id"]).split("-")[0])
+                stats["oldest_pending_age_seconds"] = round(max(time.time() - added_ms / 1000, 0.0), 3)
+                stats["oldest_pending_idle_seconds"] = round(entry.get("time_since_delivered", 0) / 1000, 3)
+    except Exception as e:
+        logger.warning(f"Could not read sync stream stats: {e}")
+        stats["error"] = str(e)
+    return stats
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def render_prometheus(snapshots: Dict[str, Dict[str, Any]], stream_stats: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Render snapshots and stream stats in the Prometheus text format.
+
+    Series carry a source label (consumer name or "reconciliation") so
+    counters stay monotonic per process.
+    """
+    lines: List[str] = []
+
+    def header(name: str, kind: str, help_text: str):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    header("sync_stage_duration_seconds", "histogram",
+           "Time spent per sync event stage (queue_wait = Redis backlog, handler = Neo4j, status_update = PostgreSQL)")
+    for source, snapshot in sorted(snapshots.items()):
+        for entry in snapshot.get("histograms", []):
+            labels = {"source": source, "stage": entry["stage"], "event_type": entry["event_type"]}
+            cumulative = 0
+            for bound, count in zip(STAGE_BUCKETS + (float("inf"),), entry["counts"]):
+                cumulative += count
+                lines.append(f"sync_stage_duration_seconds_bucket{_labels(**labels, le=_format_bound(bound))} {cumulative}")
+            lines.append(f"sync_stage_duration_seconds_sum{_labels(**labels)} {entry['sum']}")
+            lines.append(f"sync_stage_duration_seconds_count{_labels(**labels)} {entry['count']}")
+
+    counter_help = {
+        "events": ("sync_events_total", "Sync events finished, by outcome"),
+        "retries": ("sync_event_retries_total", "Sync events scheduled for retry"),
+        "dead_letters": ("sync_event_dead_letters_total", "Sync events that exhausted their retries"),
+    }
+    for counter, (metric, help_text) in counter_help.items():
+        header(metric, "counter", help_text)
+        for source, snapshot in sorted(snapshots.items()):
+            for entry in snapshot.get("counters", []):
+                if entry["name"] != counter:
+                    continue
+                labels = {"source": source, "event_type": entry["event_type"]}
+                if entry["outcome"]:
+                    labels["outcome"] = entry["outcome"]
+                lines.append(f"{metric}{_labels(**labels)} {entry['value']}")
+
+    reconciliation_help = {
+        "runs_total": ("counter", "Reconciliation runs"),
+        "failures_total": ("counter", "Failed reconciliation runs"),
+        "last_run_timestamp": ("gauge", "Unix time of the latest reconciliation run"),
+        "last_run_duration_seconds": ("gauge", "Duration of the latest reconciliation run"),
+        "last_run_stuck_events": ("gauge", "Stuck events republished by the latest run"),
+        "last_run_inconsistencies": ("gauge", "Inconsistencies found by the latest run"),
+        "last_run_repaired": ("gauge", "Inconsistencies repaired by the latest run"),
+        "last_run_conflicts": ("gauge", "Conflicts detected by the latest run"),
+    }
+    for field_name, (kind, help_text) in reconciliation_help.items():
+        values = [
+            (source, snapshot["reconciliation"][field_name])
+            for source, snapshot in sorted(snapshots.items())
+            if field_name in snapshot.get("reconciliation", {})
+        ]
+        if not values:
+            continue
+        header(f"sync_reconciliation_{field_name}", kind, help_text)
+        for source, value in values:
+            lines.append(f"sync_reconciliation_{field_name}{_labels(source=source)} {value}")
+
+    header("sync_metrics_snapshot_age_seconds", "gauge", "Seconds since each source last published metrics")
+    now = time.time()
+    for source, snapshot in sorted(snapshots.items()):
+        lines.append(f"sync_metrics_snapshot_age_seconds{_labels(source=source)} {round(now - snapshot.get('timestamp', now), 3)}")
+
+    # Without Redis the zeros would read as an empty backlog, so leave the
+    # stream series absent instead
+    if stream_stats is not None and "error" not in stream_stats:
+        gauges = {
+            "sync_stream_length": ("stream_length", "Entries in the sync stream"),
+            "sync_stream_group_lag": ("group_lag", "Entries not yet delivered to the consumer group"),
+            "sync_stream_pending": ("pending", "Entries delivered but not acknowledged"),
+            "sync_stream_oldest_pending_age_seconds": ("oldest_pending_age_seconds", "Age of the oldest unacknowledged entry"),
+            "sync_stream_oldest_pending_idle_seconds": ("oldest_pending_idle_seconds", "Time since the oldest unacknowledged entry was delivered"),
+            "sync_retry_scheduled": ("retry_scheduled", "Failed events waiting for a delayed retry"),
+            "sync_dead_letters": ("dead_letters", "Events in the dead-letter stream"),
+        }
+        for metric, (field_name, help_text) in gauges.items():
+            value = stream_stats.get(field_name)
+            if value is None:
+                continue
+            header(metric, "gauge", help_text)
+            lines.append(f"{metric} {value}")
+        header("sync_stream_consumer_pending", "gauge", "Unacknowledged entries per consumer")
+        for consumer, pending in sorted(stream_stats.get("consumers", {}).items()):
+            lines.append(f"sync_stream_consumer_pending{_labels(consumer=consumer)} {pending}")
+
+    return "\n".join(lines) + "\n"
+
@@ -17,7 +17,7 @@ Author: Jeseci Development Team
 from datetime import datetime, timezone
 from typing import Optional, List
 from sqlalchemy import (
-    String, Integer, Text, DateTime, Boolean, 
+    String, Integer, BigInteger, Text, DateTime, Boolean, 
     ForeignKey, Index, Enum as SQLEnum, JSON
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -88,7 +88,7 @@ class SyncEventLog(Base):
     payload: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
     
     # Source version for conflict detection
-    source_version: Mapped[int] = mapped_column(Integer, nullable=False)
+    source_version: Mapped[int] = mapped_column(BigInteger, nullable=False)
     
     # Processing status
     status: Mapped[str] = mapped_column(
@@ -125,6 +125,18 @@ class SyncEventLog(Base):
         "SyncConflict", back_populates="event", cascade="all, delete-orphan"
     )
     
+    def __init__(self, **kwargs):
+        # Column defaults are only applied on INSERT; apply them here too so
+        # a new record can be used before it is flushed
+        now = datetime.now(timezone.utc)
+        kwargs.setdefault("payload", {})
+        kwargs.setdefault("status", SyncEventStatus.PENDING)
+        kwargs.setdefault("retry_count", 0)
+        kwargs.setdefault("max_retries", 3)
+        kwargs.setdefault("created_at", now)
+        kwargs.setdefault("updated_at", now)
+        super().__init__(**kwargs)
+    
     def __repr__(self) -> str:
         return f"<SyncEventLog(event_id={self.event_id}, type={self.event_type}, status={self.status})>"
     
@@ -183,6 +195,18 @@ class SyncEventLog(Base):
         self.error_message = reason
         self.updated_at = datetime.now(timezone.utc)
     
+    def mark_retry_scheduled(self, retry_count: int, error_message: str):
+        """
+        Mark event as waiting in the retry schedule after a failed attempt.
+        
+        It stays PUBLISHED (queued, just not on the stream yet) so the
+        outbox relay, which drains PENDING rows, doesn't skip the backoff.
+        """
+        self.status = SyncEventStatus.PUBLISHED
+        self.retry_count = retry_count
+        self.error_message = error_message
+        self.updated_at = datetime.now(timezone.utc)
+    
     def increment_retry(self):
         """Increment retry count"""
         self.retry_count += 1
@@ -219,13 +243,13 @@ class SyncStatus(Base):
     # Sync status
     is_synced: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
     last_synced_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    last_synced_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_synced_version: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     
     # Source data version
-    source_version: Mapped[int] = mapped_column(Integer, default=0)
+    source_version: Mapped[int] = mapped_column(BigInteger, default=0)
     
     # Neo4j data version (for conflict detection)
-    neo4j_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    neo4j_version: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     neo4j_checksum: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
     
     # Status flags
@@ -247,10 +271,22 @@ class SyncStatus(Base):
     
     # Unique constraint
     __table_args__ = (
-        {"schema": "jeseci_academy"},
         Index("ix_jeseci_academy_sync_status_entity", "entity_id", "entity_type", unique=True),
+        {"schema": "jeseci_academy"},
     )
     
+    def __init__(self, **kwargs):
+        # Apply the column defaults before the row is flushed, as SyncEventLog does
+        now = datetime.now(timezone.utc)
+        kwargs.setdefault("is_synced", False)
+        kwargs.setdefault("source_version", 0)
+        kwargs.setdefault("has_pending_changes", False)
+        kwargs.setdefault("has_conflict", False)
+        kwargs.setdefault("conflict_count", 0)
+        kwargs.setdefault("created_at", now)
+        kwargs.setdefault("updated_at", now)
+        super().__init__(**kwargs)
+    
     def __repr__(self) -> str:
         return f"<SyncStatus(entity_id={self.entity_id}, type={self.entity_type}, synced={self.is_synced})>"
     
@@ -305,8 +341,8 @@ class SyncConflict(Base):
     
     # Conflict details
     conflict_type: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
-    source_version: Mapped[int] = mapped_column(Integer, nullable=False)
-    target_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    source_version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    target_version: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     
     # Data comparison
     source_data: Mapped[dict] = mapped_column(JSONB, nullable=False)
@@ -10,21 +10,33 @@ The publisher:
 2. Publishes events to Redis stream
 3. Updates event status after successful publication
 
+In outbox mode (SYNC_OUTBOX_MODE=true) content writes only insert
+sync_event_log rows, ideally inside their own transaction via
+enqueue_events/enqueue_events_with_cursor. The outbox relay then drains
+PENDING rows in id order, publishing each batch with one pipelined round of
+XADDs and recording the outcome with one bulk UPDATE. The relay runs inside
+run_consumer() when outbox mode is on, or on its own with
+python -m backend.sync_engine.publisher.
+
 Author: Jeseci Development Team
 """
 
 import json
 import logging
+import threading
 import uuid
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Tuple, Callable, Set
 from contextlib import contextmanager
 
 import redis
+from sqlalchemy import case, literal, update
 
 from backend.sync_engine.config import get_redis_config, get_sync_config
-from backend.sync_engine.events import SyncEvent, EventType
+from backend.sync_engine.events import SyncEvent, EventType, EventBatch
+from backend.sync_engine.hlc import get_clock
 from backend.sync_engine.models import SyncEventLog, SyncEventStatus
+from backend.sync_engine.retry_scheduler import RetryScheduler
 from backend.sync_engine.database import get_postgres_sync_manager, get_redis_sync_manager
 
 # Import centralized logging configuration
@@ -48,6 +60,8 @@ class SyncEventPublisher:
         self.sync_config = get_sync_config()
         self.redis_client = None
         self.postgres_manager = None
+        self._relay_thread: Optional[threading.Thread] = None
+        self._relay_stop = threading.Event()
         self._initialize()
     
     def _initialize(self):
@@ -77,14 +91,16 @@ class SyncEventPublisher:
         entity_type: str,
         payload: Dict[str, Any],
         source_version: Optional[int] = None,
-        correlation_id: Optional[str] = None
+        correlation_id: Optional[str] = None,
+        session=None
     ) -> SyncEvent:
         """
         Create a new synchronization event.
         
         This method creates an event in the database (outbox pattern)
         and returns the event object. The event is not yet published
-        to the message queue.
+        to the message queue. Pass the caller's session to write the
+        outbox row in the same transaction as the content change.
         
         Args:
             event_type: Type of event (create, update, delete)
@@ -92,13 +108,17 @@ class SyncEventPublisher:
             entity_type: Type of entity (concept, learning_path, relationship)
             payload: Event data to synchronize
             source_version: Version of source data for conflict detection
+                (default: a new HLC version past the payload's updated_at)
             correlation_id: ID for tracing related events
+            session: Optional SQLAlchemy session of the content write
             
         Returns:
             SyncEvent object that was created
         """
         if source_version is None:
-            source_version = int(datetime.utcnow().timestamp())
+            clock = get_clock()
+            clock.observe(payload.get("updated_at"))
+            source_version = clock.now()
         
         if correlation_id is None:
             correlation_id = str(uuid.uuid4())
@@ -115,24 +135,219 @@ class SyncEventPublisher:
         )
         
         # Save to database (outbox)
-        with self.get_session() as session:
-            event_log = SyncEventLog(
-                event_id=event.event_id,
-                correlation_id=event.correlation_id,
-                event_type=event.event_type.value,
-                entity_id=event.entity_id,
-                entity_type=event.entity_type,
-                payload=event.payload,
-                source_version=event.source_version,
-                status=SyncEventStatus.PENDING,
-                max_retries=event.max_retries
-            )
-            session.add(event_log)
-            session.flush()  # Get the ID without committing
+        self.enqueue_events([event], session=session)
         
         logger.debug(f"Created sync event: {event.event_id} ({event.event_type.value})")
         return event
     
+    @staticmethod
+    def _event_log(event: SyncEvent) -> SyncEventLog:
+        """Build the outbox row for an event"""
+        return SyncEventLog(
+            event_id=event.event_id,
+            correlation_id=event.correlation_id,
+            event_type=event.event_type.value if isinstance(event.event_type, EventType) else event.event_type,
+            entity_id=event.entity_id,
+            entity_type=event.entity_type,
+            payload=event.payload,
+            source_version=event.source_version,
+            status=SyncEventStatus.PENDING,
+            retry_count=event.retry_count,
+            max_retries=event.max_retries
+        )
+    
+    def enqueue_events(self, events: Iterable[SyncEvent], session=None) -> int:
+        """
+        Insert outbox rows for events without publishing them.
+        
+        Args:
+            events: Events to enqueue
+            session: Optional SQLAlchemy session of the content write; the
+                rows commit or roll back with it
+            
+        Returns:
+            Number of events enqueued
+        """
+        rows = [self._event_log(event) for event in events]
+        if not rows:
+            return 0
+        if session is not None:
+            session.add_all(rows)
+            session.flush()
+        else:
+            with self.get_session() as own_session:
+                own_session.add_all(rows)
+        return len(rows)
+    
+    def enqueue_events_with_cursor(self, cursor, events: Iterable[SyncEvent]) -> int:
+        """
+        Insert outbox rows through a psycopg2 cursor.
+        
+        For content stores that write with raw psycopg2 connections: the
+        rows are inserted in the cursor's transaction with a single
+        multi-row INSERT and become visible to the relay on commit.
+        
+        Args:
+            cursor: psycopg2 cursor of the content write
+            events: Events to enqueue
+            
+        Returns:
+            Number of events enqueued
+        """
+        from psycopg2.extras import execute_values
+        
+        rows = [
+            (
+                event.event_id,
+                event.correlation_id,
+                event.event_type.value if isinstance(event.event_type, EventType) else event.event_type,
+                event.entity_id,
+                event.entity_type,
+                json.dumps(event.payload, default=str),
+                event.source_version,
+                event.retry_count,
+                event.max_retries
+            )
+            for event in events
+        ]
+        if not rows:
+            return 0
+        table = SyncEventLog.__table__
+        execute_values(cursor, f"""
+            INSERT INTO {table.schema}.{table.name}
+                (event_id, correlation_id, event_type, entity_id, entity_type,
+                 payload, source_version, retry_count, max_retries)
+            VALUES %s
+            ON CONFLICT (event_id) DO NOTHING
+        """, rows, template="(%s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s)", page_size=1000)
+        return len(rows)
+    
+    def _xadd_batch(self, events: List[SyncEvent]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        XADD events in one pipelined round trip.
+        
+        Returns:
+            (event_id -> stream message id, event_id -> error message)
+        """
+        if self.redis_client is None:
+            return {}, {event.event_id: "Redis client not available" for event in events}
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(
+                self.redis_config.stream_name,
+                event.get_redis_fields(),
+                maxlen=self.sync_config.stream_max_length,
+                approximate=True
+            )
+        try:
+            results = pipe.execute(raise_on_error=False)
+        except Exception as e:
+            return {}, {event.event_id: str(e) for event in events}
+        
+        published, failed = {}, {}
+        for event, result in zip(events, results):
+            if isinstance(result, Exception):
+                failed[event.event_id] = str(result)
+            else:
+                published[event.event_id] = result.decode() if isinstance(result, bytes) else result
+        return published, failed
+    
+    def _record_batch_outcome(
+        self,
+        session,
+        published: Dict[str, str],
+        failed: Dict[str, str],
+        count_retry: bool = False,
+        fail_permanently: bool = False
+    ):
+        """
+        Record the outcome of a published batch with one UPDATE per outcome.
+        
+        Published rows get status PUBLISHED and their stream message ids.
+        Failed rows either fail permanently or, for the relay, stay PENDING
+        with an incremented retry count until max_retries is reached.
+        """
+        now = datetime.now(timezone.utc)
+        status_type = SyncEventLog.__table__.c.status.type
+        
+        if published:
+            values = {
+                "status": SyncEventStatus.PUBLISHED,
+                "published_at": now,
+                "updated_at": now,
+                "redis_message_id": case(published, value=SyncEventLog.event_id)
+            }
+            if count_retry:
+                values["retry_count"] = SyncEventLog.retry_count + 1
+            session.execute(
+                update(SyncEventLog)
+                .where(SyncEventLog.event_id.in_(list(published)))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        
+        if failed:
+            values = {
+                "error_message": case(failed, value=SyncEventLog.event_id),
+                "updated_at": now
+            }
+            if fail_permanently:
+                values["status"] = SyncEventStatus.FAILED
+            else:
+                values["retry_count"] = SyncEventLog.retry_count + 1
+                values["status"] = case(
+                    (SyncEventLog.retry_count + 1 >= SyncEventLog.max_retries,
+                     literal(SyncEventStatus.FAILED, status_type)),
+                    else_=SyncEventLog.status
+                )
+            session.execute(
+                update(SyncEventLog)
+                .where(SyncEventLog.event_id.in_(list(failed)))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+    
+    def publish_batch(self, batch: EventBatch, session=None) -> int:
+        """
+        Create and publish a batch of events.
+        
+        The outbox rows are inserted together, published with pipelined
+        XADDs and updated with one bulk UPDATE, instead of three database
+        round trips per event. In outbox mode the rows are only enqueued
+        and the relay publishes them.
+        
+        Args:
+            batch: Events to create and publish
+            session: Optional SQLAlchemy session of the content write
+            
+        Returns:
+            Number of events published (or enqueued in outbox mode)
+        """
+        if batch.is_empty():
+            return 0
+        if self.sync_config.outbox_mode or session is not None:
+            return self.enqueue_events(batch.events, session=session)
+        
+        published_count = 0
+        for chunk in batch.chunks(self.sync_config.relay_batch_size):
+            self.enqueue_events(chunk.events)
+            published, failed = self._xadd_batch(chunk.events)
+            with self.get_session() as own_session:
+                self._record_batch_outcome(own_session, published, failed, fail_permanently=True)
+            for event_id, error in failed.items():
+                logger.error(f"Failed to publish event {event_id}: {error}")
+            published_count += len(published)
+        
+        logger.info(f"Published sync batch {batch.correlation_id}: {published_count}/{batch.size()} events")
+        return published_count
+    
+    def _dispatch(self, event: SyncEvent) -> bool:
+        """Publish a freshly created event, or leave it to the relay in outbox mode"""
+        if self.sync_config.outbox_mode:
+            return True
+        return self.publish_event(event)
+    
     def publish_event(self, event: SyncEvent) -> bool:
         """
         Publish an event to Redis stream.
@@ -203,7 +418,7 @@ class SyncEventPublisher:
             payload=concept_data
         )
         
-        return self.publish_event(event)
+        return self._dispatch(event)
     
     def publish_learning_path(
         self,
@@ -229,7 +444,7 @@ class SyncEventPublisher:
             payload=path_data
         )
         
-        return self.publish_event(event)
+        return self._dispatch(event)
     
     def publish_relationship(
         self,
@@ -255,7 +470,7 @@ class SyncEventPublisher:
             payload=relationship_data
         )
         
-        return self.publish_event(event)
+        return self._dispatch(event)
     
     def _update_event_error(self, event_id: str, error_message: str):
         """Update event status with error message"""
@@ -268,12 +483,89 @@ class SyncEventPublisher:
                 event_log.mark_failed(error_message)
                 session.flush()
     
+    def _relay(
+        self,
+        statuses: List[SyncEventStatus],
+        limit: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        count_retry: bool = False,
+        skip: Optional[Callable[[Iterable[str]], Set[str]]] = None
+    ) -> int:
+        """
+        Drain outbox rows with the given statuses in id order.
+        
+        Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED so
+        several relays can run side by side, published with one pipelined
+        XADD round trip and settled with one bulk UPDATE in the same
+        transaction. The cursor (last id seen) moves forward between
+        batches, so rows that fail and stay PENDING are picked up by the
+        next pass rather than retried in a tight loop. skip, given the
+        event ids of a batch, returns the ones to leave untouched.
+        
+        Returns:
+            Number of events published
+        """
+        batch_size = batch_size or self.sync_config.relay_batch_size
+        cursor = 0
+        published_total = 0
+        remaining = limit
+        
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            with self.get_session() as session:
+                rows = session.query(SyncEventLog).filter(
+                    SyncEventLog.status.in_(statuses),
+                    SyncEventLog.retry_count < SyncEventLog.max_retries,
+                    SyncEventLog.id > cursor
+                ).order_by(
+                    SyncEventLog.id.asc()
+                ).limit(size).with_for_update(skip_locked=True).all()
+                
+                if not rows:
+                    break
+                
+                cursor = rows[-1].id
+                skipped = skip(row.event_id for row in rows) if skip is not None else set()
+                events = [row.to_event() for row in rows if row.event_id not in skipped]
+                if count_retry:
+                    for event in events:
+                        event.retry_count += 1
+                published, failed = self._xadd_batch(events) if events else ({}, {})
+                self._record_batch_outcome(session, published, failed, count_retry=count_retry)
+            
+            for event_id, error in failed.items():
+                logger.warning(f"Outbox relay failed to publish event {event_id}: {error}")
+            published_total += len(published)
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                break
+        
+        if published_total:
+            logger.info(f"Outbox relay published {published_total} sync events")
+        return published_total
+    
+    def relay_outbox(self, limit: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+        """
+        Publish PENDING outbox rows in batches.
+        
+        Args:
+            limit: Maximum number of rows to drain (None drains everything)
+            batch_size: Rows per batch (default SYNC_RELAY_BATCH_SIZE)
+            
+        Returns:
+            Number of events published
+        """
+        return self._relay([SyncEventStatus.PENDING], limit=limit, batch_size=batch_size)
+    
     def retry_pending_events(self, limit: int = 100) -> int:
         """
         Retry events that are stuck in PENDING or PUBLISHED status.
         
-        This method finds events that haven't been successfully processed
-        and attempts to republish them.
+        Runs the outbox relay cursor over PENDING and PUBLISHED rows that
+        still have retries left, republishing them in batches and counting
+        the retry on each row. Events waiting in the consumer's retry
+        schedule are PUBLISHED too; they are skipped so their backoff holds.
         
         Args:
             limit: Maximum number of events to retry
@@ -281,31 +573,43 @@ class SyncEventPublisher:
         Returns:
             Number of events retried
         """
-        with self.get_session() as session:
-            # Find pending/published events
-            stuck_events = session.query(SyncEventLog).filter(
-                SyncEventLog.status.in_([
-                    SyncEventStatus.PENDING,
-                    SyncEventStatus.PUBLISHED
-                ]),
-                SyncEventLog.retry_count < SyncEventLog.max_retries
-            ).limit(limit).all()
-            
-            retried = 0
-            for event_log in stuck_events:
-                try:
-                    # Increment retry count
-                    event_log.increment_retry()
-                    
-                    # Convert to event and republish
-                    event = event_log.to_event()
-                    if self.publish_event(event):
-                        retried += 1
-                        
-                except Exception as e:
-                    logger.error(f"Failed to retry event {event_log.event_id}: {e}")
-            
-            return retried
+        scheduler = RetryScheduler(self.redis_client, self.redis_config.stream_name)
+        return self._relay(
+            [SyncEventStatus.PENDING, SyncEventStatus.PUBLISHED],
+            limit=limit,
+            count_retry=True,
+            skip=scheduler.scheduled_ids
+        )
+    
+    def start_relay(self) -> bool:
+        """Start the outbox relay in a background thread"""
+        if self._relay_thread and self._relay_thread.is_alive():
+            return False
+        self._relay_stop.clear()
+        self._relay_thread = threading.Thread(
+            target=self._relay_loop, name="sync-outbox-relay", daemon=True
+        )
+        self._relay_thread.start()
+        logger.info("Sync outbox relay started")
+        return True
+    
+    def stop_relay(self, timeout: float = 5.0):
+        """Stop the background outbox relay"""
+        self._relay_stop.set()
+        if self._relay_thread:
+            self._relay_thread.join(timeout=timeout)
+            self._relay_thread = None
+    
+    def _relay_loop(self):
+        """Drain the outbox until stopped, idling between empty passes"""
+        while not self._relay_stop.is_set():
+            try:
+                published = self.relay_outbox()
+            except Exception as e:
+                logger.error(f"Sync outbox relay error: {e}")
+                published = 0
+            if not published:
+                self._relay_stop.wait(self.sync_config.relay_interval_seconds)
     
     def get_pending_events(self, limit: int = 100) -> List[SyncEventLog]:
         """
@@ -371,6 +675,7 @@ class SyncEventPublisher:
     
     def close(self):
         """Close publisher connections"""
+        self.stop_relay()
         if self.redis_client:
             self.redis_client.close()
             self.redis_client = None
@@ -441,3 +746,30 @@ def publish_relationship_event(
     """
     publisher = get_sync_publisher()
     return publisher.publish_relationship(relationship_data, event_type)
+
+
+def relay_outbox_events(limit: Optional[int] = None) -> int:
+    """
+    Convenience function to drain the sync outbox once.
+    
+    Args:
+        limit: Maximum number of events to publish
+        
+    Returns:
+        Number of events published
+    """
+    publisher = get_sync_publisher()
+    return publisher.relay_outbox(limit=limit)
+
+
+if __name__ == "__main__":
+    # Standalone relay process: python -m backend.sync_engine.publisher
+    publisher = get_sync_publisher()
+    publisher.start_relay()
+    try:
+        while publisher._relay_thread and publisher._relay_thread.is_alive():
+            publisher._relay_thread.join(timeout=1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
@@ -21,7 +21,7 @@ import random
 import threading
 import time
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List, Tuple
 import hashlib
 
@@ -33,6 +33,9 @@ from backend.sync_engine.models import (
     ReconciliationRun, ConflictResolutionStatus
 )
 from backend.sync_engine.publisher import get_sync_publisher
+from backend.sync_engine.hlc import get_clock, to_version
+from backend.sync_engine.metrics import SyncMetrics
+from backend.sync_engine.retry_scheduler import RetryScheduler, DeadLetterQueue
 from backend.sync_engine.database import (
     get_postgres_sync_manager, 
     get_neo4j_sync_manager
@@ -64,6 +67,12 @@ class ReconciliationJob:
         self.postgres_manager = get_postgres_sync_manager()
         self.neo4j_manager = get_neo4j_sync_manager()
         self.publisher = get_sync_publisher()
+        self.metrics = SyncMetrics()
+        
+        # Retry schedule and dead letters share the publisher's Redis client
+        redis_client = self.publisher.redis_client
+        self.retry_scheduler = RetryScheduler(redis_client) if redis_client else None
+        self.dead_letters = DeadLetterQueue(redis_client) if redis_client else None
         
         # State
         self.running = False
@@ -136,6 +145,8 @@ class ReconciliationJob:
         with self.postgres_manager.get_session() as session:
             session.add(self.current_run)
             session.flush()
+            # Keep the run usable after the session closes; saved again at the end
+            session.expunge(self.current_run)
         
         start_time = datetime.now(timezone.utc)
         
@@ -175,37 +186,56 @@ class ReconciliationJob:
             }
             
             logger.info(f"Reconciliation run {run_id} completed: {result}")
+            self._record_run_metrics(result)
             return result
             
         except Exception as e:
             logger.error(f"Reconciliation run {run_id} failed: {e}")
             self.current_run.fail(str(e))
             
-            return {
+            result = {
                 "run_id": run_id,
                 "status": "FAILED",
                 "error": str(e),
                 "duration_seconds": (datetime.now(timezone.utc) - start_time).total_seconds()
             }
+            self._record_run_metrics(result)
+            return result
         
         finally:
             self.last_run = datetime.now(timezone.utc)
+            self._save_run()
+    
+    def _record_run_metrics(self, result: Dict[str, Any]):
+        """Record the run for /metrics/sync and publish it for the API process"""
+        self.metrics.record_reconciliation(result)
+        self.metrics.publish(self.publisher.redis_client, "reconciliation", force=True)
+    
+    def _save_run(self):
+        """Persist the current run's statistics and status"""
+        try:
+            with self.postgres_manager.get_session() as session:
+                session.merge(self.current_run)
+        except Exception as e:
+            logger.error(f"Failed to save reconciliation run {self.current_run.run_id}: {e}")
     
     def _process_stuck_events(self) -> int:
         """
         Process events that are stuck in PENDING or PUBLISHED status.
         
         These events may have failed to publish or may have been lost.
-        This method republishes them to ensure they are processed.
+        This method republishes them to ensure they are processed. Events
+        waiting in the consumer's retry schedule are PUBLISHED too but are
+        left alone, and retry counts are kept so exhausted events still end
+        up dead-lettered instead of cycling through every sweep.
         
         Returns:
             Number of events processed
         """
         with self.postgres_manager.get_session() as session:
             # Find stuck events
-            threshold = datetime.now(timezone.utc)
-            threshold = threshold.replace(
-                second=threshold.second - (self.sync_config.stale_event_threshold_minutes * 60)
+            threshold = datetime.now(timezone.utc) - timedelta(
+                minutes=self.sync_config.stale_event_threshold_minutes
             )
             
             stuck_events = session.query(SyncEventLog).filter(
@@ -214,17 +244,26 @@ class ReconciliationJob:
                     SyncEventStatus.PUBLISHED
                 ]),
                 SyncEventLog.updated_at < threshold,
-                SyncEventLog.retry_count < SyncEventLog.max_retries
+                # retry_count == max_retries is a final retry that was lost
+                SyncEventLog.retry_count <= SyncEventLog.max_retries
             ).limit(self.sync_config.reconciliation_batch_size).all()
             
+            scheduled = set()
+            if self.retry_scheduler is not None:
+                try:
+                    scheduled = self.retry_scheduler.scheduled_ids(e.event_id for e in stuck_events)
+                except Exception as e:
+                    logger.warning(f"Could not read retry schedule: {e}")
+            
             processed = 0
             for event_log in stuck_events:
+                if event_log.event_id in scheduled:
+                    continue
                 try:
                     event = event_log.to_event()
                     
                     # Reset status for retry
                     event_log.status = SyncEventStatus.PENDING
-                    event_log.retry_count = 0
                     
                     # Publish to Redis
                     if self._publish_event(event):
@@ -302,20 +341,23 @@ class ReconciliationJob:
             (self.sync_config.reconciliation_batch_size,)
         )
         
+        # Get the matching nodes from Neo4j in one query
+        neo4j_nodes = self.neo4j_manager.get_nodes(
+            neo4j_label,
+            id_field,
+            [entity.get(id_field) for entity in pg_entities]
+        )
+        
         for entity in pg_entities:
             entity_id = entity.get(id_field)
-            
-            # Get from Neo4j
-            neo4j_node = self.neo4j_manager.get_node(
-                neo4j_label, 
-                id_field.replace("_", ""),  # Remove underscore for Neo4j property
-                entity_id
-            )
+            neo4j_node = neo4j_nodes.get(entity_id)
             
             if neo4j_node:
-                # Compare versions
-                pg_version = int(entity.get("updated_at", 0).timestamp()) if hasattr(entity.get("updated_at"), 'timestamp') else 0
-                neo4j_version = neo4j_node.get("source_version", 0)
+                # Compare HLC versions: the node carries the version of the
+                # last applied event, which is issued after the row's updated_at
+                pg_version = to_version(entity.get("updated_at"))
+                neo4j_version = to_version(neo4j_node.get("source_version"))
+                get_clock().observe(neo4j_version)
                 
                 if pg_version > neo4j_version:
                     # Drift detected - repair
@@ -373,6 +415,11 @@ class ReconciliationJob:
         
         entity_data = entities[0]
         
+        # Repair version: newer than both the row and anything applied so far
+        clock = get_clock()
+        clock.observe(entity_data.get("updated_at"))
+        source_version = clock.now()
+        
         # Convert datetime to serializable format
         for key, value in entity_data.items():
             if hasattr(value, 'isoformat'):
@@ -393,7 +440,7 @@ class ReconciliationJob:
                 entity_id=entity_id,
                 entity_type=neo4j_label.lower(),
                 payload=entity_data,
-                source_version=int(datetime.utcnow().timestamp()),
+                source_version=source_version,
                 correlation_id=f"reconciliation-{uuid.uuid4()}"
             )
         )
@@ -430,8 +477,8 @@ class ReconciliationJob:
                             entity_id=status.entity_id,
                             entity_type=status.entity_type,
                             conflict_type="VERSION_MISMATCH",
-                            source_version=pg_data.get("updated_at", 0),
-                            target_version=neo4j_data.get("updated_at", 0),
+                            source_version=to_version(pg_data.get("updated_at")),
+                            target_version=to_version(neo4j_data.get("updated_at")),
                             source_data=pg_data,
                             target_data=neo4j_data,
                             difference_summary=self._summarize_differences(pg_data, neo4j_data)
@@ -550,6 +597,68 @@ class ReconciliationJob:
             logger.error(f"Failed to publish event {event.event_id}: {e}")
             return False
     
+    def list_dead_letters(self, count: int = 50) -> List[Dict[str, Any]]:
+        """Get the oldest dead-lettered events"""
+        if self.dead_letters is None:
+            return []
+        return [
+            {
+                "id": entry["id"],
+                "event_id": entry["fields"].get("event_id"),
+                "event_type": entry["fields"].get("event_type"),
+                "entity_id": entry["fields"].get("entity_id"),
+                "attempts": int(entry["fields"].get("attempts", 0)),
+                "error": entry["fields"].get("error"),
+                "failed_at": entry["fields"].get("failed_at"),
+                "replayable": entry["event"] is not None
+            }
+            for entry in self.dead_letters.list(count=count)
+        ]
+    
+    def replay_dead_letters(self, entry_ids: Optional[List[str]] = None, limit: int = 100) -> Dict[str, int]:
+        """
+        Republish dead-lettered events with a fresh retry budget.
+        
+        Args:
+            entry_ids: Dead-letter entry IDs; the oldest ``limit`` when omitted
+            limit: Most entries to replay when no IDs are given
+            
+        Returns:
+            Counts of replayed entries, skipped entries (unparseable stream
+            entries, which can only be deleted) and failed publishes
+        """
+        result = {"replayed": 0, "skipped": 0, "failed": 0}
+        if self.dead_letters is None:
+            logger.error("Redis not available, cannot replay dead letters")
+            return result
+        
+        entries = self.dead_letters.get(entry_ids) if entry_ids else self.dead_letters.list(count=limit)
+        for entry in entries:
+            event = entry["event"]
+            if event is None:
+                result["skipped"] += 1
+                continue
+            
+            event.retry_count = 0
+            event.error_message = None
+            with self.postgres_manager.get_session() as session:
+                event_log = session.query(SyncEventLog).filter(
+                    SyncEventLog.event_id == event.event_id
+                ).first()
+                if event_log:
+                    event_log.retry_count = 0
+                    event_log.error_message = None
+                session.flush()
+            
+            if self._publish_event(event):
+                self.dead_letters.delete([entry["id"]])
+                result["replayed"] += 1
+            else:
+                result["failed"] += 1
+        
+        logger.info(f"Dead letter replay: {result}")
+        return result
+    
     def get_status(self) -> Dict[str, Any]:
         """Get reconciliation job status"""
         return {
@@ -558,6 +667,7 @@ class ReconciliationJob:
             "total_runs": self.total_runs,
             "total_repairs": self.total_repairs,
             "total_conflicts_detected": self.total_conflicts_detected,
+            "last_run_metrics": dict(self.metrics.reconciliation),
             "config": {
                 "interval_seconds": self.sync_config.reconciliation_interval_seconds,
                 "batch_size": self.sync_config.reconciliation_batch_size,
@@ -619,13 +729,23 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description="Sync Reconciliation Job")
     parser.add_argument("--run-once", action="store_true", help="Run reconciliation once and exit")
+    parser.add_argument("--dead-letters", action="store_true", help="List dead-lettered events and exit")
+    parser.add_argument("--replay-dead-letters", nargs="*", metavar="ENTRY_ID",
+                        help="Republish dead-lettered events (the oldest --limit when no IDs are given) and exit")
+    parser.add_argument("--limit", type=int, default=50, help="Dead letters to list or replay")
     args = parser.parse_args()
     
     logging.basicConfig(level=logging.INFO)
     
     job = ReconciliationJob()
     
-    if args.run_once:
+    if args.dead_letters:
+        for entry in job.list_dead_letters(args.limit):
+            print(json.dumps(entry))
+    elif args.replay_dead_letters is not None:
+        result = job.replay_dead_letters(args.replay_dead_letters or None, args.limit)
+        print(f"Dead letter replay: {result}")
+    elif args.run_once:
         result = job.run_reconciliation(run_type="manual")
         print(f"Reconciliation result: {result}")
     else:
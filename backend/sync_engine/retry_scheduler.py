@@ -0,0 +1,257 @@
+"""
+Retry Scheduling and Dead Letters for Sync Engine
+
+Failed events are not left for the reconciliation sweep. The consumer
+hands them to a RetryScheduler, which keeps them in a Redis sorted set
+scored by the time they are due:
+
+- Delays grow exponentially: retry_delay_seconds * retry_backoff_multiplier
+  ** (attempt - 1), capped at retry_max_delay_seconds, plus up to 10% jitter
+  so events that failed together don't retry together
+- Consumers promote due events back onto the sync stream each loop; a Lua
+  script removes each due event from the schedule and payload hash and
+  appends it to the stream in one step, so an event is requeued exactly
+  once even if a consumer dies mid-promotion
+- Event payloads live in a hash next to the schedule, keyed by event_id, so
+  rescheduling an event replaces its earlier entry
+
+Events that exhaust their retries, and stream entries that can't be parsed,
+go to a dead-letter stream with the error and attempt count. DeadLetterQueue
+lists, deletes and hands back entries for replay; ReconciliationJob wires
+replay to the publisher (see ``python -m backend.sync_engine.reconciliation
+--dead-letters``).
+
+Author: Jeseci Development Team
+"""
+
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from backend.sync_engine.config import get_redis_config, get_sync_config
+from backend.sync_engine.events import SyncEvent
+
+# Import centralized logging configuration
+from logger_config import logger
+
+# Largest fraction of a delay added as jitter
+RETRY_JITTER = 0.1
+
+# KEYS: schedule, payloads, stream. ARGV: now, limit, stream maxlen.
+# Stream fields match SyncEvent.get_redis_fields(); data is the stored JSON.
+# Returns the promoted event ids, the number of due entries looked at and
+# the next due time ('' if none).
+_PROMOTE_DUE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local promoted = {}
+for _, event_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], event_id)
+    local payload = redis.call('HGET', KEYS[2], event_id)
+    if payload then
+        redis.call('HDEL', KEYS[2], event_id)
+        local event = cjson.decode(payload)
+        redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[3], '*',
+            'event_id', event_id,
+            'event_type', tostring(event['event_type']),
+            'entity_id', tostring(event['entity_id']),
+            'entity_type', tostring(event['entity_type']),
+            'data', payload)
+        table.insert(promoted, event_id)
+    end
+end
+local next_due = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {promoted, #due, next_due[2] or ''}
+"""
+
+
+def retry_schedule_key(stream_name: str) -> str:
+    """Sorted set of event_id -> due time"""
+    return f"{stream_name}:retry"
+
+
+def retry_payload_key(stream_name: str) -> str:
+    """Hash of event_id -> event JSON for scheduled retries"""
+    return f"{stream_name}:retry:events"
+
+
+def dead_letter_key(stream_name: str) -> str:
+    """Stream of events that exhausted their retries or couldn't be parsed"""
+    return f"{stream_name}:dead"
+
+
+class RetryScheduler:
+    """
+    Delayed retries for failed sync events, backed by a Redis sorted set.
+    """
+
+    def __init__(self, redis_client, stream_name: Optional[str] = None):
+        self.redis_client = redis_client
+        self.sync_config = get_sync_config()
+        self.stream_name = stream_name or get_redis_config().stream_name
+        self.schedule_key = retry_schedule_key(self.stream_name)
+        self.payload_key = retry_payload_key(self.stream_name)
+        self._promote = redis_client.register_script(_PROMOTE_DUE)
+
+        # Statistics
+        self.scheduled = 0
+        self.promoted = 0
+
+    def delay_for(self, attempt: int) -> float:
+        """Seconds to wait before retry number ``attempt`` (1-based)"""
+        delay = self.sync_config.retry_delay_seconds * (
+            self.sync_config.retry_backoff_multiplier ** max(attempt - 1, 0)
+        )
+        delay = min(delay, self.sync_config.retry_max_delay_seconds)
+        return delay + random.uniform(0, delay * RETRY_JITTER)
+
+    def schedule(self, event: SyncEvent) -> float:
+        """
+        Schedule an event for its next attempt.
+
+        Args:
+            event: Failed event, with retry_count already counting this retry
+
+        Returns:
+            Unix time the event is due
+        """
+        due = time.time() + self.delay_for(event.retry_count)
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(self.payload_key, event.event_id, event.to_json())
+        pipe.zadd(self.schedule_key, {event.event_id: due})
+        pipe.execute()
+        self.scheduled += 1
+        return due
+
+    def promote_due(self, limit: int = 100) -> Optional[float]:
+        """
+        Move due events back onto the sync stream.
+
+        Args:
+            limit: Most events to look at in one call
+
+        Returns:
+            Seconds until the next scheduled event, or None if none are left
+        """
+        now = time.time()
+        promoted, looked_at, next_due = self._promote(
+            keys=[self.schedule_key, self.payload_key, self.stream_name],
+            args=[repr(now), limit, self.sync_config.stream_max_length]
+        )
+        for event_id in promoted:
+            if isinstance(event_id, bytes):
+                event_id = event_id.decode()
+            logger.info(f"Requeued event {event_id} for retry")
+        self.promoted += len(promoted)
+        # A full page may have more due events behind it
+        if looked_at == limit:
+            return 0.0
+        if next_due in ("", b"", None):
+            return None
+        return max(float(next_due) - now, 0.0)
+
+    def scheduled_ids(self, event_ids: Iterable[str]) -> Set[str]:
+        """Subset of event_ids currently waiting in the schedule"""
+        event_ids = list(event_ids)
+        if not event_ids:
+            return set()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for event_id in event_ids:
+            pipe.zscore(self.schedule_key, event_id)
+        return {event_id for event_id, score in zip(event_ids, pipe.execute()) if score is not None}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics"""
+        try:
+            waiting = self.redis_client.zcard(self.schedule_key)
+        except Exception:
+            waiting = None
+        return {
+            "waiting": waiting,
+            "scheduled": self.scheduled,
+            "promoted": self.promoted,
+        }
+
+
+class DeadLetterQueue:
+    """
+    Redis stream of sync events that won't be retried automatically.
+    """
+
+    def __init__(self, redis_client, stream_name: Optional[str] = None):
+        self.redis_client = redis_client
+        self.sync_config = get_sync_config()
+        self.key = dead_letter_key(stream_name or get_redis_config().stream_name)
+
+    def add(
+        self,
+        error: str,
+        event: Optional[SyncEvent] = None,
+        raw: Optional[Dict[str, str]] = None,
+        stream_id: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Dead-letter an event, or the raw fields of an entry that couldn't be
+        parsed.
+
+        Returns:
+            Dead-letter entry ID, or None if it couldn't be written
+        """
+        fields = {
+            "error": error,
+            "failed_at": datetime.now(timezone.utc).isoformat(),
+            "source_stream_id": stream_id or "",
+        }
+        if event is not None:
+            fields.update(
+                event_id=event.event_id,
+                event_type=event.event_type.value,
+                entity_id=event.entity_id,
+                attempts=str(event.retry_count),
+                data=event.to_json()
+            )
+        else:
+            fields.update(event_id=(raw or {}).get("event_id", ""), raw=json.dumps(raw or {}))
+        try:
+            return self.redis_client.xadd(
+                self.key,
+                fields,
+                maxlen=self.sync_config.dead_letter_max_length,
+                approximate=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to dead-letter event {fields['event_id']}: {e}")
+            return None
+
+    def list(self, count: int = 50, start: str = "-") -> List[Dict[str, Any]]:
+        """
+        Oldest dead letters first.
+
+        Returns:
+            Entries with their ID, fields and parsed event (None for raw
+            entries)
+        """
+        entries = []
+        for entry_id, fields in self.redis_client.xrange(self.key, min=start, max="+", count=count):
+            event = SyncEvent.from_json(fields["data"]) if fields.get("data") else None
+            entries.append({"id": entry_id, "fields": fields, "event": event})
+        return entries
+
+    def get(self, entry_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Dead letters with the given entry IDs, skipping missing ones"""
+        entries = []
+        for entry_id in entry_ids:
+            found = self.list(count=1, start=entry_id)
+            if found and found[0]["id"] == entry_id:
+                entries.append(found[0])
+        return entries
+
+    def delete(self, entry_ids: Iterable[str]) -> int:
+        """Remove dead letters, e.g. after a replay"""
+        entry_ids = list(entry_ids)
+        return self.redis_client.xdel(self.key, *entry_ids) if entry_ids else 0
+
+    def length(self) -> int:
+        """Number of dead letters"""
+        return self.redis_client.xlen(self.key)
@@ -0,0 +1,403 @@
+"""
+Local Stand-ins for Sync Engine Managers
+
+This module provides in-process replacements for the PostgreSQL, Neo4j and
+Redis managers so the publisher, consumer and reconciliation job can be run
+end to end without external services (benchmarks, local experiments).
+
+The stand-ins implement the same interface as the real managers:
+- SQLiteSyncManager: PostgresSyncManager on a file-backed SQLite database,
+  with the sync schema attached under its PostgreSQL name
+- InMemoryGraphManager: Neo4jSyncManager over dictionaries, interpreting
+  the Cypher statements the consumer issues
+- FakeRedisSyncManager: RedisSyncManager on fakeredis streams
+
+The database and graph stand-ins count their round trips (in total and per
+calling thread) and can inject a fixed latency per round trip to
+approximate a networked deployment.
+
+Author: Jeseci Development Team
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session
+
+from backend.sync_engine.config import get_database_config
+from backend.sync_engine.models import Base
+
+# Import centralized logging configuration
+from logger_config import logger
+
+try:
+    import fakeredis
+    FAKEREDIS_AVAILABLE = True
+except ImportError:
+    fakeredis = None
+    FAKEREDIS_AVAILABLE = False
+
+
+# Source tables read by reconciliation, reduced to the columns it uses
+SOURCE_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.concepts (
+        concept_id VARCHAR(100) PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        display_name VARCHAR(200),
+        category VARCHAR(100),
+        difficulty_level VARCHAR(50),
+        description TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.learning_paths (
+        path_id VARCHAR(100) PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        title VARCHAR(200),
+        category VARCHAR(100),
+        difficulty_level VARCHAR(50),
+        description TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+# psycopg2 placeholders, with "= ANY(%s)" list parameters
+_PLACEHOLDER = re.compile(r"=\s*ANY\(%s\)|%s")
+
+
+def _to_qmark(query: str, params: Optional[tuple]) -> Tuple[str, tuple]:
+    """Rewrite a psycopg2-style query for sqlite3, expanding ANY(list) to IN (...)"""
+    values = iter(params or ())
+    flat: List[Any] = []
+
+    def replace(match):
+        value = next(values)
+        if match.group(0) == "%s":
+            flat.append(value)
+            return "?"
+        items = list(value) or [None]
+        flat.extend(items)
+        return f"IN ({', '.join('?' * len(items))})"
+
+    return _PLACEHOLDER.sub(replace, query), tuple(flat)
+
+
+class SQLiteSyncManager:
+    """
+    PostgresSyncManager stand-in backed by SQLite.
+
+    The main database and the schema database are files in a temporary
+    directory, so sessions from the publisher, consumer and reconciliation
+    threads each get their own connection as they would with PostgreSQL.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, directory: Optional[str] = None):
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="sync-standin-")
+        self.latency = latency_ms / 1000.0
+        self._schema = get_database_config().postgres_schema
+        self._lock = threading.Lock()
+        self.round_trips = 0
+        self.round_trips_by_thread: Counter = Counter()
+
+        schema_file = os.path.join(self.directory, f"{self._schema}.db")
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.directory, 'main.db')}",
+            pool_size=8,
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+
+        @event.listens_for(self.engine, "connect")
+        def _attach_schema(dbapi_connection, connection_record):
+            dbapi_connection.execute(f"ATTACH DATABASE '{schema_file}' AS {self._schema}")
+            dbapi_connection.execute(f"PRAGMA {self._schema}.journal_mode=WAL")
+            # Durability is irrelevant for a throwaway database; fsyncs would
+            # dominate every measurement
+            dbapi_connection.execute(f"PRAGMA {self._schema}.synchronous=OFF")
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def _count_round_trip(conn, cursor, statement, parameters, context, executemany):
+            with self._lock:
+                self.round_trips += 1
+                self.round_trips_by_thread[threading.current_thread().name] += 1
+            if self.latency:
+                time.sleep(self.latency)
+
+        self._session_factory = sessionmaker(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            for ddl in SOURCE_TABLES_DDL:
+                conn.exec_driver_sql(ddl.format(schema=self._schema))
+
+    @contextmanager
+    def get_session(self) -> Session:
+        """Get a SQLAlchemy session"""
+        session = self._session_factory()
+        try:
+            yield session
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Database session error: {e}")
+            raise
+        finally:
+            session.close()
+
+    def execute_query(self, query: str, params: Optional[tuple] = None,
+                      raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """Execute a query and return results as list of dicts"""
+        sql, values = _to_qmark(query, params)
+        try:
+            with self.engine.connect() as conn:
+                return [dict(row) for row in conn.exec_driver_sql(sql, values).mappings()]
+        except Exception as e:
+            logger.error(f"SQLite query error: {e}")
+            if raise_errors:
+                raise
+            return []
+
+    def execute_update(self, query: str, params: Optional[tuple] = None) -> int:
+        """Execute an update/insert/delete and return affected rows"""
+        sql, values = _to_qmark(query, params)
+        try:
+            with self.engine.begin() as conn:
+                return conn.exec_driver_sql(sql, values).rowcount
+        except Exception as e:
+            logger.error(f"SQLite update error: {e}")
+            return 0
+
+    def close(self):
+        """Dispose the engine and remove the database files"""
+        self.engine.dispose()
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    @property
+    def schema(self) -> str:
+        """Get the current schema name"""
+        return self._schema
+
+
+class InMemoryGraphManager:
+    """
+    Neo4jSyncManager stand-in holding nodes and relationships in memory.
+
+    Writes are interpreted from the consumer's Cypher: node MERGE with an
+    optional source_version guard and SET list, MATCH ... DETACH DELETE,
+    and relationship MERGE / DELETE between matched nodes.
+    """
+
+    _NODE = re.compile(r"\((\w+):(\w+) \{(\w+): \$(\w+)\}\)")
+    _SET = re.compile(r"(\w+)\.(\w+) = (\$\w+|datetime\(\))")
+    _REL = re.compile(r"\((\w+)(?::\w+ \{[^}]*\})?\)-\[\w+:(\w+)[^\]]*\]->\((\w+)")
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self._lock = threading.Lock()
+        self.nodes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.relationships = set()
+        self.round_trips = 0
+        self.round_trips_by_thread: Counter = Counter()
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+            self.round_trips_by_thread[threading.current_thread().name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _find(self, label: str, property_name: str, value: Any) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Find a node; nodes are keyed by the property they were merged on"""
+        nodes = self.nodes.get(label, {})
+        node = nodes.get(value)
+        if node is not None and node.get(property_name) == value:
+            return value, node
+        for key, node in nodes.items():
+            if node.get(property_name) == value:
+                return key, node
+        return None, None
+
+    def execute_query(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Read queries go through get_node/get_nodes; anything else returns no rows"""
+        self._round_trip()
+        return []
+
+    def execute_write(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> bool:
+        """Apply a consumer write statement"""
+        self._round_trip()
+        params = parameters or {}
+        patterns = self._NODE.findall(query)
+        with self._lock:
+            if "DETACH DELETE" in query and patterns:
+                _, label, prop, param = patterns[0]
+                key, node = self._find(label, prop, params.get(param))
+                if node is not None:
+                    del self.nodes[label][key]
+                    self.relationships = {
+                        r for r in self.relationships if (label, key) not in (r[0], r[2])
+                    }
+                return True
+
+            bound = {}
+            for var, label, prop, param in patterns:
+                key, node = self._find(label, prop, params.get(param))
+                if node is None and not query.lstrip().startswith("MERGE"):
+                    return True  # MATCH found nothing
+                bound[var] = (label, key)
+
+            rel = self._REL.search(query)
+            if rel:
+                start, rel_type, end = rel.groups()
+                if start in bound and end in bound:
+                    edge = (bound[start], rel_type, bound[end])
+                    if "DELETE" in query:
+                        self.relationships.discard(edge)
+                    else:
+                        self.relationships.add(edge)
+                return True
+
+            if query.lstrip().startswith("MERGE") and patterns:
+                var, label, prop, param = patterns[0]
+                key = params.get(param)
+                node = self.nodes.setdefault(label, {}).setdefault(key, {prop: key})
+                if "coalesce(" in query and (node.get("source_version") or 0) > params.get("source_version", 0):
+                    return True
+                for set_var, name, value in self._SET.findall(query):
+                    if set_var == var:
+                        node[name] = time.time() if value == "datetime()" else params.get(value[1:])
+            return True
+
+    def close(self):
+        """Nothing to release"""
+
+    def get_node(self, label: str, property_name: str, property_value: str) -> Optional[Dict[str, Any]]:
+        """Get a node by property value"""
+        self._round_trip()
+        with self._lock:
+            _, node = self._find(label, property_name, property_value)
+            return dict(node) if node else None
+
+    def node_exists(self, label: str, property_name: str, property_value: str) -> bool:
+        """Check if a node exists"""
+        return self.get_node(label, property_name, property_value) is not None
+
+    def get_node_version(self, label: str, property_name: str, property_value: str) -> Optional[int]:
+        """Get the source_version of a node"""
+        node = self.get_node(label, property_name, property_value)
+        return node.get("source_version") if node else None
+
+    def get_nodes(self, label: str, property_name: str, property_values: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get nodes keyed by property value in one round trip"""
+        self._round_trip()
+        with self._lock:
+            found = {}
+            for value in property_values:
+                _, node = self._find(label, property_name, value)
+                if node:
+                    found[value] = dict(node)
+            return found
+
+    def get_node_versions(self, label: str, property_name: str, property_values: List[str]) -> Dict[str, int]:
+        """Get source_version per property value in one round trip"""
+        return {
+            value: node.get("source_version")
+            for value, node in self.get_nodes(label, property_name, property_values).items()
+            if node.get("source_version") is not None
+        }
+
+
+class FakeRedisSyncManager:
+    """RedisSyncManager stand-in on an in-process fakeredis server"""
+
+    def __init__(self):
+        if not FAKEREDIS_AVAILABLE:
+            raise RuntimeError("fakeredis is required for the Redis stand-in: pip install fakeredis")
+        self.client = fakeredis.FakeRedis(decode_responses=True)
+
+    def get_client(self):
+        """Get the Redis client"""
+        return self.client
+
+    def stream_exists(self, stream_name: str) -> bool:
+        """Check if a stream exists"""
+        return bool(self.client.exists(stream_name))
+
+    def create_stream_with_group(self, stream_name: str, group_name: str) -> bool:
+        """Create a stream and consumer group if they don't exist"""
+        try:
+            self.client.xgroup_create(stream_name, group_name, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                logger.error(f"Failed to create consumer group: {e}")
+                return False
+        return True
+
+    def close(self):
+        """Close the client"""
+        self.client.close()
+
+
+class StandInEnvironment:
+    """The three stand-in managers, installed in place of the real ones"""
+
+    # Modules that resolve managers through module-level get_* functions
+    _MODULES = (
+        "backend.sync_engine.publisher",
+        "backend.sync_engine.consumer",
+        "backend.sync_engine.reconciliation",
+        "backend.sync_engine.conflict_resolution",
+    )
+
+    def __init__(self, db_latency_ms: float = 0.0, graph_latency_ms: float = 0.0):
+        self.postgres = SQLiteSyncManager(latency_ms=db_latency_ms)
+        self.neo4j = InMemoryGraphManager(latency_ms=graph_latency_ms)
+        self.redis = FakeRedisSyncManager()
+        self._saved: List[Tuple[Any, str, Any]] = []
+
+    def install(self):
+        """Point the sync engine modules at the stand-ins"""
+        import importlib
+
+        factories = {
+            "get_postgres_sync_manager": lambda: self.postgres,
+            "get_neo4j_sync_manager": lambda: self.neo4j,
+            "get_redis_sync_manager": lambda: self.redis,
+        }
+        for module_name in self._MODULES:
+            module = importlib.import_module(module_name)
+            for name, factory in factories.items():
+                if hasattr(module, name):
+                    self._saved.append((module, name, getattr(module, name)))
+                    setattr(module, name, factory)
+        publisher = importlib.import_module("backend.sync_engine.publisher")
+        self._saved.append((publisher, "_publisher_instance", publisher._publisher_instance))
+        publisher._publisher_instance = None
+
+    def uninstall(self):
+        """Restore the real managers"""
+        while self._saved:
+            module, name, value = self._saved.pop()
+            setattr(module, name, value)
+
+    def close(self):
+        self.uninstall()
+        self.redis.close()
+        self.postgres.close()
+
+    def __enter__(self) -> "StandInEnvironment":
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,164 @@
+"""
+Applied-Version Cache for Sync Engine
+
+This module keeps the last source_version applied to Neo4j for each
+(entity_type, entity_id), so the consumer can discard stale events without
+a graph round trip per event.
+
+The cache is:
+- Bounded: least recently used entries are evicted past max_entries
+- Versioned: recording an older version never lowers a cached one
+- Warmed in bulk from sync_status when a consumer starts
+
+While nothing has been evicted and the warm load covered all of
+sync_status, a miss means the entity has never been applied and needs no
+lookup. Otherwise a miss falls back to Neo4j and the answer is cached.
+
+Each consumer process keeps its own cache and only uses it to skip work:
+the version guard in the Cypher writes and sync_status stay authoritative,
+so a cache that lags behind other consumers costs a redundant write, never
+a lost one.
+
+Author: Jeseci Development Team
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from backend.sync_engine.hlc import to_version
+
+# Import centralized logging configuration
+from logger_config import logger
+
+VERSION_CACHE_MAX_ENTRIES = int(os.getenv("SYNC_VERSION_CACHE_SIZE", 100000))
+
+# Entity types whose versions are tracked, with their Neo4j label and key
+VERSIONED_ENTITIES = {
+    "concept": ("Concept", "concept_id"),
+    "learning_path": ("LearningPath", "path_id"),
+}
+
+
+class AppliedVersionCache:
+    """
+    Bounded LRU map of (entity_type, entity_id) -> last applied source_version.
+    """
+
+    def __init__(self, max_entries: int = VERSION_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._versions: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+        # True while every applied entity is known to be in the cache
+        self._complete = False
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether a miss means the entity has never been applied"""
+        return self._complete
+
+    def get(self, entity_type: str, entity_id: str) -> Optional[int]:
+        """Get the last applied version, or None if not cached"""
+        key = (entity_type, entity_id)
+        with self._lock:
+            version = self._versions.get(key)
+            if version is None:
+                self.misses += 1
+                return None
+            self._versions.move_to_end(key)
+            self.hits += 1
+            return version
+
+    def record(self, entity_type: str, entity_id: str, version: Optional[int]):
+        """Record an applied version; keeps the highest version seen"""
+        if version is None:
+            return
+        version = to_version(version)
+        key = (entity_type, entity_id)
+        with self._lock:
+            current = self._versions.get(key)
+            if current is None or version > current:
+                self._versions[key] = version
+            self._versions.move_to_end(key)
+            self._evict()
+
+    def record_many(self, entries: Iterable[Tuple[str, str, Optional[int]]]):
+        """Record several (entity_type, entity_id, version) entries"""
+        for entity_type, entity_id, version in entries:
+            self.record(entity_type, entity_id, version)
+
+    def _evict(self):
+        while len(self._versions) > self.max_entries:
+            self._versions.popitem(last=False)
+            self.evictions += 1
+            self._complete = False
+
+    def warm(self, postgres_manager, schema: str) -> int:
+        """
+        Load applied versions from sync_status in one query.
+
+        The most recently synced entities are loaded first; if sync_status
+        holds more entities than fit, the cache is marked incomplete so
+        misses fall back to Neo4j.
+
+        Raises:
+            Exception: If the query fails; the cache stays incomplete
+
+        Returns:
+            Number of entries loaded
+        """
+        # An error must not read as an empty sync_status, or the cache
+        # would be marked complete
+        types = list(VERSIONED_ENTITIES)
+        rows = postgres_manager.execute_query(f"""
+            SELECT entity_type, entity_id, last_synced_version
+            FROM {schema}.sync_status
+            WHERE entity_type = ANY(%s) AND last_synced_version IS NOT NULL
+            ORDER BY last_synced_at DESC NULLS LAST
+            LIMIT %s
+        """, (types, self.max_entries + 1), raise_errors=True)
+
+        truncated = len(rows) > self.max_entries
+        # Insert oldest first so the most recent end up least likely to be evicted
+        with self._lock:
+            for row in reversed(rows[:self.max_entries]):
+                key = (row["entity_type"], row["entity_id"])
+                version = to_version(row["last_synced_version"])
+                current = self._versions.get(key)
+                if current is None or version > current:
+                    self._versions[key] = version
+                self._versions.move_to_end(key)
+            self._evict()
+            self._complete = not truncated and self.evictions == 0
+
+        logger.info(f"Applied-version cache warmed with {min(len(rows), self.max_entries)} entries"
+                    f"{' (truncated)' if truncated else ''}")
+        return min(len(rows), self.max_entries)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._versions.clear()
+            self._complete = False
+
+    def get_stats(self) -> Dict[str, int]:
+        """Cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._versions),
+            "max_entries": self.max_entries,
+            "complete": self._complete,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
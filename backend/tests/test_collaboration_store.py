@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Collaboration Store Forum Paths
+
+Covers batched counter flushes (and requeueing a failed flush), applying
+flushed deltas to cached thread pages, and keyset cursors. PostgreSQL is
+replaced by mocks that record the statements sent to it.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collaboration_store import (
+    CollaborationStore,
+    ForumCounterBuffer,
+    HotThreadCache,
+    _encode_cursor,
+    _decode_cursor
+)
+
+
+class TestForumCounterBuffer(unittest.TestCase):
+    """Tests for batching counter increments into UPDATEs"""
+
+    def setUp(self):
+        self.flushed = []
+        self.buffer = ForumCounterBuffer(flush_interval=3600, on_flush=self.on_flush)
+        self.conn = MagicMock()
+        manager = MagicMock()
+        manager.get_connection.return_value = self.conn
+        patcher = patch("collaboration_store.get_postgres_manager", return_value=manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = manager
+        self.writes = []
+        patcher = patch("collaboration_store.extras.execute_values", side_effect=self.execute_values)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fail_writes = False
+
+    def tearDown(self):
+        self.buffer._stop.set()
+
+    def execute_values(self, cursor, sql, rows, template=None):
+        if self.fail_writes:
+            raise RuntimeError("connection lost")
+        self.writes.append((sql, rows))
+
+    def on_flush(self, flushed, committed_at):
+        # Deltas being written still count until on_flush has seen them
+        self.flushed.append((dict(flushed), self.buffer.pending("post_likes", "p1")))
+
+    def test_flush_writes_one_update_per_counter(self):
+        """Test that deltas are summed per key and written in one statement per counter"""
+        self.buffer.increment("post_likes", "p1", "t1")
+        self.buffer.increment("post_likes", "p1", "t1")
+        self.buffer.increment("post_likes", "p2", "t1")
+        self.buffer.increment("thread_views", "t1", "t1")
+        self.assertEqual(self.buffer.pending("post_likes", "p1"), 2)
+
+        self.assertEqual(self.buffer.flush(), 3)
+
+        self.assertEqual(len(self.writes), 2)
+        likes = next(rows for sql, rows in self.writes if "forum_posts" in sql)
+        self.assertEqual(sorted((key, delta) for key, delta, _ in likes), [("p1", 2), ("p2", 1)])
+        self.conn.commit.assert_called_once()
+        self.manager.return_connection.assert_called_once_with(self.conn)
+        self.assertEqual(self.buffer.pending("post_likes", "p1"), 0)
+
+    def test_pending_until_on_flush(self):
+        """Test that readers keep seeing a delta until on_flush is told about it"""
+        self.buffer.increment("post_likes", "p1", "t1")
+        self.buffer.flush()
+        flushed, pending_during_callback = self.flushed[0]
+        self.assertEqual(flushed[("post_likes", "p1")][0], 1)
+        self.assertEqual(pending_during_callback, 1)
+
+    def test_failed_flush_requeues(self):
+        """Test that a failed flush is rolled back and its deltas merged into new ones"""
+        self.buffer.increment("post_likes", "p1", "t1", delta=2)
+        self.fail_writes = True
+        self.assertEqual(self.buffer.flush(), 0)
+        self.conn.rollback.assert_called_once()
+        self.manager.return_connection.assert_called_once_with(self.conn)
+        self.assertEqual(self.buffer.stats["errors"], 1)
+        self.assertEqual(self.flushed, [])
+
+        self.buffer.increment("post_likes", "p1", "t1")
+        self.assertEqual(self.buffer.pending("post_likes", "p1"), 3)
+        self.fail_writes = False
+        self.buffer.flush()
+        self.assertEqual([(key, delta) for key, delta, _ in self.writes[0][1]], [("p1", 3)])
+
+
+class TestHotThreadCache(unittest.TestCase):
+    """Tests for cached thread pages and flushed counter deltas"""
+
+    def setUp(self):
+        self.cache = HotThreadCache(ttl=60, max_entries=2)
+        self.cache.set("t1", self.page("t1"), loaded_at=10.0)
+
+    def page(self, thread_id):
+        return {
+            "thread_id": thread_id,
+            "view_count": 5,
+            "reply_count": 1,
+            "posts": [{"post_id": "p1", "like_count": 3}]
+        }
+
+    def test_delta_committed_after_load_is_added(self):
+        """Test that a flush committed after the page was read is applied"""
+        self.cache.apply_flushed({
+            ("thread_views", "t1"): [2, None, "t1"],
+            ("post_likes", "p1"): [1, None, "t1"],
+        }, committed_at=20.0)
+        page = self.cache.get("t1")
+        self.assertEqual(page["view_count"], 7)
+        self.assertEqual(page["posts"][0]["like_count"], 4)
+        self.assertEqual(page["reply_count"], 1)
+
+    def test_delta_committed_before_load_is_skipped(self):
+        """Test that a page read after the commit doesn't count the delta twice"""
+        self.cache.apply_flushed({("thread_views", "t1"): [2, None, "t1"]}, committed_at=5.0)
+        self.assertEqual(self.cache.get("t1")["view_count"], 5)
+
+    def test_uncached_thread_is_ignored(self):
+        """Test that deltas for threads not in the cache don't create entries"""
+        self.cache.apply_flushed({("thread_views", "t2"): [2, None, "t2"]}, committed_at=20.0)
+        self.assertIsNone(self.cache.get("t2"))
+
+    def test_lru_bound(self):
+        """Test that the least recently used page is evicted"""
+        self.cache.set("t2", self.page("t2"), loaded_at=10.0)
+        self.cache.get("t1")
+        self.cache.set("t3", self.page("t3"), loaded_at=10.0)
+        self.assertIsNone(self.cache.get("t2"))
+        self.assertIsNotNone(self.cache.get("t1"))
+
+
+class TestKeysetCursors(unittest.TestCase):
+    """Tests for cursor encoding and the next-page query"""
+
+    def test_round_trip(self):
+        """Test that a cursor decodes to the sort key it was built from"""
+        updated_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+        cursor = _encode_cursor(True, updated_at, 42)
+        is_pinned, decoded_at, row_id = _decode_cursor(cursor, 3)
+        self.assertEqual((is_pinned, datetime.fromisoformat(decoded_at), int(row_id)), ("1", updated_at, 42))
+
+    def test_null_sort_key_rejected(self):
+        """Test that a NULL sort key is not written into a cursor"""
+        with self.assertRaises(ValueError):
+            _encode_cursor(None, 42)
+
+    def test_wrong_arity_rejected(self):
+        """Test that a cursor from another listing is refused"""
+        with self.assertRaises(ValueError):
+            _decode_cursor(_encode_cursor(datetime(2024, 5, 1), 7), 3)
+
+    def test_get_threads_continues_after_cursor(self):
+        """Test that the next page is read after the last row's sort key"""
+        store = CollaborationStore()
+        self.addCleanup(store.counters._stop.set)
+        cur = MagicMock()
+        conn = MagicMock()
+        conn.cursor.return_value = cur
+        store._get_connection = lambda: conn
+        store._close_connection = lambda conn: None
+
+        def row(row_id, pinned, updated_at):
+            return (f"t{row_id}", "title", 0, 0, pinned, False, updated_at, updated_at,
+                    "user", "First", "Last", row_id)
+
+        rows = [row(9, True, datetime(2024, 5, 3)), row(8, False, datetime(2024, 5, 2)),
+                row(7, False, datetime(2024, 5, 1))]
+        cur.fetchone.return_value = (3,)
+        cur.fetchall.return_value = rows
+        first = store.get_threads("f1", limit=2)
+        self.assertTrue(first["pagination"]["has_more"])
+        self.assertEqual([t["thread_id"] for t in first["threads"]], ["t9", "t8"])
+
+        cur.fetchall.return_value = rows[2:]
+        second = store.get_threads("f1", limit=2, cursor=first["pagination"]["next_cursor"])
+        query, params = cur.execute.call_args[0]
+        self.assertIn("(ft.is_pinned, ft.updated_at, ft.id) < (%s, %s, %s)", query)
+        self.assertNotIn("OFFSET", query)
+        self.assertEqual(params, ["f1", False, datetime(2024, 5, 2), 8, 3])
+        self.assertFalse(second["pagination"]["has_more"])
+        self.assertIsNone(second["pagination"]["next_cursor"])
+
+
+if __name__ == "__main__":
+    unittest.main()
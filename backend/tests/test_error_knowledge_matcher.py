@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Error Knowledge Matcher
+
+Covers the Aho-Corasick pattern automaton (overlapping, nested and shared
+prefix patterns) and the matcher's language partitioning and ranking.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import random
+import unittest
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from error_knowledge_matcher import ErrorKnowledgeMatcher, PatternAutomaton
+
+
+class TestPatternAutomaton(unittest.TestCase):
+    """Tests for the multi-pattern substring automaton"""
+
+    def test_overlapping_and_nested_patterns(self):
+        """Test that every pattern occurring in the text is reported"""
+        automaton = PatternAutomaton(["he", "she", "his", "hers", "nameerror", "error"])
+        self.assertEqual(automaton.search("ushers"), {"he", "she", "hers"})
+        self.assertEqual(automaton.search("nameerror: x"), {"nameerror", "error"})
+        self.assertEqual(automaton.search("nothing here"), {"he"})
+
+    def test_matches_naive_scan(self):
+        """Test the automaton against a plain substring scan on random input"""
+        rng = random.Random(7)
+        for _ in range(200):
+            patterns = list({"".join(rng.choice("ab:") for _ in range(rng.randint(1, 4)))
+                             for _ in range(rng.randint(1, 8))})
+            text = "".join(rng.choice("ab: ") for _ in range(rng.randint(0, 30)))
+            expected = {pattern for pattern in patterns if pattern in text}
+            self.assertEqual(PatternAutomaton(patterns).search(text), expected, (patterns, text))
+
+
+class TestErrorKnowledgeMatcher(unittest.TestCase):
+    """Tests for matching error messages against knowledge entries"""
+
+    def setUp(self):
+        self.entries = [
+            {"id": 1, "language": "python", "error_pattern": "NameError", "created_at": "2024-01-01"},
+            {"id": 2, "language": "python", "error_pattern": "is not defined", "created_at": "2024-01-02"},
+            {"id": 3, "language": "all", "error_pattern": "Error", "created_at": "2024-01-03"},
+            {"id": 4, "language": "jac", "error_pattern": "walker", "created_at": "2024-01-04"},
+        ]
+        self.loads = 0
+        self.matcher = ErrorKnowledgeMatcher(self.load)
+
+    def load(self):
+        self.loads += 1
+        return self.entries
+
+    def test_ranks_longer_patterns_first(self):
+        """Test that specific patterns outrank shared, shorter ones"""
+        matches = self.matcher.match("python", "NameError: name 'x' is not defined")
+        self.assertEqual([entry["id"] for entry in matches], [2, 1, 3])
+
+    def test_exact_message_ranks_first(self):
+        """Test that a pattern equal to the whole message wins"""
+        matches = self.matcher.match("python", "error")
+        self.assertEqual([entry["id"] for entry in matches], [3])
+        self.assertEqual(self.matcher.match("python", "  NameError ")[0]["id"], 1)
+
+    def test_languages_are_partitioned(self):
+        """Test that other languages' patterns are not matched"""
+        self.assertEqual([entry["id"] for entry in self.matcher.match("jac", "walker Error")], [4, 3])
+        self.assertEqual(self.matcher.match("python", "walker"), [])
+
+    def test_invalidate_rebuilds(self):
+        """Test that new entries are matched after invalidate()"""
+        self.matcher.match("python", "x")
+        self.entries.append({"id": 5, "language": "python", "error_pattern": "IndentationError"})
+        self.matcher.invalidate()
+        self.assertEqual(self.matcher.match("python", "IndentationError")[0]["id"], 5)
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(self.matcher.get_stats()["compiled_indexes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Study Group Chat Delivery
+
+Covers the tail buffers, catching up on notified messages sent by other
+processes, messages delivered while a tail loads, and long-poll wake-ups.
+The hub reads from an in-memory message log instead of PostgreSQL, and
+notifications are handed to it directly instead of over LISTEN.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from group_chat import GroupChatHub, GroupTail
+
+
+def message(cursor, group_id="g1"):
+    return {"cursor": cursor, "group_id": group_id, "content": f"message {cursor}"}
+
+
+class MessageLog:
+    """fetch_messages stand-in over an in-memory list"""
+
+    def __init__(self):
+        self.rows = []
+        self.loads = 0
+        self.on_load = None
+
+    def add(self, cursor, group_id="g1"):
+        row = message(cursor, group_id)
+        self.rows.append(row)
+        return row
+
+    def fetch(self, group_id, limit, before=None, after=None):
+        self.loads += 1
+        if self.on_load is not None:
+            self.on_load()
+        rows = [row for row in self.rows if row["group_id"] == group_id
+                and (before is None or row["cursor"] < before)
+                and (after is None or row["cursor"] > after)]
+        rows.sort(key=lambda row: row["cursor"], reverse=after is None)
+        return rows[:limit]
+
+
+class TestGroupTail(unittest.TestCase):
+    """Tests for the per-group ring buffer"""
+
+    def test_full_buffer_raises_floor(self):
+        """Test that evicting the oldest message raises the floor"""
+        tail = GroupTail([message(1), message(2)], floor=0, size=2)
+        tail.append(message(3))
+        self.assertEqual(tail.floor, 1)
+        self.assertIsNone(tail.after(0, 10))
+        self.assertEqual([m["cursor"] for m in tail.after(1, 10)], [2, 3])
+
+    def test_out_of_order_and_duplicates(self):
+        """Test that relayed messages are inserted in order once"""
+        tail = GroupTail([message(1), message(3)], floor=0, size=5)
+        self.assertTrue(tail.append(message(2)))
+        self.assertFalse(tail.append(message(2)))
+        self.assertEqual([m["cursor"] for m in tail.latest(5)], [3, 2, 1])
+
+
+class TestGroupChatHub(unittest.TestCase):
+    """Tests for reads, delivery and notified catch-up"""
+
+    def setUp(self):
+        self.log = MessageLog()
+        for cursor in range(1, 4):
+            self.log.add(cursor)
+        self.hub = GroupChatHub(backend="memory", tail_size=5, loader=self.log.fetch,
+                                tail_ttl=60, listen=False)
+
+    def _cursors(self, messages):
+        return [m["cursor"] for m in messages]
+
+    def test_reads_served_from_tail(self):
+        """Test that the tail is loaded once and then answers reads"""
+        self.assertEqual(self._cursors(self.hub.latest("g1", 2)), [3, 2])
+        self.assertEqual(self._cursors(self.hub.after("g1", 1, 10)), [2, 3])
+        self.assertEqual(self.log.loads, 1)
+        self.assertEqual(self.hub.stats["memory_reads"], 2)
+
+    def test_published_message_reaches_tail(self):
+        """Test that a message sent through this process is read from memory"""
+        self.hub.latest("g1", 1)
+        self.hub.publish(self.log.add(4))
+        self.assertEqual(self._cursors(self.hub.after("g1", 3, 10)), [4])
+        self.assertEqual(self.log.loads, 1)
+
+    def test_reads_do_not_query_without_notifications(self):
+        """Test that tail reads never touch the database on their own"""
+        self.hub.latest("g1", 1)
+        for _ in range(3):
+            self.hub.after("g1", 3, 10)
+        self.assertEqual(self.log.loads, 1)
+
+    def test_catches_up_on_notified_messages(self):
+        """Test that messages committed elsewhere are read once notified"""
+        self.hub.latest("g1", 1)
+        self.log.add(4)
+        self.log.add(5)
+        self.hub._on_notify("g1", 5)
+        self.assertEqual(self._cursors(self.hub.after("g1", 3, 10)), [4, 5])
+        self.assertEqual(self.hub.stats["caught_up"], 2)
+        self.assertEqual(self.log.loads, 2)
+
+    def test_notification_for_seen_or_unbuffered_group_is_ignored(self):
+        """Test that notifications only read when a buffered tail is behind"""
+        self.hub.latest("g1", 1)
+        self.hub.publish(self.log.add(4))
+        self.hub._on_notify("g1", 4)
+        self.hub._on_notify("g2", 1)
+        self.assertEqual(self.log.loads, 1)
+
+    def test_notification_during_load_is_caught_up(self):
+        """Test that a message committed just after the tail load read is not missed"""
+        def commit_during_load():
+            self.log.on_load = None
+            self.hub._on_notify("g1", self.log.add(4)["cursor"])
+
+        self.log.on_load = commit_during_load
+        original = self.log.fetch
+
+        def stale_fetch(group_id, limit, before=None, after=None):
+            # The tail load read its rows before message 4 committed
+            rows = original(group_id, limit, before, after)
+            return [row for row in rows if row["cursor"] < 4] if after is None else rows
+
+        self.hub._loader = stale_fetch
+        self.assertEqual(self._cursors(self.hub.latest("g1", 10)), [4, 3, 2, 1])
+
+    def test_message_delivered_during_load_is_kept(self):
+        """Test that a message published while the tail loads isn't lost"""
+        late = message(4)
+
+        def publish_during_load():
+            self.log.on_load = None
+            self.hub.publish(late)
+
+        self.log.on_load = publish_during_load
+        self.assertEqual(self._cursors(self.hub.latest("g1", 10)), [4, 3, 2, 1])
+
+    def test_long_poll_wakes_on_publish(self):
+        """Test that a waiting long-poll returns as soon as a message is published"""
+        async def run():
+            waiter = asyncio.ensure_future(self.hub.wait("g1", 3, timeout=5))
+            await asyncio.sleep(0.1)
+            self.hub.publish(self.log.add(4))
+            return await asyncio.wait_for(waiter, 2)
+        self.assertEqual(self._cursors(asyncio.run(run())), [4])
+
+    def test_long_poll_wakes_on_notification(self):
+        """Test that a long-poll returns when another process's message is notified"""
+        async def run():
+            waiter = asyncio.ensure_future(self.hub.wait("g1", 3, timeout=5))
+            await asyncio.sleep(0.1)
+            await asyncio.to_thread(self.hub._on_notify, "g1", self.log.add(4)["cursor"])
+            return await asyncio.wait_for(waiter, 2)
+        self.assertEqual(self._cursors(asyncio.run(run())), [4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Notification Counters
+
+Covers the in-memory and Redis counter backends: deltas only apply to
+cached counters, counters never go negative, and entries expire.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notification_counters import (
+    InMemoryCounterBackend,
+    RedisCounterBackend,
+    NotificationCounters,
+    UNREAD,
+    TOTAL
+)
+
+try:
+    import fakeredis
+    FAKEREDIS_AVAILABLE = True
+except ImportError:
+    fakeredis = None
+    FAKEREDIS_AVAILABLE = False
+
+
+class CounterBehaviour:
+    """Checks shared by both backends; subclasses provide make_backend"""
+
+    def setUp(self):
+        self.counters = NotificationCounters(self.make_backend())
+
+    def test_miss_until_loaded(self):
+        """Test that an unloaded counter reads as a miss"""
+        self.assertIsNone(self.counters.get(1))
+        self.counters.set(1, UNREAD, 3)
+        self.assertEqual(self.counters.get(1), 3)
+        self.assertEqual((self.counters.get_stats()["hits"], self.counters.get_stats()["misses"]), (1, 1))
+
+    def test_adjust_only_cached_counters(self):
+        """Test that a delta doesn't start an uncached counter from zero"""
+        self.counters.set(1, UNREAD, 3)
+        self.counters.set(1, TOTAL, 10)
+        self.counters.adjust([1, 2], 1)
+        self.assertEqual(self.counters.get(1, UNREAD), 4)
+        self.assertEqual(self.counters.get(1, TOTAL), 11)
+        self.assertIsNone(self.counters.get(2, UNREAD))
+
+    def test_negative_counter_is_dropped(self):
+        """Test that a counter driven below zero is reloaded rather than kept"""
+        self.counters.set(1, UNREAD, 1)
+        self.counters.adjust([1], -2, kinds=(UNREAD,))
+        self.assertIsNone(self.counters.get(1, UNREAD))
+
+    def test_invalidate(self):
+        """Test that invalidation drops both counters of a user"""
+        self.counters.set(1, UNREAD, 1)
+        self.counters.set(1, TOTAL, 1)
+        self.counters.invalidate(1)
+        self.assertIsNone(self.counters.get(1, UNREAD))
+        self.assertIsNone(self.counters.get(1, TOTAL))
+
+
+class TestInMemoryCounters(CounterBehaviour, unittest.TestCase):
+    """Tests for the process-local backend"""
+
+    def make_backend(self):
+        return InMemoryCounterBackend(ttl=60, max_users=3)
+
+    def test_entries_expire(self):
+        """Test that counters expire after the TTL"""
+        self.counters.set(1, UNREAD, 1)
+        with patch("notification_counters.time.time", return_value=10 ** 12):
+            self.assertIsNone(self.counters.get(1, UNREAD))
+
+    def test_bounded_entries(self):
+        """Test that the backend never holds more than max_users entries"""
+        for user_id in range(5):
+            self.counters.set(user_id, UNREAD, user_id)
+        self.assertEqual(self.counters.backend.count(), 3)
+        self.assertEqual(self.counters.get(4), 4)
+
+
+@unittest.skipUnless(FAKEREDIS_AVAILABLE, "fakeredis not installed")
+class TestRedisCounters(CounterBehaviour, unittest.TestCase):
+    """Tests for the shared Redis backend and its increment script"""
+
+    def make_backend(self):
+        return RedisCounterBackend(client=fakeredis.FakeRedis(decode_responses=True), ttl=60)
+
+    def test_counters_have_ttl(self):
+        """Test that counters are written with an expiry"""
+        self.counters.set(1, UNREAD, 1)
+        backend = self.counters.backend
+        self.assertGreater(backend.client.ttl(backend._key("1:unread")), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Password Hashing Service
+
+Covers hashing and verification in the process pool and in-process, and
+the bounded pending-operation queue.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from password_hashing import PasswordHashingService, PasswordHashingBusy
+
+# Lowest bcrypt cost, so the tests stay fast
+ROUNDS = 4
+
+
+class TestPasswordHashing(unittest.TestCase):
+    """Tests for hashing and verification"""
+
+    def setUp(self):
+        self.service = PasswordHashingService(workers=1, max_pending=2, queue_wait=0.1)
+        # Hash in-process unless a test starts the pool
+        self.service._executor_failed = True
+
+    def test_hash_and_verify(self):
+        """Test that a hash verifies only its own password"""
+        password_hash = self.service.hash_password("s3cret", rounds=ROUNDS)
+        self.assertTrue(self.service.verify_password("s3cret", password_hash))
+        self.assertFalse(self.service.verify_password("other", password_hash))
+        self.assertEqual(self.service.get_stats()["inline"], 3)
+
+    def test_malformed_hash_does_not_verify(self):
+        """Test that a corrupt stored hash is rejected rather than raising"""
+        self.assertFalse(self.service.verify_password("s3cret", "not-a-bcrypt-hash"))
+
+    def test_async_entry_points(self):
+        """Test hashing and verification from an event loop"""
+        async def run():
+            password_hash = await self.service.hash_password_async("s3cret", rounds=ROUNDS)
+            return await self.service.verify_password_async("s3cret", password_hash)
+        self.assertTrue(asyncio.run(run()))
+
+    def test_process_pool(self):
+        """Test that operations run in the spawned worker pool"""
+        self.service._executor_failed = False
+        self.addCleanup(self.service.shutdown)
+        password_hash = self.service.hash_password("s3cret", rounds=ROUNDS)
+        self.assertTrue(self.service.verify_password("s3cret", password_hash))
+        stats = self.service.get_stats()
+        self.assertEqual(stats["inline"], 0)
+        self.assertEqual((stats["submitted"], stats["completed"], stats["pending"]), (2, 2, 0))
+
+
+class TestPendingLimit(unittest.TestCase):
+    """Tests for the bounded queue of pending operations"""
+
+    def setUp(self):
+        self.service = PasswordHashingService(workers=1, max_pending=1, queue_wait=0.1)
+        self.service._executor_failed = True
+
+    def test_rejects_after_queue_wait(self):
+        """Test that a caller is rejected only after waiting for a slot"""
+        self.service._slots.acquire()
+        started = time.monotonic()
+        with self.assertRaises(PasswordHashingBusy):
+            self.service.hash_password("s3cret", rounds=ROUNDS)
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        stats = self.service.get_stats()
+        self.assertEqual((stats["waited"], stats["rejected"]), (1, 1))
+
+    def test_waiting_caller_gets_freed_slot(self):
+        """Test that a burst is smoothed out when a slot frees up within the wait"""
+        self.service.queue_wait = 5
+        self.service._slots.acquire()
+        threading.Timer(0.05, self.service._slots.release).start()
+        password_hash = self.service.hash_password("s3cret", rounds=ROUNDS)
+        self.assertTrue(password_hash.startswith("$2"))
+        stats = self.service.get_stats()
+        self.assertEqual((stats["waited"], stats["rejected"]), (1, 0))
+
+    def test_slot_released_after_error(self):
+        """Test that a failing operation gives its slot back"""
+        with self.assertRaises(Exception):
+            self.service.hash_password(None, rounds=ROUNDS)
+        self.assertTrue(self.service.verify_password("s3cret", self.service.hash_password("s3cret", rounds=ROUNDS)))
+        self.assertEqual(self.service.get_stats()["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
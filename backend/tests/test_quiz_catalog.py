@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Quiz Catalog Index
+
+Covers filtered and paginated lookups, reindexing and the per-posting
+totals used by the admin quiz grid, and the running attempt aggregates
+behind quiz analytics.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import unittest
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_catalog import CatalogIndex, field, multi_field
+from quiz_admin import QuizManager
+
+
+def make_catalog(count=10):
+    catalog = CatalogIndex({
+        "status": field("status"),
+        "difficulty": field("difficulty"),
+        "topic": multi_field("tags"),
+    }, sort_key=lambda quiz: quiz["created_at"], sums={"points": lambda quiz: quiz["points"]})
+    for index in range(count):
+        catalog.add(f"q{index}", {
+            "status": "published" if index % 2 else "draft",
+            "difficulty": ["beginner", "intermediate", "advanced"][index % 3],
+            "tags": ["jac"] + (["graphs"] if index % 4 == 0 else []),
+            "created_at": index,
+            "points": index,
+            "title": f"Quiz {index}",
+        })
+    return catalog
+
+
+class TestCatalogSearch(unittest.TestCase):
+    """Tests for CatalogIndex.search"""
+
+    def setUp(self):
+        self.catalog = make_catalog()
+
+    def _titles(self, items):
+        return [item["title"] for item in items]
+
+    def test_unfiltered_page_newest_first(self):
+        """Test that a page is sliced from the full ordering, with the match count"""
+        page, total = self.catalog.search(offset=2, limit=3)
+        self.assertEqual(self._titles(page), ["Quiz 7", "Quiz 6", "Quiz 5"])
+        self.assertEqual(total, 10)
+
+    def test_single_filter(self):
+        """Test a lookup on one posting, oldest first"""
+        page, total = self.catalog.search({"status": "published"}, limit=2, newest_first=False)
+        self.assertEqual(self._titles(page), ["Quiz 1", "Quiz 3"])
+        self.assertEqual(total, 5)
+
+    def test_intersected_filters(self):
+        """Test that several filters intersect, and a list value matches any option"""
+        page, total = self.catalog.search({"status": "draft", "difficulty": ["beginner", "advanced"]})
+        self.assertEqual(self._titles(page), ["Quiz 8", "Quiz 6", "Quiz 2", "Quiz 0"])
+        self.assertEqual(total, 4)
+
+    def test_predicate_counts_every_match(self):
+        """Test that a predicate filters candidates while only the page is returned"""
+        page, total = self.catalog.search({"topic": "jac"}, predicate=lambda q: q["points"] > 2, limit=2)
+        self.assertEqual(self._titles(page), ["Quiz 9", "Quiz 8"])
+        self.assertEqual(total, 7)
+
+    def test_unknown_value_matches_nothing(self):
+        """Test that a filter value with no posting returns no matches"""
+        self.assertEqual(self.catalog.search({"status": "archived"}), ([], 0))
+
+    def test_reindex_after_change(self):
+        """Test that adding an item again moves it between postings"""
+        quiz = dict(self.catalog.get("q0"), status="published")
+        self.catalog.add("q0", quiz)
+        self.assertEqual(self.catalog.search({"status": "published"})[1], 6)
+        self.assertEqual(self.catalog.search({"status": "draft"})[1], 4)
+        self.catalog.remove("q0")
+        self.assertNotIn("q0", self.catalog)
+        self.assertEqual(self.catalog.search({"topic": "graphs"})[1], 2)
+
+
+class TestCatalogSummary(unittest.TestCase):
+    """Tests for CatalogIndex.summarize"""
+
+    def setUp(self):
+        self.catalog = make_catalog()
+
+    def test_unfiltered_summary(self):
+        """Test totals over the whole catalog"""
+        summary = self.catalog.summarize(count_fields=["status"])
+        self.assertEqual(summary["total"], 10)
+        self.assertEqual(summary["counts"]["status"], {"draft": 5, "published": 5})
+        self.assertEqual(summary["sums"]["points"], 45)
+
+    def test_summary_matches_search(self):
+        """Test that filtered and predicate summaries agree with search"""
+        filters = {"status": "draft", "difficulty": ["beginner", "intermediate"]}
+        predicate = lambda quiz: quiz["points"] >= 2
+        summary = self.catalog.summarize(filters, predicate, count_fields=["difficulty"])
+        page, total = self.catalog.search(filters, predicate)
+        self.assertEqual(summary["total"], total)
+        self.assertEqual(summary["sums"]["points"], sum(quiz["points"] for quiz in page))
+        self.assertEqual(summary["counts"]["difficulty"], {"beginner": 1, "intermediate": 1})
+
+    def test_sums_follow_removal(self):
+        """Test that posting sums are updated when items are removed"""
+        self.catalog.remove("q9")
+        self.assertEqual(self.catalog.summarize({"status": "published"})["sums"]["points"], 16)
+
+
+class TestRecordAttempt(unittest.TestCase):
+    """Tests for QuizManager.record_attempt and the analytics it feeds"""
+
+    QUIZ_ID = "quiz_jac_fundamentals_001"
+
+    def setUp(self):
+        self.manager = QuizManager()
+
+    def _attempt(self, score, passed, time_taken, attempt_id=None):
+        attempt = {"quiz_id": self.QUIZ_ID, "score": score, "passed": passed, "time_taken": time_taken}
+        if attempt_id:
+            attempt["attempt_id"] = attempt_id
+        return attempt
+
+    def _recalculated(self):
+        """Analytics computed from scratch over every stored attempt"""
+        attempts = [a for a in self.manager.quiz_attempts.values() if a["quiz_id"] == self.QUIZ_ID]
+        passed = [a for a in attempts if a["passed"]]
+        return {
+            "total_attempts": len(attempts),
+            "total_completions": len(passed),
+            "average_score": round(sum(a["score"] for a in passed) / len(passed), 1),
+            "average_time": int(sum(a["time_taken"] for a in attempts) / len(attempts)),
+        }
+
+    def _analytics(self):
+        analytics = self.manager.calculate_quiz_analytics(self.QUIZ_ID)
+        return {key: analytics[key] for key in ("total_attempts", "total_completions", "average_score", "average_time")}
+
+    def test_new_attempts_reach_analytics(self):
+        """Test that recorded attempts are stored and counted"""
+        result = self.manager.record_attempt(self._attempt(40.0, False, 100))
+        self.manager.record_attempt(self._attempt(80.0, True, 200))
+        self.assertIn(result["attempt_id"], self.manager.quiz_attempts)
+        self.assertEqual(self._analytics(), self._recalculated())
+        self.assertEqual(self._analytics()["total_attempts"], 3)
+
+    def test_regraded_attempt_replaces_old_grade(self):
+        """Test that recording an attempt id again doesn't count it twice"""
+        self.manager.record_attempt(self._attempt(40.0, False, 100, attempt_id="retake"))
+        self.manager.record_attempt(self._attempt(90.0, True, 120, attempt_id="retake"))
+        self.assertEqual(self._analytics(), self._recalculated())
+        self.assertEqual(self._analytics()["total_completions"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the Reputation Leaderboard
+
+Covers both board backends and the race between a rebuild and concurrent
+reputation events: an event the rebuild snapshot already counted is not
+counted again, and one committed after the snapshot is not lost.
+
+Author: Cavin Otieno
+"""
+
+import os
+import sys
+import unittest
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reputation_leaderboard import (
+    InMemoryLeaderboardBackend,
+    RedisLeaderboardBackend,
+    ReputationLeaderboard,
+    snapshot_includes,
+    GLOBAL
+)
+
+try:
+    import fakeredis
+    FAKEREDIS_AVAILABLE = True
+except ImportError:
+    fakeredis = None
+    FAKEREDIS_AVAILABLE = False
+
+# Transactions 100 and 102 were still running when the rebuild read the
+# database; everything below 100 and transaction 101 had committed
+SNAPSHOT = "100:103:100,102"
+COMMITTED_BEFORE = 99
+COMMITTED_AFTER = 102
+
+
+class TestSnapshotIncludes(unittest.TestCase):
+    """Tests for snapshot visibility of writing transactions"""
+
+    def test_visibility(self):
+        """Test committed, running and later transactions against a snapshot"""
+        self.assertTrue(snapshot_includes(SNAPSHOT, 99))
+        self.assertTrue(snapshot_includes(SNAPSHOT, 101))
+        self.assertFalse(snapshot_includes(SNAPSHOT, 100))
+        self.assertFalse(snapshot_includes(SNAPSHOT, 102))
+        self.assertFalse(snapshot_includes(SNAPSHOT, 103))
+
+    def test_unknown_is_counted(self):
+        """Test that a missing snapshot or xid never skips an event"""
+        self.assertFalse(snapshot_includes(None, 99))
+        self.assertFalse(snapshot_includes(SNAPSHOT, None))
+
+
+class LeaderboardBehaviour:
+    """Checks shared by both backends; subclasses provide make_backend"""
+
+    def setUp(self):
+        self.scores = {1: 100.0, 2: 50.0}
+        self.during_rebuild = []
+        self.loads = 0
+        self.board = ReputationLeaderboard(
+            self.make_backend(), board_loader=self.load, members_loader=lambda group_id: [1, 2]
+        )
+
+    def load(self, board):
+        """Stand-in loader; events in during_rebuild arrive mid-rebuild"""
+        self.loads += 1
+        snapshot = dict(self.scores)
+        for events in self.during_rebuild:
+            self.board.record(events)
+        return snapshot, SNAPSHOT
+
+    def points(self, user_id):
+        return self.board.rank(user_id)["points"]
+
+    def test_rebuild_on_first_read(self):
+        """Test that the first read loads the board and later reads don't"""
+        page = self.board.top(limit=10)
+        self.assertEqual([e["user_id"] for e in page["entries"]], [1, 2])
+        self.board.top(limit=10)
+        self.assertEqual(self.loads, 1)
+
+    def test_increment_loaded_board(self):
+        """Test that an event committed after the rebuild moves the ranking"""
+        self.board.top()
+        self.board.record([(2, 60, COMMITTED_AFTER)])
+        self.assertEqual(self.board.rank(2)["rank"], 1)
+        self.assertEqual(self.points(2), 110)
+
+    def test_event_in_snapshot_not_counted_twice(self):
+        """Test that a late record() of an event the rebuild read is skipped"""
+        self.board.top()
+        self.board.record([(1, 10, COMMITTED_BEFORE)])
+        self.assertEqual(self.points(1), 100)
+
+    def test_event_during_rebuild_not_lost(self):
+        """Test that an event committed after the snapshot but recorded mid-rebuild is applied"""
+        self.during_rebuild.append([(2, 5, COMMITTED_AFTER)])
+        self.board.top()
+        self.assertEqual(self.points(2), 55)
+
+    def test_event_during_rebuild_already_read(self):
+        """Test that a buffered event the snapshot already counted is dropped"""
+        self.during_rebuild.append([(2, 5, COMMITTED_BEFORE)])
+        self.board.top()
+        self.assertEqual(self.points(2), 50)
+
+    def test_event_without_xid_counted(self):
+        """Test that events from callers without a transaction id still count"""
+        self.board.top()
+        self.board.record([(1, 10)])
+        self.assertEqual(self.points(1), 110)
+
+    def test_unloaded_board_ignores_events(self):
+        """Test that events before any rebuild are left to the rebuild"""
+        self.board.record([(1, 10, COMMITTED_BEFORE)])
+        self.assertEqual(self.points(1), 100)
+
+    def test_failed_rebuild_can_retry(self):
+        """Test that a loader error releases the rebuild"""
+        def failing(board):
+            raise RuntimeError("database unavailable")
+        self.board._board_loader = failing
+        with self.assertRaises(RuntimeError):
+            self.board.top()
+        self.assertFalse(self.board.backend.is_rebuilding(GLOBAL))
+        self.board._board_loader = self.load
+        self.assertEqual(self.board.top()["total"], 2)
+
+    def test_group_ranking(self):
+        """Test that group boards rank members by their global points"""
+        self.board.top()
+        self.board.record([(2, 60, COMMITTED_AFTER)])
+        page = self.board.top(board="group", group_id="g1")
+        self.assertEqual([e["user_id"] for e in page["entries"]], [2, 1])
+
+
+class TestInMemoryLeaderboard(LeaderboardBehaviour, unittest.TestCase):
+    """Tests for the process-local backend"""
+
+    def make_backend(self):
+        return InMemoryLeaderboardBackend()
+
+
+@unittest.skipUnless(FAKEREDIS_AVAILABLE, "fakeredis not installed")
+class TestRedisLeaderboard(LeaderboardBehaviour, unittest.TestCase):
+    """Tests for the shared Redis backend and its scripts"""
+
+    def make_backend(self):
+        client = fakeredis.FakeRedis(decode_responses=True)
+        client.flushall()
+        return RedisLeaderboardBackend(client=client)
+
+    def test_rebuild_claimed_by_another_worker(self):
+        """Test that events reach the buffer while another worker rebuilds"""
+        backend = self.board.backend
+        self.assertTrue(backend.begin_rebuild(GLOBAL))
+        self.assertFalse(backend.begin_rebuild(GLOBAL))
+        backend.incr(GLOBAL, 2, 5, COMMITTED_AFTER)
+        backend.replace(GLOBAL, self.scores, None, SNAPSHOT)
+        self.assertEqual(backend.scores(GLOBAL, [2]), [55.0])
+        self.assertFalse(backend.is_rebuilding(GLOBAL))
+
+
+if __name__ == "__main__":
+    unittest.main()
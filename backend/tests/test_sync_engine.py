@@ -9,6 +9,7 @@ synchronization system, covering:
 - Consumer processing
 - Reconciliation jobs
 - Conflict detection and resolution
+- HLC versions, the applied-version cache and retry scheduling
 
 Author: Jeseci Development Team
 """
@@ -47,6 +48,12 @@ from backend.sync_engine.models import (
     SyncStatus,
     SyncConflict
 )
+from backend.sync_engine.coalescing import coalesce_events
+from backend.sync_engine import hlc
+from backend.sync_engine.hlc import HybridLogicalClock, LOGICAL_SCALE, to_version
+from backend.sync_engine.version_cache import AppliedVersionCache
+from backend.sync_engine.retry_scheduler import RetryScheduler
+from backend.sync_engine.stand_ins import FAKEREDIS_AVAILABLE, SQLiteSyncManager, StandInEnvironment
 from backend.sync_engine.conflict_resolution import (
     ConflictType,
     ResolutionStrategy,
@@ -226,10 +233,12 @@ class TestSyncEvent(unittest.TestCase):
             entity_type="concept"
         )
         
+        created_at = event.created_at
         event.mark_failed("Permanent error")
         
-        self.assertEqual(event.status, SyncEventStatus.FAILED)
+        # Status lives on the SyncEventLog row; the event carries the error
         self.assertEqual(event.error_message, "Permanent error")
+        self.assertGreaterEqual(event.updated_at, created_at)
     
     def test_get_redis_fields(self):
         """Test Redis fields generation"""
@@ -738,6 +747,320 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(batch.size(), 0)
 
 
+class TestEventCoalescing(unittest.TestCase):
+    """Tests for per-batch event coalescing"""
+
+    def _entries(self, *specs):
+        """Stream entries from (event_type, entity_id, source_version) specs"""
+        entries = []
+        for position, (event_type, entity_id, version) in enumerate(specs, start=1):
+            entity_type = "relationship" if EventType.is_relationship_event(event_type) else "concept"
+            event = SyncEvent(event_type=event_type, entity_id=entity_id,
+                              entity_type=entity_type, source_version=version)
+            entries.append((f"{position}-0", {"event_type": event_type.value}, event))
+        return entries
+
+    def _kept(self, batch):
+        return [stream_id for stream_id, _ in batch.keep]
+
+    def test_updates_collapse_into_newest(self):
+        """Test that several upserts leave only the newest"""
+        batch = coalesce_events(self._entries(
+            (EventType.CONCEPT_CREATED, "c1", 1),
+            (EventType.CONCEPT_UPDATED, "c1", 2),
+            (EventType.CONCEPT_UPDATED, "c1", 3),
+        ), lambda *_: False)
+        self.assertEqual(self._kept(batch), ["3-0"])
+        self.assertEqual(len(batch.dropped), 2)
+
+    def test_relationship_runs_after_collapsed_upsert(self):
+        """Test that the surviving upsert moves ahead of relationships that need the node"""
+        batch = coalesce_events(self._entries(
+            (EventType.CONCEPT_CREATED, "c1", 1),
+            (EventType.RELATIONSHIP_CREATED, "c1->c2", 2),
+            (EventType.CONCEPT_UPDATED, "c1", 3),
+        ), lambda *_: False)
+        self.assertEqual(self._kept(batch), ["3-0", "2-0"])
+        self.assertEqual([stream_id for stream_id, _, _ in batch.dropped], ["1-0"])
+
+    def test_create_and_delete_cancel(self):
+        """Test that a create and delete of a never-applied entity both drop"""
+        entries = self._entries(
+            (EventType.CONCEPT_CREATED, "c1", 1),
+            (EventType.CONCEPT_UPDATED, "c1", 2),
+            (EventType.CONCEPT_DELETED, "c1", 3),
+        )
+        batch = coalesce_events(entries, lambda *_: False)
+        self.assertEqual(self._kept(batch), [])
+        self.assertEqual(len(batch.dropped), 3)
+
+        # Once in the graph, the delete still has to run
+        batch = coalesce_events(entries, lambda *_: True)
+        self.assertEqual(self._kept(batch), ["3-0"])
+
+    def test_upsert_after_delete_runs_after_delete(self):
+        """Test that a re-create after a delete is kept, after the delete"""
+        batch = coalesce_events(self._entries(
+            (EventType.CONCEPT_UPDATED, "c1", 1),
+            (EventType.CONCEPT_DELETED, "c1", 2),
+            (EventType.CONCEPT_CREATED, "c1", 3),
+            (EventType.RELATIONSHIP_CREATED, "c1->c2", 4),
+            (EventType.CONCEPT_UPDATED, "c1", 5),
+        ), lambda *_: True)
+        self.assertEqual(self._kept(batch), ["2-0", "5-0", "4-0"])
+
+    def test_retried_upsert_stays_after_delete(self):
+        """Test ordering when the newer upsert sits before the delete in the stream"""
+        batch = coalesce_events(self._entries(
+            (EventType.CONCEPT_UPDATED, "c1", 3),
+            (EventType.CONCEPT_DELETED, "c1", 2),
+        ), lambda *_: True)
+        self.assertEqual(self._kept(batch), ["2-0", "1-0"])
+
+    def test_unparsed_entries_are_kept(self):
+        """Test that entries without an event pass through in place"""
+        entries = self._entries((EventType.CONCEPT_UPDATED, "c1", 1))
+        entries.insert(0, ("0-0", {}, None))
+        batch = coalesce_events(entries, lambda *_: False)
+        self.assertEqual(self._kept(batch), ["0-0", "1-0"])
+
+
+class TestHybridLogicalClock(unittest.TestCase):
+    """Tests for HLC version issuing and normalization"""
+
+    def test_versions_increase_when_clock_stalls(self):
+        """Test that a stalled wall clock advances the logical counter"""
+        clock = HybridLogicalClock()
+        with patch.object(HybridLogicalClock, "_physical_version", return_value=5 * LOGICAL_SCALE):
+            versions = [clock.now() for _ in range(3)]
+        self.assertEqual(versions, [5 * LOGICAL_SCALE, 5 * LOGICAL_SCALE + 1, 5 * LOGICAL_SCALE + 2])
+
+    def test_observe_moves_clock_past_version(self):
+        """Test that a version issued after observing one is newer"""
+        clock = HybridLogicalClock()
+        future = clock.now() + 10 ** 12
+        clock.observe(future)
+        self.assertGreater(clock.now(), future)
+
+    def test_legacy_seconds_are_normalized(self):
+        """Test that whole-second versions compare on the HLC scale"""
+        self.assertEqual(to_version(1700000000), 1700000000 * 1_000_000 * LOGICAL_SCALE)
+        version = hlc.next_version()
+        self.assertEqual(to_version(version), version)
+        self.assertEqual(to_version(str(version)), version)
+        self.assertEqual(to_version(None), 0)
+
+    def test_aware_datetime(self):
+        """Test that aware datetimes map to their UTC instant"""
+        moment = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+        self.assertEqual(to_version(moment), int(moment.timestamp()) * 1_000_000 * LOGICAL_SCALE)
+        self.assertEqual(to_version(moment.isoformat()), to_version(moment))
+
+    def test_naive_datetime_uses_database_timezone(self):
+        """Test that naive timestamps are read in SYNC_DB_TIMEZONE, else local time"""
+        naive = datetime(2024, 1, 1, 12)
+        with patch.object(hlc, "_NAIVE_TZ", None):
+            self.assertEqual(hlc.from_datetime(naive), int(naive.timestamp()) * 1_000_000 * LOGICAL_SCALE)
+        with patch.object(hlc, "_NAIVE_TZ", timezone.utc):
+            self.assertEqual(hlc.from_datetime(naive),
+                             hlc.from_datetime(naive.replace(tzinfo=timezone.utc)))
+
+
+class TestAppliedVersionCache(unittest.TestCase):
+    """Tests for the consumer's applied-version cache"""
+
+    def test_record_keeps_highest_version(self):
+        """Test that recording an older version doesn't lower the cached one"""
+        cache = AppliedVersionCache(max_entries=10)
+        cache.record("concept", "c1", 2000000000)
+        cache.record("concept", "c1", 1000000000)
+        self.assertEqual(cache.get("concept", "c1"), to_version(2000000000))
+        self.assertIsNone(cache.get("concept", "c2"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_eviction_marks_cache_incomplete(self):
+        """Test that evicting an entry means misses are no longer authoritative"""
+        cache = AppliedVersionCache(max_entries=2)
+        cache._complete = True
+        for entity_id in ("c1", "c2", "c3"):
+            cache.record("concept", entity_id, 1)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("concept", "c1"))
+        self.assertFalse(cache.is_complete)
+
+    def _status_db(self, count):
+        manager = SQLiteSyncManager()
+        self.addCleanup(manager.close)
+        with manager.get_session() as session:
+            for index in range(count):
+                status = SyncStatus(entity_id=f"c{index}", entity_type="concept")
+                status.update_after_sync(hlc.next_version())
+                session.add(status)
+        return manager
+
+    def test_warm_loads_sync_status(self):
+        """Test that a warm load covering sync_status makes the cache complete"""
+        manager = self._status_db(3)
+        cache = AppliedVersionCache(max_entries=10)
+        self.assertEqual(cache.warm(manager, manager.schema), 3)
+        self.assertTrue(cache.is_complete)
+        self.assertIsNotNone(cache.get("concept", "c2"))
+
+    def test_truncated_warm_is_incomplete(self):
+        """Test that a sync_status larger than the cache leaves it incomplete"""
+        manager = self._status_db(3)
+        cache = AppliedVersionCache(max_entries=2)
+        self.assertEqual(cache.warm(manager, manager.schema), 2)
+        self.assertFalse(cache.is_complete)
+
+    def test_failed_warm_is_incomplete(self):
+        """Test that a query error is raised rather than read as an empty table"""
+        manager = MagicMock()
+        manager.execute_query.side_effect = RuntimeError("connection lost")
+        cache = AppliedVersionCache(max_entries=10)
+        with self.assertRaises(RuntimeError):
+            cache.warm(manager, "jeseci_academy")
+        self.assertFalse(cache.is_complete)
+
+
+@unittest.skipUnless(FAKEREDIS_AVAILABLE, "fakeredis not installed")
+class TestRetryScheduler(unittest.TestCase):
+    """Tests for delayed retries and their promotion back onto the stream"""
+
+    def setUp(self):
+        import fakeredis
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.scheduler = RetryScheduler(self.redis, "test:stream")
+        self.scheduler.sync_config.retry_delay_seconds = 5
+        self.scheduler.sync_config.retry_backoff_multiplier = 2.0
+        self.scheduler.sync_config.retry_max_delay_seconds = 300
+
+    def _schedule(self, entity_id="c1"):
+        event = create_concept_event({"concept_id": entity_id, "name": entity_id})
+        event.retry_count = 1
+        return event, self.scheduler.schedule(event)
+
+    def test_delay_grows_and_is_capped(self):
+        """Test exponential backoff with jitter, capped at the maximum delay"""
+        self.assertGreaterEqual(self.scheduler.delay_for(3), 20)
+        self.assertLessEqual(self.scheduler.delay_for(3), 22)
+        self.assertLessEqual(self.scheduler.delay_for(20), 330)
+
+    def test_events_wait_until_due(self):
+        """Test that nothing is promoted before its due time"""
+        event, due = self._schedule()
+        self.assertGreater(self.scheduler.promote_due(), 0)
+        self.assertEqual(self.redis.xlen("test:stream"), 0)
+        self.assertEqual(self.scheduler.scheduled_ids([event.event_id]), {event.event_id})
+
+    def test_promotion_moves_event_atomically(self):
+        """Test that a due event is removed from the schedule and appended to the stream once"""
+        event, due = self._schedule()
+        with patch("backend.sync_engine.retry_scheduler.time.time", return_value=due + 1):
+            self.assertIsNone(self.scheduler.promote_due())
+            self.assertIsNone(self.scheduler.promote_due())
+
+        entries = self.redis.xrange("test:stream")
+        self.assertEqual(len(entries), 1)
+        fields = entries[0][1]
+        self.assertEqual(fields["event_id"], event.event_id)
+        self.assertEqual(fields["event_type"], EventType.CONCEPT_CREATED.value)
+        self.assertEqual(SyncEvent.from_json(fields["data"]).retry_count, 1)
+        self.assertEqual(self.redis.zcard(self.scheduler.schedule_key), 0)
+        self.assertEqual(self.redis.hlen(self.scheduler.payload_key), 0)
+        self.assertEqual(self.scheduler.promoted, 1)
+
+    def test_entry_without_payload_is_dropped(self):
+        """Test that a schedule entry whose payload is gone is not requeued"""
+        event, due = self._schedule()
+        self.redis.hdel(self.scheduler.payload_key, event.event_id)
+        with patch("backend.sync_engine.retry_scheduler.time.time", return_value=due + 1):
+            self.scheduler.promote_due()
+        self.assertEqual(self.redis.xlen("test:stream"), 0)
+        self.assertEqual(self.redis.zcard(self.scheduler.schedule_key), 0)
+
+    def test_full_page_asks_to_promote_again(self):
+        """Test that a full page of due events reports more may be waiting"""
+        due = max(self._schedule(f"c{index}")[1] for index in range(3))
+        with patch("backend.sync_engine.retry_scheduler.time.time", return_value=due + 1):
+            self.assertEqual(self.scheduler.promote_due(limit=2), 0.0)
+            self.assertIsNone(self.scheduler.promote_due(limit=2))
+        self.assertEqual(self.redis.xlen("test:stream"), 3)
+
+
+@unittest.skipUnless(FAKEREDIS_AVAILABLE, "fakeredis not installed")
+class TestStaleSyncStatus(unittest.TestCase):
+    """Tests that sync_status versions never go backwards"""
+
+    def setUp(self):
+        from backend.sync_engine.consumer import SyncEventConsumer
+        self.env = StandInEnvironment()
+        self.env.install()
+        self.addCleanup(self.env.close)
+        self.consumer = SyncEventConsumer(consumer_name="test-consumer")
+
+    def _stored_version(self):
+        with self.env.postgres.get_session() as session:
+            return session.query(SyncStatus).filter(SyncStatus.entity_id == "c1").one().last_synced_version
+
+    def test_stale_event_does_not_lower_status(self):
+        """Test that an older event applied after a newer one leaves the status alone"""
+        older, newer = hlc.next_version(), hlc.next_version()
+        self.consumer._update_sync_status("c1", "concept", newer)
+        self.consumer._update_sync_status("c1", "concept", older)
+        self.assertEqual(self._stored_version(), newer)
+        self.assertEqual(self.consumer.version_cache.get("concept", "c1"), newer)
+
+    def test_newer_event_raises_status(self):
+        """Test that a newer event updates the status and the cache"""
+        older, newer = hlc.next_version(), hlc.next_version()
+        self.consumer._update_sync_status("c1", "concept", older)
+        self.consumer._update_sync_status("c1", "concept", newer)
+        self.assertEqual(self._stored_version(), newer)
+        self.assertTrue(self.consumer._should_skip_event(
+            SyncEvent(event_type=EventType.CONCEPT_UPDATED, entity_id="c1",
+                      entity_type="concept", source_version=older)
+        ))
+
+
+@unittest.skipUnless(FAKEREDIS_AVAILABLE, "fakeredis not installed")
+class TestRetryPendingEvents(unittest.TestCase):
+    """Tests for republishing stuck outbox rows through the relay"""
+
+    def setUp(self):
+        from backend.sync_engine.publisher import SyncEventPublisher
+        self.env = StandInEnvironment()
+        self.env.install()
+        self.addCleanup(self.env.close)
+        self.publisher = SyncEventPublisher()
+        self.stream = self.publisher.redis_config.stream_name
+
+    def _rows(self):
+        with self.env.postgres.get_session() as session:
+            return {row.event_id: (row.status, row.retry_count) for row in session.query(SyncEventLog)}
+
+    def test_scheduled_retries_are_left_alone(self):
+        """Test that stuck rows are republished but rows waiting for a retry are not"""
+        stuck, pending, scheduled = (create_concept_event({"concept_id": f"c{index}", "name": f"c{index}"})
+                                     for index in range(3))
+        self.publisher.enqueue_events([stuck, pending, scheduled])
+        with self.env.postgres.get_session() as session:
+            for row in session.query(SyncEventLog).filter(
+                    SyncEventLog.event_id.in_([stuck.event_id, scheduled.event_id])):
+                row.mark_published("lost")
+        RetryScheduler(self.publisher.redis_client, self.stream).schedule(scheduled)
+
+        self.assertEqual(self.publisher.retry_pending_events(), 2)
+
+        client = self.publisher.redis_client
+        published = {fields["event_id"] for _, fields in client.xrange(self.stream)}
+        self.assertEqual(published, {stuck.event_id, pending.event_id})
+        rows = self._rows()
+        self.assertEqual(rows[stuck.event_id], (SyncEventStatus.PUBLISHED, 1))
+        self.assertEqual(rows[pending.event_id], (SyncEventStatus.PUBLISHED, 1))
+        self.assertEqual(rows[scheduled.event_id], (SyncEventStatus.PUBLISHED, 0))
+
+
 def run_tests():
     """Run all tests"""
     # Create test suite
@@ -755,6 +1078,12 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestConflictDetector))
     suite.addTests(loader.loadTestsFromTestCase(TestConflictResolver))
     suite.addTests(loader.loadTestsFromTestCase(TestIntegration))
+    suite.addTests(loader.loadTestsFromTestCase(TestEventCoalescing))
+    suite.addTests(loader.loadTestsFromTestCase(TestHybridLogicalClock))
+    suite.addTests(loader.loadTestsFromTestCase(TestAppliedVersionCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestRetryScheduler))
+    suite.addTests(loader.loadTestsFromTestCase(TestStaleSyncStatus))
+    suite.addTests(loader.loadTestsFromTestCase(TestRetryPendingEvents))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
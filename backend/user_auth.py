@@ -10,7 +10,9 @@ License: MIT License
 
 import os
 import asyncio
+import atexit
 import secrets
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -18,9 +20,8 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', 'config',
 
 import psycopg2
 from psycopg2 import pool, extras
-import bcrypt
 import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import uuid
 from email_verification import (
     generate_verification_token,
@@ -28,6 +29,7 @@ from email_verification import (
     send_verification_email,
     send_welcome_email
 )
+from password_hashing import get_password_hasher, PasswordHashingBusy
 from database.neo4j_manager import Neo4jManager
 from database.initialize_database import initialize_database
 
@@ -42,6 +44,9 @@ JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES
 # Database Schema Configuration
 DB_SCHEMA = os.getenv("DB_SCHEMA", "jeseci_academy")
 
+# Seconds between batched last_login_at writes
+LAST_LOGIN_FLUSH_INTERVAL = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", "5"))
+
 
 class UserAuthManager:
     """
@@ -53,12 +58,12 @@ class UserAuthManager:
     
     _instance = None
     _pool = None
+    _pool_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.schema = DB_SCHEMA
-            cls._instance._initialize_pool()
         return cls._instance
     
     def _initialize_pool(self):
@@ -96,9 +101,11 @@ class UserAuthManager:
         }
     
     def _get_connection(self):
-        """Get a connection from the pool"""
+        """Get a connection from the pool, opening it (and the schema) on first use"""
         if UserAuthManager._pool is None:
-            self._initialize_pool()
+            with UserAuthManager._pool_lock:
+                if UserAuthManager._pool is None:
+                    self._initialize_pool()
         if UserAuthManager._pool:
             return UserAuthManager._pool.getconn()
         return None
@@ -163,8 +170,7 @@ class UserAuthManager:
             user_id = f"user_{username}_{uuid.uuid4().hex[:8]}"
             
             # Hash password with bcrypt
-            salt = bcrypt.gensalt(rounds=12)
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+            password_hash = get_password_hasher().hash_password(password, rounds=12)
             
             # Generate verification token if not skipped
             verification_token = None
@@ -271,104 +277,173 @@ class UserAuthManager:
         finally:
             self._return_connection(conn)
     
-    def authenticate_user(self, username: str, password: str) -> dict:
+    def _fetch_login_record(self, username: str) -> dict:
         """
-        Authenticate user with username and password.
+        Fetch the user, profile and preferences needed for login in one query.
         
-        Args:
-            username: Username or email
-            password: Plain text password
-            
         Returns:
-            dict with 'success', 'token', 'user_data', and 'message' keys
+            dict with 'user', 'profile' and 'preferences' keys, None if no
+            active user matches, or a dict with 'error' on failure
         """
         conn = self._get_connection()
         if conn is None:
-            return {"success": False, "error": "Database connection failed", "token": None}
+            return {"error": "Database connection failed"}
         
         try:
             cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
-            
-            # Find user by username or email (only auth fields from users table)
             cursor.execute(
-                f"SELECT id, user_id, username, email, password_hash, is_active, is_admin, admin_role, is_email_verified FROM {self.schema}.users WHERE (username = %s OR email = %s) AND is_active = TRUE",
+                f"""
+                SELECT u.id, u.user_id, u.username, u.email, u.password_hash, u.is_active,
+                       u.is_admin, u.admin_role, u.is_email_verified,
+                       p.user_id AS profile_user_id,
+                       p.first_name AS profile_first_name, p.last_name AS profile_last_name,
+                       p.bio AS profile_bio, p.avatar_url AS profile_avatar_url,
+                       p.timezone AS profile_timezone, p.language AS profile_language,
+                       lp.user_id AS preferences_user_id,
+                       lp.daily_goal_minutes AS preferences_daily_goal_minutes,
+                       lp.preferred_difficulty AS preferences_preferred_difficulty,
+                       lp.preferred_content_type AS preferences_preferred_content_type,
+                       lp.notifications_enabled AS preferences_notifications_enabled,
+                       lp.email_reminders AS preferences_email_reminders,
+                       lp.dark_mode AS preferences_dark_mode,
+                       lp.auto_play_videos AS preferences_auto_play_videos
+                FROM {self.schema}.users u
+                LEFT JOIN {self.schema}.user_profile p ON p.user_id = u.id
+                LEFT JOIN {self.schema}.user_learning_preferences lp ON lp.user_id = u.id
+                WHERE (u.username = %s OR u.email = %s) AND u.is_active = TRUE
+                LIMIT 1
+                """,
                 (username, username)
             )
-            user = cursor.fetchone()
-            
-            if not user:
-                return {"success": False, "error": "Invalid credentials", "code": "UNAUTHORIZED", "token": None}
-            
-            # Check if email is verified
-            if not user.get('is_email_verified', False):
-                return {
-                    "success": False, 
-                    "error": "Please verify your email before logging in", 
-                    "code": "EMAIL_NOT_VERIFIED", 
-                    "token": None,
-                    "email": user['email']
-                }
-            
-            # Verify password
-            if not bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
-                return {"success": False, "error": "Invalid credentials", "code": "UNAUTHORIZED", "token": None}
-            
-            # Fetch profile from user_profile table (links via users.id)
-            cursor.execute(
-                f"SELECT first_name, last_name, bio, avatar_url, timezone, language FROM {self.schema}.user_profile WHERE user_id = %s",
-                (user['id'],)
-            )
-            profile = cursor.fetchone()
-            
-            # Fetch preferences from user_learning_preferences table (links via users.id)
-            cursor.execute(
-                f"SELECT daily_goal_minutes, preferred_difficulty, preferred_content_type, notifications_enabled, email_reminders, dark_mode, auto_play_videos FROM {self.schema}.user_learning_preferences WHERE user_id = %s",
-                (user['id'],)
-            )
-            preferences = cursor.fetchone()
-            
-            # Generate JWT token
-            user_id = user['user_id']
-            token_payload = {
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            record = {"user": {}, "profile": {}, "preferences": {}}
+            for key, value in row.items():
+                if key.startswith("profile_"):
+                    record["profile"][key[len("profile_"):]] = value
+                elif key.startswith("preferences_"):
+                    record["preferences"][key[len("preferences_"):]] = value
+                else:
+                    record["user"][key] = value
+            
+            # LEFT JOIN yields NULLs when the row does not exist
+            if record["profile"].pop("user_id") is None:
+                record["profile"] = {}
+            if record["preferences"].pop("user_id") is None:
+                record["preferences"] = {}
+            return record
+        except Exception as e:
+            logger.error(f"User lookup error: {e}")
+            return {"error": str(e)}
+        finally:
+            self._return_connection(conn)
+    
+    def _build_login_response(self, record: dict) -> dict:
+        """Generate the JWT and login response for a verified user"""
+        user = record["user"]
+        user_id = user['user_id']
+        token_payload = {
+            "user_id": user_id,
+            "username": user['username'],
+            "email": user['email'],
+            "is_admin": user.get('is_admin', False),
+            "admin_role": user.get('admin_role', 'student'),
+            "exp": datetime.utcnow() + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES),
+            "iat": datetime.utcnow()
+        }
+        token = jwt.encode(token_payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+        
+        # Last login is written in batches by the background recorder
+        last_login_recorder.record(user['id'])
+        
+        logger.info(f"User authenticated successfully: {user_id}")
+        return {
+            "success": True,
+            "access_token": token,
+            "token_type": "bearer",
+            "expires_in": JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            "user": {
                 "user_id": user_id,
                 "username": user['username'],
                 "email": user['email'],
                 "is_admin": user.get('is_admin', False),
                 "admin_role": user.get('admin_role', 'student'),
-                "exp": datetime.utcnow() + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES),
-                "iat": datetime.utcnow()
-            }
-            token = jwt.encode(token_payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-            
-            # Update last login
-            update_query = f"UPDATE {self.schema}.users SET last_login_at = CURRENT_TIMESTAMP WHERE id = %s"
-            cursor.execute(update_query, (user['id'],))
-            conn.commit()
-            
-            logger.info(f"User authenticated successfully: {user_id}")
+                "is_email_verified": user.get('is_email_verified', False),
+                "profile": record["profile"],
+                "preferences": record["preferences"]
+            },
+            "message": "Login successful"
+        }
+    
+    def _check_login_record(self, record: dict) -> dict:
+        """Return an error response if the record cannot log in, otherwise None"""
+        if record is None:
+            return {"success": False, "error": "Invalid credentials", "code": "UNAUTHORIZED", "token": None}
+        if "error" in record:
+            return {"success": False, "error": record["error"], "token": None}
+        
+        user = record["user"]
+        if not user.get('is_email_verified', False):
             return {
-                "success": True,
-                "access_token": token,
-                "token_type": "bearer",
-                "expires_in": JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-                "user": {
-                    "user_id": user_id,
-                    "username": user['username'],
-                    "email": user['email'],
-                    "is_admin": user.get('is_admin', False),
-                    "admin_role": user.get('admin_role', 'student'),
-                    "is_email_verified": user.get('is_email_verified', False),
-                    "profile": dict(profile) if profile else {},
-                    "preferences": dict(preferences) if preferences else {}
-                },
-                "message": "Login successful"
+                "success": False, 
+                "error": "Please verify your email before logging in", 
+                "code": "EMAIL_NOT_VERIFIED", 
+                "token": None,
+                "email": user['email']
             }
+        return None
+    
+    def authenticate_user(self, username: str, password: str) -> dict:
+        """
+        Authenticate user with username and password.
+        
+        Args:
+            username: Username or email
+            password: Plain text password
             
+        Returns:
+            dict with 'success', 'token', 'user_data', and 'message' keys
+        """
+        record = self._fetch_login_record(username)
+        failure = self._check_login_record(record)
+        if failure:
+            return failure
+        
+        try:
+            if not get_password_hasher().verify_password(password, record["user"]['password_hash']):
+                return {"success": False, "error": "Invalid credentials", "code": "UNAUTHORIZED", "token": None}
+            return self._build_login_response(record)
+        except PasswordHashingBusy as e:
+            logger.warning(f"Login rejected, password hashing saturated: {e}")
+            return {"success": False, "error": "Server busy, please retry", "code": "BUSY", "token": None}
+        except Exception as e:
+            logger.error(f"User authentication error: {e}")
+            return {"success": False, "error": str(e), "token": None}
+    
+    async def authenticate_user_async(self, username: str, password: str) -> dict:
+        """
+        Authenticate user without blocking the event loop.
+        
+        The database lookup runs in a thread and password verification runs
+        in the password hashing pool.
+        """
+        record = await asyncio.to_thread(self._fetch_login_record, username)
+        failure = self._check_login_record(record)
+        if failure:
+            return failure
+        
+        try:
+            if not await get_password_hasher().verify_password_async(password, record["user"]['password_hash']):
+                return {"success": False, "error": "Invalid credentials", "code": "UNAUTHORIZED", "token": None}
+            return self._build_login_response(record)
+        except PasswordHashingBusy as e:
+            logger.warning(f"Login rejected, password hashing saturated: {e}")
+            return {"success": False, "error": "Server busy, please retry", "code": "BUSY", "token": None}
         except Exception as e:
             logger.error(f"User authentication error: {e}")
             return {"success": False, "error": str(e), "token": None}
-        finally:
-            self._return_connection(conn)
     
     def get_user_by_id(self, user_id: str) -> dict:
         """Get user data by user_id"""
@@ -974,8 +1049,86 @@ class UserAuthManager:
             logger.info("User auth connection pool closed")
 
 
+class LastLoginRecorder:
+    """
+    Collects successful logins and writes last_login_at in batches.
+    
+    Login requests only record the user id in memory; a background thread
+    flushes all pending ids with a single UPDATE every flush interval.
+    """
+    
+    def __init__(self, manager: UserAuthManager, flush_interval: float = LAST_LOGIN_FLUSH_INTERVAL):
+        self.manager = manager
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def record(self, user_pk: int):
+        """Record a login for the given users.id"""
+        with self._lock:
+            self._pending[user_pk] = datetime.now(timezone.utc)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="last-login-flush", daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+    
+    def flush(self) -> int:
+        """Write all pending last_login_at values; returns the number written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        
+        conn = self.manager._get_connection()
+        if conn is None:
+            self._requeue(pending)
+            return 0
+        
+        try:
+            cursor = conn.cursor()
+            extras.execute_values(
+                cursor,
+                f"""
+                UPDATE {self.manager.schema}.users AS u
+                SET last_login_at = v.login_at
+                FROM (VALUES %s) AS v(id, login_at)
+                WHERE u.id = v.id
+                """,
+                list(pending.items()),
+                template="(%s, %s::timestamp)"
+            )
+            conn.commit()
+            return len(pending)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to flush last login times: {e}")
+            self._requeue(pending)
+            return 0
+        finally:
+            self.manager._return_connection(conn)
+    
+    def _requeue(self, pending: dict):
+        """Put back entries that failed to flush, keeping newer logins"""
+        with self._lock:
+            for user_pk, login_at in pending.items():
+                self._pending.setdefault(user_pk, login_at)
+    
+    def stop(self):
+        """Stop the background thread and write anything pending"""
+        self._stop.set()
+        self.flush()
+
+
 # Global instance
 auth_manager = UserAuthManager()
+last_login_recorder = LastLoginRecorder(auth_manager)
+atexit.register(last_login_recorder.stop)
 
 
 def register_user(username: str, email: str, password: str, 
@@ -1000,6 +1153,11 @@ def authenticate_user(username: str, password: str) -> dict:
     return auth_manager.authenticate_user(username, password)
 
 
+async def authenticate_user_async(username: str, password: str) -> dict:
+    """Wrapper function for async endpoints"""
+    return await auth_manager.authenticate_user_async(username, password)
+
+
 def verify_email(verification_token: str) -> dict:
     """Wrapper function for email verification"""
     return auth_manager.verify_email(verification_token)